@@ -1,15 +1,19 @@
 from django.shortcuts import redirect
 from django.urls import reverse
 
+from core.middleware import compilar_prefixos
+
 
 class LoginRequiredMiddleware:
     """
     Middleware que força login em todas as páginas, exceto login e register.
+
+    As URLs isentas são compiladas uma única vez, na inicialização, em uma
+    regex ancorada.
     """
     def __init__(self, get_response):
         self.get_response = get_response
 
-    def __call__(self, request):
         # URLs que não precisam de autenticação
         exempt_urls = [
             reverse('accounts:login'),
@@ -25,14 +29,11 @@ class LoginRequiredMiddleware:
             '/accounts/password-reset-confirm/',  # Recuperação de senha - criar nova senha
             '/accounts/password-reset-complete/',  # Recuperação de senha - sucesso
         ]
-        
-        # Verifica se a URL atual está nas exceções
-        path = request.path_info
-        is_exempt = any(path.startswith(url) for url in exempt_urls)
-        
+        self.exempt_matcher = compilar_prefixos(exempt_urls)
+
+    def __call__(self, request):
         # Se não estiver autenticado e não for uma URL de exceção, redireciona para login
-        if not request.user.is_authenticated and not is_exempt:
+        if not request.user.is_authenticated and not self.exempt_matcher.match(request.path_info):
             return redirect('accounts:login')
-        
-        response = self.get_response(request)
-        return response
+
+        return self.get_response(request)
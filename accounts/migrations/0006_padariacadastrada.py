@@ -0,0 +1,81 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def copiar_ids_para_vinculos(apps, schema_editor):
+    """Converte a lista JSON `padarias_cadastradas_ids` em linhas de PadariaCadastrada."""
+    AgenteCredenciado = apps.get_model('accounts', 'AgenteCredenciado')
+    PadariaCadastrada = apps.get_model('accounts', 'PadariaCadastrada')
+    Padaria = apps.get_model('organizations', 'Padaria')
+
+    padarias_existentes = set(Padaria.objects.values_list('id', flat=True))
+    vistas = set()
+    vinculos = []
+
+    # Agente mais antigo primeiro: se a padaria estiver em mais de uma lista, fica com ele
+    for agente_id, ids in AgenteCredenciado.objects.order_by('created_at', 'id').values_list(
+        'id', 'padarias_cadastradas_ids'
+    ):
+        for padaria_id in ids or []:
+            try:
+                padaria_id = int(padaria_id)
+            except (TypeError, ValueError):
+                continue
+            if padaria_id in vistas or padaria_id not in padarias_existentes:
+                continue
+            vistas.add(padaria_id)
+            vinculos.append(PadariaCadastrada(agente_id=agente_id, padaria_id=padaria_id))
+
+    PadariaCadastrada.objects.bulk_create(vinculos, batch_size=BATCH_SIZE)
+
+
+def copiar_vinculos_para_ids(apps, schema_editor):
+    """Reverte: reconstrói as listas JSON a partir dos vínculos."""
+    AgenteCredenciado = apps.get_model('accounts', 'AgenteCredenciado')
+    PadariaCadastrada = apps.get_model('accounts', 'PadariaCadastrada')
+
+    por_agente = {}
+    for agente_id, padaria_id in PadariaCadastrada.objects.order_by('id').values_list('agente_id', 'padaria_id'):
+        por_agente.setdefault(agente_id, []).append(padaria_id)
+
+    for agente_id, ids in por_agente.items():
+        AgenteCredenciado.objects.filter(pk=agente_id).update(padarias_cadastradas_ids=ids)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_add_agente_credenciado'),
+        ('organizations', '0008_add_socio_responsavel_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PadariaCadastrada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Cadastrada em')),
+                ('agente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cadastros', to='accounts.agentecredenciado', verbose_name='Agente Credenciado')),
+                ('padaria', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cadastro_agente', to='organizations.padaria', verbose_name='Padaria')),
+            ],
+            options={
+                'verbose_name': 'Padaria Cadastrada por Agente',
+                'verbose_name_plural': 'Padarias Cadastradas por Agentes',
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='agentecredenciado',
+            name='padarias_cadastradas',
+            field=models.ManyToManyField(blank=True, related_name='agentes_credenciados', through='accounts.PadariaCadastrada', to='organizations.padaria', verbose_name='Padarias Cadastradas'),
+        ),
+        migrations.RunPython(copiar_ids_para_vinculos, copiar_vinculos_para_ids),
+        migrations.RemoveField(
+            model_name='agentecredenciado',
+            name='padarias_cadastradas_ids',
+        ),
+    ]
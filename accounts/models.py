@@ -72,13 +72,13 @@ class AgenteCredenciado(models.Model):
         help_text="Lista de cidades/estados onde o agente pode atuar"
     )
     
-    # Padarias cadastradas pelo agente (relacionamento)
-    # Isso será gerenciado via ForeignKey na Padaria ou através de um campo aqui
-    padarias_cadastradas_ids = models.JSONField(
-        default=list, 
+    # Padarias cadastradas pelo agente (tabela intermediária indexada)
+    padarias_cadastradas = models.ManyToManyField(
+        'organizations.Padaria',
+        through='PadariaCadastrada',
+        related_name="agentes_credenciados",
         blank=True,
-        verbose_name="IDs das Padarias Cadastradas",
-        help_text="IDs das padarias cadastradas por este agente"
+        verbose_name="Padarias Cadastradas"
     )
     
     # Controle
@@ -146,14 +146,60 @@ class AgenteCredenciado(models.Model):
         return False
     
     def adicionar_padaria(self, padaria_id):
-        """Adiciona uma padaria à lista de padarias cadastradas."""
-        if padaria_id not in self.padarias_cadastradas_ids:
-            self.padarias_cadastradas_ids.append(padaria_id)
-            self.save()
+        """Registra que a padaria foi cadastrada por este agente."""
+        PadariaCadastrada.objects.get_or_create(padaria_id=padaria_id, defaults={'agente': self})
+    
+    def cadastrou_padaria(self, padaria_id):
+        """Verifica se a padaria foi cadastrada por este agente."""
+        return self.cadastros.filter(padaria_id=padaria_id).exists()
     
     def get_padarias_count(self):
-        """Retorna o número de padarias cadastradas."""
-        return len(self.padarias_cadastradas_ids)
+        """
+        Retorna o número de padarias cadastradas.
+        Usa a anotação `num_padarias` quando presente (ver `com_total_padarias`).
+        """
+        if hasattr(self, 'num_padarias'):
+            return self.num_padarias
+        return self.cadastros.count()
+    
+    @classmethod
+    def com_total_padarias(cls):
+        """Queryset de agentes anotada com `num_padarias` (evita N+1 em listagens)."""
+        return cls.objects.annotate(num_padarias=models.Count('cadastros'))
+    
+    @classmethod
+    def cadastrador_de(cls, padaria):
+        """Retorna o agente credenciado que cadastrou a padaria (ou None)."""
+        padaria_id = getattr(padaria, 'pk', padaria)
+        return cls.objects.filter(cadastros__padaria_id=padaria_id).first()
+
+
+class PadariaCadastrada(models.Model):
+    """
+    Vínculo entre o agente credenciado e as padarias que ele cadastrou.
+    Cada padaria é cadastrada por no máximo um agente.
+    """
+    agente = models.ForeignKey(
+        AgenteCredenciado,
+        on_delete=models.CASCADE,
+        related_name="cadastros",
+        verbose_name="Agente Credenciado"
+    )
+    padaria = models.OneToOneField(
+        'organizations.Padaria',
+        on_delete=models.CASCADE,
+        related_name="cadastro_agente",
+        verbose_name="Padaria"
+    )
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Cadastrada em")
+
+    class Meta:
+        verbose_name = "Padaria Cadastrada por Agente"
+        verbose_name_plural = "Padarias Cadastradas por Agentes"
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.agente.nome} -> {self.padaria_id}"
 
 
 from django.db.models.signals import post_save
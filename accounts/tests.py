@@ -1,3 +1,44 @@
 from django.test import TestCase
+from django.contrib.auth.models import User
 
-# Accounts tests
+from organizations.models import Padaria
+from .models import AgenteCredenciado, PadariaCadastrada
+
+
+class AgenteCredenciadoPadariasTest(TestCase):
+    """Testes para o vínculo agente credenciado -> padarias cadastradas."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="dono", password="12345")
+        self.agente = AgenteCredenciado.objects.create(
+            user=User.objects.create_user(username="agente", password="12345"),
+            nome="Agente Teste",
+            cpf="000.000.000-00",
+            telefone="11999999999",
+            email="agente@teste.com",
+        )
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=self.owner)
+
+    def test_adicionar_padaria(self):
+        """Testa registro e consulta nos dois sentidos."""
+        self.agente.adicionar_padaria(self.padaria.id)
+        self.agente.adicionar_padaria(self.padaria.id)  # idempotente
+
+        self.assertEqual(PadariaCadastrada.objects.count(), 1)
+        self.assertTrue(self.agente.cadastrou_padaria(self.padaria.id))
+        self.assertEqual(list(self.agente.padarias_cadastradas.all()), [self.padaria])
+        self.assertEqual(AgenteCredenciado.cadastrador_de(self.padaria), self.agente)
+        self.assertEqual(self.agente.get_padarias_count(), 1)
+
+    def test_padaria_sem_agente(self):
+        """Testa padaria cadastrada pelo admin (sem agente)."""
+        self.assertIsNone(AgenteCredenciado.cadastrador_de(self.padaria))
+        self.assertFalse(self.agente.cadastrou_padaria(self.padaria.id))
+
+    def test_com_total_padarias(self):
+        """Testa a anotação usada nas listagens."""
+        self.agente.adicionar_padaria(self.padaria.id)
+        agente = AgenteCredenciado.com_total_padarias().get(pk=self.agente.pk)
+        self.assertEqual(agente.num_padarias, 1)
+        with self.assertNumQueries(0):
+            self.assertEqual(agente.get_padarias_count(), 1)
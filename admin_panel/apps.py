@@ -5,3 +5,7 @@ class AdminPanelConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'admin_panel'
     verbose_name = 'Painel Administrativo'
+
+    def ready(self):
+        # Importar signals das métricas para registrá-los
+        import admin_panel.signals  # noqa
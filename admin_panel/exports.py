@@ -0,0 +1,407 @@
+"""
+Exportação do relatório de clientes (padarias) para Excel.
+
+A planilha é gerada com o openpyxl em modo write-only: as linhas são
+escritas direto no arquivo à medida que a queryset é percorrida em
+blocos (``.iterator()``), então a memória usada não cresce com o número
+de padarias. Contagens e assinaturas são buscadas antes em mapas
+``{padaria_id: valor}`` (uma query agrupada por relação) e o agente
+credenciado vem por JOIN, em vez de consultas por linha.
+
+Exportações grandes rodam em uma thread em segundo plano e gravam o
+arquivo em ``EXPORTS_ROOT``; o status é derivado dos arquivos no disco,
+o que funciona entre workers do mesmo host.
+"""
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Exists, F, Max, OuterRef, Q
+
+logger = logging.getLogger(__name__)
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Acima deste número de padarias a exportação vai para segundo plano
+ASYNC_THRESHOLD = getattr(settings, 'CLIENTES_EXPORT_ASYNC_THRESHOLD', 2000)
+
+# Tamanho dos blocos lidos do banco durante a exportação
+CHUNK_SIZE = 1000
+
+# Arquivos de exportação mais antigos que isso são removidos
+EXPORT_MAX_AGE_SECONDS = 24 * 60 * 60
+
+EXPORTS_ROOT = Path(getattr(
+    settings, 'EXPORTS_ROOT', Path(tempfile.gettempdir()) / 'pandia_exports'
+))
+
+_JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+HEADERS = [
+    'Nome', 'Slug', 'CNPJ', 'Responsável', 'Email Responsável',
+    'Status', 'WhatsApp Conectado', 'Status Assinatura',
+    'Qtd. Agentes', 'Qtd. Usuários', 'Qtd. Produtos',
+    'Qtd. Promoções', 'Qtd. Clientes', 'Qtd. Campanhas',
+    'Data Cadastro', 'Cadastrado por', 'Última Atividade', 'Telefone', 'Endereço'
+]
+
+COLUMN_WIDTHS = [25, 20, 18, 20, 30, 12, 18, 18, 12, 12, 12, 12, 12, 12, 15, 18, 15, 30]
+
+
+def filtrar_padarias(params):
+    """
+    Aplica os filtros do relatório de clientes (status, whatsapp,
+    assinatura, período e busca) e retorna a queryset de padarias.
+
+    Args:
+        params: dict/QueryDict com os parâmetros do request (GET)
+    """
+    from organizations.models import Padaria
+    from agents.models import Agent
+    from payments.models import AsaasSubscription
+
+    status_filter = params.get('status', '')
+    whatsapp_filter = params.get('whatsapp', '')
+    subscription_filter = params.get('subscription', '')
+    date_from = params.get('date_from', '')
+    date_to = params.get('date_to', '')
+    search = params.get('search', '')
+
+    padarias = Padaria.objects.all()
+
+    if status_filter == 'ativas':
+        padarias = padarias.filter(is_active=True)
+    elif status_filter == 'inativas':
+        padarias = padarias.filter(is_active=False)
+
+    if whatsapp_filter in ('conectado', 'desconectado'):
+        padarias = padarias.annotate(
+            tem_agente=Exists(Agent.objects.filter(padaria=OuterRef('pk')))
+        ).filter(tem_agente=(whatsapp_filter == 'conectado'))
+
+    if subscription_filter in ('ativa', 'inativa'):
+        active_subs = AsaasSubscription.objects.filter(
+            status__in=['ACTIVE', 'active']
+        ).values_list('padaria_id', flat=True)
+        if subscription_filter == 'ativa':
+            padarias = padarias.filter(id__in=active_subs)
+        else:
+            padarias = padarias.exclude(id__in=active_subs)
+
+    if date_from:
+        try:
+            date_from_dt = datetime.strptime(date_from, '%Y-%m-%d')
+            padarias = padarias.filter(created_at__gte=date_from_dt)
+        except ValueError:
+            pass
+
+    if date_to:
+        try:
+            date_to_dt = datetime.strptime(date_to, '%Y-%m-%d')
+            date_to_dt = date_to_dt.replace(hour=23, minute=59, second=59)
+            padarias = padarias.filter(created_at__lte=date_to_dt)
+        except ValueError:
+            pass
+
+    if search:
+        padarias = padarias.filter(
+            Q(name__icontains=search) |
+            Q(slug__icontains=search) |
+            Q(owner__username__icontains=search) |
+            Q(owner__email__icontains=search)
+        )
+
+    return padarias
+
+
+def _contagem_por_padaria(model, padaria_ids):
+    """Retorna {padaria_id: total} para um model com FK `padaria`."""
+    rows = model.objects.filter(padaria_id__in=padaria_ids).values('padaria_id').annotate(
+        total=Count('id')
+    ).values_list('padaria_id', 'total')
+    return dict(rows)
+
+
+def _carregar_mapas(padarias):
+    """
+    Pré-carrega, em poucas queries agrupadas, as contagens, a última
+    atividade e o status da assinatura de cada padaria.
+    """
+    from organizations.models import PadariaUser, Produto, Promocao, Cliente, CampanhaWhatsApp
+    from agents.models import Agent
+    from audit.models import AuditLog
+    from payments.models import AsaasSubscription
+
+    padaria_ids = padarias.values('id')
+
+    contagens = {
+        'agents': _contagem_por_padaria(Agent, padaria_ids),
+        'users': _contagem_por_padaria(PadariaUser, padaria_ids),
+        'produtos': _contagem_por_padaria(Produto, padaria_ids),
+        'promocoes': _contagem_por_padaria(Promocao, padaria_ids),
+        'clientes': _contagem_por_padaria(Cliente, padaria_ids),
+        'campanhas': _contagem_por_padaria(CampanhaWhatsApp, padaria_ids),
+    }
+
+    ultima_atividade = dict(
+        AuditLog.objects.filter(padaria_id__in=padaria_ids).values('padaria_id').annotate(
+            ultima=Max('created_at')
+        ).values_list('padaria_id', 'ultima')
+    )
+
+    assinaturas = dict(
+        AsaasSubscription.objects.filter(padaria_id__in=padaria_ids).values_list('padaria_id', 'status')
+    )
+
+    return contagens, ultima_atividade, assinaturas
+
+
+def _status_assinatura(status):
+    """Traduz o status da AsaasSubscription para o texto da planilha."""
+    if status is None:
+        return 'Sem assinatura'
+    if status in ['ACTIVE', 'active']:
+        return 'Ativa'
+    if status in ['TRIAL', 'trialing']:
+        return 'Trial'
+    if status == 'OVERDUE':
+        return 'Vencida'
+    if status == 'EXPIRED':
+        return 'Expirada'
+    return status
+
+
+def gerar_planilha_clientes(params, destino):
+    """
+    Gera a planilha do relatório de clientes em `destino`.
+
+    Args:
+        params: dict/QueryDict com os filtros do relatório
+        destino: caminho ou arquivo binário aberto para escrita
+
+    Returns:
+        int: número de padarias exportadas
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+    from openpyxl.utils import get_column_letter
+
+    padarias = filtrar_padarias(params)
+    total = padarias.count()
+    contagens, ultima_atividade, assinaturas = _carregar_mapas(padarias)
+
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("Relatório de Clientes")
+
+    # Estilos (criados uma única vez e reaproveitados em todas as células)
+    header_fill = PatternFill(start_color="667EEA", end_color="667EEA", fill_type="solid")
+    header_font = Font(bold=True, color="FFFFFF", size=12)
+    verde = PatternFill(start_color="D1FAE5", end_color="D1FAE5", fill_type="solid")
+    vermelho = PatternFill(start_color="FEE2E2", end_color="FEE2E2", fill_type="solid")
+    border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    alinhamento_dados = Alignment(horizontal='left', vertical='center')
+
+    # Em modo write-only, larguras e alturas precisam ser definidas antes das linhas
+    for col_num, width in enumerate(COLUMN_WIDTHS, 1):
+        ws.column_dimensions[get_column_letter(col_num)].width = width
+    ws.row_dimensions[1].height = 30
+    ws.row_dimensions[2].height = 20
+    ws.row_dimensions[4].height = 25
+
+    ultima_coluna = get_column_letter(len(HEADERS))
+
+    # Título
+    titulo = WriteOnlyCell(ws, value='RELATÓRIO DE CONTROLE DE CLIENTES (PADARIAS)')
+    titulo.font = Font(bold=True, size=16, color="667EEA")
+    titulo.alignment = Alignment(horizontal='center', vertical='center')
+    ws.append([titulo])
+    ws.merged_cells.add(f'A1:{ultima_coluna}1')
+
+    # Info de geração
+    info = WriteOnlyCell(
+        ws, value=f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")} - Total: {total} clientes'
+    )
+    info.font = Font(size=10, italic=True)
+    info.alignment = Alignment(horizontal='center')
+    ws.append([info])
+    ws.merged_cells.add(f'A2:{ultima_coluna}2')
+
+    ws.append([])
+
+    # Cabeçalhos na linha 4
+    header_row = []
+    for header in HEADERS:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.fill = header_fill
+        cell.font = header_font
+        cell.alignment = Alignment(horizontal='center', vertical='center')
+        cell.border = border
+        header_row.append(cell)
+    ws.append(header_row)
+
+    # Dados
+    # O agente credenciado que cadastrou vem por JOIN com a tabela de vínculos
+    linhas = padarias.select_related('owner').only(
+        'name', 'slug', 'cnpj', 'is_active', 'created_at', 'phone', 'address',
+        'owner__username', 'owner__email',
+    ).annotate(
+        agente_criador_nome=F('cadastro_agente__agente__nome')
+    ).order_by('name').iterator(chunk_size=CHUNK_SIZE)
+
+    exportadas = 0
+    for padaria in linhas:
+        num_agents = contagens['agents'].get(padaria.id, 0)
+        atividade = ultima_atividade.get(padaria.id)
+        status = 'Ativa' if padaria.is_active else 'Inativa'
+        whatsapp = 'Sim' if num_agents > 0 else 'Não'
+
+        row_data = [
+            padaria.name,
+            padaria.slug,
+            padaria.cnpj or '-',
+            padaria.owner.username,
+            padaria.owner.email,
+            status,
+            whatsapp,
+            _status_assinatura(assinaturas.get(padaria.id)),
+            num_agents,
+            contagens['users'].get(padaria.id, 0),
+            contagens['produtos'].get(padaria.id, 0),
+            contagens['promocoes'].get(padaria.id, 0),
+            contagens['clientes'].get(padaria.id, 0),
+            contagens['campanhas'].get(padaria.id, 0),
+            padaria.created_at.strftime('%d/%m/%Y') if padaria.created_at else '-',
+            padaria.agente_criador_nome or 'Admin',
+            atividade.strftime('%d/%m/%Y %H:%M') if atividade else '-',
+            padaria.phone or '-',
+            padaria.address or '-'
+        ]
+
+        row = []
+        for col_num, value in enumerate(row_data, 1):
+            cell = WriteOnlyCell(ws, value=value)
+            cell.border = border
+            cell.alignment = alinhamento_dados
+
+            # Colorir status
+            if col_num == 6:
+                cell.fill = verde if value == 'Ativa' else vermelho
+            elif col_num == 7 and value == 'Sim':
+                cell.fill = verde
+            row.append(cell)
+
+        ws.append(row)
+        exportadas += 1
+
+    wb.save(destino)
+    return exportadas
+
+
+def nome_arquivo_exportacao():
+    """Nome sugerido para download da planilha."""
+    return f'relatorio_clientes_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+
+
+# =============================================================================
+# Exportação em segundo plano
+# =============================================================================
+
+def _job_valido(job_id):
+    return bool(job_id and _JOB_ID_RE.match(job_id))
+
+
+def caminho_exportacao(job_id):
+    """Caminho do arquivo final de uma exportação."""
+    return EXPORTS_ROOT / f'{job_id}.xlsx'
+
+
+def _caminho_parcial(job_id):
+    return EXPORTS_ROOT / f'{job_id}.xlsx.part'
+
+
+def _caminho_erro(job_id):
+    return EXPORTS_ROOT / f'{job_id}.error'
+
+
+def status_exportacao(job_id):
+    """
+    Retorna o status de uma exportação em segundo plano:
+    'pronto', 'processando', 'erro' ou None se o job não existe.
+    """
+    if not _job_valido(job_id):
+        return None
+    if caminho_exportacao(job_id).exists():
+        return 'pronto'
+    if _caminho_erro(job_id).exists():
+        return 'erro'
+    if _caminho_parcial(job_id).exists():
+        return 'processando'
+    return None
+
+
+def _limpar_exportacoes_antigas():
+    """Remove arquivos de exportações com mais de EXPORT_MAX_AGE_SECONDS."""
+    limite = time.time() - EXPORT_MAX_AGE_SECONDS
+    try:
+        for arquivo in EXPORTS_ROOT.iterdir():
+            if arquivo.stat().st_mtime < limite:
+                arquivo.unlink(missing_ok=True)
+    except OSError as e:
+        logger.warning(f"Erro ao limpar exportações antigas: {e}")
+
+
+def _executar_exportacao(job_id, params):
+    """Execução interna da exportação (roda na thread de segundo plano)."""
+    parcial = _caminho_parcial(job_id)
+    try:
+        with open(parcial, 'wb') as destino:
+            total = gerar_planilha_clientes(params, destino)
+        os.replace(parcial, caminho_exportacao(job_id))
+        logger.info(f"[Exportação {job_id}] Concluída com {total} padarias")
+    except Exception as e:
+        logger.error(f"[Exportação {job_id}] Erro ao gerar planilha: {e}")
+        _caminho_erro(job_id).write_text(str(e), encoding='utf-8')
+        parcial.unlink(missing_ok=True)
+    finally:
+        connection.close()
+
+
+def iniciar_exportacao_background(params):
+    """
+    Inicia a geração da planilha em uma thread separada.
+
+    Args:
+        params: dict com os filtros do relatório
+
+    Returns:
+        str: id do job, usado para consultar o status e baixar o arquivo
+    """
+    EXPORTS_ROOT.mkdir(parents=True, exist_ok=True)
+    _limpar_exportacoes_antigas()
+
+    job_id = uuid.uuid4().hex
+    # Marca o job como em processamento antes de iniciar a thread
+    _caminho_parcial(job_id).touch()
+
+    thread = threading.Thread(
+        target=_executar_exportacao,
+        args=(job_id, dict(params)),
+        name=f"ClientesExport-{job_id[:8]}",
+        daemon=True
+    )
+    thread.start()
+    return job_id
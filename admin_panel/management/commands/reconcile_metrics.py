@@ -0,0 +1,45 @@
+"""
+Management command para reconciliar as métricas do painel administrativo.
+
+Recalcula os contadores da plataforma (padarias, agentes, usuários,
+produtos, clientes, assinaturas, MRR) e o rollup de cadastros a partir
+das tabelas de origem, corrigindo divergências deixadas por atualizações
+em massa que não disparam signals.
+
+Uso: python manage.py reconcile_metrics
+Executado pelo agendador interno (run_scheduler) 1x ao dia - ver SCHEDULER_TASKS
+"""
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from admin_panel import metrics
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as métricas do painel administrativo e corrige divergências'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas lista as divergências, sem corrigir',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get('dry_run', False)
+
+        self.stdout.write(f"[{timezone.now()}] Reconciliando métricas...")
+
+        divergencias = metrics.reconciliar(dry_run=dry_run)
+
+        for chave, armazenado, correto in divergencias:
+            self.stdout.write(f"  ⚠️  {chave}: {armazenado} -> {correto}")
+
+        if not divergencias:
+            self.stdout.write(self.style.SUCCESS("Nenhuma divergência encontrada."))
+        elif dry_run:
+            self.stdout.write(self.style.WARNING(
+                f"\nMODO DRY-RUN: {len(divergencias)} divergência(s) não corrigida(s)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"\n{len(divergencias)} divergência(s) corrigida(s)."))
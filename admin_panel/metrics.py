@@ -0,0 +1,240 @@
+"""
+Métricas globais da plataforma para o painel administrativo.
+
+Os valores ficam em linhas pré-calculadas (`PlatformCounter` e o rollup
+diário `PadariaSignupDaily`), atualizadas incrementalmente pelos signals
+em `admin_panel.signals`. Como atualizações em massa (`queryset.update()`,
+`bulk_create`) não disparam signals, o comando `reconcile_metrics`
+recalcula tudo a partir das tabelas de origem e corrige divergências.
+Recomendado: executar o reconcile 1x ao dia.
+"""
+import logging
+from collections import defaultdict, OrderedDict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import PlatformCounter, PadariaSignupDaily
+
+logger = logging.getLogger(__name__)
+
+# Chaves dos contadores
+PADARIAS_TOTAL = 'padarias_total'
+PADARIAS_ATIVAS = 'padarias_ativas'
+PADARIAS_COM_AGENTE = 'padarias_com_agente'
+PADARIAS_ATIVAS_SEM_AGENTE = 'padarias_ativas_sem_agente'
+AGENTS_TOTAL = 'agents_total'
+AGENTS_ATIVOS = 'agents_ativos'
+USERS_TOTAL = 'users_total'  # Usuários que não são superuser
+# Membros, produtos e clientes: exclusões de instância e em cascata são
+# descontadas pelos signals, mas `queryset.delete()` (inclusive a ação
+# "excluir selecionados" do admin do Django) não - quem usar deve aplicar
+# o delta com `incrementar` ou deixar o reconcile corrigir
+MEMBROS_TOTAL = 'membros_total'  # Vínculos PadariaUser
+PRODUTOS_TOTAL = 'produtos_total'
+CLIENTES_TOTAL = 'clientes_total'
+MRR_CENTAVOS = 'mrr_centavos'  # Soma do plan_value das CaktoSubscription ativas
+
+CAKTO_STATUS_PREFIX = 'cakto_status:'
+ASAAS_STATUS_PREFIX = 'asaas_status:'
+
+
+def chave_status_cakto(status):
+    return f'{CAKTO_STATUS_PREFIX}{status}'
+
+
+def chave_status_asaas(status):
+    return f'{ASAAS_STATUS_PREFIX}{status}'
+
+
+def para_centavos(valor):
+    """Converte um valor em reais (Decimal/float/None) para centavos inteiros."""
+    return int((Decimal(valor or 0) * 100).quantize(Decimal('1')))
+
+
+# =============================================================================
+# Escrita
+# =============================================================================
+
+def incrementar(chave, delta=1):
+    """Soma `delta` ao contador `chave` (criando a linha se necessário)."""
+    if not delta:
+        return
+    updated = PlatformCounter.objects.filter(key=chave).update(
+        value=F('value') + delta, updated_at=timezone.now()
+    )
+    if not updated:
+        counter, created = PlatformCounter.objects.get_or_create(key=chave, defaults={'value': delta})
+        if not created:
+            PlatformCounter.objects.filter(pk=counter.pk).update(value=F('value') + delta)
+
+
+def incrementar_varios(deltas):
+    """Aplica vários incrementos de uma vez: {chave: delta}."""
+    for chave, delta in deltas.items():
+        incrementar(chave, delta)
+
+
+def registrar_cadastro(quando, delta=1):
+    """Atualiza o rollup diário de cadastros de padarias."""
+    if not delta:
+        return
+    dia = timezone.localdate(quando) if quando else timezone.localdate()
+    updated = PadariaSignupDaily.objects.filter(date=dia).update(count=F('count') + delta)
+    if not updated:
+        rollup, created = PadariaSignupDaily.objects.get_or_create(date=dia, defaults={'count': delta})
+        if not created:
+            PadariaSignupDaily.objects.filter(pk=rollup.pk).update(count=F('count') + delta)
+
+
+# =============================================================================
+# Leitura
+# =============================================================================
+
+def obter_metricas():
+    """
+    Retorna todas as métricas em um dict (uma única query).
+    Chaves ausentes valem 0; `mrr` é devolvido em reais (Decimal).
+    """
+    metricas = defaultdict(int)
+    metricas.update(PlatformCounter.objects.values_list('key', 'value'))
+    metricas['padarias_inativas'] = metricas[PADARIAS_TOTAL] - metricas[PADARIAS_ATIVAS]
+    metricas['mrr'] = Decimal(metricas[MRR_CENTAVOS]) / 100
+    return metricas
+
+
+def contagem_por_status(metricas, prefixo):
+    """Extrai {status: total} das métricas para um prefixo de status."""
+    return {
+        chave[len(prefixo):]: valor
+        for chave, valor in metricas.items()
+        if chave.startswith(prefixo) and valor
+    }
+
+
+def cadastros_por_mes(meses=6):
+    """
+    Retorna um OrderedDict {'YYYY-MM': total} com os cadastros dos
+    últimos `meses` meses, a partir do rollup diário.
+    """
+    inicio = timezone.localdate() - timedelta(days=30 * meses)
+    por_mes = OrderedDict()
+    for dia, count in PadariaSignupDaily.objects.filter(
+        date__gte=inicio, count__gt=0
+    ).order_by('date').values_list('date', 'count'):
+        mes_ano = dia.strftime('%Y-%m')
+        por_mes[mes_ano] = por_mes.get(mes_ano, 0) + count
+    return por_mes
+
+
+def novas_padarias(dias=30):
+    """Total de padarias cadastradas nos últimos `dias` dias."""
+    inicio = timezone.localdate() - timedelta(days=dias)
+    return PadariaSignupDaily.objects.filter(date__gte=inicio).aggregate(
+        total=Sum('count')
+    )['total'] or 0
+
+
+# =============================================================================
+# Reconciliação
+# =============================================================================
+
+def calcular_metricas():
+    """
+    Calcula todas as métricas a partir das tabelas de origem.
+
+    Returns:
+        (contadores: dict, cadastros_diarios: dict {date: count})
+    """
+    from django.contrib.auth.models import User
+    from organizations.models import Padaria, PadariaUser, Produto, Cliente
+    from agents.models import Agent
+    from payments.models import CaktoSubscription, AsaasSubscription
+
+    padarias = Padaria.objects.aggregate(
+        total=Count('id'),
+        ativas=Count('id', filter=Q(is_active=True)),
+    )
+    tem_agente = Exists(Agent.objects.filter(padaria=OuterRef('pk')))
+    agents = Agent.objects.aggregate(
+        total=Count('id'),
+        ativos=Count('id', filter=Q(status='ativo')),
+    )
+
+    contadores = {
+        PADARIAS_TOTAL: padarias['total'],
+        PADARIAS_ATIVAS: padarias['ativas'],
+        PADARIAS_COM_AGENTE: Padaria.objects.filter(tem_agente).count(),
+        PADARIAS_ATIVAS_SEM_AGENTE: Padaria.objects.filter(is_active=True).exclude(tem_agente).count(),
+        AGENTS_TOTAL: agents['total'],
+        AGENTS_ATIVOS: agents['ativos'],
+        USERS_TOTAL: User.objects.filter(is_superuser=False).count(),
+        MEMBROS_TOTAL: PadariaUser.objects.count(),
+        PRODUTOS_TOTAL: Produto.objects.count(),
+        CLIENTES_TOTAL: Cliente.objects.count(),
+        MRR_CENTAVOS: para_centavos(
+            CaktoSubscription.objects.filter(status='active').aggregate(total=Sum('plan_value'))['total']
+        ),
+    }
+
+    for status, total in CaktoSubscription.objects.values_list('status').annotate(total=Count('id')):
+        contadores[chave_status_cakto(status)] = total
+    for status, total in AsaasSubscription.objects.values_list('status').annotate(total=Count('id')):
+        contadores[chave_status_asaas(status)] = total
+
+    cadastros = dict(
+        Padaria.objects.annotate(dia=TruncDate('created_at')).values_list('dia').annotate(total=Count('id'))
+    )
+
+    return contadores, cadastros
+
+
+def reconciliar(dry_run=False):
+    """
+    Recalcula as métricas e corrige os valores armazenados.
+
+    Returns:
+        list[tuple]: divergências encontradas como (chave, armazenado, correto)
+    """
+    contadores, cadastros = calcular_metricas()
+
+    with transaction.atomic():
+        atuais = dict(PlatformCounter.objects.select_for_update().values_list('key', 'value'))
+        # Status que deixaram de existir devem ir a zero
+        for chave in atuais:
+            if chave not in contadores:
+                contadores[chave] = 0
+
+        divergencias = [
+            (chave, atuais.get(chave, 0), valor)
+            for chave, valor in sorted(contadores.items())
+            if atuais.get(chave, 0) != valor
+        ]
+
+        cadastros_atuais = dict(PadariaSignupDaily.objects.values_list('date', 'count'))
+        for dia in sorted(set(cadastros) | set(cadastros_atuais)):
+            if cadastros_atuais.get(dia, 0) != cadastros.get(dia, 0):
+                divergencias.append(
+                    (f'cadastros:{dia.isoformat()}', cadastros_atuais.get(dia, 0), cadastros.get(dia, 0))
+                )
+
+        if dry_run:
+            return divergencias
+
+        for chave, _, valor in divergencias:
+            if chave.startswith('cadastros:'):
+                continue
+            PlatformCounter.objects.update_or_create(key=chave, defaults={'value': valor})
+
+        PadariaSignupDaily.objects.all().delete()
+        PadariaSignupDaily.objects.bulk_create([
+            PadariaSignupDaily(date=dia, count=count) for dia, count in cadastros.items()
+        ])
+
+    if divergencias:
+        logger.info(f"Métricas reconciliadas: {len(divergencias)} divergência(s) corrigida(s)")
+    return divergencias
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PadariaSignupDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True, verbose_name='Data')),
+                ('count', models.IntegerField(default=0, verbose_name='Cadastros')),
+            ],
+            options={
+                'verbose_name': 'Cadastros de Padarias (dia)',
+                'verbose_name_plural': 'Cadastros de Padarias (dia)',
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PlatformCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True, verbose_name='Chave')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Valor')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Atualizado em')),
+            ],
+            options={
+                'verbose_name': 'Contador da Plataforma',
+                'verbose_name_plural': 'Contadores da Plataforma',
+                'ordering': ['key'],
+            },
+        ),
+    ]
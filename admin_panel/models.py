@@ -1,3 +1,37 @@
 from django.db import models
 
-# Create your models here.
+
+class PlatformCounter(models.Model):
+    """
+    Contador global da plataforma (ex: total de padarias, MRR).
+    Mantido incrementalmente pelos signals de admin_panel e corrigido
+    pelo comando `reconcile_metrics`.
+    """
+    key = models.CharField(max_length=100, unique=True, verbose_name="Chave")
+    value = models.BigIntegerField(default=0, verbose_name="Valor")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
+    class Meta:
+        verbose_name = "Contador da Plataforma"
+        verbose_name_plural = "Contadores da Plataforma"
+        ordering = ["key"]
+
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class PadariaSignupDaily(models.Model):
+    """
+    Rollup diário de cadastros de padarias.
+    Usado nos gráficos de cadastros por mês e em "novas nos últimos 30 dias".
+    """
+    date = models.DateField(unique=True, verbose_name="Data")
+    count = models.IntegerField(default=0, verbose_name="Cadastros")
+
+    class Meta:
+        verbose_name = "Cadastros de Padarias (dia)"
+        verbose_name_plural = "Cadastros de Padarias (dia)"
+        ordering = ["-date"]
+
+    def __str__(self):
+        return f"{self.date}: {self.count}"
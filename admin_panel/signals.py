@@ -0,0 +1,302 @@
+"""
+Signals que mantêm as métricas da plataforma (admin_panel.metrics).
+
+Cada save/delete aplica apenas o delta correspondente nos contadores.
+Os valores anteriores necessários (status, is_active, plan_value) são
+guardados na própria instância no pre_save: vêm do snapshot dos models
+com ChangeTrackingMixin (Padaria, Agent) ou, nos demais, de uma leitura
+do banco.
+
+Membros, produtos e clientes não têm receivers de pre/post_delete:
+qualquer um desliga o fast-delete do Django e faria a exclusão de uma
+padaria carregar e apagar essas linhas uma a uma. A cascata é descontada
+pela contagem feita no pre_delete da padaria (e do usuário, para os
+vínculos); a exclusão individual, pelo signal `instancia_excluida`
+(core.models.ExclusaoNotificadaMixin). `queryset.delete()` não é contado
+(ver admin_panel.metrics).
+"""
+import threading
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from core.models import ChangeTrackingMixin, instancia_excluida
+from organizations.models import Padaria, PadariaUser, Produto, Cliente
+from agents.models import Agent
+from payments.models import CaktoSubscription, AsaasSubscription
+from . import metrics
+
+# Padarias sendo excluídas na thread atual: a exclusão em cascata dos
+# agentes não deve mexer nos contadores de "com/sem agente" dessas padarias
+_exclusoes = threading.local()
+
+
+def _padarias_em_exclusao():
+    if not hasattr(_exclusoes, 'ids'):
+        _exclusoes.ids = set()
+    return _exclusoes.ids
+
+
+def _valores_anteriores(sender, instance, *fields):
+    """Valores atuais de `fields` no banco, antes do save."""
+    if instance.pk is None or instance._state.adding:
+        return None
+    if isinstance(instance, ChangeTrackingMixin) and instance.is_tracking(*fields):
+        return {field: instance.previous_value(field) for field in fields}
+    return sender.objects.filter(pk=instance.pk).values(*fields).first()
+
+
+# =============================================================================
+# Padaria
+# =============================================================================
+
+@receiver(pre_save, sender=Padaria)
+def padaria_pre_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._metrics_anterior = _valores_anteriores(sender, instance, 'is_active')
+
+
+@receiver(post_save, sender=Padaria)
+def padaria_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    if created:
+        metrics.incrementar_varios({
+            metrics.PADARIAS_TOTAL: 1,
+            metrics.PADARIAS_ATIVAS: 1 if instance.is_active else 0,
+            metrics.PADARIAS_ATIVAS_SEM_AGENTE: 1 if instance.is_active else 0,
+        })
+        metrics.registrar_cadastro(instance.created_at)
+        return
+
+    anterior = getattr(instance, '_metrics_anterior', None)
+    if anterior is None or anterior['is_active'] == instance.is_active:
+        return
+
+    delta = 1 if instance.is_active else -1
+    metrics.incrementar(metrics.PADARIAS_ATIVAS, delta)
+    if not Agent.objects.filter(padaria_id=instance.pk).exists():
+        metrics.incrementar(metrics.PADARIAS_ATIVAS_SEM_AGENTE, delta)
+
+
+@receiver(pre_delete, sender=Padaria)
+def padaria_pre_delete(sender, instance, **kwargs):
+    _padarias_em_exclusao().add(instance.pk)
+    instance._metrics_tinha_agente = Agent.objects.filter(padaria_id=instance.pk).exists()
+    # Linhas que saem na cascata (sem signals, ver docstring do módulo)
+    instance._metrics_cascata = {
+        metrics.MEMBROS_TOTAL: -PadariaUser.objects.filter(padaria_id=instance.pk).count(),
+        metrics.PRODUTOS_TOTAL: -Produto.objects.filter(padaria_id=instance.pk).count(),
+        metrics.CLIENTES_TOTAL: -Cliente.objects.filter(padaria_id=instance.pk).count(),
+    }
+
+
+@receiver(post_delete, sender=Padaria)
+def padaria_post_delete(sender, instance, **kwargs):
+    _padarias_em_exclusao().discard(instance.pk)
+    tinha_agente = getattr(instance, '_metrics_tinha_agente', False)
+
+    metrics.incrementar_varios({
+        metrics.PADARIAS_TOTAL: -1,
+        metrics.PADARIAS_ATIVAS: -1 if instance.is_active else 0,
+        metrics.PADARIAS_COM_AGENTE: -1 if tinha_agente else 0,
+        metrics.PADARIAS_ATIVAS_SEM_AGENTE: -1 if instance.is_active and not tinha_agente else 0,
+        **getattr(instance, '_metrics_cascata', {}),
+    })
+    metrics.registrar_cadastro(instance.created_at, -1)
+
+
+# =============================================================================
+# Agent
+# =============================================================================
+
+def _ajustar_padaria_com_agente(padaria_id, delta):
+    """
+    Chamado quando a padaria passa a ter seu primeiro agente (delta=1)
+    ou perde o último (delta=-1).
+    """
+    metrics.incrementar(metrics.PADARIAS_COM_AGENTE, delta)
+    if Padaria.objects.filter(pk=padaria_id, is_active=True).exists():
+        metrics.incrementar(metrics.PADARIAS_ATIVAS_SEM_AGENTE, -delta)
+
+
+@receiver(pre_save, sender=Agent)
+def agent_pre_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._metrics_anterior = _valores_anteriores(sender, instance, 'status')
+
+
+@receiver(post_save, sender=Agent)
+def agent_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+
+    if created:
+        metrics.incrementar_varios({
+            metrics.AGENTS_TOTAL: 1,
+            metrics.AGENTS_ATIVOS: 1 if instance.status == 'ativo' else 0,
+        })
+        if Agent.objects.filter(padaria_id=instance.padaria_id).count() == 1:
+            _ajustar_padaria_com_agente(instance.padaria_id, 1)
+        return
+
+    anterior = getattr(instance, '_metrics_anterior', None)
+    if anterior is None or anterior['status'] == instance.status:
+        return
+    if instance.status == 'ativo':
+        metrics.incrementar(metrics.AGENTS_ATIVOS, 1)
+    elif anterior['status'] == 'ativo':
+        metrics.incrementar(metrics.AGENTS_ATIVOS, -1)
+
+
+@receiver(post_delete, sender=Agent)
+def agent_post_delete(sender, instance, **kwargs):
+    metrics.incrementar_varios({
+        metrics.AGENTS_TOTAL: -1,
+        metrics.AGENTS_ATIVOS: -1 if instance.status == 'ativo' else 0,
+    })
+    padaria_id = instance.padaria_id
+    if padaria_id in _padarias_em_exclusao():
+        return
+    if not Agent.objects.filter(padaria_id=padaria_id).exists():
+        _ajustar_padaria_com_agente(padaria_id, -1)
+
+
+# =============================================================================
+# Usuários, membros, produtos e clientes
+# =============================================================================
+
+@receiver(pre_save, sender=User)
+def user_pre_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    instance._metrics_anterior = None
+    # Ex.: update_last_login a cada login não precisa da leitura extra
+    if raw or (update_fields is not None and 'is_superuser' not in update_fields):
+        return
+    instance._metrics_anterior = _valores_anteriores(sender, instance, 'is_superuser')
+
+
+@receiver(post_save, sender=User)
+def user_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        if not instance.is_superuser:
+            metrics.incrementar(metrics.USERS_TOTAL, 1)
+        return
+
+    anterior = getattr(instance, '_metrics_anterior', None)
+    if anterior is not None and anterior['is_superuser'] != instance.is_superuser:
+        metrics.incrementar(metrics.USERS_TOTAL, -1 if instance.is_superuser else 1)
+
+
+@receiver(pre_delete, sender=User)
+def user_pre_delete(sender, instance, **kwargs):
+    # Vínculos que saem na cascata; os das padarias do próprio usuário
+    # (também excluídas) já entram na contagem do padaria_pre_delete
+    instance._metrics_membros = PadariaUser.objects.filter(user_id=instance.pk).exclude(
+        padaria__owner_id=instance.pk
+    ).count()
+
+
+@receiver(post_delete, sender=User)
+def user_post_delete(sender, instance, **kwargs):
+    metrics.incrementar_varios({
+        metrics.USERS_TOTAL: 0 if instance.is_superuser else -1,
+        metrics.MEMBROS_TOTAL: -getattr(instance, '_metrics_membros', 0),
+    })
+
+
+_CONTADORES_SIMPLES = {
+    PadariaUser: metrics.MEMBROS_TOTAL,
+    Produto: metrics.PRODUTOS_TOTAL,
+    Cliente: metrics.CLIENTES_TOTAL,
+}
+
+
+@receiver(post_save, sender=PadariaUser)
+@receiver(post_save, sender=Produto)
+@receiver(post_save, sender=Cliente)
+def contador_simples_post_save(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        metrics.incrementar(_CONTADORES_SIMPLES[sender], 1)
+
+
+@receiver(instancia_excluida, sender=PadariaUser)
+@receiver(instancia_excluida, sender=Produto)
+@receiver(instancia_excluida, sender=Cliente)
+def contador_simples_excluido(sender, instance, **kwargs):
+    metrics.incrementar(_CONTADORES_SIMPLES[sender], -1)
+
+
+# =============================================================================
+# Assinaturas
+# =============================================================================
+
+def _contribuicao_mrr(status, plan_value):
+    return metrics.para_centavos(plan_value) if status == 'active' else 0
+
+
+@receiver(pre_save, sender=CaktoSubscription)
+def cakto_subscription_pre_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._metrics_anterior = _valores_anteriores(sender, instance, 'status', 'plan_value')
+
+
+@receiver(post_save, sender=CaktoSubscription)
+def cakto_subscription_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    deltas = defaultdict(int)
+
+    if not created:
+        anterior = getattr(instance, '_metrics_anterior', None)
+        if anterior is None:
+            return
+        deltas[metrics.chave_status_cakto(anterior['status'])] -= 1
+        deltas[metrics.MRR_CENTAVOS] -= _contribuicao_mrr(anterior['status'], anterior['plan_value'])
+
+    deltas[metrics.chave_status_cakto(instance.status)] += 1
+    deltas[metrics.MRR_CENTAVOS] += _contribuicao_mrr(instance.status, instance.plan_value)
+    metrics.incrementar_varios(deltas)
+
+
+@receiver(post_delete, sender=CaktoSubscription)
+def cakto_subscription_post_delete(sender, instance, **kwargs):
+    metrics.incrementar_varios({
+        metrics.chave_status_cakto(instance.status): -1,
+        metrics.MRR_CENTAVOS: -_contribuicao_mrr(instance.status, instance.plan_value),
+    })
+
+
+@receiver(pre_save, sender=AsaasSubscription)
+def asaas_subscription_pre_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    instance._metrics_anterior = _valores_anteriores(sender, instance, 'status')
+
+
+@receiver(post_save, sender=AsaasSubscription)
+def asaas_subscription_post_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        metrics.incrementar(metrics.chave_status_asaas(instance.status), 1)
+        return
+
+    anterior = getattr(instance, '_metrics_anterior', None)
+    if anterior is not None and anterior['status'] != instance.status:
+        metrics.incrementar_varios({
+            metrics.chave_status_asaas(anterior['status']): -1,
+            metrics.chave_status_asaas(instance.status): 1,
+        })
+
+
+@receiver(post_delete, sender=AsaasSubscription)
+def asaas_subscription_post_delete(sender, instance, **kwargs):
+    metrics.incrementar(metrics.chave_status_asaas(instance.status), -1)
@@ -1,3 +1,207 @@
-from django.test import TestCase
+import io
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from openpyxl import load_workbook
+
+from organizations.models import Cliente, Padaria, PadariaUser, Produto
+from . import exports, metrics
+
+
+class ClientesExportTest(TestCase):
+    """Testes para a exportação do relatório de clientes."""
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="12345")
+        self.owner = User.objects.create_user(username="dono", password="12345", email="dono@teste.com")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=self.owner)
+        Produto.objects.create(padaria=self.padaria, nome="Pão Francês")
+        Produto.objects.create(padaria=self.padaria, nome="Sonho")
+        Padaria.objects.create(name="Outra Padaria", owner=self.owner, is_active=False)
+
+    def test_gerar_planilha_clientes(self):
+        """Testa geração da planilha com contagens pré-carregadas."""
+        destino = io.BytesIO()
+        total = exports.gerar_planilha_clientes({}, destino)
+        self.assertEqual(total, 2)
+
+        destino.seek(0)
+        ws = load_workbook(destino).active
+        self.assertEqual(ws.cell(row=4, column=1).value, "Nome")
+        linhas = {ws.cell(row=r, column=1).value: r for r in range(5, 7)}
+        linha = linhas["Padaria Teste"]
+        self.assertEqual(ws.cell(row=linha, column=6).value, "Ativa")
+        self.assertEqual(ws.cell(row=linha, column=11).value, 2)
+        self.assertEqual(ws.cell(row=linha, column=16).value, "Admin")
+
+    def test_planilha_agente_criador(self):
+        """Testa que o agente credenciado que cadastrou aparece na planilha."""
+        from accounts.models import AgenteCredenciado
+
+        agente = AgenteCredenciado.objects.create(
+            user=User.objects.create_user(username="agente", password="12345"),
+            nome="Agente Teste", cpf="000.000.000-00", telefone="11999999999", email="agente@teste.com",
+        )
+        agente.adicionar_padaria(self.padaria.id)
+
+        destino = io.BytesIO()
+        exports.gerar_planilha_clientes({"status": "ativas"}, destino)
+        destino.seek(0)
+        ws = load_workbook(destino).active
+        self.assertEqual(ws.cell(row=5, column=16).value, "Agente Teste")
+
+    def test_gerar_planilha_com_filtro(self):
+        """Testa que os filtros do relatório são aplicados na exportação."""
+        destino = io.BytesIO()
+        total = exports.gerar_planilha_clientes({"status": "inativas"}, destino)
+        self.assertEqual(total, 1)
+        total = exports.gerar_planilha_clientes({"whatsapp": "desconectado"}, io.BytesIO())
+        self.assertEqual(total, 2)
+
+    def test_export_view_sincrona(self):
+        """Testa download direto para exportações pequenas."""
+        self.client.login(username="admin", password="12345")
+        response = self.client.get("/admin-panel/relatorio-clientes/exportar/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], exports.XLSX_CONTENT_TYPE)
+        conteudo = b"".join(response.streaming_content)
+        ws = load_workbook(io.BytesIO(conteudo)).active
+        self.assertEqual(ws.cell(row=4, column=1).value, "Nome")
+
+    def test_status_job_invalido(self):
+        """Testa que ids de job inválidos não são aceitos."""
+        self.assertIsNone(exports.status_exportacao("../../etc/passwd"))
+        self.client.login(username="admin", password="12345")
+        response = self.client.get("/admin-panel/relatorio-clientes/exportar/" + "0" * 32 + "/download/")
+        self.assertEqual(response.status_code, 404)
+
+
+class PlatformMetricsTest(TestCase):
+    """Testes para os contadores incrementais da plataforma."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="dono", password="12345")
+
+    def assertMetricasConsistentes(self):
+        """Os contadores incrementais devem bater com o recálculo completo."""
+        self.assertEqual(metrics.reconciliar(dry_run=True), [])
+
+    def test_contadores_incrementais(self):
+        """Testa que signals mantêm os contadores em dia."""
+        from agents.models import Agent
+
+        padaria = Padaria.objects.create(name="Padaria Teste", owner=self.owner)
+        Produto.objects.create(padaria=padaria, nome="Pão")
+        metricas = metrics.obter_metricas()
+        self.assertEqual(metricas[metrics.PADARIAS_TOTAL], 1)
+        self.assertEqual(metricas[metrics.PADARIAS_ATIVAS_SEM_AGENTE], 1)
+        self.assertEqual(metricas[metrics.PRODUTOS_TOTAL], 1)
+        self.assertEqual(metrics.novas_padarias(dias=30), 1)
+
+        agent = Agent.objects.create(padaria=padaria, name="Ana")
+        metricas = metrics.obter_metricas()
+        self.assertEqual(metricas[metrics.PADARIAS_COM_AGENTE], 1)
+        self.assertEqual(metricas[metrics.PADARIAS_ATIVAS_SEM_AGENTE], 0)
+        self.assertMetricasConsistentes()
+
+        padaria.is_active = False
+        padaria.save()
+        agent.delete()
+        self.assertEqual(metrics.obter_metricas()['padarias_inativas'], 1)
+        self.assertMetricasConsistentes()
+
+        padaria.delete()
+        self.assertEqual(metrics.obter_metricas()[metrics.PADARIAS_TOTAL], 0)
+        self.assertMetricasConsistentes()
+
+    def test_exclusoes_em_cascata(self):
+        """Testa a cascata de padaria e usuário sem receivers por linha."""
+        from django.db.models.signals import post_delete, pre_delete
+
+        membro = User.objects.create_user(username="membro", password="12345")
+        padarias = [Padaria.objects.create(name=f"Padaria {i}", owner=self.owner) for i in range(2)]
+        for padaria in padarias:
+            PadariaUser.objects.get_or_create(user=self.owner, padaria=padaria, defaults={'role': 'dono'})
+            PadariaUser.objects.create(user=membro, padaria=padaria)
+            Produto.objects.create(padaria=padaria, nome="Pão")
+            Cliente.objects.create(padaria=padaria, nome="João", telefone="11999990001")
+        self.assertMetricasConsistentes()
+
+        # Produto ainda tem o receiver das imagens (organizations.signals)
+        for model in (PadariaUser, Cliente):
+            self.assertFalse(pre_delete.has_listeners(model) or post_delete.has_listeners(model))
+
+        Produto.objects.filter(padaria=padarias[0]).first().delete()
+        Cliente.objects.filter(padaria=padarias[0]).first().delete()
+        self.assertMetricasConsistentes()
+
+        padarias[0].delete()
+        self.assertMetricasConsistentes()
+
+        # Vínculo em padaria de outro dono + padaria própria
+        Padaria.objects.create(name="Padaria do Membro", owner=membro)
+        membro.delete()
+        self.assertMetricasConsistentes()
+        self.owner.delete()
+        self.assertMetricasConsistentes()
+        self.assertEqual(metrics.obter_metricas()[metrics.MEMBROS_TOTAL], 0)
+
+    def test_login_nao_le_usuario_para_metricas(self):
+        """Testa que saves com update_fields sem is_superuser não consultam o banco."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.owner.save(update_fields=["last_login"])
+        leituras = [q["sql"] for q in consultas if q["sql"].startswith('SELECT') and '"auth_user"' in q["sql"]]
+        self.assertEqual(leituras, [])
+
+        self.owner.is_superuser = True
+        self.owner.save(update_fields=["is_superuser"])
+        self.assertMetricasConsistentes()
+
+    def test_mrr_assinaturas(self):
+        """Testa contadores por status e MRR das assinaturas Cakto."""
+        from decimal import Decimal
+        from payments.models import CaktoSubscription
+
+        padaria = Padaria.objects.create(name="Padaria Teste", owner=self.owner)
+        sub = CaktoSubscription.objects.create(padaria=padaria, status='trial', plan_value=Decimal("140.00"))
+        self.assertEqual(metrics.obter_metricas()['mrr'], Decimal("0"))
+
+        sub.status = 'active'
+        sub.save()
+        metricas = metrics.obter_metricas()
+        self.assertEqual(metricas['mrr'], Decimal("140.00"))
+        self.assertEqual(metricas[metrics.chave_status_cakto('active')], 1)
+        self.assertEqual(metricas[metrics.chave_status_cakto('trial')], 0)
+        self.assertMetricasConsistentes()
+
+    def test_reconciliar_corrige_atualizacao_em_massa(self):
+        """Testa que o reconcile corrige updates que não disparam signals."""
+        Padaria.objects.create(name="Padaria Teste", owner=self.owner)
+        Padaria.objects.update(is_active=False)
+        self.assertNotEqual(metrics.reconciliar(), [])
+        self.assertEqual(metrics.obter_metricas()[metrics.PADARIAS_ATIVAS], 0)
+        self.assertMetricasConsistentes()
+
+    @override_settings(STORAGES={
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    })
+    def test_paginas_admin_usam_metricas(self):
+        """Testa que as páginas do admin renderizam a partir dos contadores."""
+        Padaria.objects.create(name="Padaria Teste", owner=self.owner)
+        User.objects.create_superuser(username="admin", password="12345")
+        self.client.login(username="admin", password="12345")
+
+        response = self.client.get("/admin-panel/")
+        self.assertEqual(response.context["total_padarias"], 1)
+
+        response = self.client.get("/admin-panel/relatorio-clientes/")
+        self.assertEqual(response.context["total_padarias"], 1)
+        response = self.client.get("/admin-panel/relatorio-clientes/?status=inativas")
+        self.assertEqual(response.context["total_padarias"], 0)
+
+        response = self.client.get("/admin-panel/assinaturas/")
+        self.assertEqual(response.status_code, 200)
@@ -10,6 +10,8 @@ urlpatterns = [
     # Relatório de Clientes (Padarias)
     path('relatorio-clientes/', views.clientes_report, name='clientes_report'),
     path('relatorio-clientes/exportar/', views.clientes_export_excel, name='clientes_export_excel'),
+    path('relatorio-clientes/exportar/<str:job_id>/', views.clientes_export_status, name='clientes_export_status'),
+    path('relatorio-clientes/exportar/<str:job_id>/download/', views.clientes_export_download, name='clientes_export_download'),
     
     # Padarias CRUD
     path('padarias/', views.padarias_list, name='padarias_list'),
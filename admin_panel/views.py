@@ -14,6 +14,7 @@ from organizations.models import Padaria, PadariaUser, ApiKey
 from agents.models import Agent
 from audit.models import AuditLog
 from accounts.models import AgenteCredenciado, UserProfile
+from . import metrics
 
 
 @login_required
@@ -21,12 +22,8 @@ from accounts.models import AgenteCredenciado, UserProfile
 def dashboard(request):
 
     """Dashboard do admin master com métricas globais."""
-    # Métricas
-    total_padarias = Padaria.objects.count()
-    padarias_ativas = Padaria.objects.filter(is_active=True).count()
-    total_agents = Agent.objects.count()
-    agents_ativos = Agent.objects.filter(status='ativo').count()
-    total_users = User.objects.filter(is_superuser=False).count()
+    # Métricas (contadores pré-calculados, ver admin_panel.metrics)
+    metricas = metrics.obter_metricas()
     
     # Padarias recentes
     padarias_recentes = Padaria.objects.select_related('owner').order_by('-created_at')[:5]
@@ -37,21 +34,16 @@ def dashboard(request):
     # Logs recentes
     logs_recentes = AuditLog.objects.select_related('padaria', 'actor').order_by('-created_at')[:10]
     
-    # Padarias sem agente
-    padarias_sem_agente = Padaria.objects.annotate(
-        num_agents=Count('agents')
-    ).filter(num_agents=0, is_active=True).count()
-    
     context = {
-        'total_padarias': total_padarias,
-        'padarias_ativas': padarias_ativas,
-        'total_agents': total_agents,
-        'agents_ativos': agents_ativos,
-        'total_users': total_users,
+        'total_padarias': metricas[metrics.PADARIAS_TOTAL],
+        'padarias_ativas': metricas[metrics.PADARIAS_ATIVAS],
+        'total_agents': metricas[metrics.AGENTS_TOTAL],
+        'agents_ativos': metricas[metrics.AGENTS_ATIVOS],
+        'total_users': metricas[metrics.USERS_TOTAL],
         'padarias_recentes': padarias_recentes,
         'agents_recentes': agents_recentes,
         'logs_recentes': logs_recentes,
-        'padarias_sem_agente': padarias_sem_agente,
+        'padarias_sem_agente': metricas[metrics.PADARIAS_ATIVAS_SEM_AGENTE],
     }
     return render(request, 'admin_panel/dashboard.html', context)
 
@@ -265,23 +257,8 @@ def padaria_detail(request, slug):
     # Agente IA (se existir)
     agent = padaria.agents.first()
 
-    # Buscar Agente Credenciado que cadastrou (baseado na lista de IDs)
-    agente_criador = None
-    try:
-        from accounts.models import AgenteCredenciado
-        # Em JSONField lista, contains busca se o elemento está presente
-        # Nota: SQLite pode ter limitações, então vamos iterar se falhar ou se não encontrar
-        agentes = AgenteCredenciado.objects.filter(padarias_cadastradas_ids__contains=padaria.id)
-        if agentes.exists():
-            agente_criador = agentes.first()
-        else:
-            # Fallback manual caso o JSON lookup falhe no DB (ex: SQLite antigo)
-            for agente in AgenteCredenciado.objects.exclude(padarias_cadastradas_ids=[]):
-                if padaria.id in agente.padarias_cadastradas_ids:
-                    agente_criador = agente
-                    break
-    except Exception:
-        pass
+    # Agente Credenciado que cadastrou a padaria
+    agente_criador = AgenteCredenciado.cadastrador_de(padaria)
     
     # API Keys
     api_keys = padaria.api_keys.order_by('-created_at')
@@ -344,8 +321,9 @@ def padaria_edit(request, slug):
                     old_owner = padaria.owner
                     padaria.owner = new_owner
                     
-                    # Atualizar memberships
-                    PadariaUser.objects.filter(user=old_owner, padaria=padaria).delete()
+                    # Atualizar memberships (queryset.delete() não passa pelas métricas)
+                    removidos, _ = PadariaUser.objects.filter(user=old_owner, padaria=padaria).delete()
+                    metrics.incrementar(metrics.MEMBROS_TOTAL, -removidos)
                     PadariaUser.objects.get_or_create(
                         user=new_owner, 
                         padaria=padaria,
@@ -755,7 +733,7 @@ def user_delete(request, user_id):
 @require_system_admin
 def clientes_report(request):
     """Relatório completo de controle de clientes (padarias)."""
-    from datetime import datetime, timedelta
+    from datetime import datetime
     from django.db.models import Count, Sum, Q, Max
     from organizations.models import Produto, Promocao, Cliente, CampanhaWhatsApp
     from payments.models import AsaasSubscription
@@ -771,7 +749,7 @@ def clientes_report(request):
     search = request.GET.get('search', '')
     
     # Query base
-    padarias = Padaria.objects.select_related('owner').annotate(
+    padarias = Padaria.objects.select_related('owner', 'cadastro_agente__agente').annotate(
         num_agents=Count('agents', distinct=True),
         num_users=Count('members', distinct=True),
         num_produtos=Count('produtos', distinct=True),
@@ -829,41 +807,49 @@ def clientes_report(request):
         )
     
     # Métricas Gerais
-    total_padarias = padarias.count()
-    padarias_ativas = padarias.filter(is_active=True).count()
-    padarias_inativas = padarias.filter(is_active=False).count()
-    
-    total_agentes = Agent.objects.filter(padaria__in=padarias).count()
-    total_usuarios = PadariaUser.objects.filter(padaria__in=padarias).count()
-    total_produtos = Produto.objects.filter(padaria__in=padarias).count()
-    total_clientes = Cliente.objects.filter(padaria__in=padarias).count()
-    
-    # Padarias com WhatsApp conectado (com agentes)
-    padarias_com_whatsapp = padarias.filter(num_agents__gt=0).count()
-    
-    # Padarias com assinatura ativa
-    active_subs = AsaasSubscription.objects.filter(
-        status__in=['ACTIVE', 'active']
-    ).values_list('padaria_id', flat=True)
-    padarias_com_sub_ativa = padarias.filter(id__in=active_subs).count()
+    metricas = metrics.obter_metricas()
+    filtros_ativos = any([status_filter, whatsapp_filter, subscription_filter, date_from, date_to, search])
+    
+    if not filtros_ativos:
+        # Sem filtros: contadores pré-calculados
+        total_padarias = metricas[metrics.PADARIAS_TOTAL]
+        padarias_ativas = metricas[metrics.PADARIAS_ATIVAS]
+        padarias_inativas = metricas['padarias_inativas']
+        total_agentes = metricas[metrics.AGENTS_TOTAL]
+        total_usuarios = metricas[metrics.MEMBROS_TOTAL]
+        total_produtos = metricas[metrics.PRODUTOS_TOTAL]
+        total_clientes = metricas[metrics.CLIENTES_TOTAL]
+        padarias_com_whatsapp = metricas[metrics.PADARIAS_COM_AGENTE]
+        padarias_com_sub_ativa = (
+            metricas[metrics.chave_status_asaas('ACTIVE')] + metricas[metrics.chave_status_asaas('active')]
+        )
+    else:
+        total_padarias = padarias.count()
+        padarias_ativas = padarias.filter(is_active=True).count()
+        padarias_inativas = padarias.filter(is_active=False).count()
+        
+        total_agentes = Agent.objects.filter(padaria__in=padarias).count()
+        total_usuarios = PadariaUser.objects.filter(padaria__in=padarias).count()
+        total_produtos = Produto.objects.filter(padaria__in=padarias).count()
+        total_clientes = Cliente.objects.filter(padaria__in=padarias).count()
+        
+        # Padarias com WhatsApp conectado (com agentes)
+        padarias_com_whatsapp = padarias.filter(num_agents__gt=0).count()
+        
+        # Padarias com assinatura ativa
+        active_subs = AsaasSubscription.objects.filter(
+            status__in=['ACTIVE', 'active']
+        ).values_list('padaria_id', flat=True)
+        padarias_com_sub_ativa = padarias.filter(id__in=active_subs).count()
     
     # Crescimento (últimos 30 dias)
-    trinta_dias_atras = datetime.now() - timedelta(days=30)
-    novas_padarias_30d = Padaria.objects.filter(
-        created_at__gte=trinta_dias_atras
-    ).count()
+    novas_padarias_30d = metrics.novas_padarias(dias=30)
     
     # Gráfico de cadastros por mês (últimos 6 meses)
-    from collections import defaultdict
-    seis_meses_atras = datetime.now() - timedelta(days=180)
-    cadastros_por_mes = defaultdict(int)
-    
-    for padaria in Padaria.objects.filter(created_at__gte=seis_meses_atras):
-        mes_ano = padaria.created_at.strftime('%Y-%m')
-        cadastros_por_mes[mes_ano] += 1
+    cadastros_por_mes = metrics.cadastros_por_mes(meses=6)
     
-    meses_labels = sorted(cadastros_por_mes.keys())
-    cadastros_data = [cadastros_por_mes[m] for m in meses_labels]
+    meses_labels = list(cadastros_por_mes.keys())
+    cadastros_data = list(cadastros_por_mes.values())
     
     # Formatar labels para português
     meses_labels_pt = []
@@ -875,12 +861,13 @@ def clientes_report(request):
             meses_labels_pt.append(m)
     
     # Distribuição por status de assinatura
-    subs_status = AsaasSubscription.objects.values('status').annotate(
-        count=Count('id')
-    ).order_by('-count')
+    subs_status = sorted(
+        metrics.contagem_por_status(metricas, metrics.ASAAS_STATUS_PREFIX).items(),
+        key=lambda item: -item[1]
+    )
     
-    sub_labels = [s['status'] for s in subs_status]
-    sub_data = [s['count'] for s in subs_status]
+    sub_labels = [status for status, _ in subs_status]
+    sub_data = [count for _, count in subs_status]
     
     # Ordenar padarias por data de criação (mais recentes primeiro)
     padarias_list = padarias.order_by('-created_at')
@@ -895,17 +882,11 @@ def clientes_report(request):
     for sub in AsaasSubscription.objects.filter(padaria__in=padarias_list).select_related('padaria'):
         subs_dict[sub.padaria_id] = sub
     
-    # Buscar agentes criadores para cada padaria
-    from accounts.models import AgenteCredenciado
-    agentes_criadores = {}
-    # Buscar todos os agentes credenciados que têm padarias cadastradas
-    for agente in AgenteCredenciado.objects.exclude(padarias_cadastradas_ids=[]):
-        for padaria_id in agente.padarias_cadastradas_ids:
-            agentes_criadores[padaria_id] = agente
-    
     for padaria in padarias_page:
         padaria.subscription = subs_dict.get(padaria.id, None)
-        padaria.agente_criador = agentes_criadores.get(padaria.id, None)
+        # Agente credenciado que cadastrou (já carregado via select_related)
+        cadastro = getattr(padaria, 'cadastro_agente', None)
+        padaria.agente_criador = cadastro.agente if cadastro else None
     
     context = {
         'total_padarias': total_padarias,
@@ -939,222 +920,73 @@ def clientes_report(request):
 @login_required
 @require_system_admin
 def clientes_export_excel(request):
-    """Exportar relatório de clientes para Excel."""
-    from datetime import datetime, timedelta
-    from django.db.models import Count, Q, Max
-    from django.http import HttpResponse
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
-    from organizations.models import Produto, Promocao, Cliente, CampanhaWhatsApp
-    from payments.models import AsaasSubscription
-    
-    # Aplicar os mesmos filtros da view principal
-    status_filter = request.GET.get('status', '')
-    whatsapp_filter = request.GET.get('whatsapp', '')
-    subscription_filter = request.GET.get('subscription', '')
-    date_from = request.GET.get('date_from', '')
-    date_to = request.GET.get('date_to', '')
-    search = request.GET.get('search', '')
-    
-    # Query base
-    padarias = Padaria.objects.select_related('owner').annotate(
-        num_agents=Count('agents', distinct=True),
-        num_users=Count('members', distinct=True),
-        num_produtos=Count('produtos', distinct=True),
-        num_promocoes=Count('promocoes', distinct=True),
-        num_clientes=Count('clientes', distinct=True),
-        num_campanhas=Count('campanhas', distinct=True),
-        ultima_atividade=Max('audit_logs__created_at')
-    )
-    
-    # Aplicar filtros
-    if status_filter == 'ativas':
-        padarias = padarias.filter(is_active=True)
-    elif status_filter == 'inativas':
-        padarias = padarias.filter(is_active=False)
-    
-    if whatsapp_filter == 'conectado':
-        padarias = padarias.filter(num_agents__gt=0)
-    elif whatsapp_filter == 'desconectado':
-        padarias = padarias.filter(num_agents=0)
-    
-    if subscription_filter == 'ativa':
-        active_subs = AsaasSubscription.objects.filter(
-            status__in=['ACTIVE', 'active']
-        ).values_list('padaria_id', flat=True)
-        padarias = padarias.filter(id__in=active_subs)
-    elif subscription_filter == 'inativa':
-        active_subs = AsaasSubscription.objects.filter(
-            status__in=['ACTIVE', 'active']
-        ).values_list('padaria_id', flat=True)
-        padarias = padarias.exclude(id__in=active_subs)
-    
-    if date_from:
-        try:
-            date_from_dt = datetime.strptime(date_from, '%Y-%m-%d')
-            padarias = padarias.filter(created_at__gte=date_from_dt)
-        except:
-            pass
-    
-    if date_to:
-        try:
-            date_to_dt = datetime.strptime(date_to, '%Y-%m-%d')
-            date_to_dt = date_to_dt.replace(hour=23, minute=59, second=59)
-            padarias = padarias.filter(created_at__lte=date_to_dt)
-        except:
-            pass
-    
-    if search:
-        padarias = padarias.filter(
-            Q(name__icontains=search) |
-            Q(slug__icontains=search) |
-            Q(owner__username__icontains=search) |
-            Q(owner__email__icontains=search)
-        )
-    
-    # Buscar assinaturas
-    subs_dict = {}
-    for sub in AsaasSubscription.objects.filter(padaria__in=padarias).select_related('padaria'):
-        subs_dict[sub.padaria_id] = sub
-    
-    # Buscar agentes criadores para cada padaria
-    from accounts.models import AgenteCredenciado
-    agentes_criadores = {}
-    for agente in AgenteCredenciado.objects.exclude(padarias_cadastradas_ids=[]):
-        for padaria_id in agente.padarias_cadastradas_ids:
-            agentes_criadores[padaria_id] = agente
-    
-    # Criar Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Relatório de Clientes"
-    
-    # Estilos
-    header_fill = PatternFill(start_color="667EEA", end_color="667EEA", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF", size=12)
-    border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
+    """
+    Exportar relatório de clientes para Excel.
+
+    Exportações pequenas são geradas e enviadas na hora; acima de
+    `exports.ASYNC_THRESHOLD` padarias a planilha é gerada em segundo plano
+    e o usuário é levado à página de acompanhamento.
+    """
+    import tempfile
+    from django.http import FileResponse
+    from . import exports
+
+    params = request.GET.dict()
+
+    if exports.filtrar_padarias(params).count() > exports.ASYNC_THRESHOLD:
+        job_id = exports.iniciar_exportacao_background(params)
+        messages.info(request, "A exportação está sendo gerada em segundo plano.")
+        return redirect('admin_panel:clientes_export_status', job_id=job_id)
+
+    # Arquivo temporário em disco: a memória não cresce com o tamanho da planilha
+    arquivo = tempfile.TemporaryFile()
+    exports.gerar_planilha_clientes(params, arquivo)
+    arquivo.seek(0)
+
+    return FileResponse(
+        arquivo,
+        as_attachment=True,
+        filename=exports.nome_arquivo_exportacao(),
+        content_type=exports.XLSX_CONTENT_TYPE,
     )
-    
-    # Cabeçalhos
-    headers = [
-        'Nome', 'Slug', 'CNPJ', 'Responsável', 'Email Responsável', 
-        'Status', 'WhatsApp Conectado', 'Status Assinatura', 
-        'Qtd. Agentes', 'Qtd. Usuários', 'Qtd. Produtos', 
-        'Qtd. Promoções', 'Qtd. Clientes', 'Qtd. Campanhas',
-        'Data Cadastro', 'Cadastrado por', 'Última Atividade', 'Telefone', 'Endereço'
-    ]
-    
-    # Adicionar título
-    ws.merge_cells('A1:S1')
-    ws['A1'] = 'RELATÓRIO DE CONTROLE DE CLIENTES (PADARIAS)'
-    ws['A1'].font = Font(bold=True, size=16, color="667EEA")
-    ws['A1'].alignment = Alignment(horizontal='center', vertical='center')
-    
-    # Adicionar info de geração
-    ws.merge_cells('A2:S2')
-    ws['A2'] = f'Gerado em: {datetime.now().strftime("%d/%m/%Y %H:%M:%S")} - Total: {padarias.count()} clientes'
-    ws['A2'].font = Font(size=10, italic=True)
-    ws['A2'].alignment = Alignment(horizontal='center')
-    
-    # Cabeçalhos na linha 4
-    for col_num, header in enumerate(headers, 1):
-        cell = ws.cell(row=4, column=col_num)
-        cell.value = header
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal='center', vertical='center')
-        cell.border = border
-    
-    # Dados
-    row_num = 5
-    for padaria in padarias.order_by('name'):
-        subscription = subs_dict.get(padaria.id, None)
-        
-        # Status da assinatura
-        if subscription:
-            if subscription.status in ['ACTIVE', 'active']:
-                sub_status = 'Ativa'
-            elif subscription.status in ['TRIAL', 'trialing']:
-                sub_status = 'Trial'
-            elif subscription.status == 'OVERDUE':
-                sub_status = 'Vencida'
-            elif subscription.status == 'EXPIRED':
-                sub_status = 'Expirada'
-            else:
-                sub_status = subscription.status
-        else:
-            sub_status = 'Sem assinatura'
-        
-        # Agente criador
-        agente_criador = agentes_criadores.get(padaria.id, None)
-        nome_agente = agente_criador.nome if agente_criador else 'Admin'
-        
-        # Dados da linha
-        row_data = [
-            padaria.name,
-            padaria.slug,
-            padaria.cnpj or '-',
-            padaria.owner.username,
-            padaria.owner.email,
-            'Ativa' if padaria.is_active else 'Inativa',
-            'Sim' if padaria.num_agents > 0 else 'Não',
-            sub_status,
-            padaria.num_agents,
-            padaria.num_users,
-            padaria.num_produtos,
-            padaria.num_promocoes,
-            padaria.num_clientes,
-            padaria.num_campanhas,
-            padaria.created_at.strftime('%d/%m/%Y') if padaria.created_at else '-',
-            nome_agente,
-            padaria.ultima_atividade.strftime('%d/%m/%Y %H:%M') if padaria.ultima_atividade else '-',
-            padaria.phone or '-',
-            padaria.address or '-'
-        ]
-        
-        for col_num, value in enumerate(row_data, 1):
-            cell = ws.cell(row=row_num, column=col_num)
-            cell.value = value
-            cell.border = border
-            cell.alignment = Alignment(horizontal='left', vertical='center')
-            
-            # Colorir status
-            if col_num == 6:  # Status
-                if value == 'Ativa':
-                    cell.fill = PatternFill(start_color="D1FAE5", end_color="D1FAE5", fill_type="solid")
-                else:
-                    cell.fill = PatternFill(start_color="FEE2E2", end_color="FEE2E2", fill_type="solid")
-            elif col_num == 7:  # WhatsApp
-                if value == 'Sim':
-                    cell.fill = PatternFill(start_color="D1FAE5", end_color="D1FAE5", fill_type="solid")
-        
-        row_num += 1
-    
-    # Ajustar largura das colunas
-    from openpyxl.utils import get_column_letter
-    column_widths = [25, 20, 18, 20, 30, 12, 18, 18, 12, 12, 12, 12, 12, 12, 15, 18, 15, 30]
-    for col_num, width in enumerate(column_widths, 1):
-        col_letter = get_column_letter(col_num)
-        ws.column_dimensions[col_letter].width = width
-    
-    # Ajustar altura das linhas
-    ws.row_dimensions[1].height = 30
-    ws.row_dimensions[2].height = 20
-    ws.row_dimensions[4].height = 25
-    
-    # Preparar resposta
-    response = HttpResponse(
-        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+@login_required
+@require_system_admin
+def clientes_export_status(request, job_id):
+    """Acompanhamento de uma exportação de clientes em segundo plano."""
+    from . import exports
+
+    status = exports.status_exportacao(job_id)
+    if status is None:
+        messages.error(request, "Exportação não encontrada ou expirada.")
+        return redirect('admin_panel:clientes_report')
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({'job_id': job_id, 'status': status})
+
+    return render(request, 'admin_panel/clientes_export_status.html', {
+        'job_id': job_id,
+        'status': status,
+    })
+
+
+@login_required
+@require_system_admin
+def clientes_export_download(request, job_id):
+    """Download da planilha gerada em segundo plano."""
+    from django.http import FileResponse, Http404
+    from . import exports
+
+    if exports.status_exportacao(job_id) != 'pronto':
+        raise Http404("Exportação não disponível")
+
+    return FileResponse(
+        open(exports.caminho_exportacao(job_id), 'rb'),
+        as_attachment=True,
+        filename=exports.nome_arquivo_exportacao(),
+        content_type=exports.XLSX_CONTENT_TYPE,
     )
-    filename = f'relatorio_clientes_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    wb.save(response)
-    return response
 
 
 # ============================================
@@ -1165,7 +997,7 @@ def clientes_export_excel(request):
 @require_system_admin
 def agentes_credenciados_list(request):
     """Lista de agentes credenciados."""
-    agentes = AgenteCredenciado.objects.select_related('user', 'created_by').all()
+    agentes = AgenteCredenciado.com_total_padarias().select_related('user', 'created_by')
     
     # Filtro por busca
     search = request.GET.get('search', '')
@@ -1328,7 +1160,7 @@ def agente_credenciado_detail(request, pk):
     agente = get_object_or_404(AgenteCredenciado, pk=pk)
     
     # Buscar padarias cadastradas pelo agente
-    padarias = Padaria.objects.filter(id__in=agente.padarias_cadastradas_ids)
+    padarias = agente.padarias_cadastradas.all()
     
     context = {
         'agente': agente,
@@ -1493,7 +1325,7 @@ def agente_minhas_padarias(request):
     agente = request.agente_credenciado
     
     # Buscar padarias cadastradas pelo agente
-    padarias = Padaria.objects.filter(id__in=agente.padarias_cadastradas_ids).order_by('-created_at')
+    padarias = agente.padarias_cadastradas.order_by('-created_at')
     
     # Filtro por busca
     search = request.GET.get('search', '')
@@ -1521,7 +1353,7 @@ def agente_minhas_padarias(request):
         'agente': agente,
         'search': search,
         'status': status,
-        'total_padarias': len(agente.padarias_cadastradas_ids),
+        'total_padarias': agente.get_padarias_count(),
     }
     
     return render(request, 'admin_panel/agente/minhas_padarias.html', context)
@@ -1731,7 +1563,7 @@ def agente_relatorio(request):
     agente = request.agente_credenciado
     
     # Buscar padarias cadastradas pelo agente
-    padarias = Padaria.objects.filter(id__in=agente.padarias_cadastradas_ids).select_related('owner')
+    padarias = agente.padarias_cadastradas.select_related('owner')
     
     # Estatísticas
     total_padarias = padarias.count()
@@ -1765,7 +1597,7 @@ def agente_padaria_detail(request, pk):
     agente = request.agente_credenciado
     
     # Verificar se a padaria pertence ao agente
-    if pk not in agente.padarias_cadastradas_ids:
+    if not agente.cadastrou_padaria(pk):
         messages.error(request, "Você não tem acesso a esta padaria.")
         return redirect('admin_panel:agente_minhas_padarias')
     
@@ -1875,8 +1707,6 @@ def api_validate_cnpj(request):
 def subscriptions_list(request):
     """Lista todas as assinaturas do sistema para admin."""
     from payments.models import CaktoSubscription
-    from django.db.models import Sum
-    from decimal import Decimal
     
     # Filtros
     status_filter = request.GET.get('status', '')
@@ -1896,17 +1726,17 @@ def subscriptions_list(request):
             Q(padaria__responsavel_email__icontains=search)
         )
     
-    # Métricas Cakto
-    total_subscriptions = CaktoSubscription.objects.count()
-    trial_count = CaktoSubscription.objects.filter(status='trial').count()
-    active_count = CaktoSubscription.objects.filter(status='active').count()
-    inactive_count = CaktoSubscription.objects.filter(status='inactive').count()
-    cancelled_count = CaktoSubscription.objects.filter(status='cancelled').count()
+    # Métricas Cakto (contadores pré-calculados, ver admin_panel.metrics)
+    metricas = metrics.obter_metricas()
+    por_status = metrics.contagem_por_status(metricas, metrics.CAKTO_STATUS_PREFIX)
+    total_subscriptions = sum(por_status.values())
+    trial_count = por_status.get('trial', 0)
+    active_count = por_status.get('active', 0)
+    inactive_count = por_status.get('inactive', 0)
+    cancelled_count = por_status.get('cancelled', 0)
     
     # MRR (Monthly Recurring Revenue) - soma dos valores de planos ativos
-    mrr = CaktoSubscription.objects.filter(status='active').aggregate(
-        total=Sum('plan_value')
-    )['total'] or Decimal('0')
+    mrr = metricas['mrr']
     
     # Paginação
     paginator = Paginator(subscriptions, 20)
@@ -1954,7 +1784,7 @@ def confirm_subscription_payment(request, subscription_id):
     agente = get_agente_credenciado(request.user)
     if agente:
         # Agente credenciado só pode confirmar das suas padarias
-        if padaria.id not in agente.padarias_cadastradas_ids:
+        if not agente.cadastrou_padaria(padaria.id):
             messages.error(request, "Você não tem permissão para esta ação.")
             return redirect('admin_panel:agente_padaria_detail', pk=padaria.id)
     
@@ -2016,7 +1846,7 @@ def pause_subscription(request, subscription_id):
     # Verificar permissão
     agente = get_agente_credenciado(request.user)
     if agente:
-        if padaria.id not in agente.padarias_cadastradas_ids:
+        if not agente.cadastrou_padaria(padaria.id):
             messages.error(request, "Você não tem permissão para esta ação.")
             return redirect('admin_panel:agente_padaria_detail', pk=padaria.id)
     
@@ -2063,7 +1893,7 @@ def cancel_admin_subscription(request, subscription_id):
     # Verificar permissão
     agente = get_agente_credenciado(request.user)
     if agente:
-        if padaria.id not in agente.padarias_cadastradas_ids:
+        if not agente.cadastrou_padaria(padaria.id):
             messages.error(request, "Você não tem permissão para esta ação.")
             return redirect('admin_panel:agente_padaria_detail', pk=padaria.id)
     
@@ -2121,7 +1951,7 @@ def reactivate_subscription(request, subscription_id):
     # Verificar permissão
     agente = get_agente_credenciado(request.user)
     if agente:
-        if padaria.id not in agente.padarias_cadastradas_ids:
+        if not agente.cadastrou_padaria(padaria.id):
             messages.error(request, "Você não tem permissão para esta ação.")
             return redirect('admin_panel:agente_padaria_detail', pk=padaria.id)
     
@@ -8,7 +8,7 @@ class AgentAdmin(admin.ModelAdmin):
     search_fields = ("name", "slug", "padaria__name", "role", "sector")
     list_filter = ("status", "personality", "role", "sector", "created_at")
     prepopulated_fields = {"slug": ("name",)}
-    readonly_fields = ("knowledge_updated_at", "created_at", "updated_at")
+    readonly_fields = ("knowledge_pdf_status", "knowledge_pdf_progress", "knowledge_pdf_error", "knowledge_updated_at", "created_at", "updated_at")
     autocomplete_fields = ()  # Padaria removida do admin
     
     fieldsets = (
@@ -31,6 +31,9 @@ class AgentAdmin(admin.ModelAdmin):
                 "knowledge_pdf", 
                 "knowledge_pdf_category",
                 "knowledge_pdf_text",
+                "knowledge_pdf_status",
+                "knowledge_pdf_progress",
+                "knowledge_pdf_error",
                 "knowledge_updated_at"
             ),
             "description": "Gerencie o conhecimento do agente através de texto ou PDF"
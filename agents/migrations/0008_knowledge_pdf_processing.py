@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0007_agent_afternoon_end_agent_afternoon_start_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KnowledgePdfCache',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True, verbose_name='SHA-256')),
+                ('text', models.TextField(blank=True, default='', verbose_name='Texto Extraído')),
+                ('page_count', models.PositiveIntegerField(default=0, verbose_name='Páginas')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Criado em')),
+            ],
+            options={
+                'verbose_name': 'Cache de PDF',
+                'verbose_name_plural': 'Cache de PDFs',
+            },
+        ),
+        migrations.AddField(
+            model_name='agent',
+            name='knowledge_pdf_error',
+            field=models.TextField(blank=True, default='', verbose_name='Erro na Extração'),
+        ),
+        migrations.AddField(
+            model_name='agent',
+            name='knowledge_pdf_progress',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Progresso da Extração (%)'),
+        ),
+        migrations.AddField(
+            model_name='agent',
+            name='knowledge_pdf_sha256',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 do conteúdo do PDF atual', max_length=64, verbose_name='Hash do PDF'),
+        ),
+        migrations.AddField(
+            model_name='agent',
+            name='knowledge_pdf_status',
+            field=models.CharField(blank=True, choices=[('', 'Sem PDF'), ('processando', 'Processando'), ('concluido', 'Concluído'), ('erro', 'Erro')], default='', max_length=20, verbose_name='Processamento do PDF'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('agents', '0008_knowledge_pdf_processing'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agent',
+            name='knowledge_pdf_n8n_sha256',
+            field=models.CharField(blank=True, default='', help_text='SHA-256 do último PDF entregue no webhook N8N', max_length=64, verbose_name='Hash do PDF enviado ao N8N'),
+        ),
+    ]
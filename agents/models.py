@@ -2,6 +2,7 @@
 from django.db import models
 from django.utils.text import slugify
 from django.core.exceptions import ValidationError
+from core.models import ChangeTrackingMixin
 from organizations.models import Padaria
 
 
@@ -40,6 +41,14 @@ STATUS_CHOICES = [
     ('manutencao', 'Em Manutenção'),
 ]
 
+# Choices para o processamento do PDF de conhecimento
+PDF_STATUS_CHOICES = [
+    ('', 'Sem PDF'),
+    ('processando', 'Processando'),
+    ('concluido', 'Concluído'),
+    ('erro', 'Erro'),
+]
+
 # Defaults para padaria
 DEFAULT_GREETING = """Olá! Eu sou {{agente_nome}}, assistente virtual da {{padaria_nome}}. Como posso te ajudar hoje?"""
 
@@ -115,7 +124,7 @@ DEFAULT_ESCALATION_RULE = """Transferir para atendente humano quando:
 - Cliente demonstrar insatisfação após 2 tentativas"""
 
 
-class Agent(models.Model):
+class Agent(ChangeTrackingMixin, models.Model):
     """
     Agente de IA configurável por padaria.
     Limite: 1 agente por padaria.
@@ -275,6 +284,36 @@ class Agent(models.Model):
         verbose_name="Categoria do PDF",
         help_text="Ex: Produtos, FAQ, Políticas, Procedimentos"
     )
+    knowledge_pdf_sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        verbose_name="Hash do PDF",
+        help_text="SHA-256 do conteúdo do PDF atual"
+    )
+    knowledge_pdf_n8n_sha256 = models.CharField(
+        max_length=64,
+        blank=True,
+        default="",
+        verbose_name="Hash do PDF enviado ao N8N",
+        help_text="SHA-256 do último PDF entregue no webhook N8N"
+    )
+    knowledge_pdf_status = models.CharField(
+        max_length=20,
+        choices=PDF_STATUS_CHOICES,
+        blank=True,
+        default="",
+        verbose_name="Processamento do PDF"
+    )
+    knowledge_pdf_progress = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name="Progresso da Extração (%)"
+    )
+    knowledge_pdf_error = models.TextField(
+        blank=True,
+        default="",
+        verbose_name="Erro na Extração"
+    )
     knowledge_updated_at = models.DateTimeField(
         null=True,
         blank=True,
@@ -328,8 +367,9 @@ class Agent(models.Model):
     def save(self, *args, **kwargs):
         from django.utils import timezone
         
-        # Validar limite de 1 agente por padaria
-        self.clean()
+        # Validar limite de 1 agente por padaria (só quando a padaria muda)
+        if self.has_changed("padaria"):
+            self.clean()
         
         if not self.slug:
             base_slug = slugify(self.name)
@@ -341,14 +381,9 @@ class Agent(models.Model):
             self.business_hours = DEFAULT_BUSINESS_HOURS
         
         # Atualizar knowledge_updated_at se PDF ou knowledge_base mudou
-        if self.pk:
-            try:
-                old_instance = Agent.objects.get(pk=self.pk)
-                if (old_instance.knowledge_pdf != self.knowledge_pdf or 
-                    old_instance.knowledge_base != self.knowledge_base):
-                    self.knowledge_updated_at = timezone.now()
-            except Agent.DoesNotExist:
-                pass
+        if self.pk and not self._state.adding:
+            if self.has_changed("knowledge_pdf", "knowledge_base"):
+                self.knowledge_updated_at = timezone.now()
         else:
             # Novo agente
             if self.knowledge_pdf or self.knowledge_base != DEFAULT_KNOWLEDGE_BASE:
@@ -378,3 +413,23 @@ class Agent(models.Model):
 
 # Alias para compatibilidade
 Organization = Padaria
+
+
+class KnowledgePdfCache(models.Model):
+    """
+    Texto extraído de PDFs, indexado pelo SHA-256 do conteúdo.
+
+    Reenviar o mesmo PDF (no mesmo agente ou em outro) reaproveita o texto
+    sem abrir o arquivo novamente.
+    """
+    sha256 = models.CharField(max_length=64, unique=True, verbose_name="SHA-256")
+    text = models.TextField(blank=True, default="", verbose_name="Texto Extraído")
+    page_count = models.PositiveIntegerField(default=0, verbose_name="Páginas")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
+
+    class Meta:
+        verbose_name = "Cache de PDF"
+        verbose_name_plural = "Cache de PDFs"
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.page_count} páginas)"
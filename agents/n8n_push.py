@@ -0,0 +1,141 @@
+"""
+Envio do PDF de conhecimento para o webhook N8N do agente (n8n_webhook_url).
+
+O signal de post_save só agenda o envio (depois do commit); o upload roda
+em uma thread por agente:
+
+- saves seguidos do mesmo agente são agrupados: enquanto um envio está na
+  fila ou em andamento, novos pedidos só marcam que há trabalho pendente e
+  a thread envia uma vez o PDF mais recente;
+- o conteúdo só é enviado se o SHA-256 for diferente do último entregue
+  (`Agent.knowledge_pdf_n8n_sha256`), a não ser que o webhook tenha mudado;
+- falhas de rede, 429 e 5xx são repetidas com backoff exponencial.
+"""
+import logging
+import threading
+import time
+
+import requests
+from django.db import close_old_connections, transaction
+
+from core.db import escrever
+
+from .pdf_extraction import hash_arquivo
+
+logger = logging.getLogger(__name__)
+
+MAX_TENTATIVAS = 4
+BACKOFF_INICIAL = 2  # segundos; dobra a cada tentativa
+TIMEOUT = 30
+
+_lock = threading.Lock()
+# agent_id -> forçar envio mesmo com o hash igual
+_pendentes = {}
+# agent_id com thread de envio ativa
+_em_execucao = set()
+
+
+def agendar_envio(agent_id, forcar=False):
+    """
+    Pede o envio do PDF do agente. Se já houver um envio pendente ou em
+    andamento para o agente, o pedido é agrupado com ele.
+
+    Returns:
+        True se uma nova thread foi iniciada
+    """
+    with _lock:
+        _pendentes[agent_id] = _pendentes.get(agent_id, False) or forcar
+        if agent_id in _em_execucao:
+            return False
+        _em_execucao.add(agent_id)
+
+    threading.Thread(
+        target=_processar_fila, args=(agent_id,), name="n8n-pdf-push", daemon=True
+    ).start()
+    return True
+
+
+def agendar_envio_apos_commit(agent_id, forcar=False):
+    transaction.on_commit(lambda: agendar_envio(agent_id, forcar))
+
+
+def _proximo_pedido(agent_id):
+    """Retira o pedido pendente do agente, ou encerra a thread se não houver."""
+    with _lock:
+        if agent_id not in _pendentes:
+            _em_execucao.discard(agent_id)
+            return None
+        return _pendentes.pop(agent_id)
+
+
+def _processar_fila(agent_id):
+    close_old_connections()
+    try:
+        while (forcar := _proximo_pedido(agent_id)) is not None:
+            try:
+                enviar_pdf(agent_id, forcar)
+            except Exception:
+                logger.exception(f"Erro inesperado ao enviar PDF do agente {agent_id} para N8N")
+    finally:
+        close_old_connections()
+
+
+def _tem_pedido_pendente(agent_id):
+    with _lock:
+        return agent_id in _pendentes
+
+
+def enviar_pdf(agent_id, forcar=False):
+    """
+    Envia o PDF atual do agente para o webhook, se o conteúdo mudou.
+
+    Returns:
+        True se o PDF foi entregue nesta chamada
+    """
+    from .models import Agent
+
+    agent = Agent.objects.filter(pk=agent_id).first()
+    if agent is None or not agent.n8n_webhook_url or not agent.knowledge_pdf:
+        return False
+
+    sha256 = hash_arquivo(agent.knowledge_pdf)
+    if not forcar and sha256 == agent.knowledge_pdf_n8n_sha256:
+        logger.info(f"PDF do agente {agent.slug} já enviado ao N8N, upload ignorado")
+        return False
+
+    for tentativa in range(1, MAX_TENTATIVAS + 1):
+        try:
+            with agent.knowledge_pdf.open("rb") as pdf_file:
+                response = requests.post(
+                    agent.n8n_webhook_url,
+                    files={"file": (agent.knowledge_pdf.name, pdf_file, "application/pdf")},
+                    data={"agent_slug": agent.slug, "agent_name": agent.name},
+                    timeout=TIMEOUT,
+                )
+            if response.ok:
+                escrever(
+                    Agent.objects.filter(pk=agent_id).update, knowledge_pdf_n8n_sha256=sha256
+                )
+                logger.info(f"PDF enviado com sucesso para N8N - agente {agent.slug}")
+                return True
+            if response.status_code < 500 and response.status_code != 429:
+                logger.warning(
+                    f"Webhook N8N retornou status {response.status_code} para agente {agent.slug}, sem nova tentativa"
+                )
+                return False
+            erro = f"status {response.status_code}"
+        except requests.exceptions.RequestException as e:
+            erro = str(e)
+
+        # Um save mais novo já está na fila: ele envia a versão atual
+        if tentativa == MAX_TENTATIVAS or _tem_pedido_pendente(agent_id):
+            break
+        espera = BACKOFF_INICIAL * 2 ** (tentativa - 1)
+        logger.warning(
+            f"Falha ao enviar PDF para N8N - agente {agent.slug} ({erro}), "
+            f"tentativa {tentativa}/{MAX_TENTATIVAS}; nova tentativa em {espera}s"
+        )
+        time.sleep(espera)
+
+    logger.error(f"Erro ao enviar PDF para N8N - agente {agent.slug}: {erro}")
+    return False
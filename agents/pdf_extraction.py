@@ -0,0 +1,253 @@
+"""
+Extração do texto do PDF de conhecimento em background.
+
+O upload só grava o arquivo e calcula o SHA-256 do conteúdo. Se esse PDF
+já foi processado antes (`KnowledgePdfCache`), o texto é reaproveitado na
+hora; senão uma thread extrai as páginas em paralelo, em lotes distribuídos
+por um pool de processos (PyPDF2 é CPU-bound e segura o GIL), atualizando
+`Agent.knowledge_pdf_progress` a cada lote. A página do agente consulta
+`agents:pdf_status` para mostrar o progresso.
+
+Ao final o texto é enviado ao webhook de memória do n8n, como antes era
+feito dentro da própria requisição.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import PyPDF2
+import requests
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+N8N_MEMORIA_WEBHOOK = "https://n8n.newcouros.com.br/webhook/memoria_pandia"
+
+PAGINAS_POR_LOTE = 8
+# Abaixo disso o custo de subir o pool é maior que o ganho
+MIN_PAGINAS_PARALELO = 16
+
+
+def hash_arquivo(arquivo, chunk_size=1024 * 1024):
+    """SHA-256 do conteúdo de um arquivo (FieldFile ou caminho)."""
+    sha = hashlib.sha256()
+    if isinstance(arquivo, (str, os.PathLike)):
+        arquivo = open(arquivo, "rb")
+    else:
+        arquivo.open("rb")
+    with arquivo:
+        for bloco in iter(lambda: arquivo.read(chunk_size), b""):
+            sha.update(bloco)
+    return sha.hexdigest()
+
+
+def _extrair_paginas(caminho, inicio, fim):
+    """Executado nos processos do pool: texto das páginas [inicio, fim)."""
+    reader = PyPDF2.PdfReader(caminho)
+    return inicio, [(reader.pages[i].extract_text() or "").strip() for i in range(inicio, fim)]
+
+
+def _numero_workers():
+    workers = getattr(settings, "PDF_EXTRACTION_WORKERS", 0)
+    return workers if workers > 0 else min(4, os.cpu_count() or 1)
+
+
+def extrair_texto_paralelo(caminho, progresso=None, workers=None):
+    """
+    Extrai o texto de um PDF no disco, dividindo as páginas em lotes.
+
+    Args:
+        caminho: caminho local do PDF
+        progresso: callable(lotes_concluidos, total_lotes), opcional
+        workers: processos do pool (padrão: PDF_EXTRACTION_WORKERS)
+
+    Returns:
+        (texto, numero_de_paginas), com o mesmo formato de
+        `agents.utils.extract_text_from_pdf`
+    """
+    total = len(PyPDF2.PdfReader(caminho).pages)
+    lotes = [(inicio, min(inicio + PAGINAS_POR_LOTE, total)) for inicio in range(0, total, PAGINAS_POR_LOTE)]
+    workers = workers or _numero_workers()
+    paginas = [""] * total
+
+    if workers <= 1 or total < MIN_PAGINAS_PARALELO:
+        for concluidos, (inicio, fim) in enumerate(lotes, 1):
+            _, textos = _extrair_paginas(caminho, inicio, fim)
+            paginas[inicio:fim] = textos
+            if progresso:
+                progresso(concluidos, len(lotes))
+    else:
+        # spawn: o processo do gunicorn tem threads, fork herdaria locks
+        contexto = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(lotes)), mp_context=contexto) as pool:
+            futuros = [pool.submit(_extrair_paginas, caminho, inicio, fim) for inicio, fim in lotes]
+            for concluidos, futuro in enumerate(as_completed(futuros), 1):
+                inicio, textos = futuro.result()
+                paginas[inicio:inicio + len(textos)] = textos
+                if progresso:
+                    progresso(concluidos, len(lotes))
+
+    return "\n\n".join(texto for texto in paginas if texto), total
+
+
+def _caminho_local(arquivo):
+    """
+    Caminho local do arquivo e se ele é temporário (storages remotos são
+    copiados para um arquivo temporário, que os processos do pool abrem).
+    """
+    try:
+        return arquivo.path, False
+    except NotImplementedError:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as tmp:
+            with arquivo.open("rb") as origem:
+                shutil.copyfileobj(origem, tmp)
+        return tmp.name, True
+
+
+def _atualizar_agente(agent_id, sha256, **campos):
+    """Atualiza o agente se o PDF ainda for o mesmo (outro upload pode ter chegado)."""
+    from core.db import escrever
+    from .models import Agent
+
+    return escrever(
+        Agent.objects.filter(pk=agent_id, knowledge_pdf_sha256=sha256).update, **campos
+    )
+
+
+def enviar_para_n8n(agent, texto, pdf_filename, enviado_por="", action="new_upload"):
+    """Envia o texto extraído para o webhook de memória (RAG) do n8n."""
+    payload = {
+        "agent_id": agent.id,
+        "agent_name": agent.name,
+        "agent_slug": agent.slug,
+        "rag_table_name": f"rag_{agent.padaria.slug.replace('-', '_')}",
+        "pdf_filename": pdf_filename,
+        "pdf_category": agent.knowledge_pdf_category or "Sem categoria",
+        "extracted_text": texto,
+        "text_length": len(texto),
+        "padaria": agent.padaria.name,
+        "uploaded_by": enviado_por,
+        "action": action,
+    }
+    try:
+        response = requests.post(N8N_MEMORIA_WEBHOOK, json=payload, timeout=10)
+        if response.status_code == 200:
+            logger.info(f"PDF do agente {agent.slug} enviado ao n8n ({len(texto)} caracteres)")
+        else:
+            logger.warning(f"Webhook n8n retornou status {response.status_code} para agente {agent.slug}")
+    except requests.exceptions.RequestException as e:
+        logger.warning(f"Erro ao enviar PDF do agente {agent.slug} para n8n: {e}")
+
+
+def processar_pdf(agent_id, sha256, pdf_filename, enviado_por="", action="new_upload"):
+    """
+    Job de extração: lê o PDF do agente, grava o texto e o cache e envia
+    ao n8n. Roda na thread iniciada por `iniciar_extracao`.
+
+    Os imports do Django ficam dentro das funções: os processos do pool
+    (spawn) importam este módulo sem configurar o Django.
+    """
+    from django.db import close_old_connections
+    from django.utils import timezone
+    from core.db import escrever
+    from .models import Agent, KnowledgePdfCache
+
+    close_old_connections()
+    try:
+        agent = Agent.objects.select_related("padaria").get(pk=agent_id)
+        cache = KnowledgePdfCache.objects.filter(sha256=sha256).first()
+        if cache:
+            texto = cache.text
+        else:
+            ultimo = [0]
+
+            def progresso(concluidos, total):
+                percentual = int(concluidos * 100 / total)
+                # 100% só quando o texto estiver gravado
+                if percentual - ultimo[0] >= 5 and percentual < 100:
+                    ultimo[0] = percentual
+                    _atualizar_agente(agent_id, sha256, knowledge_pdf_progress=percentual)
+
+            caminho, temporario = _caminho_local(agent.knowledge_pdf)
+            try:
+                texto, paginas = extrair_texto_paralelo(caminho, progresso)
+            finally:
+                if temporario:
+                    os.unlink(caminho)
+
+            escrever(
+                KnowledgePdfCache.objects.update_or_create,
+                sha256=sha256, defaults={"text": texto, "page_count": paginas},
+            )
+
+        atualizados = _atualizar_agente(
+            agent_id, sha256,
+            knowledge_pdf_text=texto,
+            knowledge_pdf_status="concluido",
+            knowledge_pdf_progress=100,
+            knowledge_pdf_error="",
+            knowledge_updated_at=timezone.now(),
+        )
+        if atualizados:
+            enviar_para_n8n(agent, texto, pdf_filename, enviado_por, action)
+    except Exception as e:
+        logger.exception(f"Erro ao processar PDF do agente {agent_id}")
+        _atualizar_agente(
+            agent_id, sha256,
+            knowledge_pdf_status="erro",
+            knowledge_pdf_error=f"Erro ao extrair texto do PDF: {e}",
+        )
+    finally:
+        close_old_connections()
+
+
+def iniciar_extracao(agent, enviado_por="", action="new_upload"):
+    """
+    Registra o novo PDF do agente e agenda a extração para depois do commit.
+
+    Se o conteúdo já estiver no cache, o texto é preenchido na hora e só o
+    envio ao n8n fica para a thread.
+
+    Returns:
+        True se o texto veio do cache
+    """
+    from .models import KnowledgePdfCache
+
+    pdf_filename = os.path.basename(agent.knowledge_pdf.name)
+    sha256 = hash_arquivo(agent.knowledge_pdf)
+    cache = KnowledgePdfCache.objects.filter(sha256=sha256).first()
+
+    agent.knowledge_pdf_sha256 = sha256
+    agent.knowledge_pdf_error = ""
+    if cache:
+        agent.knowledge_pdf_text = cache.text
+        agent.knowledge_pdf_status = "concluido"
+        agent.knowledge_pdf_progress = 100
+    else:
+        agent.knowledge_pdf_text = ""
+        agent.knowledge_pdf_status = "processando"
+        agent.knowledge_pdf_progress = 0
+    type(agent).objects.filter(pk=agent.pk).update(
+        knowledge_pdf_sha256=agent.knowledge_pdf_sha256,
+        knowledge_pdf_text=agent.knowledge_pdf_text,
+        knowledge_pdf_status=agent.knowledge_pdf_status,
+        knowledge_pdf_progress=agent.knowledge_pdf_progress,
+        knowledge_pdf_error="",
+    )
+
+    def iniciar():
+        threading.Thread(
+            target=processar_pdf,
+            args=(agent.pk, sha256, pdf_filename, enviado_por, action),
+            name="pdf-extraction",
+            daemon=True,
+        ).start()
+
+    transaction.on_commit(iniciar)
+    return cache is not None
@@ -0,0 +1,272 @@
+"""
+Extração de produtos de catálogos/cardápios com um LLM.
+
+O texto inteiro é dividido em janelas sobrepostas (um produto cortado no
+fim de uma janela aparece inteiro na seguinte), enviadas em paralelo ao
+cliente de LLM configurado em `PRODUCT_EXTRACTION_LLM_CLIENT`:
+
+- agents.product_extraction.GeminiClient: API REST do Gemini (padrão)
+- agents.product_extraction.RegexClient: sem rede, reconhece linhas
+  "Nome - R$ 0,00"; útil em desenvolvimento e testes
+
+A resposta de cada janela fica no cache compartilhado, pela hash do texto
+da janela, então reimportar o mesmo catálogo não chama o LLM de novo. Os
+produtos repetidos entre janelas são mesclados pelo nome e gravados com um
+único bulk_create/bulk_update, a partir de um mapa dos nomes já existentes.
+"""
+import hashlib
+import json
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal, InvalidOperation
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from organizations.imports import chave_nome, mapa_produtos
+
+logger = logging.getLogger(__name__)
+
+TAMANHO_JANELA = 6000
+SOBREPOSICAO = 400
+CACHE_TTL = 30 * 24 * 60 * 60
+# Muda quando o prompt muda, para não reaproveitar respostas antigas
+VERSAO_PROMPT = "1"
+
+PROMPT = """Analise o texto abaixo que foi extraído de um catálogo/cardápio de padaria.
+Extraia TODOS os produtos mencionados.
+
+Para cada produto, retorne:
+- nome: nome do produto
+- preco: preço em reais como número (ex: 5.50), ou null se não tiver
+- descricao: descrição breve, ou string vazia
+- categoria: Pães, Doces, Salgados, Bebidas, Bolos, Confeitaria, Lanches, ou vazio
+
+RETORNE APENAS JSON no formato:
+{{"produtos": [{{"nome": "X", "preco": 1.00, "descricao": "", "categoria": "Pães"}}]}}
+
+Texto:
+{texto}"""
+
+
+class GeminiClient:
+    """Cliente da API REST do Gemini."""
+
+    modelo = "gemini-1.5-flash"
+
+    def __init__(self, api_key=None, timeout=60):
+        self.api_key = api_key if api_key is not None else settings.GEMINI_API_KEY
+        self.timeout = timeout
+
+    def gerar(self, prompt):
+        """Envia o prompt e devolve o texto da resposta."""
+        if not self.api_key:
+            raise RuntimeError("GEMINI_API_KEY não configurada no .env")
+        response = requests.post(
+            f"https://generativelanguage.googleapis.com/v1beta/models/{self.modelo}:generateContent",
+            params={"key": self.api_key},
+            json={
+                "contents": [{"parts": [{"text": prompt}]}],
+                "generationConfig": {"temperature": 0.1, "maxOutputTokens": 4096},
+            },
+            timeout=self.timeout,
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"Gemini retornou status {response.status_code}: {response.text[:300]}")
+        try:
+            return response.json()["candidates"][0]["content"]["parts"][0]["text"]
+        except (KeyError, IndexError, ValueError) as e:
+            raise RuntimeError(f"Estrutura de resposta inválida do Gemini: {e}")
+
+
+class RegexClient:
+    """Cliente local, sem LLM: reconhece linhas no formato 'Nome - R$ 0,00'."""
+
+    modelo = "regex"
+    LINHA_RE = re.compile(r"^\s*(?P<nome>[^\n]+?)\s*[-–:]\s*R\$\s*(?P<preco>\d+(?:[.,]\d{1,2})?)\s*$", re.M)
+
+    def gerar(self, prompt):
+        texto = prompt.rsplit("Texto:\n", 1)[-1]
+        produtos = [
+            {"nome": m["nome"], "preco": float(m["preco"].replace(",", ".")), "descricao": "", "categoria": ""}
+            for m in self.LINHA_RE.finditer(texto)
+        ]
+        return json.dumps({"produtos": produtos})
+
+
+def obter_cliente():
+    """Instancia o cliente de LLM configurado."""
+    caminho = getattr(settings, "PRODUCT_EXTRACTION_LLM_CLIENT", "agents.product_extraction.GeminiClient")
+    return import_string(caminho)()
+
+
+def dividir_em_janelas(texto, tamanho=TAMANHO_JANELA, sobreposicao=SOBREPOSICAO):
+    """
+    Divide o texto em janelas de até `tamanho` caracteres, cada uma
+    começando `sobreposicao` caracteres antes do fim da anterior. Os cortes
+    são feitos em quebras de linha sempre que possível.
+    """
+    texto = texto.strip()
+    if len(texto) <= tamanho:
+        return [texto] if texto else []
+
+    janelas = []
+    inicio = 0
+    while inicio < len(texto):
+        fim = min(inicio + tamanho, len(texto))
+        if fim < len(texto):
+            quebra = texto.rfind("\n", inicio + tamanho // 2, fim)
+            if quebra != -1:
+                fim = quebra
+        janelas.append(texto[inicio:fim])
+        if fim >= len(texto):
+            break
+        proximo = fim - sobreposicao
+        quebra = texto.find("\n", proximo, fim)
+        inicio = quebra + 1 if quebra != -1 else proximo
+    return janelas
+
+
+def _limpar_json(resposta):
+    """Remove cercas de markdown (```json ... ```) da resposta do LLM."""
+    resposta = resposta.strip()
+    if resposta.startswith("```"):
+        linhas = resposta.split("\n")
+        resposta = "\n".join(linhas[1:-1] if linhas[-1].strip() == "```" else linhas[1:])
+    return resposta.strip()
+
+
+def _extrair_janela(cliente, janela):
+    """Produtos (dicts crus do LLM) de uma janela, usando o cache por hash."""
+    chave_hash = hashlib.sha256(
+        f"{VERSAO_PROMPT}:{getattr(cliente, 'modelo', type(cliente).__name__)}:{janela}".encode("utf-8")
+    ).hexdigest()
+    chave = f"produtos_llm:{chave_hash}"
+    produtos = cache.get(chave)
+    if produtos is not None:
+        return produtos
+
+    try:
+        resposta = cliente.gerar(PROMPT.format(texto=janela))
+        produtos = json.loads(_limpar_json(resposta)).get("produtos", [])
+    except Exception as e:
+        # Não vai para o cache: a próxima importação tenta de novo
+        logger.warning(f"Falha ao extrair produtos de uma janela ({len(janela)} caracteres): {e}")
+        return []
+
+    produtos = [p for p in produtos if isinstance(p, dict)]
+    cache.set(chave, produtos, CACHE_TTL)
+    return produtos
+
+
+def _normalizar(bruto):
+    """Converte um produto do LLM para os campos de Produto, ou None se inválido."""
+    nome = " ".join(str(bruto.get("nome") or "").split())
+    if len(nome) < 2:
+        return None
+
+    preco = bruto.get("preco")
+    if preco is not None:
+        try:
+            preco = Decimal(str(preco).replace(",", ".")).quantize(Decimal("0.01"))
+            if preco <= 0 or preco > 10000:
+                preco = None
+        except (InvalidOperation, ValueError):
+            preco = None
+
+    return {
+        "nome": nome[:200],
+        "preco": preco,
+        "descricao": str(bruto.get("descricao") or "").strip(),
+        "categoria": str(bruto.get("categoria") or "").strip()[:100],
+    }
+
+
+def mesclar_produtos(listas):
+    """
+    Junta os produtos de todas as janelas, sem repetir nomes (sem
+    diferenciar maiúsculas). Para cada campo vale o primeiro valor preenchido.
+    """
+    mesclados = {}
+    for produtos in listas:
+        for bruto in produtos:
+            produto = _normalizar(bruto)
+            if produto is None:
+                continue
+            atual = mesclados.setdefault(chave_nome(produto["nome"]), produto)
+            for campo in ("preco", "descricao", "categoria"):
+                if atual[campo] in (None, "") and produto[campo] not in (None, ""):
+                    atual[campo] = produto[campo]
+    return list(mesclados.values())
+
+
+def gravar_produtos(padaria, produtos):
+    """
+    Cria ou atualiza os produtos da padaria em lote.
+
+    Um produto com o mesmo nome (sem diferenciar maiúsculas) é atualizado
+    com os campos preenchidos; os demais são criados ativos.
+
+    Returns:
+        list: Produtos criados/atualizados
+    """
+    from admin_panel import metrics
+    from organizations.models import Produto
+
+    existentes = mapa_produtos(padaria)
+
+    agora = timezone.now()
+    novos, atualizados = [], []
+    for dados in produtos:
+        existente = existentes.get(chave_nome(dados["nome"]))
+        if existente is None:
+            novos.append(Produto(padaria=padaria, ativo=True, **dados))
+            continue
+        if dados["preco"] is not None:
+            existente.preco = dados["preco"]
+        if dados["descricao"]:
+            existente.descricao = dados["descricao"]
+        if dados["categoria"]:
+            existente.categoria = dados["categoria"]
+        existente.updated_at = agora
+        atualizados.append(existente)
+
+    with transaction.atomic():
+        if atualizados:
+            Produto.objects.bulk_update(
+                atualizados, ["preco", "descricao", "categoria", "updated_at"], batch_size=500
+            )
+        if novos:
+            Produto.objects.bulk_create(novos, batch_size=500)
+            # bulk_create não dispara post_save
+            metrics.incrementar(metrics.PRODUTOS_TOTAL, len(novos))
+
+    return atualizados + novos
+
+
+def extrair_produtos(texto, padaria, cliente=None, max_workers=None):
+    """
+    Extrai os produtos do texto inteiro e grava na padaria.
+
+    Returns:
+        list: Produtos criados/atualizados
+    """
+    cliente = cliente or obter_cliente()
+    janelas = dividir_em_janelas(texto)
+    if not janelas:
+        return []
+
+    max_workers = max_workers or getattr(settings, "PRODUCT_EXTRACTION_CONCURRENCY", 4)
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(janelas))) as pool:
+        respostas = list(pool.map(lambda janela: _extrair_janela(cliente, janela), janelas))
+
+    produtos = mesclar_produtos(respostas)
+    logger.info(
+        f"{len(produtos)} produtos encontrados em {len(janelas)} janelas "
+        f"({len(texto)} caracteres) para {padaria.name}"
+    )
+    return gravar_produtos(padaria, produtos)
@@ -1,7 +1,18 @@
-from django.test import TestCase
+import io
+import os
+import tempfile
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
-from organizations.models import Organization
-from .models import Agent
+from organizations.models import Organization, Padaria
+from .models import Agent, KnowledgePdfCache
+from . import n8n_push, pdf_extraction, product_extraction
 
 
 class AgentModelTest(TestCase):
@@ -38,3 +49,281 @@ class AgentModelTest(TestCase):
         rendered = agent.render_greeting(cliente_nome="João")
         self.assertIn("João", rendered)
         self.assertIn("Ana", rendered)
+
+
+def _pdf_com_texto(paginas):
+    """Monta um PDF mínimo com um texto por página."""
+    objetos = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + 2 * i} 0 R" for i in range(len(paginas))), len(paginas)
+        )).encode(),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    for i, texto in enumerate(paginas):
+        conteudo = f"BT /F1 12 Tf 72 720 Td ({texto}) Tj ET".encode()
+        objetos.append((
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>"
+        ).encode())
+        objetos.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(conteudo), conteudo))
+
+    saida = io.BytesIO()
+    saida.write(b"%PDF-1.4\n")
+    offsets = []
+    for numero, objeto in enumerate(objetos, 1):
+        offsets.append(saida.tell())
+        saida.write(b"%d 0 obj\n%s\nendobj\n" % (numero, objeto))
+    xref = saida.tell()
+    saida.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1))
+    for offset in offsets:
+        saida.write(b"%010d 00000 n \n" % offset)
+    saida.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref))
+    return saida.getvalue()
+
+
+class PdfExtractionTest(TestCase):
+    """Testes para a extração do PDF de conhecimento em background."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(MEDIA_ROOT=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.user = User.objects.create_user(username="dono", password="12345", email="dono@teste.com")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=self.user)
+        self.conteudo = _pdf_com_texto(["Pao frances", "Bolo de cenoura", "Sonho"])
+
+    def _agente(self, padaria):
+        agent = Agent.objects.create(padaria=padaria, name="Ana")
+        agent.knowledge_pdf.save("cardapio.pdf", ContentFile(self.conteudo))
+        return agent
+
+    def test_extracao_paralela_preserva_ordem(self):
+        paginas = [f"Pagina {i}" for i in range(20)]
+        caminho = os.path.join(settings.MEDIA_ROOT, "grande.pdf")
+        with open(caminho, "wb") as arquivo:
+            arquivo.write(_pdf_com_texto(paginas))
+
+        progresso = []
+        texto, total = pdf_extraction.extrair_texto_paralelo(
+            caminho, lambda feitos, lotes: progresso.append((feitos, lotes)), workers=2
+        )
+        self.assertEqual(total, 20)
+        self.assertEqual(texto, "\n\n".join(paginas))
+        self.assertEqual(progresso[-1], (3, 3))
+
+    @patch("agents.pdf_extraction.requests.post")
+    def test_job_grava_texto_e_reaproveita_cache(self, post):
+        post.return_value.status_code = 200
+        agent = self._agente(self.padaria)
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.assertFalse(pdf_extraction.iniciar_extracao(agent, enviado_por=self.user.email))
+        self.assertEqual(len(callbacks), 1)
+        agent.refresh_from_db()
+        self.assertEqual(agent.knowledge_pdf_status, "processando")
+
+        pdf_extraction.processar_pdf(agent.pk, agent.knowledge_pdf_sha256, "cardapio.pdf", self.user.email)
+        agent.refresh_from_db()
+        self.assertEqual(agent.knowledge_pdf_status, "concluido")
+        self.assertEqual(agent.knowledge_pdf_progress, 100)
+        self.assertEqual(agent.knowledge_pdf_text, "Pao frances\n\nBolo de cenoura\n\nSonho")
+        self.assertEqual(post.call_args.kwargs["json"]["pdf_filename"], "cardapio.pdf")
+        self.assertTrue(KnowledgePdfCache.objects.filter(sha256=agent.knowledge_pdf_sha256).exists())
+
+        # O mesmo PDF em outro agente vem direto do cache
+        outra = Padaria.objects.create(name="Outra Padaria", owner=self.user)
+        outro_agente = self._agente(outra)
+        with self.captureOnCommitCallbacks():
+            self.assertTrue(pdf_extraction.iniciar_extracao(outro_agente))
+        outro_agente.refresh_from_db()
+        self.assertEqual(outro_agente.knowledge_pdf_status, "concluido")
+        self.assertEqual(outro_agente.knowledge_pdf_text, agent.knowledge_pdf_text)
+
+    @patch("agents.pdf_extraction.requests.post")
+    def test_resultado_de_upload_antigo_e_descartado(self, post):
+        agent = self._agente(self.padaria)
+        with self.captureOnCommitCallbacks():
+            pdf_extraction.iniciar_extracao(agent)
+        sha_antigo = agent.knowledge_pdf_sha256
+        Agent.objects.filter(pk=agent.pk).update(knowledge_pdf_sha256="outro")
+
+        pdf_extraction.processar_pdf(agent.pk, sha_antigo, "cardapio.pdf")
+        agent.refresh_from_db()
+        self.assertEqual(agent.knowledge_pdf_status, "processando")
+        post.assert_not_called()
+
+
+class _ThreadAdiada:
+    """Substitui threading.Thread guardando as threads para rodar depois."""
+
+    criadas = []
+
+    def __init__(self, target, args=(), **kwargs):
+        self.target, self.args = target, args
+
+    def start(self):
+        self.criadas.append(self)
+
+    def run(self):
+        self.target(*self.args)
+
+
+class N8nPdfPushTest(TestCase):
+    """Testes para o envio do PDF ao webhook N8N do agente."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(MEDIA_ROOT=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        _ThreadAdiada.criadas = []
+        self.addCleanup(n8n_push._pendentes.clear)
+        self.addCleanup(n8n_push._em_execucao.clear)
+
+        user = User.objects.create_user(username="dono", password="12345")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=user)
+        self.conteudo = _pdf_com_texto(["Pao frances"])
+
+    def _rodar_threads(self):
+        while _ThreadAdiada.criadas:
+            _ThreadAdiada.criadas.pop(0).run()
+
+    @patch.object(n8n_push.threading, "Thread", _ThreadAdiada)
+    @patch.object(n8n_push.requests, "post")
+    def test_envia_so_quando_o_conteudo_muda(self, post):
+        post.return_value.ok = True
+        with self.captureOnCommitCallbacks(execute=True):
+            agent = Agent(padaria=self.padaria, name="Ana", n8n_webhook_url="http://n8n.local/hook")
+            agent.knowledge_pdf.save("cardapio.pdf", ContentFile(self.conteudo))
+        self._rodar_threads()
+        self.assertEqual(post.call_count, 1)
+        agent.refresh_from_db()
+        self.assertEqual(agent.knowledge_pdf_n8n_sha256, pdf_extraction.hash_arquivo(agent.knowledge_pdf))
+
+        # Edição comum não agenda nada
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            agent.greeting = "Oi!"
+            agent.save()
+        self.assertEqual(callbacks, [])
+
+        # Mesmo arquivo enviado de novo: agenda, mas o hash evita o upload
+        with self.captureOnCommitCallbacks(execute=True):
+            agent.knowledge_pdf.save("cardapio-copia.pdf", ContentFile(self.conteudo))
+        self._rodar_threads()
+        self.assertEqual(post.call_count, 1)
+
+    @patch.object(n8n_push, "BACKOFF_INICIAL", 0)
+    @patch.object(n8n_push.requests, "post")
+    def test_repete_falhas_temporarias(self, post):
+        import requests
+
+        agent = Agent(padaria=self.padaria, name="Ana", n8n_webhook_url="http://n8n.local/hook")
+        agent.knowledge_pdf.save("cardapio.pdf", ContentFile(self.conteudo))
+        post.side_effect = [
+            requests.exceptions.ConnectionError("recusada"),
+            type("Resposta", (), {"ok": False, "status_code": 503})(),
+            type("Resposta", (), {"ok": True, "status_code": 200})(),
+        ]
+        self.assertTrue(n8n_push.enviar_pdf(agent.pk))
+        self.assertEqual(post.call_count, 3)
+
+        post.side_effect = None
+        post.return_value = type("Resposta", (), {"ok": False, "status_code": 400})()
+        self.assertFalse(n8n_push.enviar_pdf(agent.pk, forcar=True))
+        self.assertEqual(post.call_count, 4)
+
+    @patch.object(n8n_push.threading, "Thread", _ThreadAdiada)
+    @patch.object(n8n_push, "enviar_pdf")
+    def test_pedidos_do_mesmo_agente_sao_agrupados(self, enviar_pdf):
+        self.assertTrue(n8n_push.agendar_envio(1))
+        self.assertFalse(n8n_push.agendar_envio(1))
+        self.assertFalse(n8n_push.agendar_envio(1, forcar=True))
+        self.assertTrue(n8n_push.agendar_envio(2))
+        self.assertEqual(len(_ThreadAdiada.criadas), 2)
+
+        self._rodar_threads()
+        self.assertEqual(
+            [c.args for c in enviar_pdf.call_args_list], [(1, True), (2, False)]
+        )
+        # Com a fila vazia um novo pedido inicia outra thread
+        self.assertTrue(n8n_push.agendar_envio(1))
+        self._rodar_threads()
+
+
+class _ClienteContador(product_extraction.RegexClient):
+    """RegexClient que conta as chamadas ao "LLM"."""
+
+    def __init__(self):
+        self.chamadas = 0
+
+    def gerar(self, prompt):
+        self.chamadas += 1
+        return super().gerar(prompt)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ProductExtractionTest(TestCase):
+    """Testes para a extração de produtos em janelas."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="dono", password="12345")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=self.user)
+
+    def test_janelas_sobrepostas_cobrem_o_texto(self):
+        linhas = [f"Produto {i} - R$ {i},50" for i in range(600)]
+        texto = "\n".join(linhas)
+        janelas = product_extraction.dividir_em_janelas(texto, tamanho=2000, sobreposicao=200)
+
+        self.assertGreater(len(janelas), 5)
+        self.assertTrue(all(len(janela) <= 2000 for janela in janelas))
+        for linha in linhas:
+            self.assertTrue(any(linha in janela.split("\n") for janela in janelas), linha)
+
+    def test_extrai_texto_inteiro_e_grava_em_lote(self):
+        from admin_panel import metrics
+        from organizations.models import Produto
+
+        Produto.objects.create(padaria=self.padaria, nome="PÃO FRANCÊS", preco=Decimal("0.80"))
+        produtos_antes = metrics.obter_metricas()[metrics.PRODUTOS_TOTAL]
+        texto = "\n".join(
+            ["Pão francês - R$ 1,00"] + [f"Produto {i} - R$ {i},50" for i in range(1, 400)]
+        )
+        cliente = _ClienteContador()
+
+        with CaptureQueriesContext(connection) as queries:
+            gravados = product_extraction.extrair_produtos(texto, self.padaria, cliente=cliente)
+        # Mapa de nomes + um UPDATE + INSERTs em lote, não uma query por produto
+        self.assertLess(len(queries), 15)
+
+        self.assertEqual(len(gravados), 400)
+        self.assertEqual(Produto.objects.filter(padaria=self.padaria).count(), 400)
+        self.assertEqual(
+            Produto.objects.get(padaria=self.padaria, nome="PÃO FRANCÊS").preco, Decimal("1.00")
+        )
+        self.assertEqual(
+            metrics.obter_metricas()[metrics.PRODUTOS_TOTAL], produtos_antes + 399
+        )
+
+        # Reimportar o mesmo texto usa o cache das janelas
+        chamadas = cliente.chamadas
+        self.assertGreater(chamadas, 1)
+        product_extraction.extrair_produtos(texto, self.padaria, cliente=cliente)
+        self.assertEqual(cliente.chamadas, chamadas)
+        self.assertEqual(Produto.objects.filter(padaria=self.padaria).count(), 400)
+
+    def test_mescla_campos_entre_janelas(self):
+        produtos = product_extraction.mesclar_produtos([
+            [{"nome": "Bolo  de Cenoura", "preco": None, "descricao": "", "categoria": "Bolos"}],
+            [{"nome": "bolo de cenoura", "preco": "25,00", "descricao": "Com cobertura"}, {"nome": "x"}],
+        ])
+        self.assertEqual(produtos, [{
+            "nome": "Bolo de Cenoura",
+            "preco": Decimal("25.00"),
+            "descricao": "Com cobertura",
+            "categoria": "Bolos",
+        }])
@@ -10,5 +10,6 @@ urlpatterns = [
     path("<slug:slug>/edit/", views.agent_edit, name="edit"),
     path("<slug:slug>/delete/", views.agent_delete, name="delete"),
     path("<slug:slug>/delete-pdf/", views.agent_delete_pdf, name="delete_pdf"),
+    path("<slug:slug>/pdf-status/", views.agent_pdf_status, name="pdf_status"),
     path("<slug:slug>/playground/", views.agent_playground, name="playground"),
 ]
@@ -1,8 +1,11 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.http import JsonResponse
+from django.db import transaction
 from .models import Agent
-from .utils import extract_text_from_pdf, extract_products_from_text
+from .utils import extract_products_from_text
+from .pdf_extraction import iniciar_extracao, enviar_para_n8n
 from .forms import AgentSimpleForm
 from .presets import get_preset_defaults, AGENT_PRESETS
 from organizations.models import Padaria, PadariaUser
@@ -80,6 +83,19 @@ def agent_detail(request, slug):
     })
 
 
+@login_required
+def agent_pdf_status(request, slug):
+    """Progresso da extração do PDF de conhecimento (consultado pela página do agente)."""
+    padarias = get_user_padarias(request.user)
+    agent = get_object_or_404(Agent, slug=slug, padaria__in=padarias)
+    return JsonResponse({
+        "status": agent.knowledge_pdf_status,
+        "progress": agent.knowledge_pdf_progress,
+        "text_length": len(agent.knowledge_pdf_text),
+        "error": agent.knowledge_pdf_error,
+    })
+
+
 @login_required
 def agent_create(request):
     """Criar novo agente com formulário simplificado."""
@@ -151,48 +167,13 @@ def agent_create(request):
             
             agent.save()
             
-            # Processar PDF se enviado
+            # Processar PDF se enviado (extração em background)
             if 'knowledge_pdf' in request.FILES:
                 try:
-                    pdf_file = request.FILES['knowledge_pdf']
-                    extracted_text = extract_text_from_pdf(pdf_file)
-                    agent.knowledge_pdf_text = extracted_text
-                    agent.save()
-                    
-                    # Enviar para n8n
-                    try:
-                        webhook_url = "https://n8n.newcouros.com.br/webhook/memoria_pandia"
-                        
-                        # Nome da tabela RAG no Supabase (baseado na padaria)
-                        rag_table_name = f"rag_{agent.padaria.slug.replace('-', '_')}"
-                        
-                        payload = {
-                            "agent_id": agent.id,
-                            "agent_name": agent.name,
-                            "agent_slug": agent.slug,
-                            "rag_table_name": rag_table_name,
-                            "pdf_filename": pdf_file.name,
-                            "pdf_category": agent.knowledge_pdf_category or "Sem categoria",
-                            "extracted_text": extracted_text,
-                            "text_length": len(extracted_text),
-                            "padaria": agent.padaria.name,
-                            "uploaded_by": request.user.email
-                        }
-                        
-                        response = requests.post(
-                            webhook_url,
-                            json=payload,
-                            headers={'Content-Type': 'application/json'},
-                            timeout=10
-                        )
-                        
-                        if response.status_code == 200:
-                            print(f"[DEBUG] PDF enviado para n8n com sucesso! {len(extracted_text)} caracteres.")
-                        else:
-                            print(f"[DEBUG] Webhook n8n retornou status {response.status_code}")
-                    except requests.exceptions.RequestException as webhook_error:
-                        print(f"[DEBUG] Erro ao enviar para n8n: {str(webhook_error)}")
-                        
+                    if iniciar_extracao(agent, enviado_por=request.user.email):
+                        messages.info(request, "Este PDF já havia sido processado; texto reaproveitado.")
+                    else:
+                        messages.info(request, "PDF recebido! O texto está sendo extraído em segundo plano.")
                 except Exception as e:
                     messages.warning(request, f"Erro ao processar PDF: {str(e)}")
             
@@ -230,6 +211,10 @@ def agent_create(request):
                     phone=agent.padaria.phone or ""
                 )
                 print(f"[DEBUG] sync_agent_to_supabase resultado: {result}")
+                if not result:
+                    # Corrige em background (com retry) em vez de deixar o Supabase divergente
+                    from integrations.supabase_sync import agendar_reconciliacao
+                    transaction.on_commit(agendar_reconciliacao)
                 
                 # Criar tabela RAG para esta padaria (passa slug do agente para update)
                 rag_result = create_rag_table(slug=agent.padaria.slug, agent_slug=agent.slug)
@@ -350,56 +335,28 @@ def agent_edit(request, slug):
             agent.save()
             
             pdf_updated = False
-            extracted_text = None
-            pdf_filename = None
             
-            # Processar PDF se enviado (novo upload)
+            # Processar PDF se enviado (novo upload, extração em background)
             if 'knowledge_pdf' in request.FILES:
                 try:
-                    pdf_file = request.FILES['knowledge_pdf']
-                    extracted_text = extract_text_from_pdf(pdf_file)
-                    agent.knowledge_pdf_text = extracted_text
-                    agent.save()
+                    if iniciar_extracao(agent, enviado_por=request.user.email):
+                        messages.info(request, "Este PDF já havia sido processado; texto reaproveitado.")
+                    else:
+                        messages.info(request, "PDF recebido! O texto está sendo extraído em segundo plano.")
                     pdf_updated = True
-                    pdf_filename = pdf_file.name
                 except Exception as e:
                     messages.warning(request, f"Erro ao processar PDF: {str(e)}")
             
-            # Se tem PDF (novo ou existente), enviar para n8n
-            if agent.knowledge_pdf and agent.knowledge_pdf_text:
-                try:
-                    webhook_url = "https://n8n.newcouros.com.br/webhook/memoria_pandia"
-                    
-                    # Nome da tabela RAG no Supabase (baseado na padaria)
-                    rag_table_name = f"rag_{agent.padaria.slug.replace('-', '_')}"
-                    
-                    payload = {
-                        "agent_id": agent.id,
-                        "agent_name": agent.name,
-                        "agent_slug": agent.slug,
-                        "rag_table_name": rag_table_name,
-                        "pdf_filename": pdf_filename or agent.knowledge_pdf.name,
-                        "pdf_category": agent.knowledge_pdf_category or "Sem categoria",
-                        "extracted_text": extracted_text or agent.knowledge_pdf_text,
-                        "text_length": len(extracted_text or agent.knowledge_pdf_text),
-                        "padaria": agent.padaria.name,
-                        "uploaded_by": request.user.email,
-                        "action": "new_upload" if pdf_updated else "update"
-                    }
-                    
-                    response = requests.post(
-                        webhook_url,
-                        json=payload,
-                        headers={'Content-Type': 'application/json'},
-                        timeout=10
-                    )
-                    
-                    if response.status_code == 200:
-                        print(f"[DEBUG] PDF {'atualizado' if pdf_updated else 'sincronizado'} com n8n com sucesso!")
-                    else:
-                        print(f"[WARNING] Webhook n8n retornou status {response.status_code}")
-                except requests.exceptions.RequestException as webhook_error:
-                    print(f"[WARNING] Erro ao enviar para n8n: {str(webhook_error)}")
+            # PDF existente sem novo upload: reenviar o texto ao n8n
+            # (novos uploads são enviados pelo job de extração)
+            if agent.knowledge_pdf and agent.knowledge_pdf_text and not pdf_updated:
+                enviar_para_n8n(
+                    agent,
+                    agent.knowledge_pdf_text,
+                    agent.knowledge_pdf.name,
+                    enviado_por=request.user.email,
+                    action="update",
+                )
             
             AuditLog.log(
                 action="update",
@@ -484,6 +441,9 @@ def agent_delete(request, slug):
         )
         
         agent.delete()
+        # Remove a linha do agente da tabela 'agentes' do Supabase
+        from integrations.supabase_sync import agendar_reconciliacao
+        transaction.on_commit(agendar_reconciliacao)
         messages.success(request, f"Agente '{agent_name}' deletado com sucesso!")
         return redirect("agents:list")
     
@@ -528,6 +488,10 @@ def agent_delete_pdf(request, slug):
             # Limpar campos relacionados
             agent.knowledge_pdf_text = ""
             agent.knowledge_pdf_category = ""
+            agent.knowledge_pdf_sha256 = ""
+            agent.knowledge_pdf_status = ""
+            agent.knowledge_pdf_progress = 0
+            agent.knowledge_pdf_error = ""
             agent.save()
             
             AuditLog.log(
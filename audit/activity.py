@@ -0,0 +1,60 @@
+"""
+Leitura dos contadores diários de atividade (AuditActivityDaily)
+para o dashboard do cliente.
+"""
+from datetime import timedelta
+
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import AuditActivityDaily
+
+
+def resumo_atividade(padarias, dias_grafico=7, dias_periodo=30, top_acoes=5):
+    """
+    Retorna as estatísticas de atividade das padarias.
+
+    Args:
+        padarias: queryset (ou lista de ids) das padarias visíveis ao usuário
+
+    Returns:
+        dict com atividade_30_dias, atividade_7_dias, api_calls_30_dias,
+        atividade_diaria (lista de {'dia', 'count'}) e acoes_frequentes
+        (lista de {'action', 'total'})
+    """
+    hoje = timezone.localdate()
+    inicio_periodo = hoje - timedelta(days=dias_periodo)
+    inicio_grafico = hoje - timedelta(days=dias_grafico - 1)
+
+    contadores = AuditActivityDaily.objects.filter(
+        padaria__in=padarias,
+        date__gte=inicio_periodo,
+    )
+
+    # Uma query agrupada por dia e ação cobre todos os números do período
+    por_dia = {}
+    por_acao = {}
+    for dia, acao, total in contadores.values_list('date', 'action').annotate(total=Sum('count')):
+        por_dia[dia] = por_dia.get(dia, 0) + total
+        por_acao[acao] = por_acao.get(acao, 0) + total
+
+    atividade_diaria = []
+    for i in range(dias_grafico - 1, -1, -1):
+        dia = hoje - timedelta(days=i)
+        atividade_diaria.append({
+            'dia': dia.strftime('%d/%m'),
+            'count': por_dia.get(dia, 0),
+        })
+
+    acoes_frequentes = [
+        {'action': acao, 'total': total}
+        for acao, total in sorted(por_acao.items(), key=lambda item: -item[1])[:top_acoes]
+    ]
+
+    return {
+        'atividade_30_dias': sum(por_dia.values()),
+        'atividade_7_dias': sum(total for dia, total in por_dia.items() if dia >= inicio_grafico),
+        'api_calls_30_dias': por_acao.get('api_call', 0),
+        'atividade_diaria': atividade_diaria,
+        'acoes_frequentes': acoes_frequentes,
+    }
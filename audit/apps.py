@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class AuditConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "audit"
+
+    def ready(self):
+        """Importar signals quando o app estiver pronto."""
+        import audit.signals
@@ -0,0 +1,198 @@
+"""
+Retenção dos logs de auditoria.
+
+Logs mais antigos que `AUDIT_RETENTION_DAYS` são copiados para arquivos
+JSONL comprimidos, um por mês (`audit-YYYY-MM.jsonl.gz` em
+`AUDIT_ARCHIVE_DIR`), e então removidos da tabela em lotes pequenos para
+não segurar o lock de escrita do banco por muito tempo.
+
+Cada lote é gravado (e sincronizado em disco) antes de ser excluído. Se o
+processo cair entre a gravação e a exclusão, o lote é arquivado de novo na
+próxima execução; a leitura descarta ids repetidos.
+
+Como o arquivo é a única cópia dos logs removidos, nada é removido se o
+diretório não for gravável ou, em container, não estiver em um volume
+montado (ver `verificar_diretorio`).
+
+Os contadores diários (`AuditActivityDaily`) não são afetados.
+"""
+import gzip
+import json
+import logging
+import os
+import re
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+MES_RE = re.compile(r"^\d{4}-\d{2}$")
+ARQUIVO_RE = re.compile(r"^audit-(\d{4}-\d{2})\.jsonl\.gz$")
+
+CAMPOS = (
+    "id", "created_at", "padaria_id", "actor_id", "action", "entity",
+    "entity_id", "diff", "ip_address", "user_agent",
+)
+
+
+class ArquivoIndisponivel(Exception):
+    """O diretório do arquivo não é gravável ou não é persistente."""
+
+
+def diretorio_arquivo():
+    return settings.AUDIT_ARCHIVE_DIR
+
+
+def _em_container():
+    return os.path.exists("/.dockerenv") or os.path.exists("/run/.containerenv")
+
+
+def _em_volume(caminho):
+    """True se o caminho está abaixo de um ponto de montagem (exceto a raiz)."""
+    caminho = os.path.realpath(caminho)
+    while caminho != os.path.dirname(caminho):
+        if os.path.ismount(caminho):
+            return True
+        caminho = os.path.dirname(caminho)
+    return False
+
+
+def verificar_diretorio():
+    """
+    Garante que o diretório do arquivo pode guardar os logs removidos.
+
+    Raises:
+        ArquivoIndisponivel: diretório não gravável ou, em container (ou com
+            AUDIT_ARCHIVE_REQUIRE_VOLUME), fora de um volume montado - seria
+            apagado no próximo deploy
+    """
+    diretorio = diretorio_arquivo()
+    try:
+        os.makedirs(diretorio, exist_ok=True)
+        with tempfile.NamedTemporaryFile(dir=diretorio, prefix=".teste-") as teste:
+            teste.write(b"ok")
+            teste.flush()
+            os.fsync(teste.fileno())
+    except OSError as e:
+        raise ArquivoIndisponivel(f"AUDIT_ARCHIVE_DIR ({diretorio}) não é gravável: {e}")
+
+    exigir_volume = settings.AUDIT_ARCHIVE_REQUIRE_VOLUME
+    if exigir_volume is None:
+        exigir_volume = _em_container()
+    if exigir_volume and not _em_volume(diretorio):
+        raise ArquivoIndisponivel(
+            f"AUDIT_ARCHIVE_DIR ({diretorio}) não está em um volume montado; "
+            f"os logs arquivados seriam perdidos no próximo deploy"
+        )
+
+
+def caminho_arquivo(mes):
+    """Caminho do arquivo de um mês ('YYYY-MM'); None se o mês for inválido."""
+    if not MES_RE.match(mes or ""):
+        return None
+    return os.path.join(diretorio_arquivo(), f"audit-{mes}.jsonl.gz")
+
+
+def meses_arquivados():
+    """Lista os meses com arquivo, do mais recente para o mais antigo."""
+    try:
+        nomes = os.listdir(diretorio_arquivo())
+    except FileNotFoundError:
+        return []
+    meses = [m.group(1) for m in map(ARQUIVO_RE.match, nomes) if m]
+    return sorted(meses, reverse=True)
+
+
+def _gravar_lote(linhas):
+    """Anexa as linhas aos arquivos de seus meses (um membro gzip por lote)."""
+    por_mes = {}
+    for linha in linhas:
+        mes = timezone.localtime(linha["created_at"]).strftime("%Y-%m")
+        por_mes.setdefault(mes, []).append(linha)
+
+    os.makedirs(diretorio_arquivo(), exist_ok=True)
+    for mes, registros in por_mes.items():
+        with open(caminho_arquivo(mes), "ab") as arquivo:
+            with gzip.GzipFile(fileobj=arquivo, mode="ab") as gz:
+                for registro in registros:
+                    gz.write(json.dumps(registro, cls=DjangoJSONEncoder, ensure_ascii=False).encode("utf-8"))
+                    gz.write(b"\n")
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+
+
+def arquivar_logs(dias=None, batch_size=BATCH_SIZE, dry_run=False):
+    """
+    Move para o arquivo os logs com mais de `dias` dias.
+
+    Returns:
+        int: quantidade de logs arquivados (ou que seriam, em dry-run)
+
+    Raises:
+        ArquivoIndisponivel: ver verificar_diretorio (nada é removido)
+    """
+    dias = settings.AUDIT_RETENTION_DAYS if dias is None else dias
+    limite = timezone.now() - timedelta(days=dias)
+    antigos = AuditLog.objects.filter(created_at__lt=limite)
+
+    if dry_run:
+        return antigos.count()
+
+    verificar_diretorio()
+
+    total = 0
+    ultimo_id = 0
+    while True:
+        linhas = list(
+            antigos.filter(id__gt=ultimo_id).order_by("id").values(*CAMPOS)[:batch_size]
+        )
+        if not linhas:
+            break
+
+        _gravar_lote(linhas)
+        ids = [linha["id"] for linha in linhas]
+        AuditLog.objects.filter(id__in=ids).delete()
+
+        total += len(ids)
+        ultimo_id = ids[-1]
+
+    if total:
+        logger.info(f"{total} log(s) de auditoria arquivado(s) (anteriores a {limite:%Y-%m-%d})")
+    return total
+
+
+def ler_arquivo(mes, padaria_id=None, action=None, apos_id=None):
+    """
+    Lê os logs arquivados de um mês, em ordem crescente de id.
+
+    Os filtros são aplicados durante a leitura (o arquivo é percorrido em
+    streaming, sem carregar o mês inteiro em memória). `apos_id` permite
+    continuar a partir do último id exibido.
+    """
+    caminho = caminho_arquivo(mes)
+    if caminho is None or not os.path.exists(caminho):
+        return
+
+    vistos = set()
+    with gzip.open(caminho, "rt", encoding="utf-8") as gz:
+        for linha in gz:
+            registro = json.loads(linha)
+            if registro["id"] in vistos:
+                continue
+            vistos.add(registro["id"])
+            if apos_id is not None and registro["id"] <= apos_id:
+                continue
+            if padaria_id is not None and registro["padaria_id"] != padaria_id:
+                continue
+            if action and registro["action"] != action:
+                continue
+            registro["created_at"] = parse_datetime(registro["created_at"])
+            yield registro
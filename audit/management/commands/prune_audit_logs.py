@@ -0,0 +1,57 @@
+"""
+Management command para arquivar logs de auditoria antigos.
+
+Move os logs com mais de AUDIT_RETENTION_DAYS dias para arquivos JSONL
+comprimidos por mês (AUDIT_ARCHIVE_DIR) e os remove da tabela em lotes.
+Os arquivos podem ser consultados em /audit/arquivo/.
+
+Uso: python manage.py prune_audit_logs [--days 90] [--batch-size 1000] [--dry-run]
+Executado pelo agendador interno (run_scheduler) 1x ao dia se
+AUDIT_PRUNE_ENABLED=true - ver SCHEDULER_TASKS
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from audit import archive
+
+
+class Command(BaseCommand):
+    help = 'Arquiva e remove logs de auditoria mais antigos que o período de retenção'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.AUDIT_RETENTION_DAYS,
+            help=f'Idade mínima (em dias) dos logs arquivados (padrão: {settings.AUDIT_RETENTION_DAYS})',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=archive.BATCH_SIZE,
+            help='Quantidade de logs removidos por lote',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas conta os logs que seriam arquivados',
+        )
+
+    def handle(self, *args, **options):
+        dias = options['days']
+        dry_run = options.get('dry_run', False)
+
+        self.stdout.write(f"[{timezone.now()}] Arquivando logs com mais de {dias} dias...")
+
+        try:
+            total = archive.arquivar_logs(dias=dias, batch_size=options['batch_size'], dry_run=dry_run)
+        except archive.ArquivoIndisponivel as e:
+            raise CommandError(f"Nenhum log removido: {e}")
+
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f"MODO DRY-RUN: {total} log(s) seriam arquivados"))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"{total} log(s) arquivado(s) em {archive.diretorio_arquivo()}"
+            ))
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+BATCH_SIZE = 1000
+
+
+def preencher_contadores(apps, schema_editor):
+    """Agrega os logs existentes nos contadores diários."""
+    AuditLog = apps.get_model('audit', 'AuditLog')
+    AuditActivityDaily = apps.get_model('audit', 'AuditActivityDaily')
+
+    agregados = AuditLog.objects.filter(padaria__isnull=False).annotate(
+        dia=TruncDate('created_at')
+    ).values_list('padaria_id', 'dia', 'action').annotate(total=Count('id')).order_by()
+
+    lote = []
+    for padaria_id, dia, action, total in agregados.iterator(chunk_size=BATCH_SIZE):
+        lote.append(AuditActivityDaily(padaria_id=padaria_id, date=dia, action=action, count=total))
+        if len(lote) >= BATCH_SIZE:
+            AuditActivityDaily.objects.bulk_create(lote)
+            lote = []
+    if lote:
+        AuditActivityDaily.objects.bulk_create(lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_rename_audit_audit_organiz_c1c99d_idx_audit_audit_padaria_8a3705_idx'),
+        ('organizations', '0008_add_socio_responsavel_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditActivityDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('action', models.CharField(max_length=100, verbose_name='Ação')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Eventos')),
+                ('padaria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='audit_activity', to='organizations.padaria', verbose_name='Padaria')),
+            ],
+            options={
+                'verbose_name': 'Atividade Diária',
+                'verbose_name_plural': 'Atividade Diária',
+                'ordering': ['-date', 'action'],
+                'constraints': [models.UniqueConstraint(fields=('padaria', 'date', 'action'), name='audit_activity_padaria_date_action_uniq')],
+            },
+        ),
+        migrations.RunPython(preencher_contadores, migrations.RunPython.noop),
+    ]
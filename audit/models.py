@@ -83,3 +83,47 @@ class AuditLog(models.Model):
             ip_address=ip,
             user_agent=user_agent or ""
         )
+
+
+class AuditActivityDaily(models.Model):
+    """
+    Contador diário de eventos de auditoria por padaria e ação.
+    Mantido a cada AuditLog criado (ver audit.signals); usado no dashboard
+    do cliente no lugar de COUNTs sobre a tabela de logs.
+    """
+    padaria = models.ForeignKey(
+        Padaria,
+        on_delete=models.CASCADE,
+        related_name="audit_activity",
+        verbose_name="Padaria"
+    )
+    date = models.DateField(verbose_name="Data")
+    action = models.CharField(max_length=100, verbose_name="Ação")
+    count = models.PositiveIntegerField(default=0, verbose_name="Eventos")
+
+    class Meta:
+        verbose_name = "Atividade Diária"
+        verbose_name_plural = "Atividade Diária"
+        ordering = ["-date", "action"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["padaria", "date", "action"],
+                name="audit_activity_padaria_date_action_uniq",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.padaria_id} - {self.date} - {self.action}: {self.count}"
+
+    @classmethod
+    def incrementar(cls, padaria_id, action, date, delta=1):
+        """Soma `delta` ao contador do dia (criando a linha se necessário)."""
+        updated = cls.objects.filter(padaria_id=padaria_id, date=date, action=action).update(
+            count=models.F("count") + delta
+        )
+        if not updated:
+            contador, created = cls.objects.get_or_create(
+                padaria_id=padaria_id, date=date, action=action, defaults={"count": delta}
+            )
+            if not created:
+                cls.objects.filter(pk=contador.pk).update(count=models.F("count") + delta)
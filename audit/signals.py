@@ -0,0 +1,20 @@
+"""
+Signals do app audit: mantém os contadores diários de atividade.
+"""
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import AuditLog, AuditActivityDaily
+
+
+@receiver(post_save, sender=AuditLog)
+def contar_atividade(sender, instance, created, raw=False, **kwargs):
+    """Incrementa o contador diário da padaria/ação do log criado."""
+    if not created or raw or not instance.padaria_id:
+        return
+    AuditActivityDaily.incrementar(
+        padaria_id=instance.padaria_id,
+        action=instance.action,
+        date=timezone.localdate(instance.created_at),
+    )
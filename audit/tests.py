@@ -0,0 +1,159 @@
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from organizations.models import Padaria
+from . import archive
+from .activity import resumo_atividade
+from .models import AuditLog, AuditActivityDaily
+
+
+class AuditActivityDailyTest(TestCase):
+    """Testes para os contadores diários de atividade."""
+
+    def setUp(self):
+        self.owner = User.objects.create_user(username="dono", password="12345")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=self.owner)
+        self.outra = Padaria.objects.create(name="Outra Padaria", owner=self.owner)
+
+    def test_contador_mantido_na_criacao(self):
+        """Testa que cada AuditLog incrementa o contador do dia."""
+        AuditLog.log(action="api_call", entity="Agent", padaria=self.padaria)
+        AuditLog.log(action="api_call", entity="Agent", padaria=self.padaria)
+        AuditLog.objects.create(action="update", entity="Agent", padaria=self.padaria)
+        AuditLog.log(action="api_call", entity="Agent")  # sem padaria: ignorado
+
+        contador = AuditActivityDaily.objects.get(padaria=self.padaria, action="api_call")
+        self.assertEqual(contador.count, 2)
+        self.assertEqual(contador.date, timezone.localdate())
+        self.assertEqual(AuditActivityDaily.objects.count(), 2)
+
+    def test_resumo_atividade(self):
+        """Testa os números do dashboard a partir dos contadores."""
+        hoje = timezone.localdate()
+        AuditActivityDaily.objects.create(padaria=self.padaria, date=hoje, action="api_call", count=5)
+        AuditActivityDaily.objects.create(padaria=self.padaria, date=hoje, action="update", count=1)
+        AuditActivityDaily.objects.create(
+            padaria=self.padaria, date=hoje - timedelta(days=10), action="api_call", count=3
+        )
+        AuditActivityDaily.objects.create(
+            padaria=self.padaria, date=hoje - timedelta(days=40), action="api_call", count=100
+        )
+        AuditActivityDaily.objects.create(padaria=self.outra, date=hoje, action="api_call", count=7)
+
+        with self.assertNumQueries(1):
+            resumo = resumo_atividade([self.padaria.id])
+
+        self.assertEqual(resumo["atividade_30_dias"], 9)
+        self.assertEqual(resumo["atividade_7_dias"], 6)
+        self.assertEqual(resumo["api_calls_30_dias"], 8)
+        self.assertEqual(len(resumo["atividade_diaria"]), 7)
+        self.assertEqual(resumo["atividade_diaria"][-1]["count"], 6)
+        self.assertEqual(resumo["acoes_frequentes"][0], {"action": "api_call", "total": 8})
+
+
+STATIC_SEM_MANIFEST = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+}
+
+
+class AuditRetentionTest(TestCase):
+    """Testes para o arquivamento e a navegação dos logs."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        override = override_settings(
+            AUDIT_ARCHIVE_DIR=self.tmp.name, AUDIT_ARCHIVE_REQUIRE_VOLUME=False, STORAGES=STATIC_SEM_MANIFEST
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.owner = User.objects.create_user(username="dono", password="12345")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=self.owner)
+
+    def _criar_log(self, action="api_call", dias_atras=0, padaria=None):
+        log = AuditLog.log(action=action, entity="Agent", padaria=padaria or self.padaria, diff={"x": 1})
+        if dias_atras:
+            AuditLog.objects.filter(pk=log.pk).update(created_at=timezone.now() - timedelta(days=dias_atras))
+        return log
+
+    def test_arquivar_logs_antigos(self):
+        """Testa que logs antigos vão para o arquivo e saem da tabela."""
+        antigos = [self._criar_log(dias_atras=200) for _ in range(5)]
+        recente = self._criar_log()
+
+        self.assertEqual(archive.arquivar_logs(dias=90, dry_run=True), 5)
+        self.assertEqual(archive.arquivar_logs(dias=90, batch_size=2), 5)
+        self.assertEqual(list(AuditLog.objects.values_list("id", flat=True)), [recente.id])
+
+        meses = archive.meses_arquivados()
+        self.assertEqual(len(meses), 1)
+        registros = list(archive.ler_arquivo(meses[0]))
+        self.assertEqual([r["id"] for r in registros], [log.id for log in antigos])
+        self.assertEqual(registros[0]["diff"], {"x": 1})
+        self.assertEqual(list(archive.ler_arquivo(meses[0], apos_id=antigos[2].id))[0]["id"], antigos[3].id)
+
+        User.objects.create_superuser(username="admin", password="12345")
+        self.client.login(username="admin", password="12345")
+        response = self.client.get(f"/audit/arquivo/{meses[0]}/", {"action": "api_call"})
+        self.assertEqual(len(response.context["logs"]), 5)
+
+        # Contadores diários não são afetados pelo arquivamento
+        self.assertEqual(AuditActivityDaily.objects.get(padaria=self.padaria).count, 6)
+
+    def test_nao_remove_sem_diretorio_persistente(self):
+        """Testa que nada é removido se o arquivo não ficar em um volume."""
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        self._criar_log(dias_atras=200)
+        with override_settings(AUDIT_ARCHIVE_REQUIRE_VOLUME=None), \
+                patch.object(archive, "_em_container", return_value=True), \
+                patch.object(archive.os.path, "ismount", return_value=False):
+            with self.assertRaises(CommandError):
+                call_command("prune_audit_logs", stdout=StringIO())
+        self.assertEqual(AuditLog.objects.count(), 1)
+        self.assertEqual(archive.meses_arquivados(), [])
+
+        # Diretório não gravável
+        bloqueio = os.path.join(self.tmp.name, "arquivo")
+        open(bloqueio, "w").close()
+        with override_settings(AUDIT_ARCHIVE_DIR=os.path.join(bloqueio, "sub")):
+            with self.assertRaises(archive.ArquivoIndisponivel):
+                archive.arquivar_logs(dias=90)
+        self.assertEqual(AuditLog.objects.count(), 1)
+
+    def test_mes_invalido(self):
+        """Testa que meses fora do formato não viram caminho de arquivo."""
+        self.assertIsNone(archive.caminho_arquivo("../../etc/passwd"))
+        self.assertEqual(list(archive.ler_arquivo("../x")), [])
+
+    def test_listagem_paginada_por_cursor(self):
+        """Testa paginação por cursor e filtros no visualizador."""
+        from . import views
+
+        User.objects.create_superuser(username="admin", password="12345")
+        self.client.login(username="admin", password="12345")
+        outra = Padaria.objects.create(name="Outra", owner=self.owner)
+        ids = [self._criar_log().id for _ in range(views.PAGE_SIZE + 3)]
+        self._criar_log(action="update", padaria=outra)
+
+        response = self.client.get("/audit/", {"padaria": self.padaria.id, "action": "api_call"})
+        pagina1 = [log.id for log in response.context["logs"]]
+        self.assertEqual(len(pagina1), views.PAGE_SIZE)
+        self.assertTrue(response.context["proximo_cursor"])
+
+        response = self.client.get("/audit/", {
+            "padaria": self.padaria.id, "action": "api_call", "cursor": response.context["proximo_cursor"],
+        })
+        pagina2 = [log.id for log in response.context["logs"]]
+        self.assertIsNone(response.context["proximo_cursor"])
+        self.assertEqual(sorted(pagina1 + pagina2), ids)
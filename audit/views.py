@@ -1,18 +1,149 @@
+from datetime import datetime, time, timedelta
+from itertools import islice
+
 from django.shortcuts import render, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from .models import AuditLog
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 
+from organizations.models import Padaria
+from . import archive
+from .models import AuditLog, AuditActivityDaily
 
-@login_required
-def audit_log_list(request):
-    """Lista de logs de auditoria - apenas para desenvolvedores/superusers."""
-    # Verificar se é superuser (desenvolvedor)
+PAGE_SIZE = 50
+
+
+def _somente_superuser(request):
     if not request.user.is_superuser:
         messages.error(request, "Acesso restrito. Apenas desenvolvedores podem acessar os logs de auditoria.")
         return redirect('ui:dashboard')
-    
-    logs = AuditLog.objects.all().select_related('padaria', 'actor').order_by('-created_at')[:100]  # Últimos 100 logs
-    
-    return render(request, "audit/list.html", {"logs": logs})
+    return None
+
+
+def _inteiro(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _codificar_cursor(log):
+    return f"{log.created_at.isoformat()}_{log.id}"
+
+
+def _decodificar_cursor(cursor):
+    """Cursor no formato '<created_at iso>_<id>'; None se inválido."""
+    try:
+        data, log_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(data), int(log_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _data(valor):
+    try:
+        return parse_date(valor or "")
+    except ValueError:
+        return None
+
+
+def _filtros(request):
+    return {
+        "padaria": _inteiro(request.GET.get("padaria")),
+        "action": request.GET.get("action", "").strip(),
+        "inicio": _data(request.GET.get("inicio")),
+        "fim": _data(request.GET.get("fim")),
+    }
+
+
+def _inicio_do_dia(dia):
+    return timezone.make_aware(datetime.combine(dia, time.min))
+
+
+def _opcoes_filtro():
+    return {
+        "padarias": Padaria.objects.order_by("name").values("id", "name"),
+        "acoes": AuditActivityDaily.objects.order_by("action").values_list("action", flat=True).distinct(),
+    }
+
+
+@login_required
+def audit_log_list(request):
+    """
+    Lista de logs de auditoria - apenas para desenvolvedores/superusers.
+
+    Paginação por cursor (created_at, id): cada página é uma busca no
+    índice a partir do último log exibido, sem OFFSET.
+    """
+    negado = _somente_superuser(request)
+    if negado:
+        return negado
+
+    filtros = _filtros(request)
+    logs = AuditLog.objects.select_related('padaria', 'actor').order_by('-created_at', '-id')
+    if filtros["padaria"]:
+        logs = logs.filter(padaria_id=filtros["padaria"])
+    if filtros["action"]:
+        logs = logs.filter(action=filtros["action"])
+    if filtros["inicio"]:
+        logs = logs.filter(created_at__gte=_inicio_do_dia(filtros["inicio"]))
+    if filtros["fim"]:
+        logs = logs.filter(created_at__lt=_inicio_do_dia(filtros["fim"] + timedelta(days=1)))
+
+    cursor = _decodificar_cursor(request.GET.get("cursor"))
+    if cursor:
+        created_at, log_id = cursor
+        logs = logs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=log_id))
+
+    pagina = list(logs[:PAGE_SIZE + 1])
+    proximo_cursor = _codificar_cursor(pagina[PAGE_SIZE - 1]) if len(pagina) > PAGE_SIZE else None
+
+    parametros = request.GET.copy()
+    parametros.pop("cursor", None)
+
+    return render(request, "audit/list.html", {
+        "logs": pagina[:PAGE_SIZE],
+        "filtros": filtros,
+        "proximo_cursor": proximo_cursor,
+        "primeira_pagina": cursor is None,
+        "query_string": parametros.urlencode(),
+        "meses_arquivados": archive.meses_arquivados(),
+        **_opcoes_filtro(),
+    })
+
+
+@login_required
+def audit_archive(request, mes):
+    """Consulta os logs arquivados de um mês (arquivo JSONL comprimido)."""
+    negado = _somente_superuser(request)
+    if negado:
+        return negado
+
+    if mes not in archive.meses_arquivados():
+        messages.error(request, "Arquivo de auditoria não encontrado.")
+        return redirect('audit:list')
+
+    filtros = _filtros(request)
+    registros = archive.ler_arquivo(
+        mes,
+        padaria_id=filtros["padaria"],
+        action=filtros["action"] or None,
+        apos_id=_inteiro(request.GET.get("apos")),
+    )
+    pagina = list(islice(registros, PAGE_SIZE + 1))
+    proximo = pagina[PAGE_SIZE - 1]["id"] if len(pagina) > PAGE_SIZE else None
+
+    parametros = request.GET.copy()
+    parametros.pop("apos", None)
 
+    return render(request, "audit/archive.html", {
+        "mes": mes,
+        "logs": pagina[:PAGE_SIZE],
+        "filtros": filtros,
+        "proximo": proximo,
+        "query_string": parametros.urlencode(),
+        "meses_arquivados": archive.meses_arquivados(),
+        **_opcoes_filtro(),
+    })
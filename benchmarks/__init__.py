@@ -0,0 +1,22 @@
+"""
+Microbenchmarks dos endpoints mais usados do PanDia.
+
+Roda as views pelo Client de teste do Django, sobre um banco de teste com
+um dataset gerado (benchmarks.dataset), com Mercado Pago, Cakto,
+Evolution, n8n e Supabase simulados em processo (benchmarks.fakes).
+Para cada cenário mede latência p50/p95/p99, consultas SQL e memória
+alocada por requisição, e salva tudo em JSON para comparar commits.
+
+Uso:
+    python -m benchmarks run                        # todos os cenários
+    python -m benchmarks run report_detail dashboard --iteracoes 100
+    python -m benchmarks run --latencia mercadopago=300 --latencia n8n=0
+    python -m benchmarks run --tamanho grande --saida antes.json
+    python -m benchmarks compare antes.json depois.json [--limite 20]
+
+Sem `--saida`, o resultado vai para <tmp>/pandia-benchmarks/<commit>.json
+(fora do repositório).
+
+`compare` sai com código 1 se algum cenário ficou mais de `--limite` %
+mais lento no p95 ou passou a fazer mais consultas SQL.
+"""
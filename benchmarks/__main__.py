@@ -0,0 +1,110 @@
+"""
+Linha de comando do benchmark (ver benchmarks/__init__.py).
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+import django
+
+
+def _latencia(valor):
+    """'mercadopago=80' (ms) -> ('mercadopago', 0.08)"""
+    servico, _, ms = valor.partition("=")
+    try:
+        return servico.strip(), float(ms.removesuffix("ms")) / 1000
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Latência inválida: {valor!r} (use servico=ms)")
+
+
+def _imprimir(resultado):
+    print(f"\n{'cenário':<22}{'p50':>9}{'p95':>9}{'p99':>9}{'SQL':>6}{'pico KiB':>10}  externas")
+    for nome, metricas in resultado["cenarios"].items():
+        latencia = metricas["latencia_ms"]
+        memoria = metricas.get("memoria_kib", {}).get("pico", "-")
+        externas = ", ".join(f"{servico}×{n:g}" for servico, n in metricas["chamadas_externas"].items())
+        erros = f"  ({metricas['erros']} erros)" if metricas["erros"] else ""
+        print(
+            f"{nome:<22}{latencia['p50']:>9.1f}{latencia['p95']:>9.1f}{latencia['p99']:>9.1f}"
+            f"{metricas['consultas_sql']['mediana']:>6g}{memoria:>10}  {externas or '-'}{erros}"
+        )
+
+
+def main(argv=None):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+    django.setup()
+    from benchmarks import runner
+    from benchmarks.dataset import TAMANHOS
+    from benchmarks.fakes import LATENCIAS_PADRAO
+    from benchmarks.scenarios import CENARIOS
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Benchmark dos endpoints do PanDia")
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    rodar = comandos.add_parser("run", help="Executa os cenários e salva o resultado")
+    rodar.add_argument("cenarios", nargs="*", metavar="cenario",
+                       help=f"Cenários a medir (padrão: todos): {', '.join(CENARIOS)}")
+    rodar.add_argument("--iteracoes", type=int, default=runner.ITERACOES)
+    rodar.add_argument("--aquecimento", type=int, default=runner.AQUECIMENTO)
+    rodar.add_argument("--tamanho", choices=list(TAMANHOS), default="medio", help="Tamanho do dataset")
+    rodar.add_argument("--latencia", type=_latencia, action="append", default=[], metavar="SERVICO=MS",
+                       help=f"Latência simulada, repetível; serviços: {', '.join(LATENCIAS_PADRAO)} "
+                            f"ou 'todos' (ex.: --latencia todos=0)")
+    rodar.add_argument("--sem-memoria", action="store_true", help="Não mede alocações (tracemalloc)")
+    rodar.add_argument("--saida", help="Arquivo JSON (padrão: <tmp>/pandia-benchmarks/<commit>.json)")
+
+    compara = comandos.add_parser("compare", help="Compara dois resultados salvos")
+    compara.add_argument("base")
+    compara.add_argument("atual")
+    compara.add_argument("--limite", type=float, default=runner.LIMITE_REGRESSAO,
+                         help="Piora máxima aceita no p95, em %%")
+
+    args = parser.parse_args(argv)
+
+    if args.comando == "compare":
+        with open(args.base) as base, open(args.atual) as atual:
+            linhas, regressoes = runner.comparar(json.load(base), json.load(atual), args.limite)
+        print("\n".join(linhas))
+        if regressoes:
+            print(f"\nRegressões: {', '.join(regressoes)}")
+            return 1
+        return 0
+
+    desconhecidos = [nome for nome in args.cenarios if nome not in CENARIOS]
+    if desconhecidos:
+        parser.error(f"Cenário desconhecido: {', '.join(desconhecidos)}")
+
+    latencias = {}
+    for servico, segundos in args.latencia:
+        if servico == "todos":
+            latencias.update(dict.fromkeys(LATENCIAS_PADRAO, segundos))
+        elif servico in LATENCIAS_PADRAO:
+            latencias[servico] = segundos
+        else:
+            parser.error(f"Serviço desconhecido: {servico}")
+
+    resultado = runner.executar(
+        cenarios=args.cenarios,
+        iteracoes=args.iteracoes,
+        aquecimento=args.aquecimento,
+        tamanho=args.tamanho,
+        latencias=latencias,
+        alocacoes=not args.sem_memoria,
+    )
+    _imprimir(resultado)
+
+    # Fora da árvore do repositório: resultados não vão parar no git
+    saida = args.saida or os.path.join(
+        tempfile.gettempdir(), "pandia-benchmarks", f"{resultado['meta']['commit'] or 'resultado'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(saida)), exist_ok=True)
+    with open(saida, "w") as arquivo:
+        json.dump(resultado, arquivo, indent=2, ensure_ascii=False)
+    print(f"\nResultado salvo em {saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+"""
+Massa de dados do benchmark.
+
+Gera, sempre da mesma forma, padarias com agente, API key, clientes,
+produtos, promoções, logs de auditoria e pagamentos. Os cenários usam a
+primeira padaria (`Dataset.padaria`); as demais existem para que as
+consultas filtrem em tabelas com volume de produção.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from agents.models import Agent
+from audit.models import AuditActivityDaily, AuditLog
+from core.phones import normalizar_whatsapp
+from organizations.models import ApiKey, Cliente, Padaria, PadariaUser, Produto, Promocao
+from payments.models import CaktoSubscription, MercadoPagoConfig, MercadoPagoPayment
+
+from .fakes import pagamento_mp
+
+TAMANHOS = {
+    "pequeno": {"padarias": 2, "clientes": 20, "produtos": 10, "logs": 50, "pagamentos": 10},
+    "medio": {"padarias": 10, "clientes": 500, "produtos": 80, "logs": 2000, "pagamentos": 200},
+    "grande": {"padarias": 30, "clientes": 3000, "produtos": 200, "logs": 10000, "pagamentos": 1000},
+}
+
+SENHA = "benchmark"
+CATEGORIAS = ("Pães", "Bolos", "Salgados", "Doces", "Bebidas")
+ACOES_LOG = ("webhook_received", "login", "produto_atualizado", "campanha_enviada", "pagamento_aprovado")
+LOTE = 1000
+DIAS_LOGS = 30
+
+
+class Dataset:
+    """Referências aos objetos usados pelos cenários."""
+
+    def __init__(self, tamanho, padaria, usuario, agente, api_key, pagamento, telefone):
+        self.tamanho = tamanho
+        self.padaria = padaria
+        self.usuario = usuario
+        self.agente = agente
+        self.api_key = api_key
+        # Pagamento pendente (o gateway falso também o devolve como pendente)
+        self.pagamento = pagamento
+        # Telefone de um cliente cadastrado, para os eventos do n8n
+        self.telefone = telefone
+        self.produtos = list(Produto.objects.filter(padaria=padaria).values_list("nome", flat=True)[:5])
+
+
+def _telefone(padaria_idx, i):
+    return f"(11) 9{padaria_idx:03d}-{i:04d}"
+
+
+def _popular_padaria(idx, usuario, quantidades, agora, proximo_mp_id):
+    padaria = Padaria.objects.create(name=f"Padaria Benchmark {idx}", owner=usuario, is_active=True)
+    PadariaUser.objects.create(user=usuario, padaria=padaria, role="dono")
+    agente = Agent.objects.create(padaria=padaria, name=f"Atendente {idx}")
+    api_key = ApiKey.objects.create(padaria=padaria, agent=agente, name="benchmark")
+
+    Cliente.objects.bulk_create(
+        [
+            Cliente(
+                padaria=padaria,
+                nome=f"Cliente {i}",
+                telefone=_telefone(idx, i),
+                whatsapp_e164=normalizar_whatsapp(_telefone(idx, i)),
+            )
+            for i in range(quantidades["clientes"])
+        ],
+        batch_size=LOTE,
+    )
+
+    produtos = Produto.objects.bulk_create(
+        [
+            Produto(
+                padaria=padaria,
+                nome=f"Produto {i}",
+                preco=Decimal(5 + i % 45) + Decimal("0.90"),
+                categoria=CATEGORIAS[i % len(CATEGORIAS)],
+                ativo=i % 10 != 0,
+            )
+            for i in range(quantidades["produtos"])
+        ],
+        batch_size=LOTE,
+    )
+    hoje = agora.date()
+    Promocao.objects.bulk_create(
+        [
+            Promocao(
+                padaria=padaria,
+                produto=produto,
+                titulo=f"Promoção {produto.nome}",
+                preco=produto.preco - 1,
+                preco_original=produto.preco,
+                data_inicio=hoje - timedelta(days=3),
+                data_fim=hoje + timedelta(days=7),
+                is_active=True,
+            )
+            for produto in produtos[::7]
+        ],
+        batch_size=LOTE,
+    )
+
+    # Logs espalhados nos últimos 30 dias, com os contadores diários
+    # equivalentes (bulk_create não dispara audit.signals). created_at é
+    # auto_now_add, então a data de cada dia é aplicada com um UPDATE.
+    logs = []
+    contadores = {}
+    for i in range(quantidades["logs"]):
+        acao = ACOES_LOG[i % len(ACOES_LOG)]
+        dias = i % DIAS_LOGS
+        logs.append(AuditLog(padaria=padaria, action=acao, entity=f"benchmark-{dias}", entity_id=str(i)))
+        chave = (timezone.localdate(agora - timedelta(days=dias)), acao)
+        contadores[chave] = contadores.get(chave, 0) + 1
+    AuditLog.objects.bulk_create(logs, batch_size=LOTE)
+    for dias in range(1, DIAS_LOGS):
+        AuditLog.objects.filter(padaria=padaria, entity=f"benchmark-{dias}").update(
+            created_at=agora - timedelta(days=dias)
+        )
+    AuditActivityDaily.objects.bulk_create(
+        [
+            AuditActivityDaily(padaria=padaria, date=data, action=acao, count=total)
+            for (data, acao), total in contadores.items()
+        ],
+        batch_size=LOTE,
+    )
+
+    config = MercadoPagoConfig.objects.create(padaria=padaria, access_token=f"TEST-benchmark-{idx}")
+    pagamentos = []
+    for i in range(quantidades["pagamentos"]):
+        mp_id = proximo_mp_id + i
+        dados = pagamento_mp(mp_id)
+        pagamentos.append(
+            MercadoPagoPayment(
+                config=config,
+                mp_payment_id=str(mp_id),
+                amount=Decimal(str(dados["transaction_amount"])),
+                description=dados["description"],
+                status=dados["status"],
+            )
+        )
+    MercadoPagoPayment.objects.bulk_create(pagamentos, batch_size=LOTE)
+
+    # Assinatura inativa com pedido em aberto: o status consulta a Cakto
+    CaktoSubscription.objects.create(
+        padaria=padaria, status="inactive", cakto_order_id=f"order-benchmark-{idx}", plan_value=Decimal("297.00")
+    )
+    return padaria, agente, api_key
+
+
+def criar_dataset(tamanho="medio"):
+    """
+    Cria a massa de dados no banco atual.
+
+    Args:
+        tamanho: chave de TAMANHOS ou dict com as mesmas quantidades
+    """
+    quantidades = TAMANHOS[tamanho] if isinstance(tamanho, str) else tamanho
+    agora = timezone.now()
+    usuario = User.objects.create_user(username="benchmark", email="benchmark@pandia.com.br", password=SENHA)
+
+    alvo = None
+    proximo_mp_id = 1
+    for idx in range(quantidades["padarias"]):
+        criados = _popular_padaria(idx, usuario, quantidades, agora, proximo_mp_id)
+        proximo_mp_id += quantidades["pagamentos"]
+        alvo = alvo or criados
+
+    padaria, agente, api_key = alvo
+    pagamento = MercadoPagoPayment.objects.filter(config__padaria=padaria, status="pending").first()
+    cliente = Cliente.objects.filter(padaria=padaria).order_by("id").last()
+    return Dataset(
+        tamanho=quantidades,
+        padaria=padaria,
+        usuario=usuario,
+        agente=agente,
+        api_key=api_key,
+        pagamento=pagamento,
+        telefone=cliente.telefone if cliente else "",
+    )
@@ -0,0 +1,184 @@
+"""
+Integrações externas simuladas em processo (Mercado Pago, Cakto,
+Evolution, n8n, Supabase).
+
+`GatewaysFalsos` substitui `HTTPAdapter.send` do requests, então pega tanto
+`requests.get/post/request` quanto as `Session` com pool (supabase_client).
+Cada chamada espera a latência configurada do serviço e recebe uma resposta
+determinística, calculada só a partir da URL. Uma URL que não pertence a
+nenhum serviço conhecido falha com ConnectionError: o benchmark nunca sai
+para a rede.
+"""
+import json
+import threading
+import time
+from collections import Counter
+from datetime import timedelta
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Latência simulada por serviço, em segundos
+LATENCIAS_PADRAO = {
+    "mercadopago": 0.080,
+    "cakto": 0.120,
+    "evolution": 0.030,
+    "n8n": 0.150,
+    "supabase": 0.050,
+}
+
+# Pagamentos devolvidos pela busca do Mercado Pago (relatórios)
+PAGAMENTOS_NA_BUSCA = 300
+
+STATUS_MP = ("approved", "approved", "approved", "pending", "rejected", "refunded")
+METODOS_MP = ("pix", "master", "visa", "account_money")
+
+
+def pagamento_mp(mp_id):
+    """Pagamento do Mercado Pago gerado a partir do id (sempre o mesmo)."""
+    mp_id = int(mp_id)
+    status = STATUS_MP[mp_id % len(STATUS_MP)]
+    valor = round(10 + (mp_id * 37 % 9000) / 100, 2)
+    criado = timezone.now().replace(hour=12, minute=0, second=0, microsecond=0) - timedelta(days=mp_id % 28)
+    return {
+        "id": mp_id,
+        "status": status,
+        "status_detail": "accredited" if status == "approved" else status,
+        "transaction_amount": valor,
+        "payment_method_id": METODOS_MP[mp_id % len(METODOS_MP)],
+        "description": f"Pedido #{mp_id}",
+        "external_reference": f"pandia_benchmark_{mp_id}",
+        "date_created": criado.isoformat(),
+        "additional_info": {
+            "items": [
+                {"title": f"Produto {mp_id % 40}", "quantity": 1 + mp_id % 3, "unit_price": valor}
+            ]
+        },
+    }
+
+
+def _host(url):
+    return (urlsplit(url).hostname or "").lower()
+
+
+class GatewaysFalsos:
+    """
+    Context manager que simula as integrações externas.
+
+    Args:
+        latencias: {servico: segundos} sobrepondo LATENCIAS_PADRAO
+    """
+
+    def __init__(self, latencias=None):
+        self.latencias = {**LATENCIAS_PADRAO, **(latencias or {})}
+        self.chamadas = Counter()
+        self._lock = threading.Lock()
+        self._patcher = None
+        self._hosts = {
+            _host(settings.CAKTO_API_URL): "cakto",
+            _host(settings.EVOLUTION_API_URL): "evolution",
+        }
+
+    def __enter__(self):
+        falsos = self
+
+        def send(adaptador, request, **kwargs):
+            return falsos.responder(request)
+
+        self._patcher = mock.patch.object(HTTPAdapter, "send", send)
+        self._patcher.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._patcher.stop()
+
+    def servico(self, url):
+        host = _host(url)
+        if host in self._hosts:
+            return self._hosts[host]
+        for servico in ("mercadopago", "cakto", "supabase", "n8n"):
+            if servico in host:
+                return servico
+        return None
+
+    def responder(self, request):
+        servico = self.servico(request.url)
+        if servico is None:
+            raise requests.exceptions.ConnectionError(f"Chamada externa não simulada no benchmark: {request.url}")
+        with self._lock:
+            self.chamadas[servico] += 1
+        time.sleep(self.latencias.get(servico, 0))
+
+        partes = urlsplit(request.url)
+        consulta = {chave: valores[0] for chave, valores in parse_qs(partes.query).items()}
+        status, corpo = getattr(self, f"_{servico}")(request.method, partes.path.rstrip("/"), consulta)
+        return _resposta(request, status, corpo)
+
+    # ------------------------------------------------------------------
+    # Serviços
+    # ------------------------------------------------------------------
+
+    def _mercadopago(self, metodo, caminho, consulta):
+        if caminho == "/v1/payments/search":
+            limite = min(int(consulta.get("limit", PAGAMENTOS_NA_BUSCA)), PAGAMENTOS_NA_BUSCA)
+            resultados = [pagamento_mp(i) for i in range(1, limite + 1)]
+            return 200, {"results": resultados, "paging": {"total": len(resultados), "limit": limite, "offset": 0}}
+        if caminho.startswith("/v1/payments/") and metodo == "GET":
+            return 200, pagamento_mp(caminho.rsplit("/", 1)[-1])
+        if caminho == "/v1/payments" and metodo == "POST":
+            return 201, {
+                **pagamento_mp(1),
+                "status": "pending",
+                "point_of_interaction": {"transaction_data": {
+                    "qr_code": "00020126580014br.gov.bcb.pix0136benchmark",
+                    "qr_code_base64": "iVBORw0KGgo=",
+                    "ticket_url": "https://www.mercadopago.com.br/payments/1/ticket",
+                }},
+            }
+        if caminho == "/checkout/preferences" and metodo == "POST":
+            return 201, {
+                "id": "pref-benchmark",
+                "init_point": "https://www.mercadopago.com.br/checkout/v1/redirect?pref_id=pref-benchmark",
+                "sandbox_init_point": "https://sandbox.mercadopago.com.br/checkout/v1/redirect?pref_id=pref-benchmark",
+            }
+        if caminho == "/users/me":
+            return 200, {"id": 1, "nickname": "BENCHMARK"}
+        return 200, {}
+
+    def _cakto(self, metodo, caminho, consulta):
+        if caminho.endswith("/token"):
+            return 200, {"access_token": "token-benchmark", "expires_in": 36000}
+        if "/orders/" in caminho:
+            return 200, {"id": caminho.rsplit("/", 1)[-1], "status": "waiting_payment"}
+        return 200, {}
+
+    def _evolution(self, metodo, caminho, consulta):
+        if "/instance/connectionState/" in caminho:
+            return 200, {"instance": {"instanceName": caminho.rsplit("/", 1)[-1], "state": "open"}}
+        if "/message/" in caminho:
+            return 201, {"key": {"id": "BENCHMARK"}, "status": "PENDING"}
+        return 200, {}
+
+    def _n8n(self, metodo, caminho, consulta):
+        return 200, {"ok": True}
+
+    def _supabase(self, metodo, caminho, consulta):
+        if metodo == "GET":
+            return 200, []
+        return 201, None
+
+
+def _resposta(request, status, corpo):
+    response = requests.Response()
+    response.status_code = status
+    response._content = b"" if corpo is None else json.dumps(corpo).encode()
+    response.headers = CaseInsensitiveDict({"Content-Type": "application/json"})
+    response.encoding = "utf-8"
+    response.url = request.url
+    response.request = request
+    return response
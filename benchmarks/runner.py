@@ -0,0 +1,231 @@
+"""
+Execução e comparação dos benchmarks.
+
+`medir()` roda os cenários no banco atual (já com o dataset) e devolve, por
+cenário, a latência (p50/p95/p99, em ms), as consultas SQL por requisição,
+as chamadas às integrações simuladas e a memória alocada. `executar()`
+cria um banco de teste, gera o dataset, mede e descarta o banco.
+`comparar()` confronta dois resultados salvos em JSON.
+"""
+import gc
+import math
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+from unittest import mock
+
+import django
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import dataset as massa
+from .fakes import LATENCIAS_PADRAO, GatewaysFalsos
+from .scenarios import CENARIOS
+
+ITERACOES = 50
+AQUECIMENTO = 5
+# Iterações da passada com tracemalloc (que deixa tudo bem mais lento)
+ITERACOES_MEMORIA = 10
+# Regressão: p95 mais lento que isso (%) ou mais consultas SQL
+LIMITE_REGRESSAO = 20.0
+
+# O benchmark não usa o cache compartilhado nem hashers lentos, e não
+# depende do collectstatic (manifest do whitenoise)
+CONFIGURACOES = {
+    "CACHES": {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    "STORAGES": {
+        "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+        "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    },
+    "PASSWORD_HASHERS": ["django.contrib.auth.hashers.MD5PasswordHasher"],
+    "DEBUG": False,
+}
+
+
+def percentil(valores, p):
+    """Percentil pelo método nearest-rank."""
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def _commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ""
+
+
+def _medir_cenario(funcao, client, dados, falsos, iteracoes, aquecimento, alocacoes):
+    for i in range(aquecimento):
+        funcao(client, dados, i)
+
+    tempos = []
+    consultas = []
+    erros = 0
+    chamadas_antes = falsos.chamadas.copy()
+    gc.collect()
+    for i in range(aquecimento, aquecimento + iteracoes):
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            ok = funcao(client, dados, i)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        consultas.append(len(capturadas))
+        erros += not ok
+    chamadas = falsos.chamadas - chamadas_antes
+
+    resultado = {
+        "iteracoes": iteracoes,
+        "erros": erros,
+        "latencia_ms": {
+            "p50": round(percentil(tempos, 50), 3),
+            "p95": round(percentil(tempos, 95), 3),
+            "p99": round(percentil(tempos, 99), 3),
+            "media": round(statistics.fmean(tempos), 3),
+            "min": round(min(tempos), 3),
+            "max": round(max(tempos), 3),
+        },
+        "consultas_sql": {"mediana": statistics.median(consultas), "max": max(consultas)},
+        "chamadas_externas": {servico: round(total / iteracoes, 2) for servico, total in sorted(chamadas.items())},
+    }
+
+    if alocacoes:
+        picos = []
+        retidos = []
+        inicio_memoria = aquecimento + iteracoes
+        tracemalloc.start()
+        try:
+            for i in range(inicio_memoria, inicio_memoria + min(iteracoes, ITERACOES_MEMORIA)):
+                tracemalloc.reset_peak()
+                antes, _ = tracemalloc.get_traced_memory()
+                funcao(client, dados, i)
+                depois, pico = tracemalloc.get_traced_memory()
+                picos.append(pico - antes)
+                retidos.append(depois - antes)
+        finally:
+            tracemalloc.stop()
+        resultado["memoria_kib"] = {
+            "pico": round(statistics.median(picos) / 1024, 1),
+            "retida": round(statistics.median(retidos) / 1024, 1),
+        }
+    return resultado
+
+
+def medir(dados, cenarios=None, iteracoes=ITERACOES, aquecimento=AQUECIMENTO, latencias=None, alocacoes=True):
+    """
+    Mede os cenários no banco atual.
+
+    Args:
+        dados: Dataset (ver benchmarks.dataset.criar_dataset)
+        cenarios: nomes de CENARIOS (padrão: todos)
+        latencias: {servico: segundos} das integrações simuladas
+
+    Returns:
+        {nome do cenário: métricas}
+    """
+    nomes = cenarios or list(CENARIOS)
+    client = Client()
+    client.force_login(dados.usuario)
+
+    resultados = {}
+    # O monitor de pagamento do generate-link é uma thread de 10 min
+    with GatewaysFalsos(latencias) as falsos, \
+            mock.patch("payments.services.payment_monitor.start_payment_monitor"):
+        for nome in nomes:
+            resultados[nome] = _medir_cenario(
+                CENARIOS[nome], client, dados, falsos, iteracoes, aquecimento, alocacoes
+            )
+    return resultados
+
+
+def executar(cenarios=None, iteracoes=ITERACOES, aquecimento=AQUECIMENTO, tamanho="medio",
+             latencias=None, alocacoes=True, verbosidade=1):
+    """
+    Cria um banco de teste, gera o dataset e mede os cenários.
+
+    Returns:
+        dict com "meta" (commit, versões, parâmetros) e "cenarios"
+    """
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    latencias = {**LATENCIAS_PADRAO, **(latencias or {})}
+    setup_test_environment()
+    nome_original = connection.settings_dict["NAME"]
+    try:
+        with override_settings(**CONFIGURACOES):
+            connection.creation.create_test_db(verbosity=0, autoclobber=True)
+            try:
+                # Sem latência na geração: criar agentes/produtos não deve demorar
+                with GatewaysFalsos(dict.fromkeys(LATENCIAS_PADRAO, 0)):
+                    inicio = time.perf_counter()
+                    dados = massa.criar_dataset(tamanho)
+                    if verbosidade:
+                        print(f"Dataset criado em {time.perf_counter() - inicio:.1f}s")
+                resultados = medir(dados, cenarios, iteracoes, aquecimento, latencias, alocacoes)
+            finally:
+                connection.creation.destroy_test_db(nome_original, verbosity=0)
+    finally:
+        teardown_test_environment()
+
+    return {
+        "meta": {
+            "commit": _commit_atual(),
+            "data": timezone.now().isoformat(),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "banco": connection.vendor,
+            "iteracoes": iteracoes,
+            "aquecimento": aquecimento,
+            "dataset": dados.tamanho,
+            "latencias_ms": {servico: round(s * 1000, 1) for servico, s in latencias.items()},
+        },
+        "cenarios": resultados,
+    }
+
+
+def _variacao(base, atual):
+    if not base:
+        return 0.0
+    return (atual - base) / base * 100
+
+
+def comparar(base, atual, limite=LIMITE_REGRESSAO):
+    """
+    Compara dois resultados de `executar()`.
+
+    Returns:
+        (linhas, regressões): linhas de texto com a tabela e a lista de
+        cenários que pioraram
+    """
+    linhas = [
+        f"base: {base['meta'].get('commit') or '?'}  atual: {atual['meta'].get('commit') or '?'}",
+        f"{'cenário':<22}{'p50 ms':>19}{'p95 ms':>25}{'SQL':>10}",
+    ]
+    for chave in ("dataset", "latencias_ms"):
+        if base["meta"].get(chave) != atual["meta"].get(chave):
+            linhas.insert(1, f"atenção: '{chave}' diferente entre as execuções, números não comparáveis")
+    regressoes = []
+    for nome, metricas in atual["cenarios"].items():
+        anterior = base["cenarios"].get(nome)
+        if anterior is None:
+            linhas.append(f"{nome:<22}{'(novo)':>18}")
+            continue
+        p50 = (anterior["latencia_ms"]["p50"], metricas["latencia_ms"]["p50"])
+        p95 = (anterior["latencia_ms"]["p95"], metricas["latencia_ms"]["p95"])
+        sql = (anterior["consultas_sql"]["mediana"], metricas["consultas_sql"]["mediana"])
+        piorou = _variacao(*p95) > limite or sql[1] > sql[0]
+        if piorou:
+            regressoes.append(nome)
+        linhas.append(
+            f"{nome:<22}"
+            f"{p50[1]:>10.1f} ({_variacao(*p50):+5.0f}%)"
+            f"{p95[1]:>16.1f} ({_variacao(*p95):+5.0f}%)"
+            f"{sql[0]:>5g} → {sql[1]:<4g}"
+            f"{'  ⚠️' if piorou else ''}"
+        )
+    return linhas, regressoes
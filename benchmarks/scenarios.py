@@ -0,0 +1,100 @@
+"""
+Cenários medidos pelo benchmark.
+
+Cada cenário recebe o Client de teste (já autenticado com o usuário do
+dataset), o Dataset e o número da iteração, faz uma requisição e devolve
+True se a resposta foi a esperada.
+"""
+import contextlib
+import io
+import json
+
+from django.urls import reverse
+
+from organizations.views import send_products_webhook
+
+
+def _ip(i):
+    # IP diferente por iteração: o limite de 60 req/min da API é por padaria+IP
+    return f"10.{i // 62500 % 250}.{i // 250 % 250}.{i % 250 + 1}"
+
+
+def agent_config(client, dataset, i):
+    response = client.get(
+        reverse("api:agent_config", args=[dataset.agente.slug]),
+        HTTP_X_API_KEY=dataset.api_key.key,
+        REMOTE_ADDR=_ip(i),
+    )
+    return response.status_code == 200
+
+
+def receive_event(client, dataset, i):
+    payload = {
+        "type": "message",
+        "agent_slug": dataset.agente.slug,
+        "session_id": f"benchmark-{i}",
+        "payload": {"phone": dataset.telefone, "text": "Bom dia, tem pão de queijo?"},
+    }
+    response = client.post(
+        reverse("webhooks:n8n_events"),
+        data=json.dumps(payload),
+        content_type="application/json",
+        HTTP_X_API_KEY=dataset.api_key.key,
+    )
+    return response.status_code == 200 and response.json()["cliente"] is not None
+
+
+def payment_status(client, dataset, i):
+    response = client.get(reverse("payments:api_payment_status", args=[dataset.pagamento.mp_payment_id]))
+    return response.status_code == 200
+
+
+def check_payment(client, dataset, i):
+    response = client.get(reverse("payments:api_check_payment", args=[dataset.pagamento.id]))
+    return response.status_code == 200 and response.json()["success"]
+
+
+def subscription_status(client, dataset, i):
+    response = client.get(reverse("payments:api_subscription_status", args=[dataset.padaria.slug]))
+    return response.status_code == 200
+
+
+def generate_link(client, dataset, i):
+    payload = {
+        "padaria_slug": dataset.padaria.slug,
+        "items": [{"nome": nome, "quantidade": 1 + n} for n, nome in enumerate(dataset.produtos)],
+    }
+    response = client.post(
+        reverse("payments:api_generate_link"), data=json.dumps(payload), content_type="application/json"
+    )
+    return response.status_code == 200
+
+
+def report_detail(client, dataset, i):
+    response = client.get(reverse("organizations:report_detail", args=[dataset.padaria.slug]))
+    return response.status_code == 200
+
+
+def dashboard(client, dataset, i):
+    response = client.get(reverse("ui:dashboard"))
+    return response.status_code == 200
+
+
+def products_webhook(client, dataset, i):
+    # Chamada direta (roda no save de produtos, não é uma view); a função
+    # escreve no stdout a cada envio
+    with contextlib.redirect_stdout(io.StringIO()):
+        return send_products_webhook(dataset.padaria, dataset.usuario)
+
+
+CENARIOS = {
+    "agent_config": agent_config,
+    "receive_event": receive_event,
+    "payment_status": payment_status,
+    "check_payment": check_payment,
+    "subscription_status": subscription_status,
+    "generate_link": generate_link,
+    "report_detail": report_detail,
+    "dashboard": dashboard,
+    "products_webhook": products_webhook,
+}
@@ -0,0 +1,56 @@
+from django.test import TestCase, override_settings
+
+from benchmarks import runner
+from benchmarks.dataset import criar_dataset
+from benchmarks.fakes import LATENCIAS_PADRAO, GatewaysFalsos
+from benchmarks.scenarios import CENARIOS
+
+SEM_LATENCIA = dict.fromkeys(LATENCIAS_PADRAO, 0)
+
+
+@override_settings(CACHES=runner.CONFIGURACOES["CACHES"], STORAGES=runner.CONFIGURACOES["STORAGES"])
+class BenchmarkTest(TestCase):
+    """Smoke test dos cenários do benchmark, com dataset mínimo."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        quantidades = {"padarias": 2, "clientes": 5, "produtos": 8, "logs": 40, "pagamentos": 6}
+        with GatewaysFalsos(SEM_LATENCIA):
+            self.dados = criar_dataset(quantidades)
+
+    def test_cenarios_sem_erros(self):
+        resultados = runner.medir(self.dados, iteracoes=2, aquecimento=1, latencias=SEM_LATENCIA)
+        self.assertEqual(set(resultados), set(CENARIOS))
+        for nome, metricas in resultados.items():
+            self.assertEqual(metricas["erros"], 0, nome)
+            self.assertGreater(metricas["consultas_sql"]["mediana"], 0, nome)
+            self.assertIn("p99", metricas["latencia_ms"])
+            self.assertIn("pico", metricas["memoria_kib"])
+        # Relatório consulta o Mercado Pago (período atual e anterior)
+        self.assertEqual(resultados["report_detail"]["chamadas_externas"], {"mercadopago": 2})
+        self.assertEqual(resultados["products_webhook"]["chamadas_externas"], {"n8n": 1})
+
+    def test_chamada_fora_das_integracoes_falha(self):
+        import requests
+        with GatewaysFalsos() as falsos:
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                requests.get("https://exemplo.com.br/")
+            self.assertEqual(falsos.chamadas, {})
+
+    def test_comparar_aponta_regressao(self):
+        def resultado(p95, sql):
+            return {
+                "meta": {"commit": "abc"},
+                "cenarios": {"dashboard": {
+                    "latencia_ms": {"p50": 10.0, "p95": p95},
+                    "consultas_sql": {"mediana": sql},
+                }},
+            }
+
+        _, regressoes = runner.comparar(resultado(10.0, 8), resultado(11.0, 8))
+        self.assertEqual(regressoes, [])
+        _, regressoes = runner.comparar(resultado(10.0, 8), resultado(15.0, 8))
+        self.assertEqual(regressoes, ["dashboard"])
+        _, regressoes = runner.comparar(resultado(10.0, 8), resultado(10.0, 9))
+        self.assertEqual(regressoes, ["dashboard"])
@@ -0,0 +1,50 @@
+"""
+Configuração do cache a partir de variáveis de ambiente.
+
+CACHE_URL define o backend compartilhado entre os workers:
+- sqlite:////app/data/cache.sqlite3  arquivo SQLite (um único host, padrão)
+- redis://host:6379/0 (ou rediss://)  Redis ou servidor compatível (várias máquinas)
+- file:////tmp/pandia_cache           diretório do FileBasedCache
+- locmem://                           memória local (cada worker tem o seu)
+
+Sem dependências do Django: importado por config/settings.py.
+"""
+import os
+from urllib.parse import urlsplit, unquote
+
+BACKENDS = {
+    "sqlite": "core.cache.SQLiteCache",
+    "redis": "django.core.cache.backends.redis.RedisCache",
+    "rediss": "django.core.cache.backends.redis.RedisCache",
+    "file": "django.core.cache.backends.filebased.FileBasedCache",
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+}
+
+
+def parse_cache_url(url):
+    """Converte uma CACHE_URL em um dict de CACHES."""
+    partes = urlsplit(url)
+    backend = BACKENDS.get(partes.scheme)
+    if backend is None:
+        raise ValueError(f"CACHE_URL com esquema não suportado: {partes.scheme!r}")
+
+    if partes.scheme in ("redis", "rediss"):
+        location = url
+    elif partes.scheme == "locmem":
+        location = partes.netloc or "pandia"
+    else:
+        # sqlite:////caminho/absoluto ou sqlite:///caminho/relativo
+        location = unquote(partes.path[1:])
+
+    return {"BACKEND": backend, "LOCATION": location, "KEY_PREFIX": "pandia"}
+
+
+def cache_from_env(default_sqlite_path, testing=False):
+    """
+    Monta CACHES["default"] a partir de CACHE_URL.
+
+    Sem CACHE_URL, os testes usam memória local: rate limits, versões e
+    locks não sobram de uma execução para a outra.
+    """
+    padrao = "locmem://testes" if testing else f"sqlite:///{default_sqlite_path}"
+    return parse_cache_url(os.getenv("CACHE_URL") or padrao)
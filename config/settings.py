@@ -4,6 +4,8 @@ Django settings for SaaS Agentes de IA project.
 
 from pathlib import Path
 import os
+import sys
+import tempfile
 from dotenv import load_dotenv
 
 # Carrega variáveis do .env
@@ -63,8 +65,13 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # Servir arquivos estáticos
-    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
+    "core.middleware.BrowserMiddleware",  # Aplica BROWSER_MIDDLEWARE fora dos endpoints de máquina
+]
+
+# Pilha de navegador: não é executada para MACHINE_URL_PREFIXES
+BROWSER_MIDDLEWARE = [
+    "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
@@ -72,6 +79,20 @@ MIDDLEWARE = [
     "accounts.middleware.LoginRequiredMiddleware",  # Força login em todas as páginas
 ]
 
+# As verificações do admin procuram sessão/autenticação/mensagens em MIDDLEWARE;
+# core.checks faz a mesma verificação em BROWSER_MIDDLEWARE
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410"]
+
+# Endpoints máquina-a-máquina (n8n, webhooks, API de pagamentos) e mídia pública:
+# autenticados por API key/token (ou públicos), sem sessão, usuário ou mensagens
+MACHINE_URL_PREFIXES = [
+    "/api/n8n/",
+    "/webhooks/",
+    "/payments/api/",
+    "/payments/cakto/webhook/",
+    "/media/",  # Mídia pública (imagens de produtos, promoções, campanhas)
+]
+
 ROOT_URLCONF = "config.urls"
 
 TEMPLATES = [
@@ -95,13 +116,17 @@ ASGI_APPLICATION = "config.asgi.application"
 
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
+# DATABASE_URL (PostgreSQL) ou DATABASE_PATH (SQLite) - ver config/database.py
+from config.database import database_from_env
 DATABASES = {
-    "default": {
-        "ENGINE": "django.db.backends.sqlite3",
-        "NAME": Path(os.getenv("DATABASE_PATH", BASE_DIR / "db.sqlite3")),
-    }
+    "default": database_from_env(BASE_DIR / "db.sqlite3"),
 }
 
+# Perfil de PRAGMAs aplicado em toda conexão SQLite (ver core/db.py).
+# SQLITE_WRITER_QUEUE serializa as escritas das threads em background
+# (campanhas, monitor de pagamentos) em uma única thread.
+SQLITE_WRITER_QUEUE = os.getenv("SQLITE_WRITER_QUEUE", "false").lower() == "true"
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 AUTH_PASSWORD_VALIDATORS = [
@@ -135,6 +160,11 @@ STATICFILES_DIRS = [BASE_DIR / "static"]
 # Media files (uploads)
 MEDIA_URL = "media/"
 MEDIA_ROOT = BASE_DIR / "media"
+# Servir mídia em produção (core/media.py): "x-accel" (nginx), "x-sendfile"
+# (Apache/lighttpd) ou vazio para FileResponse/sendfile do gunicorn
+MEDIA_SENDFILE_BACKEND = os.getenv("MEDIA_SENDFILE_BACKEND", "")
+MEDIA_ACCEL_REDIRECT_PREFIX = os.getenv("MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+MEDIA_CACHE_MAX_AGE = int(os.getenv("MEDIA_CACHE_MAX_AGE", "3600"))  # nomes sem hash
 
 # Whitenoise configuration
 STORAGES = {
@@ -176,14 +206,16 @@ if DEBUG:
         "https://*.ngrok-free.dev",
     ])
 
-# Cache configuration (para rate limiting)
+# Cache compartilhado entre os workers (rate limiting, token Cakto, sessões)
+# CACHE_URL: sqlite:// (padrão, um host) ou redis:// - ver config/cache.py
+from config.cache import cache_from_env
 CACHES = {
-    "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "unique-snowflake",
-    }
+    "default": cache_from_env(BASE_DIR / "cache.sqlite3", testing=sys.argv[1:2] == ["test"]),
 }
 
+# Sessões lidas do cache; o banco só é consultado em cache miss
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+
 # Messages framework
 from django.contrib.messages import constants as messages
 
@@ -198,6 +230,10 @@ MESSAGE_TAGS = {
 # Evolution API Settings
 EVOLUTION_API_URL = os.getenv("EVOLUTION_API_URL", "http://localhost:8080")
 EVOLUTION_API_KEY = os.getenv("EVOLUTION_API_KEY", "")
+# Token do webhook global da Evolution (/webhooks/evolution/?token=...)
+EVOLUTION_WEBHOOK_TOKEN = os.getenv("EVOLUTION_WEBHOOK_TOKEN", "")
+# Validade (segundos) do estado da conexão recebido por CONNECTION_UPDATE
+EVOLUTION_STATE_TTL = int(os.getenv("EVOLUTION_STATE_TTL", "300"))
 
 # Gemini AI Settings
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
@@ -253,3 +289,46 @@ else:
 DEFAULT_FROM_EMAIL = os.getenv("DEFAULT_FROM_EMAIL", "noreply@pandia.com.br")
 EMAIL_SUBJECT_PREFIX = "[PanDia] "
 
+
+# Auditoria: logs mais antigos que AUDIT_RETENTION_DAYS são movidos para
+# arquivos JSONL comprimidos (um por mês) em AUDIT_ARCHIVE_DIR. O arquivo é
+# a única cópia dos logs removidos: o padrão fica ao lado do banco SQLite
+# (/app/data no stack.yml, que é um volume).
+AUDIT_RETENTION_DAYS = int(os.getenv("AUDIT_RETENTION_DAYS", "90"))
+AUDIT_ARCHIVE_DIR = Path(os.getenv(
+    "AUDIT_ARCHIVE_DIR", Path(os.getenv("DATABASE_PATH", BASE_DIR / "db.sqlite3")).parent / "audit_archive"
+))
+# O prune_audit_logs só remove logs se o diretório estiver em um volume
+# montado: "auto" exige isso quando roda em container, "true"/"false" força
+_exigir_volume = os.getenv("AUDIT_ARCHIVE_REQUIRE_VOLUME", "auto").lower()
+AUDIT_ARCHIVE_REQUIRE_VOLUME = None if _exigir_volume == "auto" else _exigir_volume == "true"
+
+# Agendador interno (python manage.py run_scheduler, iniciado pelo
+# entrypoint.sh): management command -> intervalo em segundos
+SCHEDULER_TASKS = {
+    "process_subscriptions": 60 * 60,
+    "reconcile_metrics": 24 * 60 * 60,
+}
+if os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_KEY"):
+    SCHEDULER_TASKS["reconcile_supabase"] = 6 * 60 * 60
+# O arquivamento remove logs do banco: só roda sozinho quando ativado, com
+# AUDIT_ARCHIVE_DIR em armazenamento persistente
+if os.getenv("AUDIT_PRUNE_ENABLED", "false").lower() == "true":
+    SCHEDULER_TASKS["prune_audit_logs"] = 24 * 60 * 60
+
+# Heartbeat do agendador (verificado por run_scheduler --check no healthcheck)
+SCHEDULER_HEARTBEAT_FILE = os.getenv(
+    "SCHEDULER_HEARTBEAT_FILE", os.path.join(tempfile.gettempdir(), "pandia-scheduler.heartbeat")
+)
+SCHEDULER_HEARTBEAT_MAX_AGE = int(os.getenv("SCHEDULER_HEARTBEAT_MAX_AGE", str(15 * 60)))
+
+# Extração de PDFs de conhecimento: processos usados para PDFs grandes
+# (0 = automático, até 4)
+PDF_EXTRACTION_WORKERS = int(os.getenv("PDF_EXTRACTION_WORKERS", "0"))
+
+# Extração de produtos de catálogos com LLM (cliente plugável; use
+# agents.product_extraction.RegexClient para rodar sem API)
+PRODUCT_EXTRACTION_LLM_CLIENT = os.getenv(
+    "PRODUCT_EXTRACTION_LLM_CLIENT", "agents.product_extraction.GeminiClient"
+)
+PRODUCT_EXTRACTION_CONCURRENCY = int(os.getenv("PRODUCT_EXTRACTION_CONCURRENCY", "4"))
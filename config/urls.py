@@ -23,10 +23,10 @@ urlpatterns = [
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
 else:
-    # Em produção, também servir media files via Django
-    # Nota: Para alta performance, configure o Traefik/nginx para servir /media/ diretamente
-    from django.views.static import serve
+    # Em produção: ETag/304, Range e cache longo; com MEDIA_SENDFILE_BACKEND
+    # a transferência fica com o proxy (X-Accel-Redirect/X-Sendfile)
+    from core.media import serve_media
     from django.urls import re_path
     urlpatterns += [
-        re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
+        re_path(r'^media/(?P<path>.*)$', serve_media),
     ]
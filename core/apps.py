@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .db import aplicar_pragmas
+        from . import checks  # noqa: F401
+
+        connection_created.connect(aplicar_pragmas, dispatch_uid="core_sqlite_pragmas")
@@ -0,0 +1,153 @@
+"""
+Backend de cache compartilhado em SQLite.
+
+Para instalações em um único host: todos os workers do gunicorn (e as
+threads de cada um) leem e escrevem o mesmo arquivo, então rate limits,
+tokens OAuth e sessões ficam consistentes entre workers sem depender de
+um servidor Redis. Em várias máquinas, use CACHE_URL=redis://...
+
+O arquivo é separado do banco principal para não disputar o lock de
+escrita com a aplicação. Inteiros são gravados como INTEGER nativo, o
+que permite `incr`/`decr` atômicos em uma única instrução SQL.
+"""
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import BaseCache, DEFAULT_TIMEOUT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    expires REAL
+)
+"""
+
+# Probabilidade de limpar entradas expiradas a cada escrita
+CULL_PROBABILITY = 0.01
+
+
+def _serializar(valor):
+    if type(valor) is int:
+        return valor
+    return pickle.dumps(valor, pickle.HIGHEST_PROTOCOL)
+
+
+def _desserializar(valor):
+    if isinstance(valor, int):
+        return valor
+    return pickle.loads(valor)
+
+
+class SQLiteCache(BaseCache):
+    """
+    Cache em arquivo SQLite (WAL), seguro entre processos.
+
+    LOCATION é o caminho do arquivo. Cada thread mantém sua conexão.
+    """
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = str(location)
+        self._local = threading.local()
+
+    def _conexao(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode = wal")
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    def _expiracao(self, timeout):
+        # get_backend_timeout já devolve o instante absoluto (ou None)
+        return self.get_backend_timeout(timeout)
+
+    def _limpar(self, conn):
+        agora = time.time()
+        conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (agora,))
+        (total,) = conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+        if total > self._max_entries:
+            excesso = total // self._cull_frequency if self._cull_frequency else total
+            conn.execute(
+                "DELETE FROM cache WHERE key IN "
+                "(SELECT key FROM cache ORDER BY COALESCE(expires, 1e308) LIMIT ?)",
+                (excesso,),
+            )
+
+    def _gravar(self, sql, parametros):
+        conn = self._conexao()
+        if random.random() < CULL_PROBABILITY:
+            self._limpar(conn)
+        return conn.execute(sql, parametros)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._gravar(
+            "INSERT INTO cache (key, value, expires) VALUES (?, ?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (key, _serializar(value), self._expiracao(timeout), time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        linha = self._conexao().execute(
+            "SELECT value FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone()
+        return default if linha is None else _desserializar(linha[0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        self._gravar(
+            "INSERT OR REPLACE INTO cache (key, value, expires) VALUES (?, ?, ?)",
+            (key, _serializar(value), self._expiracao(timeout)),
+        )
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._conexao().execute(
+            "UPDATE cache SET expires = ? WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (self._expiracao(timeout), key, time.time()),
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        cursor = self._conexao().execute("DELETE FROM cache WHERE key = ?", (key,))
+        return cursor.rowcount == 1
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._conexao().execute(
+            "SELECT 1 FROM cache WHERE key = ? AND (expires IS NULL OR expires > ?)",
+            (key, time.time()),
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        """Incremento atômico (uma única instrução UPDATE ... RETURNING)."""
+        chave = self.make_and_validate_key(key, version=version)
+        linha = self._conexao().execute(
+            "UPDATE cache SET value = value + ? "
+            "WHERE key = ? AND typeof(value) = 'integer' AND (expires IS NULL OR expires > ?) "
+            "RETURNING value",
+            (delta, chave, time.time()),
+        ).fetchone()
+        if linha is not None:
+            return linha[0]
+        # Chave inexistente ou valor não inteiro: comportamento padrão do Django
+        return super().incr(key, delta, version)
+
+    def clear(self):
+        self._conexao().execute("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # Conexões por thread são reaproveitadas entre requisições
+        pass
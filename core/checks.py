@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+# Middlewares de navegador exigidas pelo admin (ver core.middleware.BrowserMiddleware)
+MIDDLEWARE_OBRIGATORIAS = [
+    ("django.contrib.sessions.middleware.SessionMiddleware", "core.E410"),
+    ("django.contrib.auth.middleware.AuthenticationMiddleware", "core.E408"),
+    ("django.contrib.messages.middleware.MessageMiddleware", "core.E409"),
+]
+
+
+@register()
+def check_browser_middleware(app_configs, **kwargs):
+    """Substitui admin.E408-E410 quando a pilha de navegador está em BROWSER_MIDDLEWARE."""
+    if "core.middleware.BrowserMiddleware" not in settings.MIDDLEWARE:
+        return []
+    browser = getattr(settings, "BROWSER_MIDDLEWARE", [])
+    return [
+        Error(f"'{path}' deve estar em BROWSER_MIDDLEWARE para o admin funcionar.", id=error_id)
+        for path, error_id in MIDDLEWARE_OBRIGATORIAS
+        if path not in browser
+    ]
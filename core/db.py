@@ -0,0 +1,187 @@
+"""
+Perfil do SQLite para produção.
+
+- `aplicar_pragmas`: conectado ao signal `connection_created`, aplica o
+  perfil de PRAGMAs (WAL, busy_timeout, synchronous=NORMAL, mmap, cache)
+  em toda conexão nova. Pode ser sobrescrito por `settings.SQLITE_PRAGMAS`.
+- `com_retry`: repete uma operação de escrita quando o banco está
+  bloqueado ("database is locked"), com backoff exponencial e jitter.
+- `escrever`: executa uma função de escrita na fila de escrita única
+  (uma thread dedicada) quando `SQLITE_WRITER_QUEUE` está ativo; usado
+  pelas threads em background (campanhas, monitor de pagamentos) para
+  não disputarem o lock com as requisições web.
+- `verificar_configuracao`: autoverificação usada pelo comando
+  `check_database` na inicialização do container.
+"""
+import functools
+import logging
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import connection, OperationalError
+
+logger = logging.getLogger(__name__)
+
+PRAGMAS_PADRAO = {
+    "journal_mode": "wal",
+    "busy_timeout": 5000,  # ms
+    "synchronous": "NORMAL",
+    "mmap_size": 128 * 1024 * 1024,  # 128 MB
+    "cache_size": -20000,  # valores negativos são em KiB (~20 MB)
+    "temp_store": "MEMORY",
+}
+
+# Valores numéricos que o SQLite devolve para os PRAGMAs textuais
+_VALORES_EQUIVALENTES = {
+    "synchronous": {"OFF": 0, "NORMAL": 1, "FULL": 2, "EXTRA": 3},
+    "temp_store": {"DEFAULT": 0, "FILE": 1, "MEMORY": 2},
+}
+
+RETRY_TENTATIVAS = 5
+RETRY_ESPERA_BASE = 0.05  # segundos
+RETRY_ESPERA_MAXIMA = 2.0
+
+
+def pragmas():
+    """Perfil efetivo: padrão + sobrescritas de settings.SQLITE_PRAGMAS."""
+    return {**PRAGMAS_PADRAO, **getattr(settings, "SQLITE_PRAGMAS", {})}
+
+
+def aplicar_pragmas(sender, connection, **kwargs):
+    """Receiver de `connection_created`: aplica o perfil em conexões SQLite."""
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for nome, valor in pragmas().items():
+            cursor.execute(f"PRAGMA {nome} = {valor}")
+
+
+def _normalizar(nome, valor):
+    valor = str(valor).upper()
+    return str(_VALORES_EQUIVALENTES.get(nome, {}).get(valor, valor))
+
+
+def verificar_configuracao():
+    """
+    Lê os PRAGMAs efetivos da conexão atual.
+
+    Returns:
+        list[tuple]: (pragma, esperado, efetivo, ok) para cada item do perfil
+    """
+    if connection.vendor != "sqlite":
+        return []
+
+    resultado = []
+    with connection.cursor() as cursor:
+        for nome, esperado in pragmas().items():
+            cursor.execute(f"PRAGMA {nome}")
+            linha = cursor.fetchone()  # mmap_size não retorna nada em bancos em memória
+            efetivo = linha[0] if linha else None
+            ok = _normalizar(nome, efetivo) == _normalizar(nome, esperado)
+            resultado.append((nome, esperado, efetivo, ok))
+    return resultado
+
+
+# =============================================================================
+# Retry em bloqueio
+# =============================================================================
+
+def banco_bloqueado(erro):
+    mensagem = str(erro).lower()
+    return "database is locked" in mensagem or "database is busy" in mensagem
+
+
+def com_retry(func=None, *, tentativas=RETRY_TENTATIVAS, espera_base=RETRY_ESPERA_BASE,
+              espera_maxima=RETRY_ESPERA_MAXIMA):
+    """
+    Decorator que repete `func` quando o SQLite está bloqueado.
+
+    A espera entre tentativas é aleatória entre 0 e `espera_base * 2^n`
+    (limitada a `espera_maxima`), para que threads concorrentes não voltem
+    todas ao mesmo tempo. Dentro de um `atomic()` o erro é propagado: só o
+    bloco inteiro pode ser repetido.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            for tentativa in range(tentativas):
+                try:
+                    return func(*args, **kwargs)
+                except OperationalError as e:
+                    ultima = tentativa == tentativas - 1
+                    if ultima or not banco_bloqueado(e) or connection.in_atomic_block:
+                        raise
+                    espera = random.uniform(0, min(espera_maxima, espera_base * 2 ** tentativa))
+                    nome = getattr(func, "__qualname__", repr(func))
+                    logger.warning(
+                        f"Banco bloqueado em {nome} "
+                        f"(tentativa {tentativa + 1}/{tentativas}), aguardando {espera:.2f}s"
+                    )
+                    time.sleep(espera)
+        return wrapper
+
+    if func is not None:
+        return decorator(func)
+    return decorator
+
+
+# =============================================================================
+# Fila de escrita única
+# =============================================================================
+
+class FilaEscrita:
+    """
+    Serializa escritas de threads em background em uma única thread.
+
+    A thread é criada sob demanda e mantém sua própria conexão com o banco.
+    """
+
+    def __init__(self):
+        self._fila = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _garantir_thread(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+    def enviar(self, func, *args, **kwargs):
+        """Enfileira `func(*args, **kwargs)` e retorna um Future com o resultado."""
+        future = Future()
+        self._fila.put((func, args, kwargs, future))
+        self._garantir_thread()
+        return future
+
+    def _loop(self):
+        while True:
+            func, args, kwargs, future = self._fila.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(com_retry(func)(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+            finally:
+                connection.close_if_unusable_or_obsolete()
+
+
+fila_escrita = FilaEscrita()
+
+
+def escrever(func, *args, **kwargs):
+    """
+    Executa uma escrita vinda de uma thread em background.
+
+    Com `SQLITE_WRITER_QUEUE` ativo (e banco SQLite), a escrita passa pela
+    fila única e esta chamada aguarda o resultado; caso contrário, executa
+    na própria thread com retry em bloqueio.
+    """
+    if getattr(settings, "SQLITE_WRITER_QUEUE", False) and connection.vendor == "sqlite":
+        return fila_escrita.enviar(func, *args, **kwargs).result()
+    return com_retry(func)(*args, **kwargs)
@@ -0,0 +1,49 @@
+"""
+Management command de autoverificação do banco de dados.
+
+Mostra o engine em uso (no PostgreSQL, a política de conexões) e, no SQLite, os PRAGMAs efetivos da conexão
+comparados com o perfil de produção (core.db).
+
+Uso: python manage.py check_database [--strict]
+Executado pelo entrypoint na inicialização do container.
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import db
+
+
+class Command(BaseCommand):
+    help = 'Mostra a configuração efetiva do banco de dados'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--strict',
+            action='store_true',
+            help='Falha se algum PRAGMA não corresponder ao perfil',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"Banco: {connection.vendor} ({connection.settings_dict['NAME']})")
+
+        resultado = db.verificar_configuracao()
+        for nome, esperado, efetivo, ok in resultado:
+            marca = "✅" if ok else "⚠️ "
+            self.stdout.write(f"  {marca} {nome} = {efetivo} (esperado: {esperado})")
+
+        if connection.vendor != "sqlite":
+            dados = connection.settings_dict
+            pool = "ativo" if dados.get("OPTIONS", {}).get("pool") else "desativado"
+            self.stdout.write(f"  CONN_MAX_AGE={dados['CONN_MAX_AGE']} health checks={dados['CONN_HEALTH_CHECKS']} pool={pool}")
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+        else:
+            fila = "ativa" if getattr(settings, "SQLITE_WRITER_QUEUE", False) else "desativada"
+            self.stdout.write(f"  Fila de escrita única: {fila}")
+
+        divergentes = [nome for nome, _, _, ok in resultado if not ok]
+        if divergentes and options['strict']:
+            raise CommandError(f"PRAGMAs divergentes: {', '.join(divergentes)}")
+        if not divergentes:
+            self.stdout.write(self.style.SUCCESS("Configuração do banco OK."))
@@ -0,0 +1,170 @@
+"""
+Management command para copiar um banco SQLite para o banco configurado.
+
+Usado na migração para PostgreSQL: com DATABASE_URL apontando para o
+Postgres (já com `migrate` aplicado), copia tabela a tabela, em lotes, os
+dados do arquivo SQLite informado. Ao final compara a contagem de linhas
+de cada tabela e reinicia as sequences de ids.
+
+As tabelas de destino são esvaziadas antes da cópia (inclusive os content
+types e permissões criados pelo migrate), para que os ids sejam os mesmos
+da origem.
+
+Uso: python manage.py copy_sqlite_to_postgres /app/data/db.sqlite3 [--batch-size 2000]
+"""
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connections, transaction, DEFAULT_DB_ALIAS
+
+ORIGEM = "sqlite_origem"
+
+
+def modelos_em_ordem():
+    """
+    Modelos concretos (inclusive tabelas M2M automáticas) ordenados para
+    que as tabelas referenciadas por FK sejam copiadas antes.
+    """
+    modelos = [
+        m for m in apps.get_models(include_auto_created=True)
+        if m._meta.managed and not m._meta.proxy
+    ]
+    dependencias = {
+        m: {
+            f.related_model._meta.concrete_model
+            for f in m._meta.concrete_fields
+            if f.is_relation and f.related_model is not None
+        } - {m}
+        for m in modelos
+    }
+
+    ordenados, visitados = [], set()
+
+    def visitar(modelo):
+        if modelo in visitados:
+            return
+        visitados.add(modelo)
+        for dep in dependencias.get(modelo, ()):
+            visitar(dep)
+        ordenados.append(modelo)
+
+    for modelo in sorted(modelos, key=lambda m: m._meta.label):
+        visitar(modelo)
+    return [m for m in ordenados if m in dependencias]
+
+
+class Command(BaseCommand):
+    help = 'Copia os dados de um banco SQLite para o banco configurado (PostgreSQL)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('sqlite_path', help='Caminho do arquivo SQLite de origem')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Linhas por lote de inserção',
+        )
+        parser.add_argument(
+            '--allow-sqlite-target',
+            action='store_true',
+            help='Permite que o destino também seja SQLite (para testes)',
+        )
+
+    def handle(self, *args, **options):
+        destino = connections[DEFAULT_DB_ALIAS]
+        if destino.vendor == "sqlite" and not options['allow_sqlite_target']:
+            raise CommandError("O banco configurado é SQLite. Defina DATABASE_URL apontando para o PostgreSQL.")
+
+        connections.databases[ORIGEM] = {
+            **connections.databases[DEFAULT_DB_ALIAS],
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": options['sqlite_path'],
+            "OPTIONS": {},
+            "CONN_MAX_AGE": 0,
+        }
+        origem = connections[ORIGEM]
+        batch_size = options['batch_size']
+
+        try:
+            modelos = modelos_em_ordem()
+            tabelas_origem = set(origem.introspection.table_names())
+            faltando = [m._meta.db_table for m in modelos if m._meta.db_table not in tabelas_origem]
+            if faltando:
+                raise CommandError(
+                    f"Tabelas ausentes na origem (rode migrate no SQLite antes): {', '.join(faltando)}"
+                )
+
+            self.stdout.write(f"Esvaziando {len(modelos)} tabela(s) no destino...")
+            tabelas = [m._meta.db_table for m in modelos]
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                destino.ops.execute_sql_flush(
+                    destino.ops.sql_flush(no_style(), tabelas, allow_cascade=True)
+                )
+
+            for modelo in modelos:
+                total = self._copiar(modelo, batch_size)
+                self.stdout.write(f"  {modelo._meta.db_table}: {total} linha(s)")
+
+            with destino.cursor() as cursor:
+                for sql in destino.ops.sequence_reset_sql(no_style(), modelos):
+                    cursor.execute(sql)
+
+            divergencias = self._verificar(modelos)
+        finally:
+            origem.close()
+            del connections[ORIGEM]
+            connections.databases.pop(ORIGEM, None)
+
+        if divergencias:
+            for tabela, na_origem, no_destino in divergencias:
+                self.stdout.write(self.style.ERROR(f"  ❌ {tabela}: origem={na_origem} destino={no_destino}"))
+            raise CommandError(f"{len(divergencias)} tabela(s) com contagem divergente")
+
+        self.stdout.write(self.style.SUCCESS("Cópia concluída e verificada."))
+
+    def _copiar(self, modelo, batch_size):
+        """
+        Copia uma tabela em lotes, preservando ids e datas.
+
+        Usa INSERT direto em vez de bulk_create, que sobrescreveria campos
+        auto_now/auto_now_add e dispararia validações desnecessárias.
+        """
+        destino = connections[DEFAULT_DB_ALIAS]
+        campos = modelo._meta.concrete_fields
+        colunas = ", ".join(destino.ops.quote_name(f.column) for f in campos)
+        sql = (
+            f"INSERT INTO {destino.ops.quote_name(modelo._meta.db_table)} ({colunas}) "
+            f"VALUES ({', '.join(['%s'] * len(campos))})"
+        )
+        linhas = (
+            modelo._base_manager.using(ORIGEM)
+            .order_by(modelo._meta.pk.attname)
+            .values_list(*[f.attname for f in campos])
+            .iterator(chunk_size=batch_size)
+        )
+
+        total = 0
+        lote = []
+        for valores in linhas:
+            lote.append([f.get_db_prep_save(v, connection=destino) for f, v in zip(campos, valores)])
+            if len(lote) >= batch_size:
+                total += self._inserir(sql, lote)
+                lote = []
+        if lote:
+            total += self._inserir(sql, lote)
+        return total
+
+    def _inserir(self, sql, lote):
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+                cursor.executemany(sql, lote)
+        return len(lote)
+
+    def _verificar(self, modelos):
+        divergencias = []
+        for modelo in modelos:
+            na_origem = modelo._base_manager.using(ORIGEM).count()
+            no_destino = modelo._base_manager.using(DEFAULT_DB_ALIAS).count()
+            if na_origem != no_destino:
+                divergencias.append((modelo._meta.db_table, na_origem, no_destino))
+        return divergencias
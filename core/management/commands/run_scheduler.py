@@ -0,0 +1,53 @@
+"""
+Management command que roda o agendador interno de tarefas periódicas
+(ver core.scheduler e settings.SCHEDULER_TASKS).
+
+Uso: python manage.py run_scheduler [--once | --check]
+Iniciado em background pelo entrypoint.sh, que o reinicia se encerrar
+(desative com SCHEDULER_ENABLED=0). `--check` sai com erro se o heartbeat
+do agendador estiver atrasado (healthcheck do stack.yml).
+"""
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import scheduler
+
+
+class Command(BaseCommand):
+    help = 'Executa as tarefas periódicas de SCHEDULER_TASKS (substitui o cron)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Executa as tarefas vencidas uma vez e sai',
+        )
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Verifica se o agendador em execução está ativo (heartbeat recente)',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            idade = scheduler.idade_heartbeat()
+            if idade is None or idade > settings.SCHEDULER_HEARTBEAT_MAX_AGE:
+                atraso = "sem heartbeat" if idade is None else f"último heartbeat há {int(idade)}s"
+                raise CommandError(f"Agendador parado ({atraso})")
+            self.stdout.write(f"Agendador ativo (último heartbeat há {int(idade)}s)")
+            return
+
+        if options['once']:
+            executadas = scheduler.executar_pendentes()
+            self.stdout.write(f"Tarefas executadas: {', '.join(executadas) or 'nenhuma'}")
+            return
+
+        parar = threading.Event()
+        for sinal in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sinal, lambda *_: parar.set())
+        self.stdout.write(f"Agendador iniciado ({len(scheduler.tarefas())} tarefas)")
+        scheduler.rodar(parar)
+        self.stdout.write("Agendador encerrado")
@@ -0,0 +1,146 @@
+"""
+Servir arquivos de mídia (uploads) em produção.
+
+- Com um proxy na frente (MEDIA_SENDFILE_BACKEND = "x-accel" para nginx,
+  "x-sendfile" para Apache/lighttpd), o Django só valida o caminho e
+  devolve o cabeçalho; a transferência do arquivo fica com o proxy.
+- Sem proxy, usa FileResponse, que o gunicorn entrega via sendfile().
+
+Sempre responde com ETag/Last-Modified (304 em requisições condicionais),
+aceita `Range` de um único intervalo (206) e envia Cache-Control longo e
+`immutable` para nomes de arquivo com hash de conteúdo.
+"""
+import mimetypes
+import os
+import re
+import stat
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+
+CHUNK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+
+# Nomes com hash de conteúdo: foto.3f2a9c1b.jpg, foto-3f2a9c1b7d4e.webp
+HASHED_NAME_RE = re.compile(r"[.\-_][0-9a-f]{8,}\.[A-Za-z0-9]+$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _etag(st):
+    return f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+
+
+def _cache_control(path):
+    if HASHED_NAME_RE.search(path):
+        return f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return f"public, max-age={getattr(settings, 'MEDIA_CACHE_MAX_AGE', 3600)}"
+
+
+def _intervalo(request, tamanho, etag, mtime):
+    """
+    Interpreta o cabeçalho Range (um único intervalo).
+
+    Returns:
+        (inicio, fim) inclusivo; None para resposta completa;
+        False se o intervalo não puder ser atendido (416)
+    """
+    cabecalho = request.META.get("HTTP_RANGE", "").strip()
+    if not cabecalho or request.method not in ("GET", "HEAD"):
+        return None
+
+    # If-Range: só atende o intervalo se o arquivo não mudou
+    if_range = request.META.get("HTTP_IF_RANGE", "").strip()
+    if if_range and if_range != etag:
+        data = parse_http_date_safe(if_range)
+        if data is None or data < int(mtime):
+            return None
+
+    match = RANGE_RE.match(cabecalho)
+    if not match:
+        return None  # múltiplos intervalos ou formato desconhecido: arquivo inteiro
+    inicio, fim = match.groups()
+    if not inicio:
+        if not fim:
+            return None
+        # Sufixo: últimos N bytes
+        inicio, fim = max(tamanho - int(fim), 0), tamanho - 1
+    else:
+        inicio, fim = int(inicio), min(int(fim), tamanho - 1) if fim else tamanho - 1
+    if inicio >= tamanho or inicio > fim:
+        return False
+    return inicio, fim
+
+
+def _ler_intervalo(caminho, inicio, fim):
+    with open(caminho, "rb") as arquivo:
+        arquivo.seek(inicio)
+        restante = fim - inicio + 1
+        while restante > 0:
+            bloco = arquivo.read(min(CHUNK_SIZE, restante))
+            if not bloco:
+                break
+            restante -= len(bloco)
+            yield bloco
+
+
+def serve_media(request, path):
+    """View para MEDIA_URL em produção."""
+    try:
+        caminho = safe_join(settings.MEDIA_ROOT, path)
+        st = os.stat(caminho)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404("Arquivo não encontrado")
+    if not stat.S_ISREG(st.st_mode):
+        raise Http404("Arquivo não encontrado")
+
+    etag = _etag(st)
+    content_type, encoding = mimetypes.guess_type(caminho)
+    content_type = content_type or "application/octet-stream"
+
+    cabecalhos = {
+        "ETag": etag,
+        "Last-Modified": http_date(st.st_mtime),
+        "Cache-Control": _cache_control(path),
+    }
+
+    nao_modificado = get_conditional_response(request, etag=etag, last_modified=int(st.st_mtime))
+    if nao_modificado is not None:
+        for nome, valor in cabecalhos.items():
+            nao_modificado.headers.setdefault(nome, valor)
+        return nao_modificado
+
+    backend = getattr(settings, "MEDIA_SENDFILE_BACKEND", "")
+    if backend in ("x-accel", "x-sendfile"):
+        # O proxy transfere o arquivo e trata Range por conta própria
+        response = HttpResponse(content_type=content_type)
+        if backend == "x-accel":
+            prefixo = getattr(settings, "MEDIA_ACCEL_REDIRECT_PREFIX", "/protected-media/")
+            response["X-Accel-Redirect"] = prefixo.rstrip("/") + "/" + path.lstrip("/")
+        else:
+            response["X-Sendfile"] = caminho
+    else:
+        intervalo = _intervalo(request, st.st_size, etag, st.st_mtime)
+        if intervalo is False:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{st.st_size}"
+            return response
+        if intervalo:
+            inicio, fim = intervalo
+            response = StreamingHttpResponse(
+                _ler_intervalo(caminho, inicio, fim), status=206, content_type=content_type
+            )
+            response["Content-Range"] = f"bytes {inicio}-{fim}/{st.st_size}"
+            response["Content-Length"] = str(fim - inicio + 1)
+        else:
+            response = FileResponse(open(caminho, "rb"), content_type=content_type)
+
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Accept-Ranges"] = "bytes"
+    for nome, valor in cabecalhos.items():
+        response[nome] = valor
+    return response
@@ -0,0 +1,95 @@
+"""
+Separação entre tráfego de navegador e tráfego máquina-a-máquina.
+
+`BrowserMiddleware` fica no fim de MIDDLEWARE e encapsula a pilha de
+navegador definida em `BROWSER_MIDDLEWARE` (sessão, CSRF, autenticação,
+mensagens, clickjacking, login obrigatório). Requisições para os
+prefixos de `MACHINE_URL_PREFIXES` (API do n8n, webhooks, API de
+pagamentos) pulam essa pilha inteira: não carregam sessão, não resolvem
+usuário e não tocam no storage de mensagens. Elas se autenticam por API
+key/token no próprio endpoint.
+
+Os hooks `process_view`, `process_exception` e `process_template_response`
+das middlewares internas continuam sendo chamados (o CSRF depende do
+`process_view`), apenas para requisições de navegador.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+
+
+def compilar_prefixos(prefixos):
+    """Compila uma lista de prefixos de URL em uma única regex ancorada."""
+    if not prefixos:
+        return re.compile(r"(?!)")  # nunca casa
+    return re.compile("|".join(re.escape(prefixo) for prefixo in prefixos))
+
+
+class BrowserMiddleware:
+    """Aplica a pilha BROWSER_MIDDLEWARE apenas a requisições de navegador."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.machine_matcher = compilar_prefixos(getattr(settings, "MACHINE_URL_PREFIXES", []))
+
+        self._view_middleware = []
+        self._template_response_middleware = []
+        self._exception_middleware = []
+
+        handler = get_response
+        for middleware_path in reversed(settings.BROWSER_MIDDLEWARE):
+            try:
+                mw_instance = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+
+            if hasattr(mw_instance, "process_view"):
+                self._view_middleware.insert(0, mw_instance.process_view)
+            if hasattr(mw_instance, "process_template_response"):
+                self._template_response_middleware.append(mw_instance.process_template_response)
+            if hasattr(mw_instance, "process_exception"):
+                self._exception_middleware.append(mw_instance.process_exception)
+
+            handler = convert_exception_to_response(mw_instance)
+
+        self.browser_handler = handler
+
+    def is_machine_request(self, request):
+        if not hasattr(request, "is_machine_request"):
+            request.is_machine_request = bool(self.machine_matcher.match(request.path_info))
+        return request.is_machine_request
+
+    def __call__(self, request):
+        if self.is_machine_request(request):
+            request.user = AnonymousUser()
+            return self.get_response(request)
+        return self.browser_handler(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_machine_request(request):
+            return None
+        for process_view in self._view_middleware:
+            response = process_view(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
+
+    def process_template_response(self, request, response):
+        if self.is_machine_request(request):
+            return response
+        for process_template_response in self._template_response_middleware:
+            response = process_template_response(request, response)
+        return response
+
+    def process_exception(self, request, exception):
+        if self.is_machine_request(request):
+            return None
+        for process_exception in self._exception_middleware:
+            response = process_exception(request, exception)
+            if response is not None:
+                return response
+        return None
@@ -1,3 +1,146 @@
+"""
+Mixins de models compartilhados entre os apps.
+"""
+import hashlib
+import json
+
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.dispatch import Signal
+
+_NAO_CARREGADO = object()
+
+# Enviado pelo delete() das instâncias com ExclusaoNotificadaMixin
+instancia_excluida = Signal()
+
+
+class ChangeTrackingMixin:
+    """
+    Guarda os valores dos campos como vieram do banco (ou do último save)
+    para que save(), signals e views saibam o que mudou sem reler a linha.
+
+    Strings, números e datas são imutáveis: o snapshot só guarda a
+    referência, sem copiar textos longos. Campos JSON guardam uma hash do
+    conteúdo, porque o dict/lista pode ser alterado no lugar. Campos
+    `auto_now` ficam de fora (mudam em todo save).
+
+    Dentro dos signals de post_save `changed_fields` ainda descreve o save
+    em andamento; o snapshot é renovado quando save() retorna.
+
+    Campos adiados (`.defer()`/`.only()`) que não foram lidos não entram na
+    comparação. Em uma instância nova, todos os campos contam como alterados.
+
+    Uso: `class Produto(ChangeTrackingMixin, models.Model)`. Para acompanhar
+    só alguns campos, defina `tracked_fields = ("nome", ...)`.
+    """
+
+    tracked_fields = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._tirar_snapshot()
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        self._tirar_snapshot(kwargs.get("update_fields"))
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        self._tirar_snapshot(fields)
+
+    @classmethod
+    def _campos_rastreados(cls):
+        campos = cls.__dict__.get("_campos_rastreados_cache")
+        if campos is None:
+            campos = tuple(
+                campo for campo in cls._meta.concrete_fields
+                if not campo.primary_key
+                and not getattr(campo, "auto_now", False)
+                and (cls.tracked_fields is None or campo.name in cls.tracked_fields)
+            )
+            cls._campos_rastreados_cache = campos
+        return campos
+
+    @staticmethod
+    def _normalizar(campo, valor):
+        """Valor comparável do campo (o que o save gravaria)."""
+        if valor is None:
+            return None
+        if isinstance(campo, models.FileField):
+            return getattr(valor, "name", valor) or None
+        if isinstance(campo, models.JSONField):
+            dados = json.dumps(valor, sort_keys=True, default=str, cls=campo.encoder)
+            return hashlib.blake2b(dados.encode("utf-8"), digest_size=16).digest()
+        if campo.is_relation:
+            return valor
+        try:
+            # "5,50"/float em DecimalField, "2025-01-31" em DateField etc.
+            return campo.to_python(valor)
+        except ValidationError:
+            return valor
+
+    def _valor_atual(self, campo):
+        if campo.attname not in self.__dict__:
+            return _NAO_CARREGADO
+        if isinstance(campo, models.FileField):
+            # Passa pelo descriptor para receber o FieldFile
+            return self._normalizar(campo, getattr(self, campo.attname))
+        return self._normalizar(campo, self.__dict__[campo.attname])
+
+    def _tirar_snapshot(self, fields=None):
+        snapshot = self.__dict__.setdefault("_snapshot_campos", {})
+        for campo in self._campos_rastreados():
+            if fields is not None and campo.name not in fields and campo.attname not in fields:
+                continue
+            valor = self._valor_atual(campo)
+            if valor is not _NAO_CARREGADO:
+                snapshot[campo.name] = valor
+
+    @property
+    def changed_fields(self):
+        """Nomes dos campos alterados desde a leitura/último save."""
+        snapshot = self.__dict__.get("_snapshot_campos")
+        if snapshot is None or self._state.adding:
+            return frozenset(campo.name for campo in self._campos_rastreados())
+        alterados = set()
+        for campo in self._campos_rastreados():
+            valor = self._valor_atual(campo)
+            if valor is _NAO_CARREGADO:
+                continue
+            if campo.name not in snapshot or snapshot[campo.name] != valor:
+                alterados.add(campo.name)
+        return frozenset(alterados)
+
+    def has_changed(self, *fields):
+        """Se algum dos campos mudou (ou qualquer campo, sem argumentos)."""
+        alterados = self.changed_fields
+        return bool(alterados.intersection(fields) if fields else alterados)
+
+    def is_tracking(self, *fields):
+        """Se há valor anterior conhecido para todos os campos."""
+        snapshot = self.__dict__.get("_snapshot_campos")
+        return snapshot is not None and not self._state.adding and all(f in snapshot for f in fields)
+
+    def previous_value(self, field):
+        """
+        Valor do campo no snapshot (para campos de relação, o id; para
+        arquivos, o nome). Campos JSON só guardam a hash.
+        """
+        return self.__dict__.get("_snapshot_campos", {})[field]
+
+
+class ExclusaoNotificadaMixin:
+    """
+    Envia `instancia_excluida` depois de `instance.delete()`.
+
+    Ao contrário de um receiver de post_delete, não desliga o fast-delete
+    do Django: exclusões em cascata e `queryset.delete()` não enviam o
+    signal (quem precisa delas conta as linhas no pre_delete do pai).
+    """
 
-# Core não tem models específicos
+    def delete(self, *args, **kwargs):
+        resultado = super().delete(*args, **kwargs)
+        instancia_excluida.send(sender=type(self), instance=self)
+        return resultado
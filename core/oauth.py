@@ -0,0 +1,175 @@
+"""
+Access token OAuth2 (client_credentials) compartilhado entre workers.
+
+O token fica no cache compartilhado (CACHE_URL), então todos os workers do
+gunicorn usam o mesmo. A renovação passa por um lock no cache: só uma
+requisição por vez chama o endpoint de token, e as demais esperam o
+token que ela gravar. Quando faltam menos de `renovar_antes` segundos para
+o token expirar, ele continua sendo usado e uma thread o renova em
+background. Em `requisitar`, um 401 descarta o token e a chamada é
+repetida uma vez com um token novo.
+
+Uso:
+    token = TokenClientCredentials("cakto", f"{base_url}/token/", client_id, client_secret)
+    response = token.requisitar("GET", url, timeout=30)
+"""
+import logging
+import threading
+import time
+
+import requests
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+# Token deixa de ser usado `MARGEM` segundos antes de expirar
+MARGEM = 60
+RENOVAR_ANTES = 10 * 60
+EXPIRES_IN_PADRAO = 60 * 60
+LOCK_TTL = 30
+INTERVALO_ESPERA = 0.1
+
+
+class TokenIndisponivel(Exception):
+    """Não foi possível obter um access token."""
+
+
+class TokenClientCredentials:
+    """Access token de um cliente OAuth2 client_credentials."""
+
+    def __init__(self, nome, token_url, client_id, client_secret,
+                 grant_type="client_credentials", renovar_antes=RENOVAR_ANTES, timeout=30):
+        self.nome = nome
+        self.token_url = token_url
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.grant_type = grant_type
+        self.renovar_antes = renovar_antes
+        self.timeout = timeout
+        self.chave = f"oauth:{nome}:token"
+        self.chave_lock = f"oauth:{nome}:lock"
+        # Cópia local do último token lido do cache
+        self._local = None
+
+    # ------------------------------------------------------------------
+    # Token
+    # ------------------------------------------------------------------
+
+    def obter(self):
+        """
+        Access token válido, do cache ou renovado agora.
+
+        Raises:
+            TokenIndisponivel: o endpoint de token falhou
+        """
+        agora = time.time()
+        token = self._local
+        if token is None or agora >= token["renovar_em"]:
+            token = cache.get(self.chave)
+            if token is None or agora >= token["expira_em"] - MARGEM:
+                token = self._renovar_com_lock()
+            elif agora >= token["renovar_em"]:
+                self._renovar_em_background()
+            self._local = token
+        return token["access_token"]
+
+    def invalidar(self, access_token=None):
+        """
+        Descarta o token (ex.: rejeitado com 401). Com `access_token`, só
+        descarta se ele ainda for o token atual, para não apagar um token
+        novo gravado por outro worker.
+        """
+        self._local = None
+        atual = cache.get(self.chave)
+        if atual is not None and access_token in (None, atual["access_token"]):
+            cache.delete(self.chave)
+
+    def _buscar_token(self):
+        dados = {"client_id": self.client_id, "client_secret": self.client_secret}
+        if self.grant_type:
+            dados["grant_type"] = self.grant_type
+        try:
+            response = requests.post(
+                self.token_url,
+                headers={"Content-Type": "application/x-www-form-urlencoded"},
+                data=dados,
+                timeout=self.timeout,
+            )
+        except requests.exceptions.RequestException as e:
+            raise TokenIndisponivel(f"Erro de conexão ao obter token {self.nome}: {e}")
+        if response.status_code != 200:
+            raise TokenIndisponivel(
+                f"Erro ao obter token {self.nome}: {response.status_code} - {response.text[:300]}"
+            )
+        dados = response.json()
+        expires_in = int(dados.get("expires_in") or EXPIRES_IN_PADRAO)
+        agora = time.time()
+        token = {
+            "access_token": dados["access_token"],
+            "expira_em": agora + expires_in,
+            # Tokens curtos: renova na metade da validade
+            "renovar_em": agora + expires_in - min(self.renovar_antes, expires_in / 2),
+        }
+        cache.set(self.chave, token, max(expires_in - MARGEM, 1))
+        self._local = token
+        logger.info(f"Novo token {self.nome} obtido, expira em {expires_in}s")
+        return token
+
+    def _renovar_com_lock(self):
+        """Renova o token, ou espera a renovação feita por outra requisição."""
+        limite = time.monotonic() + LOCK_TTL + self.timeout
+        while time.monotonic() < limite:
+            if cache.add(self.chave_lock, True, LOCK_TTL):
+                try:
+                    # Outra requisição pode ter renovado antes do lock
+                    token = cache.get(self.chave)
+                    if token is not None and time.time() < token["renovar_em"]:
+                        return token
+                    return self._buscar_token()
+                finally:
+                    cache.delete(self.chave_lock)
+            time.sleep(INTERVALO_ESPERA)
+            token = cache.get(self.chave)
+            if token is not None and time.time() < token["expira_em"] - MARGEM:
+                return token
+        raise TokenIndisponivel(f"Tempo esgotado esperando renovação do token {self.nome}")
+
+    def _renovar_em_background(self):
+        if not cache.add(self.chave_lock, True, LOCK_TTL):
+            return False
+        threading.Thread(target=self._renovar_e_liberar, name=f"oauth-{self.nome}", daemon=True).start()
+        return True
+
+    def _renovar_e_liberar(self):
+        try:
+            self._buscar_token()
+        except Exception as e:
+            # O token atual ainda vale; o lock só expira depois de LOCK_TTL,
+            # então a próxima tentativa não sai a cada requisição
+            logger.warning(f"Renovação antecipada do token {self.nome} falhou: {e}")
+        else:
+            cache.delete(self.chave_lock)
+
+    # ------------------------------------------------------------------
+    # Requisições
+    # ------------------------------------------------------------------
+
+    def requisitar(self, metodo, url, headers=None, **kwargs):
+        """
+        `requests.request` com o header Authorization: Bearer. Se a API
+        responder 401, renova o token e repete a chamada uma vez.
+
+        Raises:
+            TokenIndisponivel: não foi possível obter um token
+            requests.exceptions.RequestException: falha na chamada
+        """
+        for _ in range(2):
+            access_token = self.obter()
+            response = requests.request(
+                metodo, url, headers={**(headers or {}), "Authorization": f"Bearer {access_token}"}, **kwargs
+            )
+            if response.status_code != 401:
+                break
+            logger.warning(f"Token {self.nome} rejeitado (401), renovando")
+            self.invalidar(access_token)
+        return response
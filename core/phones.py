@@ -0,0 +1,42 @@
+"""
+Normalização de telefones para o WhatsApp (formato E.164).
+"""
+import re
+
+_NAO_DIGITOS = re.compile(r'\D')
+
+
+def normalizar_whatsapp(telefone: str) -> str:
+    """
+    Converte um telefone digitado livremente para E.164 (+5511999999999).
+
+    Aceita números brasileiros com DDD (10 ou 11 dígitos), com ou sem o 55
+    na frente, e números internacionais escritos com '+'. Retorna "" se o
+    número não puder ser interpretado.
+
+    Obs: um número com 10/11 dígitos é sempre tratado como DDD + número,
+    então "(55) 99999-1111" (DDD 55, RS) vira +5555999991111.
+    """
+    if not telefone:
+        return ""
+    texto = str(telefone).strip()
+    digitos = _NAO_DIGITOS.sub('', texto)
+
+    if texto.startswith('+') or texto.startswith('00'):
+        if texto.startswith('00'):
+            digitos = digitos[2:]
+        if digitos.startswith('55'):
+            nacional = digitos[2:]
+        else:
+            return f"+{digitos}" if 8 <= len(digitos) <= 15 else ""
+    elif len(digitos) in (12, 13) and digitos.startswith('55'):
+        nacional = digitos[2:]
+    else:
+        # Prefixo de operadora (0 + código + DDD): 0 21 11 99999-9999
+        if len(digitos) in (13, 14) and digitos.startswith('0'):
+            digitos = digitos[3:]
+        nacional = digitos.lstrip('0') if len(digitos) in (11, 12) and digitos.startswith('0') else digitos
+
+    if len(nacional) not in (10, 11) or nacional[0] == '0':
+        return ""
+    return f"+55{nacional}"
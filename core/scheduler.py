@@ -0,0 +1,120 @@
+"""
+Agendador interno de tarefas periódicas (sem cron).
+
+`python manage.py run_scheduler` (iniciado pelo entrypoint.sh) roda um
+loop que, a cada `INTERVALO_LOOP` segundos, executa os management commands
+de `settings.SCHEDULER_TASKS` ({comando: intervalo em segundos}) cujo
+intervalo desde a última execução já passou.
+
+O horário da última execução e um lock por tarefa ficam no cache
+compartilhado: com mais de um agendador rodando (réplicas, deploy
+start-first), cada execução acontece em um só processo. Uma tarefa que
+falha é repetida depois de `ESPERA_APOS_FALHA` segundos.
+
+A cada volta do loop (e após cada tarefa) o agendador grava o horário em
+`settings.SCHEDULER_HEARTBEAT_FILE`; `run_scheduler --check` (healthcheck
+do stack.yml) falha se o arquivo tiver mais de
+`SCHEDULER_HEARTBEAT_MAX_AGE` segundos. O entrypoint.sh reinicia o
+processo se ele encerrar.
+"""
+import logging
+import os
+import threading
+import time
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import close_old_connections
+
+logger = logging.getLogger(__name__)
+
+INTERVALO_LOOP = 30
+LOCK_TTL = 60 * 60
+ESPERA_APOS_FALHA = 5 * 60
+
+
+def tarefas():
+    return getattr(settings, "SCHEDULER_TASKS", {})
+
+
+def _chave_ultima(nome):
+    return f"agendador:{nome}:ultima"
+
+
+def _chave_lock(nome):
+    return f"agendador:{nome}:lock"
+
+
+def registrar_heartbeat():
+    try:
+        with open(settings.SCHEDULER_HEARTBEAT_FILE, "w") as arquivo:
+            arquivo.write(str(time.time()))
+    except OSError as e:
+        logger.warning(f"Não foi possível gravar o heartbeat do agendador: {e}")
+
+
+def idade_heartbeat():
+    """Segundos desde o último heartbeat; None se nunca houve."""
+    try:
+        return time.time() - os.path.getmtime(settings.SCHEDULER_HEARTBEAT_FILE)
+    except OSError:
+        return None
+
+
+def executar_tarefa(nome):
+    """Roda o management command e registra a saída no log."""
+    saida = StringIO()
+    close_old_connections()
+    try:
+        call_command(nome, stdout=saida, stderr=saida)
+    finally:
+        close_old_connections()
+    logger.info(f"Tarefa {nome} concluída:\n{saida.getvalue().strip()}")
+
+
+def executar_pendentes(executar=executar_tarefa):
+    """
+    Executa as tarefas vencidas que nenhum outro processo está executando.
+
+    Returns:
+        lista com os nomes das tarefas executadas
+    """
+    executadas = []
+    for nome, intervalo in tarefas().items():
+        ultima = cache.get(_chave_ultima(nome))
+        if ultima is not None and time.time() - ultima < intervalo:
+            continue
+        if not cache.add(_chave_lock(nome), True, LOCK_TTL):
+            continue
+        try:
+            # Outro processo pode ter acabado de executar
+            ultima = cache.get(_chave_ultima(nome))
+            if ultima is not None and time.time() - ultima < intervalo:
+                continue
+            try:
+                executar(nome)
+                cache.set(_chave_ultima(nome), time.time(), None)
+            except Exception:
+                logger.exception(f"Erro na tarefa agendada {nome}")
+                # Nova tentativa em ESPERA_APOS_FALHA, não no próximo loop
+                cache.set(_chave_ultima(nome), time.time() - intervalo + ESPERA_APOS_FALHA, None)
+            executadas.append(nome)
+        finally:
+            cache.delete(_chave_lock(nome))
+            registrar_heartbeat()
+    return executadas
+
+
+def rodar(parar=None):
+    """Loop do agendador, até `parar` (threading.Event) ser sinalizado."""
+    parar = parar or threading.Event()
+    logger.info(f"Agendador iniciado: {', '.join(f'{n} ({s}s)' for n, s in tarefas().items())}")
+    while not parar.is_set():
+        registrar_heartbeat()
+        try:
+            executar_pendentes()
+        except Exception:
+            logger.exception("Erro no agendador")
+        parar.wait(INTERVALO_LOOP)
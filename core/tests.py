@@ -1,3 +1,456 @@
-from django.test import TestCase
+import os
+import tempfile
+import time
+import unittest
+from io import StringIO
+from unittest import mock
 
-# Core tests
+from django.db import OperationalError
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import db
+
+
+class SQLiteProfileTest(TestCase):
+    """Testes para o perfil de PRAGMAs do SQLite."""
+
+    def test_pragmas_aplicados_na_conexao(self):
+        """Testa que o perfil é aplicado nas conexões (exceto WAL em memória)."""
+        resultado = {nome: ok for nome, _, _, ok in db.verificar_configuracao()}
+        self.assertTrue(resultado["busy_timeout"])
+        self.assertTrue(resultado["synchronous"])
+        self.assertTrue(resultado["cache_size"])
+        self.assertTrue(resultado["temp_store"])
+
+
+class RetryEscritaTest(SimpleTestCase):
+    """Testes para o retry em bloqueio e a fila de escrita."""
+
+    def test_retry_em_banco_bloqueado(self):
+        """Testa que bloqueios são repetidos e outros erros não."""
+        chamadas = []
+
+        @db.com_retry(espera_base=0)
+        def escrita():
+            chamadas.append(1)
+            if len(chamadas) < 3:
+                raise OperationalError("database is locked")
+            return "ok"
+
+        self.assertEqual(escrita(), "ok")
+        self.assertEqual(len(chamadas), 3)
+
+        @db.com_retry(espera_base=0)
+        def erro_de_sql():
+            raise OperationalError("no such table: x")
+
+        with self.assertRaises(OperationalError):
+            erro_de_sql()
+
+    def test_retry_desiste_apos_tentativas(self):
+        """Testa que o erro é propagado após esgotar as tentativas."""
+        func = mock.Mock(side_effect=OperationalError("database is locked"))
+        with self.assertRaises(OperationalError):
+            db.com_retry(func, tentativas=2, espera_base=0)()
+        self.assertEqual(func.call_count, 2)
+
+    def test_fila_escrita(self):
+        """Testa que a fila executa em thread própria e devolve resultado/erro."""
+        import threading
+
+        fila = db.FilaEscrita()
+        self.assertEqual(fila.enviar(lambda: threading.current_thread().name).result(timeout=5), "sqlite-writer")
+        with self.assertRaises(ValueError):
+            fila.enviar(int, "x").result(timeout=5)
+
+
+class DatabaseUrlTest(SimpleTestCase):
+    """Testes para a configuração do banco via DATABASE_URL."""
+
+    def test_parse_postgres(self):
+        from config.database import parse_database_url
+
+        config = parse_database_url("postgres://pandia:s%40nha@db:5433/pandia?sslmode=require")
+        self.assertEqual(config["ENGINE"], "django.db.backends.postgresql")
+        self.assertEqual(config["PASSWORD"], "s@nha")
+        self.assertEqual(config["PORT"], "5433")
+        self.assertEqual(config["OPTIONS"], {"sslmode": "require"})
+
+    def test_database_from_env(self):
+        from config.database import database_from_env
+
+        with mock.patch.dict("os.environ", {"DATABASE_URL": "postgresql://u:p@h/x", "DATABASE_POOL": "true"}):
+            config = database_from_env("db.sqlite3")
+        self.assertTrue(config["OPTIONS"]["pool"])
+        self.assertEqual(config["CONN_MAX_AGE"], 0)
+
+        with mock.patch.dict("os.environ", {"DATABASE_URL": "sqlite:////app/data/db.sqlite3"}):
+            self.assertEqual(database_from_env("db.sqlite3")["NAME"], "/app/data/db.sqlite3")
+
+    def test_ordem_de_copia(self):
+        """Testa que tabelas referenciadas são copiadas antes."""
+        from django.contrib.auth.models import User
+        from organizations.models import Padaria
+        from core.management.commands.copy_sqlite_to_postgres import modelos_em_ordem
+
+        ordem = modelos_em_ordem()
+        self.assertLess(ordem.index(User), ordem.index(Padaria))
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    """Testes para o cache compartilhado em SQLite."""
+
+    def setUp(self):
+        from .cache import SQLiteCache
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        caminho = os.path.join(tmp.name, "cache.sqlite3")
+        # Duas instâncias no mesmo arquivo simulam dois workers
+        self.worker1 = SQLiteCache(caminho, {})
+        self.worker2 = SQLiteCache(caminho, {})
+
+    def test_compartilhado_entre_workers(self):
+        self.worker1.set("token", {"access": "abc"}, 60)
+        self.assertEqual(self.worker2.get("token"), {"access": "abc"})
+        self.assertTrue(self.worker2.delete("token"))
+        self.assertIsNone(self.worker1.get("token"))
+
+    def test_add_e_incr(self):
+        self.assertTrue(self.worker1.add("contador", 0, 60))
+        self.assertFalse(self.worker2.add("contador", 0, 60))
+        self.worker1.incr("contador")
+        self.assertEqual(self.worker2.incr("contador", 2), 3)
+        with self.assertRaises(ValueError):
+            self.worker1.incr("inexistente")
+
+    def test_expiracao(self):
+        agora = time.time()
+        self.worker1.set("set", "x", 1)
+        self.assertTrue(self.worker1.add("add", "x", 1))
+        self.worker1.set("touch", "x", 60)
+        self.assertTrue(self.worker1.touch("touch", 1))
+        self.worker1.set("incr", 1, 1)
+        self.assertEqual(self.worker1.incr("incr"), 2)
+
+        with mock.patch("core.cache.time.time", return_value=agora + 2):
+            for chave in ("set", "add", "touch", "incr"):
+                self.assertIsNone(self.worker2.get(chave), chave)
+            self.assertTrue(self.worker2.add("add", "y", 60))
+            with self.assertRaises(ValueError):
+                self.worker2.incr("incr")
+
+    def test_rate_limited(self):
+        from core import utils
+
+        with mock.patch.object(utils, "cache", self.worker1):
+            resultados = [utils.rate_limited("rl", limit=3, window_seconds=60) for _ in range(4)]
+        self.assertEqual(resultados, [True, True, True, False])
+
+
+class OAuthTokenTest(SimpleTestCase):
+    """Testes para o token OAuth2 compartilhado entre workers."""
+
+    def setUp(self):
+        from .cache import SQLiteCache
+        from . import oauth
+
+        self.oauth = oauth
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = SQLiteCache(os.path.join(tmp.name, "cache.sqlite3"), {})
+        patcher = mock.patch.object(oauth, "cache", self.cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.emitidos = []
+        post = mock.patch.object(oauth.requests, "post", side_effect=self._endpoint_token)
+        self.post = post.start()
+        self.addCleanup(post.stop)
+
+    def _endpoint_token(self, url, **kwargs):
+        import time
+
+        time.sleep(0.05)
+        self.emitidos.append(f"tok{len(self.emitidos) + 1}")
+        return mock.Mock(status_code=200, json=lambda: {"access_token": self.emitidos[-1], "expires_in": 3600})
+
+    def _cliente(self):
+        return self.oauth.TokenClientCredentials("teste", "https://auth/token/", "id", "secret")
+
+    def test_uma_renovacao_para_varios_workers(self):
+        import threading
+
+        # Um cliente por "worker", todos sem token ao mesmo tempo
+        tokens = []
+        threads = [threading.Thread(target=lambda: tokens.append(self._cliente().obter())) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.emitidos, ["tok1"])
+        self.assertEqual(tokens, ["tok1"] * 5)
+        self.assertEqual(self.post.call_args.kwargs["data"]["grant_type"], "client_credentials")
+
+    def test_renovacao_antecipada_em_background(self):
+        cliente = self._cliente()
+        self.assertEqual(cliente.obter(), "tok1")
+        with mock.patch.object(self.oauth.threading, "Thread") as thread, \
+                mock.patch.object(self.oauth.time, "time", return_value=cliente._local["renovar_em"] + 1):
+            thread.side_effect = lambda target, **kwargs: mock.Mock(start=target)
+            # Ainda usa o token atual; a renovação roda em outra thread
+            self.assertEqual(cliente.obter(), "tok1")
+        self.assertEqual(thread.call_count, 1)
+        self.assertEqual(self.emitidos, ["tok1", "tok2"])
+        self.assertEqual(self._cliente().obter(), "tok2")
+
+    def test_retry_em_401(self):
+        cliente = self._cliente()
+        respostas = [mock.Mock(status_code=401), mock.Mock(status_code=200)]
+        with mock.patch.object(self.oauth.requests, "request", side_effect=respostas) as request:
+            response = cliente.requisitar("GET", "https://api/orders/1/", timeout=5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [c.kwargs["headers"]["Authorization"] for c in request.call_args_list],
+            ["Bearer tok1", "Bearer tok2"],
+        )
+
+    def test_falha_no_endpoint_de_token(self):
+        self.post.side_effect = None
+        self.post.return_value = mock.Mock(status_code=500, text="erro")
+        with self.assertRaises(self.oauth.TokenIndisponivel):
+            self._cliente().obter()
+
+
+class SchedulerTest(SimpleTestCase):
+    """Testes para o agendador interno de tarefas."""
+
+    def setUp(self):
+        from .cache import SQLiteCache
+        from . import scheduler
+
+        self.scheduler = scheduler
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = SQLiteCache(os.path.join(tmp.name, "cache.sqlite3"), {})
+        self.heartbeat = os.path.join(tmp.name, "scheduler.heartbeat")
+        for patcher in (
+            mock.patch.object(scheduler, "cache", self.cache),
+            mock.patch.object(scheduler, "tarefas", return_value={"diaria": 86400, "horaria": 3600}),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        override = override_settings(SCHEDULER_HEARTBEAT_FILE=self.heartbeat, SCHEDULER_HEARTBEAT_MAX_AGE=60)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_executa_so_tarefas_vencidas(self):
+        executadas = []
+        self.assertEqual(self.scheduler.executar_pendentes(executadas.append), ["diaria", "horaria"])
+        self.assertEqual(self.scheduler.executar_pendentes(executadas.append), [])
+
+        agora = self.cache.get(self.scheduler._chave_ultima("horaria"))
+        with mock.patch.object(self.scheduler.time, "time", return_value=agora + 3601):
+            self.assertEqual(self.scheduler.executar_pendentes(executadas.append), ["horaria"])
+        self.assertEqual(executadas, ["diaria", "horaria", "horaria"])
+
+    def test_tarefa_em_execucao_em_outro_processo(self):
+        self.cache.add(self.scheduler._chave_lock("diaria"), True, 60)
+        self.assertEqual(self.scheduler.executar_pendentes(lambda nome: None), ["horaria"])
+
+    def test_falha_tenta_de_novo_mais_tarde(self):
+        def falhar(nome):
+            raise RuntimeError("erro")
+
+        with self.assertLogs("core.scheduler", "ERROR"):
+            self.scheduler.executar_pendentes(falhar)
+        self.assertEqual(self.scheduler.executar_pendentes(lambda nome: None), [])
+        depois = self.scheduler.time.time() + self.scheduler.ESPERA_APOS_FALHA + 1
+        with mock.patch.object(self.scheduler.time, "time", return_value=depois):
+            self.assertEqual(self.scheduler.executar_pendentes(lambda nome: None), ["diaria", "horaria"])
+
+    def test_heartbeat_verificado_pelo_check(self):
+        from django.core.management import call_command
+        from django.core.management.base import CommandError
+
+        with self.assertRaises(CommandError):
+            call_command("run_scheduler", check=True, stdout=StringIO())
+
+        self.scheduler.executar_pendentes(lambda nome: None)
+        call_command("run_scheduler", check=True, stdout=StringIO())
+
+        # Loop travado ou processo morto: heartbeat envelhece
+        antigo = time.time() - 120
+        os.utime(self.heartbeat, (antigo, antigo))
+        with self.assertRaises(CommandError):
+            call_command("run_scheduler", check=True, stdout=StringIO())
+
+
+@unittest.skipUnless(os.getenv("REDIS_TEST_URL"), "REDIS_TEST_URL não definida")
+class RedisCacheTest(SimpleTestCase):
+    """Testes contra um Redis (ou compatível) local: REDIS_TEST_URL=redis://localhost:6379/15"""
+
+    def test_backend_redis(self):
+        from django.core.cache.backends.redis import RedisCache
+
+        cache = RedisCache(os.environ["REDIS_TEST_URL"], {"KEY_PREFIX": "pandia-test"})
+        cache.set("token", {"access": "abc"}, 60)
+        self.assertEqual(cache.get("token"), {"access": "abc"})
+        self.assertTrue(cache.add("contador", 0, 60))
+        self.assertEqual(cache.incr("contador"), 1)
+        cache.delete_many(["token", "contador"])
+
+
+class BrowserMiddlewareTest(TestCase):
+    """Testes para o caminho rápido dos endpoints máquina-a-máquina."""
+
+    def test_endpoint_de_maquina_pula_pilha_de_navegador(self):
+        response = self.client.post("/webhooks/n8n/events", data="{}", content_type="application/json")
+        self.assertEqual(response.status_code, 401)
+        request = response.wsgi_request
+        self.assertTrue(request.is_machine_request)
+        self.assertFalse(hasattr(request, "session"))
+        self.assertFalse(request.user.is_authenticated)
+        self.assertNotIn("X-Frame-Options", response)
+
+    def test_pagina_de_navegador_mantem_pilha(self):
+        response = self.client.get("/agents/")
+        self.assertRedirects(response, "/accounts/login/", fetch_redirect_response=False)
+        self.assertTrue(hasattr(response.wsgi_request, "session"))
+
+    def test_csrf_continua_ativo_no_navegador(self):
+        from django.test import Client
+
+        client = Client(enforce_csrf_checks=True)
+        response = client.post("/accounts/login/", {"username": "x", "password": "y"})
+        self.assertEqual(response.status_code, 403)
+
+
+class MediaServingTest(SimpleTestCase):
+    """Testes para o serviço de arquivos de mídia em produção."""
+
+    def setUp(self):
+        from django.test import RequestFactory, override_settings
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        os.makedirs(os.path.join(tmp.name, "produtos"))
+        for nome in ("pao.jpg", "pao.3f2a9c1b.jpg"):
+            with open(os.path.join(tmp.name, "produtos", nome), "wb") as arquivo:
+                arquivo.write(b"0123456789")
+        override = override_settings(MEDIA_ROOT=tmp.name, MEDIA_SENDFILE_BACKEND="")
+        override.enable()
+        self.addCleanup(override.disable)
+        self.factory = RequestFactory()
+
+    def _get(self, path, **headers):
+        from .media import serve_media
+
+        return serve_media(self.factory.get("/media/" + path, headers=headers), path)
+
+    def test_resposta_completa_e_condicional(self):
+        response = self._get("produtos/pao.jpg")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"0123456789")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Cache-Control"], "public, max-age=3600")
+
+        response = self._get("produtos/pao.jpg", if_none_match=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_nome_com_hash_e_imutavel(self):
+        response = self._get("produtos/pao.3f2a9c1b.jpg")
+        self.assertIn("immutable", response["Cache-Control"])
+
+    def test_range(self):
+        response = self._get("produtos/pao.jpg", range="bytes=2-4")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 2-4/10")
+        self.assertEqual(b"".join(response.streaming_content), b"234")
+
+        response = self._get("produtos/pao.jpg", range="bytes=-3")
+        self.assertEqual(b"".join(response.streaming_content), b"789")
+
+        self.assertEqual(self._get("produtos/pao.jpg", range="bytes=20-").status_code, 416)
+
+    def test_x_accel_redirect(self):
+        from django.test import override_settings
+
+        with override_settings(MEDIA_SENDFILE_BACKEND="x-accel"):
+            response = self._get("produtos/pao.jpg")
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/produtos/pao.jpg")
+        self.assertEqual(response.content, b"")
+
+    def test_caminho_invalido(self):
+        from django.http import Http404
+
+        for path in ("../settings.py", "produtos", "produtos/nao-existe.jpg"):
+            with self.assertRaises(Http404):
+                self._get(path)
+
+
+class ChangeTrackingTest(TestCase):
+    """Testes para o ChangeTrackingMixin."""
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from organizations.models import Padaria, Produto
+
+        owner = User.objects.create_user(username="dono", password="12345")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=owner)
+        Produto.objects.create(padaria=self.padaria, nome="Pão", preco="0.80", descricao="Crocante")
+
+    def _produto(self):
+        from organizations.models import Produto
+        return Produto.objects.get(nome="Pão")
+
+    def test_campos_alterados(self):
+        produto = self._produto()
+        self.assertEqual(produto.changed_fields, frozenset())
+
+        # Mesmo valor em outro tipo (como as views atribuem) não conta
+        produto.preco = 0.8
+        produto.descricao = "Crocante"
+        self.assertFalse(produto.has_changed())
+
+        produto.descricao = "Macio"
+        produto.padaria_id = None
+        self.assertEqual(produto.changed_fields, {"descricao", "padaria"})
+        self.assertEqual(produto.previous_value("padaria"), self.padaria.pk)
+
+    def test_snapshot_renovado_no_save(self):
+        produto = self._produto()
+        produto.nome = "Pão Francês"
+        produto.save(update_fields=["nome"])
+        self.assertFalse(produto.has_changed())
+
+        nova = type(produto)(padaria=self.padaria, nome="Sonho")
+        self.assertTrue(nova.has_changed("nome", "preco"))
+
+    def test_campos_adiados(self):
+        from organizations.models import Produto
+
+        produto = Produto.objects.only("nome").get(nome="Pão")
+        self.assertFalse(produto.has_changed())
+        self.assertEqual(produto.descricao, "Crocante")  # carrega o campo adiado
+        produto.descricao = "Macio"
+        self.assertEqual(produto.changed_fields, {"descricao"})
+
+    def test_agent_sem_consulta_extra_no_save(self):
+        from django.test.utils import CaptureQueriesContext
+        from django.db import connection
+        from agents.models import Agent
+
+        agent = Agent.objects.create(padaria=self.padaria, name="Assistente")
+        agent = Agent.objects.get(pk=agent.pk)
+        updated_at = agent.knowledge_updated_at
+        agent.name = "Novo Nome"
+        with CaptureQueriesContext(connection) as queries:
+            agent.save()
+        # Nem a validação de limite nem a releitura da linha
+        self.assertFalse(any(q["sql"].lstrip().upper().startswith("SELECT") for q in queries))
+        self.assertEqual(agent.knowledge_updated_at, updated_at)
+
+        agent.knowledge_base = "Novo conhecimento"
+        agent.save()
+        self.assertNotEqual(agent.knowledge_updated_at, updated_at)
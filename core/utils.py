@@ -64,21 +64,18 @@ def rate_limited(cache_key, limit=60, window_seconds=60):
     Returns:
         bool: True se dentro do limite, False se excedeu
     """
-    # Obter contador atual
-    count = cache.get(cache_key, 0)
-    
-    if count >= limit:
-        return False
-    
-    # Incrementar contador
-    if count == 0:
-        # Primeira requisição na janela
+    # add() só grava se a chave não existir: a janela começa na 1ª requisição.
+    # incr() é atômico no cache compartilhado, então workers concorrentes
+    # não perdem incrementos.
+    cache.add(cache_key, 0, window_seconds)
+    try:
+        count = cache.incr(cache_key)
+    except ValueError:
+        # A janela expirou entre o add() e o incr()
         cache.set(cache_key, 1, window_seconds)
-    else:
-        # Incrementar existente
-        cache.incr(cache_key)
+        count = 1
     
-    return True
+    return count <= limit
 
 
 def rate_limit_decorator(limit=60, window_seconds=60, key_func=None):
@@ -6,20 +6,41 @@ echo "=== Django Entrypoint ==="
 # Aguardar um momento para garantir que volumes estão montados
 sleep 2
 
+# Verificar configuração do banco (PRAGMAs efetivos do SQLite)
+echo "[1/5] Verificando banco de dados..."
+python manage.py check_database
+
 # Rodar migrações
-echo "[1/3] Aplicando migrações..."
+echo "[2/5] Aplicando migrações..."
 python manage.py migrate --noinput
 
+# Recalcular métricas do painel administrativo
+echo "[3/5] Reconciliando métricas..."
+python manage.py reconcile_metrics
+
 # Coletar arquivos estáticos
-echo "[2/3] Coletando arquivos estáticos..."
+echo "[4/5] Coletando arquivos estáticos..."
 python manage.py collectstatic --noinput --clear
 
+# Agendador de tarefas periódicas (assinaturas, métricas). Reiniciado se
+# encerrar; o healthcheck do stack.yml acompanha o heartbeat dele.
+if [ "${SCHEDULER_ENABLED:-1}" != "0" ]; then
+    (
+        while true; do
+            codigo=0
+            python manage.py run_scheduler || codigo=$?
+            echo "[scheduler] run_scheduler encerrou (código $codigo); reiniciando em 10s" >&2
+            sleep 10
+        done
+    ) &
+fi
+
 # Iniciar Gunicorn
-echo "[3/3] Iniciando Gunicorn..."
+echo "[5/5] Iniciando Gunicorn..."
 exec gunicorn config.wsgi:application \
     --bind 0.0.0.0:8000 \
     --workers 2 \
-    --threads 2 \
+    --threads "${GUNICORN_THREADS:-8}" \
     --worker-class gthread \
     --worker-tmp-dir /dev/shm \
     --access-logfile - \
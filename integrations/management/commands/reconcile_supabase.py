@@ -0,0 +1,60 @@
+"""
+Management command para reconciliar a tabela 'agentes' do Supabase.
+
+Lê as linhas remotas em páginas, compara com os agentes e API Keys
+locais e aplica as diferenças com upserts e deletes em lote
+(integrations.supabase_sync).
+
+Uso: python manage.py reconcile_supabase [--dry-run] [--no-delete]
+Executado pelo agendador interno (run_scheduler) a cada 6 horas, se o Supabase
+estiver configurado - ver SCHEDULER_TASKS
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from integrations import supabase_client, supabase_sync
+
+
+class Command(BaseCommand):
+    help = 'Reconcilia a tabela agentes do Supabase com os agentes locais'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Apenas lista as diferenças, sem alterar o Supabase',
+        )
+        parser.add_argument(
+            '--no-delete',
+            action='store_true',
+            help='Não remove do Supabase agentes que não existem localmente',
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get('dry_run', False)
+
+        if not supabase_client.SUPABASE_URL or not supabase_client.SUPABASE_KEY:
+            raise CommandError("SUPABASE_URL/SUPABASE_KEY não configurados.")
+
+        self.stdout.write(f"[{timezone.now()}] Reconciliando agentes com o Supabase...")
+
+        try:
+            resultado = supabase_sync.reconciliar(remover=not options.get('no_delete'), dry_run=dry_run)
+        except Exception as e:
+            raise CommandError(f"Falha na reconciliação: {e}")
+
+        for chave, simbolo in (('inseridos', '+'), ('atualizados', '~'), ('removidos', '-')):
+            for slug in resultado[chave]:
+                self.stdout.write(f"  {simbolo} {slug}")
+
+        total = sum(len(resultado[chave]) for chave in ('inseridos', 'atualizados', 'removidos'))
+        resumo = (
+            f"{len(resultado['inseridos'])} inserido(s), {len(resultado['atualizados'])} atualizado(s), "
+            f"{len(resultado['removidos'])} removido(s), {resultado['inalterados']} inalterado(s)"
+        )
+        if not total:
+            self.stdout.write(self.style.SUCCESS("Nenhuma divergência encontrada."))
+        elif dry_run:
+            self.stdout.write(self.style.WARNING(f"\nMODO DRY-RUN: {resumo}"))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"\n{resumo}"))
@@ -4,9 +4,12 @@ Supabase Integration Client
 Funções para sincronizar agentes e criar tabelas RAG no Supabase.
 """
 import os
+import threading
 import requests
 import logging
 from django.utils.text import slugify
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +18,37 @@ SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_KEY = os.getenv("SUPABASE_KEY", "")
 
 
+_sessoes = {}
+_sessao_lock = threading.Lock()
+
+
+def obter_sessao(repetir_post=False):
+    """
+    Sessão HTTP compartilhada (pool de conexões + retry com backoff).
+
+    Por padrão só repete métodos idempotentes (GET, PUT, DELETE, PATCH de
+    valor fixo...). Com `repetir_post`, repete também POST: use só em
+    chamadas cuja repetição não tem efeito (insert na tabela agentes, que
+    gera 409 pelo slug único, e upsert com merge-duplicates) - nunca nas
+    RPCs de DDL (create_rag_table, exec_sql).
+    """
+    with _sessao_lock:
+        sessao = _sessoes.get(repetir_post)
+        if sessao is None:
+            retry = Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=(429, 500, 502, 503, 504),
+                allowed_methods=None if repetir_post else Retry.DEFAULT_ALLOWED_METHODS | {"PATCH"},
+                raise_on_status=False,
+            )
+            sessao = requests.Session()
+            sessao.mount("http://", HTTPAdapter(pool_maxsize=10, max_retries=retry))
+            sessao.mount("https://", HTTPAdapter(pool_maxsize=10, max_retries=retry))
+            _sessoes[repetir_post] = sessao
+        return sessao
+
+
 def get_headers():
     """Retorna headers para autenticação no Supabase."""
     return {
@@ -54,7 +88,8 @@ def sync_agent_to_supabase(slug, api_key, padaria_name, agent_name, phone=""):
             "phone": phone or ""
         }
         
-        response = requests.post(
+        # POST duplicado só gera 409 (slug único): pode repetir
+        response = obter_sessao(repetir_post=True).post(
             url,
             json=data,
             headers=get_headers(),
@@ -119,7 +154,7 @@ def create_rag_table(slug, agent_slug=None):
         WITH (lists = 100);
         """
         
-        response = requests.post(
+        response = obter_sessao().post(
             url,
             json={"query": sql},
             headers=get_headers(),
@@ -159,7 +194,7 @@ def create_rag_table_alternative(table_name):
         print(f"[DEBUG] Chamando RPC create_rag_table com table_name={table_name}")
         print(f"[DEBUG] URL: {url}")
         
-        response = requests.post(
+        response = obter_sessao().post(
             url,
             json={"table_name": table_name},
             headers=headers,
@@ -212,7 +247,7 @@ def update_agent_rag_table(slug, rag_table_name):
         headers = get_headers()
         headers["Prefer"] = "return=representation"
         
-        response = requests.patch(
+        response = obter_sessao().patch(
             url,
             json=data,
             headers=headers,
@@ -251,7 +286,7 @@ def get_table_oid(table_name):
         headers = get_headers()
         headers["Prefer"] = "return=representation"
         
-        response = requests.post(
+        response = obter_sessao().post(
             url,
             json={"p_table_name": table_name},
             headers=headers,
@@ -290,7 +325,7 @@ def delete_agent_from_supabase(slug):
     try:
         url = f"{SUPABASE_URL}/rest/v1/agentes?slug=eq.{slug}"
         
-        response = requests.delete(
+        response = obter_sessao().delete(
             url,
             headers=get_headers(),
             timeout=10
@@ -331,7 +366,7 @@ def update_agent_evolution_hash(slug, evolution_hash):
         headers = get_headers()
         headers["Prefer"] = "return=representation"
         
-        response = requests.patch(
+        response = obter_sessao().patch(
             url,
             json=data,
             headers=headers,
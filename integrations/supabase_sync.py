@@ -0,0 +1,231 @@
+"""
+Reconciliação em lote da tabela 'agentes' do Supabase com os agentes locais.
+
+As funções de supabase_client gravam uma linha por vez e só registram as
+falhas em log, então o Supabase diverge do banco com o tempo (agente
+excluído que continua lá, API Key trocada, nome alterado). A
+reconciliação lê as linhas remotas em páginas (keyset por slug), compara
+com os agentes locais (lidos depois das páginas remotas) e aplica as
+diferenças com upserts e deletes em lote do PostgREST, numa sessão HTTP
+com pool de conexões e retry.
+
+Só as colunas mantidas pelo Django (`COLUNAS`) são comparadas e
+enviadas; as preenchidas por outros fluxos (evo, rag_table, rag_id) não
+são tocadas, porque o upsert com merge-duplicates só altera as colunas
+presentes no corpo.
+
+Uso: `python manage.py reconcile_supabase` ou, a partir de views,
+`agendar_reconciliacao()`.
+"""
+import logging
+import threading
+
+import requests
+from django.core.cache import cache
+from django.db import close_old_connections
+
+from . import supabase_client
+
+logger = logging.getLogger(__name__)
+
+TABELA = "agentes"
+COLUNAS = ("slug", "api_key", "padaria_name", "agent_name", "phone")
+TAMANHO_PAGINA = 500
+TAMANHO_LOTE = 500
+
+LOCK_KEY = "supabase:reconciliacao:lock"
+PENDENTE_KEY = "supabase:reconciliacao:pendente"
+LOCK_TTL = 10 * 60
+
+
+class SupabaseError(Exception):
+    """Resposta de erro do PostgREST."""
+
+
+class AgentesRemotos:
+    """Acesso em lote à tabela 'agentes' via PostgREST."""
+
+    def __init__(self, url=None, key=None, sessao=None):
+        url = url if url is not None else supabase_client.SUPABASE_URL
+        self.key = key if key is not None else supabase_client.SUPABASE_KEY
+        self.endpoint = f"{url.rstrip('/')}/rest/v1/{TABELA}"
+        # Upsert com merge-duplicates é idempotente: pode repetir POST
+        self.sessao = sessao or supabase_client.obter_sessao(repetir_post=True)
+
+    def _headers(self, prefer="return=minimal"):
+        return {
+            "apikey": self.key,
+            "Authorization": f"Bearer {self.key}",
+            "Content-Type": "application/json",
+            "Prefer": prefer,
+        }
+
+    def _verificar(self, response, operacao):
+        if response.status_code >= 300:
+            raise SupabaseError(f"{operacao}: {response.status_code} - {response.text[:300]}")
+
+    def paginas(self, tamanho=None):
+        """Itera as linhas remotas em páginas ordenadas por slug."""
+        tamanho = tamanho or TAMANHO_PAGINA
+        ultimo = None
+        while True:
+            params = {"select": ",".join(COLUNAS), "order": "slug.asc", "limit": tamanho}
+            if ultimo is not None:
+                params["slug"] = f'gt."{ultimo}"'
+            response = self.sessao.get(self.endpoint, params=params, headers=self._headers(), timeout=30)
+            self._verificar(response, "leitura")
+            linhas = response.json()
+            if linhas:
+                yield linhas
+            if len(linhas) < tamanho:
+                return
+            ultimo = linhas[-1]["slug"]
+
+    def upsert(self, linhas):
+        for inicio in range(0, len(linhas), TAMANHO_LOTE):
+            response = self.sessao.post(
+                self.endpoint,
+                params={"on_conflict": "slug"},
+                json=linhas[inicio:inicio + TAMANHO_LOTE],
+                headers=self._headers("resolution=merge-duplicates,return=minimal"),
+                timeout=30,
+            )
+            self._verificar(response, "upsert")
+
+    def remover(self, slugs):
+        for inicio in range(0, len(slugs), TAMANHO_LOTE):
+            lote = ",".join(f'"{slug}"' for slug in slugs[inicio:inicio + TAMANHO_LOTE])
+            response = self.sessao.delete(
+                self.endpoint, params={"slug": f"in.({lote})"}, headers=self._headers(), timeout=30
+            )
+            self._verificar(response, "remoção")
+
+
+def linhas_locais():
+    """Linha esperada no Supabase para cada agente local, por slug."""
+    from agents.models import Agent
+    from organizations.models import ApiKey
+
+    # A chave vinculada mais antiga ainda ativa é a que foi enviada na criação
+    chaves = {}
+    for agent_id, key in (
+        ApiKey.objects.filter(agent__isnull=False, is_active=True)
+        .order_by("created_at")
+        .values_list("agent_id", "key")
+    ):
+        chaves.setdefault(agent_id, key)
+
+    linhas = {}
+    for agent in Agent.objects.select_related("padaria").only(
+        "id", "slug", "name", "padaria__name", "padaria__phone"
+    ):
+        linhas[agent.slug] = {
+            "slug": agent.slug,
+            "api_key": chaves.get(agent.id, ""),
+            "padaria_name": agent.padaria.name,
+            "agent_name": agent.name,
+            "phone": agent.padaria.phone or "",
+        }
+    return linhas
+
+
+def reconciliar(remoto=None, remover=True, dry_run=False):
+    """
+    Compara a tabela remota com os agentes locais e aplica as diferenças.
+
+    Args:
+        remoto: AgentesRemotos (padrão: SUPABASE_URL/SUPABASE_KEY)
+        remover: remove do Supabase os slugs que não existem localmente
+        dry_run: só calcula as diferenças
+
+    Returns:
+        dict com as listas de slugs 'inseridos', 'atualizados', 'removidos'
+        e o total de 'inalterados'
+    """
+    from agents.models import Agent
+
+    remoto = remoto or AgentesRemotos()
+    # Remoto antes do local: um agente criado durante a execução, que o
+    # sync_agent_to_supabase insere no Supabase, já está no snapshot local
+    # quando aparece na leitura remota (e não é tratado como excluído)
+    remotas = [linha for pagina in remoto.paginas() for linha in pagina]
+    locais = linhas_locais()
+
+    atualizar, remover_slugs, vistos = [], [], set()
+    inalterados = 0
+    for linha in remotas:
+        slug = linha["slug"]
+        vistos.add(slug)
+        esperado = locais.get(slug)
+        if esperado is None:
+            remover_slugs.append(slug)
+        elif any((linha.get(coluna) or "") != esperado[coluna] for coluna in COLUNAS):
+            atualizar.append(esperado)
+        else:
+            inalterados += 1
+
+    inserir = [linha for slug, linha in locais.items() if slug not in vistos]
+    if not remover:
+        remover_slugs = []
+
+    if not dry_run:
+        if inserir or atualizar:
+            remoto.upsert(inserir + atualizar)
+        if remover_slugs:
+            # Agente com o mesmo slug criado depois do snapshot local
+            recriados = set(Agent.objects.filter(slug__in=remover_slugs).values_list("slug", flat=True))
+            remover_slugs = [slug for slug in remover_slugs if slug not in recriados]
+        if remover_slugs:
+            remoto.remover(remover_slugs)
+
+    resultado = {
+        "inseridos": [linha["slug"] for linha in inserir],
+        "atualizados": [linha["slug"] for linha in atualizar],
+        "removidos": remover_slugs,
+        "inalterados": inalterados,
+    }
+    logger.info(
+        f"Reconciliação Supabase{' (dry-run)' if dry_run else ''}: "
+        f"{len(inserir)} inseridos, {len(atualizar)} atualizados, "
+        f"{len(remover_slugs)} removidos, {inalterados} inalterados"
+    )
+    return resultado
+
+
+def _executar_reconciliacao():
+    close_old_connections()
+    try:
+        while True:
+            cache.delete(PENDENTE_KEY)
+            try:
+                reconciliar()
+            except (requests.exceptions.RequestException, SupabaseError) as e:
+                logger.warning(f"Falha na reconciliação com o Supabase: {e}")
+            except Exception:
+                logger.exception("Erro inesperado na reconciliação com o Supabase")
+            # Pedidos feitos durante a execução: mais uma rodada
+            if cache.get(PENDENTE_KEY):
+                continue
+            cache.delete(LOCK_KEY)
+            # Pedido que chegou entre a verificação e a liberação do lock
+            if not (cache.get(PENDENTE_KEY) and cache.add(LOCK_KEY, True, LOCK_TTL)):
+                break
+    finally:
+        close_old_connections()
+
+
+def agendar_reconciliacao():
+    """
+    Roda a reconciliação em uma thread. Se já houver uma em andamento (em
+    qualquer worker), só marca que outra rodada é necessária.
+
+    Returns:
+        True se uma nova thread foi iniciada
+    """
+    if not supabase_client.SUPABASE_URL or not supabase_client.SUPABASE_KEY:
+        return False
+    if not cache.add(LOCK_KEY, True, LOCK_TTL):
+        cache.set(PENDENTE_KEY, True, LOCK_TTL)
+        return False
+    threading.Thread(target=_executar_reconciliacao, name="supabase-reconciliacao", daemon=True).start()
+    return True
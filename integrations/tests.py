@@ -0,0 +1,177 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from agents.models import Agent
+from organizations.models import ApiKey, Padaria
+from . import supabase_client, supabase_sync
+
+
+class _PostgrestFalso(BaseHTTPRequestHandler):
+    """Subconjunto do PostgREST usado pela reconciliação (tabela em memória)."""
+
+    def log_message(self, *args):
+        pass
+
+    def _filtros(self):
+        return {chave: valores[0] for chave, valores in parse_qs(urlparse(self.path).query).items()}
+
+    def _responder(self, status, corpo=None):
+        dados = json.dumps(corpo).encode() if corpo is not None else b""
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(dados)))
+        self.end_headers()
+        self.wfile.write(dados)
+
+    def do_GET(self):
+        self.server.chamadas.append("GET")
+        filtros = self._filtros()
+        linhas = sorted(self.server.linhas.values(), key=lambda linha: linha["slug"])
+        if "slug" in filtros:
+            ultimo = filtros["slug"].removeprefix("gt.").strip('"')
+            linhas = [linha for linha in linhas if linha["slug"] > ultimo]
+        colunas = filtros["select"].split(",")
+        linhas = linhas[:int(filtros["limit"])]
+        self._responder(200, [{c: linha.get(c) for c in colunas} for linha in linhas])
+
+    def do_POST(self):
+        self.server.chamadas.append("POST")
+        assert "merge-duplicates" in self.headers["Prefer"]
+        corpo = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        for linha in corpo:
+            self.server.linhas.setdefault(linha["slug"], {}).update(linha)
+        self._responder(201)
+
+    def do_DELETE(self):
+        self.server.chamadas.append("DELETE")
+        slugs = self._filtros()["slug"].removeprefix("in.(").removesuffix(")")
+        for slug in slugs.split(","):
+            self.server.linhas.pop(slug.strip('"'), None)
+        self._responder(204)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class SupabaseReconciliacaoTest(TestCase):
+    """Testes para a reconciliação da tabela agentes do Supabase."""
+
+    def setUp(self):
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), _PostgrestFalso)
+        self.servidor.linhas, self.servidor.chamadas = {}, []
+        threading.Thread(target=self.servidor.serve_forever, daemon=True).start()
+        self.addCleanup(self.servidor.server_close)
+        self.addCleanup(self.servidor.shutdown)
+        self.url = f"http://127.0.0.1:{self.servidor.server_port}"
+
+        owner = User.objects.create_user(username="dono", password="12345")
+        self.agentes = []
+        for i in range(5):
+            padaria = Padaria.objects.create(name=f"Padaria {i}", owner=owner, phone=f"1199999000{i}")
+            agent = Agent.objects.create(padaria=padaria, name="Ana")
+            ApiKey.objects.create(padaria=padaria, agent=agent, name="Auto")
+            self.agentes.append(agent)
+
+    def _remoto(self):
+        return supabase_sync.AgentesRemotos(url=self.url, key="teste")
+
+    def test_reconcilia_em_lote(self):
+        esperado = supabase_sync.linhas_locais()
+        # Remoto: um agente em dia, um com nome antigo (e coluna evo própria
+        # do Supabase), um que não existe mais aqui; os demais faltando
+        self.servidor.linhas = {
+            self.agentes[0].slug: dict(esperado[self.agentes[0].slug]),
+            self.agentes[1].slug: {**esperado[self.agentes[1].slug], "agent_name": "Antigo", "evo": "hash"},
+            "agente-removido": {"slug": "agente-removido", "api_key": "x", "agent_name": "Velho"},
+        }
+
+        with patch.object(supabase_sync, "TAMANHO_PAGINA", 2):
+            resultado = supabase_sync.reconciliar(self._remoto())
+
+        self.assertEqual(resultado["atualizados"], [self.agentes[1].slug])
+        self.assertEqual(resultado["removidos"], ["agente-removido"])
+        self.assertEqual(len(resultado["inseridos"]), 3)
+        self.assertEqual(resultado["inalterados"], 1)
+        # 2 páginas de leitura, um upsert e um delete para todos os agentes
+        self.assertEqual(self.servidor.chamadas, ["GET", "GET", "POST", "DELETE"])
+
+        self.assertEqual(set(self.servidor.linhas), set(esperado))
+        self.assertEqual(self.servidor.linhas[self.agentes[1].slug]["agent_name"], "Ana")
+        self.assertEqual(self.servidor.linhas[self.agentes[1].slug]["evo"], "hash")
+
+        self.servidor.chamadas.clear()
+        resultado = supabase_sync.reconciliar(self._remoto())
+        self.assertEqual(resultado["inalterados"], 5)
+        self.assertEqual(self.servidor.chamadas, ["GET"])
+
+    def test_agente_criado_durante_a_reconciliacao_nao_e_removido(self):
+        remoto = self._remoto()
+        paginas = remoto.paginas
+        owner = self.agentes[0].padaria.owner
+
+        def paginas_com_agente_novo():
+            # Criado (e inserido no Supabase pelo sync) durante a leitura
+            padaria = Padaria.objects.create(name="Padaria Nova", owner=owner, phone="11999990010")
+            novo = Agent.objects.create(padaria=padaria, name="Bia")
+            self.servidor.linhas[novo.slug] = {"slug": novo.slug, "agent_name": "Bia"}
+            yield from paginas()
+
+        linhas_locais = supabase_sync.linhas_locais
+
+        def snapshot_e_agente_recriado():
+            locais = linhas_locais()
+            # Slug removido localmente e recriado logo depois do snapshot
+            padaria = Padaria.objects.create(name="Padaria Recriada", owner=owner, phone="11999990011")
+            Agent.objects.create(padaria=padaria, name="Caio", slug="recriado")
+            return locais
+
+        self.servidor.linhas = {"recriado": {"slug": "recriado", "agent_name": "Caio"}}
+        with patch.object(remoto, "paginas", paginas_com_agente_novo), \
+                patch.object(supabase_sync, "linhas_locais", snapshot_e_agente_recriado):
+            resultado = supabase_sync.reconciliar(remoto)
+
+        self.assertEqual(resultado["removidos"], [])
+        self.assertNotIn("DELETE", self.servidor.chamadas)
+        self.assertIn("recriado", self.servidor.linhas)
+
+    def test_post_so_repete_na_sessao_idempotente(self):
+        padrao = supabase_client.obter_sessao().get_adapter("https://").max_retries
+        self.assertNotIn("POST", padrao.allowed_methods)
+        self.assertIn("PATCH", padrao.allowed_methods)
+        repete = supabase_client.obter_sessao(repetir_post=True).get_adapter("https://").max_retries
+        self.assertIsNone(repete.allowed_methods)  # todos os métodos
+        self.assertIs(self._remoto().sessao.get_adapter("https://").max_retries, repete)
+
+    def test_dry_run_pelo_comando(self):
+        self.servidor.linhas = {"agente-removido": {"slug": "agente-removido"}}
+        saida = StringIO()
+        with patch.object(supabase_client, "SUPABASE_URL", self.url), \
+                patch.object(supabase_client, "SUPABASE_KEY", "teste"):
+            call_command("reconcile_supabase", "--dry-run", stdout=saida)
+        self.assertIn("- agente-removido", saida.getvalue())
+        self.assertIn("5 inserido(s)", saida.getvalue())
+        self.assertEqual(list(self.servidor.linhas), ["agente-removido"])
+
+    def test_reconciliacao_em_background_e_agrupada(self):
+        threads = []
+        with patch.object(supabase_client, "SUPABASE_URL", self.url), \
+                patch.object(supabase_client, "SUPABASE_KEY", "teste"), \
+                patch.object(supabase_sync.threading, "Thread") as thread:
+            thread.side_effect = lambda target, **kwargs: threads.append(target) or thread.return_value
+            self.assertTrue(supabase_sync.agendar_reconciliacao())
+            self.assertFalse(supabase_sync.agendar_reconciliacao())
+            self.assertEqual(len(threads), 1)
+
+            # Um pedido feito durante a execução gera uma segunda rodada
+            pedidos = [supabase_sync.agendar_reconciliacao, lambda: None]
+            with patch.object(supabase_sync, "reconciliar", side_effect=lambda: pedidos.pop(0)()) as reconciliar:
+                threads[0]()
+            self.assertEqual(reconciliar.call_count, 2)
+            self.assertEqual(len(threads), 1)
+            self.assertTrue(supabase_sync.agendar_reconciliacao())
@@ -81,25 +81,26 @@ class ProdutoAdmin(admin.ModelAdmin):
 
 @admin.register(Cliente)
 class ClienteAdmin(admin.ModelAdmin):
-    list_display = ['nome', 'telefone', 'padaria', 'aceita_promocoes', 'is_active', 'created_at']
+    list_display = ['nome', 'telefone', 'whatsapp_e164', 'padaria', 'aceita_promocoes', 'is_active', 'created_at']
     list_filter = ['is_active', 'aceita_promocoes', 'padaria']
-    search_fields = ['nome', 'telefone', 'email', 'padaria__name']
+    search_fields = ['nome', 'telefone', 'whatsapp_e164', 'email', 'padaria__name']
+    readonly_fields = ['whatsapp_e164']
     date_hierarchy = 'created_at'
 
 
 class MensagemCampanhaInline(admin.TabularInline):
     model = MensagemCampanha
     extra = 0
-    readonly_fields = ['cliente', 'status', 'enviado_em', 'erro_mensagem']
+    readonly_fields = ['cliente', 'status', 'enviado_em', 'entregue_em', 'lido_em', 'erro_mensagem']
     can_delete = False
 
 
 @admin.register(CampanhaWhatsApp)
 class CampanhaWhatsAppAdmin(admin.ModelAdmin):
-    list_display = ['nome', 'padaria', 'status', 'total_destinatarios', 'enviados', 'falhas', 'created_at']
+    list_display = ['nome', 'padaria', 'status', 'total_destinatarios', 'enviados', 'falhas', 'entregues', 'lidas', 'created_at']
     list_filter = ['status', 'padaria', 'created_at']
     search_fields = ['nome', 'padaria__name', 'mensagem']
-    readonly_fields = ['total_destinatarios', 'enviados', 'falhas', 'iniciado_em', 'concluido_em']
+    readonly_fields = ['total_destinatarios', 'enviados', 'falhas', 'entregues', 'lidas', 'iniciado_em', 'concluido_em']
     inlines = [MensagemCampanhaInline]
     date_hierarchy = 'created_at'
     
@@ -115,7 +116,7 @@ class CampanhaWhatsAppAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
         ('Estatísticas', {
-            'fields': ('total_destinatarios', 'enviados', 'falhas', 'iniciado_em', 'concluido_em'),
+            'fields': ('total_destinatarios', 'enviados', 'falhas', 'entregues', 'lidas', 'iniciado_em', 'concluido_em'),
             'classes': ('collapse',)
         }),
     )
@@ -123,7 +124,7 @@ class CampanhaWhatsAppAdmin(admin.ModelAdmin):
 
 @admin.register(MensagemCampanha)
 class MensagemCampanhaAdmin(admin.ModelAdmin):
-    list_display = ['campanha', 'cliente', 'status', 'enviado_em']
+    list_display = ['campanha', 'cliente', 'status', 'enviado_em', 'entregue_em', 'lido_em']
     list_filter = ['status', 'campanha', 'enviado_em']
-    search_fields = ['campanha__nome', 'cliente__nome', 'cliente__telefone']
-    readonly_fields = ['campanha', 'cliente', 'enviado_em']
+    search_fields = ['campanha__nome', 'cliente__nome', 'cliente__telefone', 'provider_message_id']
+    readonly_fields = ['campanha', 'cliente', 'enviado_em', 'provider_message_id', 'entregue_em', 'lido_em', 'falhou_em']
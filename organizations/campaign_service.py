@@ -19,12 +19,27 @@ import os
 from django.conf import settings
 from django.utils import timezone
 
+from core.db import escrever
+from .images import arquivo_variante
+from .whatsapp_state import consultar_estado, nome_instancia
+
 logger = logging.getLogger(__name__)
 
 # Armazena campanhas em execução (para pausar/cancelar)
 campanhas_em_execucao = {}
 
 
+def _message_id(response):
+    """key.id da mensagem na resposta de envio da Evolution API."""
+    try:
+        data = response.json()
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    return (data.get("key") or {}).get("id")
+
+
 class CampaignService:
     """
     Serviço para envio de mensagens de campanha via Evolution API.
@@ -36,7 +51,7 @@ class CampaignService:
         self.padaria = campanha.padaria
         self.api_url = getattr(settings, 'EVOLUTION_API_URL', None)
         self.api_key = getattr(settings, 'EVOLUTION_API_KEY', None)
-        self.instance_name = f"padaria_{self.padaria.slug}"
+        self.instance_name = nome_instancia(self.padaria)
         self._stop_requested = False
     
     def is_configured(self):
@@ -56,17 +71,13 @@ class CampaignService:
             return False, "Evolution API não configurada"
         
         try:
-            url = f"{self.api_url}/instance/connectionState/{self.instance_name}"
-            response = requests.get(url, headers=self.get_headers(), timeout=10)
-            
-            if response.status_code == 200:
-                data = response.json()
-                state = data.get("state") or data.get("instance", {}).get("state")
-                if state == "open":
-                    return True, "Conectado"
-                return False, f"WhatsApp não conectado (estado: {state})"
-            
-            return False, f"Erro ao verificar conexão: {response.status_code}"
+            # Estado do cache (eventos CONNECTION_UPDATE); consulta a API se expirou
+            state = consultar_estado(self.instance_name, self.api_url, self.api_key)
+            if state is None:
+                return False, "Erro ao verificar conexão"
+            if state == "open":
+                return True, "Conectado"
+            return False, f"WhatsApp não conectado (estado: {state})"
         except Exception as e:
             logger.error(f"Erro ao verificar conexão WhatsApp: {e}")
             return False, str(e)
@@ -80,10 +91,11 @@ class CampaignService:
             mensagem: Texto da mensagem
             
         Returns:
-            (sucesso: bool, mensagem_erro: str ou None)
+            (sucesso: bool, mensagem_erro: str ou None, message_id: str ou None)
+            message_id é o key.id da Evolution, usado pelos recibos de entrega
         """
         if not self.is_configured():
-            return False, "Evolution API não configurada"
+            return False, "Evolution API não configurada", None
         
         try:
             url = f"{self.api_url}/message/sendText/{self.instance_name}"
@@ -100,17 +112,17 @@ class CampaignService:
             )
             
             if response.status_code in [200, 201]:
-                return True, None
+                return True, None, _message_id(response)
             else:
                 error_data = response.json() if response.text else {}
                 error_msg = error_data.get("message", response.text or "Erro desconhecido")
-                return False, error_msg
+                return False, error_msg, None
                 
         except requests.exceptions.Timeout:
-            return False, "Timeout ao enviar mensagem"
+            return False, "Timeout ao enviar mensagem", None
         except Exception as e:
             logger.error(f"Erro ao enviar mensagem: {e}")
-            return False, str(e)
+            return False, str(e), None
     
     def enviar_mensagem_imagem(self, telefone, imagem_base64, legenda="", mimetype="image/jpeg"):
         """
@@ -123,10 +135,11 @@ class CampaignService:
             mimetype: Tipo MIME da imagem
             
         Returns:
-            (sucesso: bool, mensagem_erro: str ou None)
+            (sucesso: bool, mensagem_erro: str ou None, message_id: str ou None)
+            message_id é o key.id da Evolution, usado pelos recibos de entrega
         """
         if not self.is_configured():
-            return False, "Evolution API não configurada"
+            return False, "Evolution API não configurada", None
         
         try:
             url = f"{self.api_url}/message/sendMedia/{self.instance_name}"
@@ -146,17 +159,17 @@ class CampaignService:
             )
             
             if response.status_code in [200, 201]:
-                return True, None
+                return True, None, _message_id(response)
             else:
                 error_data = response.json() if response.text else {}
                 error_msg = error_data.get("message", response.text or "Erro desconhecido")
-                return False, str(error_msg)
+                return False, str(error_msg), None
                 
         except requests.exceptions.Timeout:
-            return False, "Timeout ao enviar imagem"
+            return False, "Timeout ao enviar imagem", None
         except Exception as e:
             logger.error(f"Erro ao enviar imagem: {e}")
-            return False, str(e)
+            return False, str(e), None
     
     def converter_imagem_para_base64(self, imagem_field):
         """
@@ -169,23 +182,27 @@ class CampaignService:
             (base64_string, mimetype) ou (None, None) se falhar
         """
         try:
-            # Obter o caminho completo do arquivo
-            caminho_arquivo = imagem_field.path
-            
-            if not os.path.exists(caminho_arquivo):
-                logger.error(f"Arquivo de imagem não encontrado: {caminho_arquivo}")
-                return None, None
+            # Preferir a versão otimizada para WhatsApp (JPEG reduzido)
+            caminho_arquivo, mimetype = arquivo_variante(imagem_field, 'whatsapp')
             
-            # Determinar o mimetype baseado na extensão
-            extensao = os.path.splitext(caminho_arquivo)[1].lower()
-            mimetypes = {
-                '.jpg': 'image/jpeg',
-                '.jpeg': 'image/jpeg',
-                '.png': 'image/png',
-                '.gif': 'image/gif',
-                '.webp': 'image/webp'
-            }
-            mimetype = mimetypes.get(extensao, 'image/jpeg')
+            if not caminho_arquivo:
+                # Sem derivado: enviar o original
+                caminho_arquivo = imagem_field.path
+                
+                if not os.path.exists(caminho_arquivo):
+                    logger.error(f"Arquivo de imagem não encontrado: {caminho_arquivo}")
+                    return None, None
+                
+                # Determinar o mimetype baseado na extensão
+                extensao = os.path.splitext(caminho_arquivo)[1].lower()
+                mimetypes = {
+                    '.jpg': 'image/jpeg',
+                    '.jpeg': 'image/jpeg',
+                    '.png': 'image/png',
+                    '.gif': 'image/gif',
+                    '.webp': 'image/webp'
+                }
+                mimetype = mimetypes.get(extensao, 'image/jpeg')
             
             # Ler e converter para base64
             with open(caminho_arquivo, 'rb') as f:
@@ -237,7 +254,9 @@ class CampaignService:
         # Atualizar status
         campanha.status = 'enviando'
         campanha.iniciado_em = timezone.now()
-        campanha.save()
+        # update_fields: os contadores de recibos (entregues/lidas) são
+        # atualizados em paralelo pelo webhook e não podem ser sobrescritos
+        escrever(campanha.save, update_fields=['status', 'iniciado_em', 'updated_at'])
         
         logger.info(f"[Campanha {campanha.id}] Iniciando envio para {campanha.total_destinatarios} destinatários")
         
@@ -248,12 +267,13 @@ class CampaignService:
         ).select_related('cliente')
         
         contador_lote = 0
+        imagem_base64, mimetype = None, None
         
         for msg in mensagens:
             # Verificar se deve parar
             if self._stop_requested:
                 campanha.status = 'pausada'
-                campanha.save()
+                escrever(campanha.save, update_fields=['status', 'updated_at'])
                 logger.info(f"[Campanha {campanha.id}] Pausada pelo usuário")
                 break
             
@@ -263,27 +283,29 @@ class CampaignService:
             
             # Atualizar status para enviando
             msg.status = 'enviando'
-            msg.save()
+            escrever(msg.save, update_fields=['status'])
             
             # Enviar mensagem
             if campanha.imagem:
-                # Se tem imagem, converter para base64 e enviar com legenda
-                imagem_base64, mimetype = self.converter_imagem_para_base64(campanha.imagem)
+                # Se tem imagem, enviar com legenda (base64 convertido uma vez por execução)
+                if imagem_base64 is None:
+                    imagem_base64, mimetype = self.converter_imagem_para_base64(campanha.imagem)
                 
                 if imagem_base64:
-                    sucesso, erro = self.enviar_mensagem_imagem(telefone, imagem_base64, texto_personalizado, mimetype)
+                    sucesso, erro, message_id = self.enviar_mensagem_imagem(telefone, imagem_base64, texto_personalizado, mimetype)
                 else:
                     # Falha ao converter imagem, enviar apenas texto
                     logger.warning(f"[Campanha {campanha.id}] Falha ao converter imagem, enviando apenas texto")
-                    sucesso, erro = self.enviar_mensagem_texto(telefone, texto_personalizado)
+                    sucesso, erro, message_id = self.enviar_mensagem_texto(telefone, texto_personalizado)
             else:
                 # Apenas texto
-                sucesso, erro = self.enviar_mensagem_texto(telefone, texto_personalizado)
+                sucesso, erro, message_id = self.enviar_mensagem_texto(telefone, texto_personalizado)
             
             # Atualizar resultado
             if sucesso:
                 msg.status = 'enviado'
                 msg.enviado_em = timezone.now()
+                msg.provider_message_id = message_id or ""
                 campanha.enviados += 1
                 logger.info(f"[Campanha {campanha.id}] Mensagem enviada para {cliente.nome} ({telefone})")
             else:
@@ -292,8 +314,8 @@ class CampaignService:
                 campanha.falhas += 1
                 logger.warning(f"[Campanha {campanha.id}] Falha ao enviar para {cliente.nome}: {erro}")
             
-            msg.save()
-            campanha.save()
+            escrever(msg.save, update_fields=['status', 'enviado_em', 'provider_message_id', 'erro_mensagem'])
+            escrever(campanha.save, update_fields=['enviados', 'falhas', 'updated_at'])
             
             contador_lote += 1
             
@@ -312,7 +334,7 @@ class CampaignService:
         if not self._stop_requested:
             campanha.status = 'concluida'
             campanha.concluido_em = timezone.now()
-            campanha.save()
+            escrever(campanha.save, update_fields=['status', 'concluido_em', 'updated_at'])
             logger.info(f"[Campanha {campanha.id}] Concluída! Enviados: {campanha.enviados}, Falhas: {campanha.falhas}")
         
         # Remover da lista de campanhas em execução
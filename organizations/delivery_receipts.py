@@ -0,0 +1,223 @@
+"""
+Recibos de entrega/leitura das mensagens de campanha (eventos
+MESSAGES_UPDATE da Evolution, ver webhooks.views.evolution_event).
+
+O webhook só registra o recibo em memória e responde; uma thread grava os
+recibos acumulados a cada `INTERVALO` segundos (ou assim que passam de
+`TAMANHO_LOTE`). Cada gravação:
+
+- resolve os `provider_message_id` recebidos para (mensagem, campanha)
+  com uma consulta por bloco;
+- marca entregue_em/lido_em/falhou_em com um UPDATE por campanha e tipo,
+  só nas mensagens em que o campo ainda está vazio (o número de linhas
+  afetadas é o incremento exato do contador, mesmo com recibos repetidos
+  ou workers gravando ao mesmo tempo);
+- soma esses incrementos em CampanhaWhatsApp.entregues/lidas com F().
+
+Um recibo pode chegar antes do envio gravar o provider_message_id; os que
+não encontram mensagem ficam para as próximas `MAX_TENTATIVAS` gravações.
+
+Os recibos pendentes só existem na memória do processo. No encerramento
+normal (SIGTERM do gunicorn ao worker, fim do runserver) um handler de
+atexit espera a gravação em andamento e grava o que sobrou. Se o processo
+morre sem passar pelo atexit (SIGKILL, OOM, graceful timeout estourado),
+perdem-se os recibos do último `INTERVALO` (até `TAMANHO_LOTE`) e os que
+ainda esperavam o provider_message_id; as mensagens ficam sem
+entregue_em/lido_em e os contadores da campanha, um pouco abaixo.
+"""
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.db import close_old_connections, transaction
+from django.db.models import Case, DateTimeField, F, Value, When
+from django.utils import timezone
+
+from core.db import escrever
+
+logger = logging.getLogger(__name__)
+
+INTERVALO = 1.0
+TAMANHO_LOTE = 500
+MAX_TENTATIVAS = 30
+
+ENTREGUE, LIDO, FALHA = "entregue", "lido", "falha"
+CAMPOS = {ENTREGUE: "entregue_em", LIDO: "lido_em", FALHA: "falhou_em"}
+CONTADORES = {ENTREGUE: "entregues", LIDO: "lidas"}
+
+# Status da Evolution (v2 em texto, v1 numérico) -> tipo de recibo
+STATUS_EVOLUTION = {
+    "DELIVERY_ACK": ENTREGUE, 3: ENTREGUE,
+    "READ": LIDO, 4: LIDO,
+    "PLAYED": LIDO, 5: LIDO,
+    "ERROR": FALHA, 0: FALHA,
+}
+
+_lock = threading.Lock()
+# provider_message_id -> {"tipos": {tipo: quando}, "tentativas": n}
+_pendentes = {}
+_sinal = threading.Event()
+_thread = None
+# Uma gravação por vez: o atexit espera a da thread terminar
+_gravacao = threading.Lock()
+
+
+def tipo_do_status(status):
+    """Tipo de recibo de um status da Evolution, ou None (PENDING, SERVER_ACK...)."""
+    if isinstance(status, str):
+        status = int(status) if status.isdigit() else status.upper()
+    return STATUS_EVOLUTION.get(status)
+
+
+def registrar(recibos):
+    """
+    Acumula recibos para a próxima gravação.
+
+    Args:
+        recibos: iterável de (provider_message_id, tipo, quando)
+    """
+    total = 0
+    with _lock:
+        for message_id, tipo, quando in recibos:
+            pendente = _pendentes.setdefault(message_id, {"tipos": {}, "tentativas": 0})
+            anterior = pendente["tipos"].get(tipo)
+            pendente["tipos"][tipo] = min(anterior, quando) if anterior else quando
+            total += 1
+        cheio = len(_pendentes) >= TAMANHO_LOTE
+    if total:
+        _iniciar_thread()
+        if cheio:
+            _sinal.set()
+    return total
+
+
+def _iniciar_thread():
+    global _thread
+    with _lock:
+        if _thread is not None and _thread.is_alive():
+            return
+        if _thread is None:
+            atexit.register(_gravar_ao_sair)
+        _thread = threading.Thread(target=_loop, name="recibos-campanha", daemon=True)
+        _thread.start()
+
+
+def _loop():
+    while True:
+        _sinal.wait(INTERVALO)
+        _sinal.clear()
+        close_old_connections()
+        try:
+            gravar_pendentes()
+        except Exception:
+            logger.exception("Erro ao gravar recibos de campanha")
+        finally:
+            close_old_connections()
+
+
+def _gravar_ao_sair():
+    """Grava os recibos pendentes no encerramento do processo."""
+    try:
+        gravar_pendentes()
+    except Exception:
+        logger.exception("Erro ao gravar recibos de campanha no encerramento")
+    finally:
+        close_old_connections()
+    if _pendentes:
+        logger.warning("%d recibo(s) de campanha sem mensagem descartados no encerramento", len(_pendentes))
+
+
+def gravar_pendentes():
+    """
+    Grava os recibos acumulados.
+
+    Returns:
+        dict campanha_id -> {"entregues": n, "lidas": n} com os incrementos
+    """
+    with _gravacao:
+        return _gravar_pendentes()
+
+
+def _gravar_pendentes():
+    with _lock:
+        lote = dict(_pendentes)
+        _pendentes.clear()
+    if not lote:
+        return {}
+
+    try:
+        encontrados, incrementos = escrever(_aplicar, lote)
+    except Exception:
+        # Banco indisponível (ex.: ainda travado depois dos retries): o lote
+        # volta inteiro para a próxima gravação, sem gastar tentativa
+        _devolver(lote)
+        raise
+
+    # Mensagens ainda sem provider_message_id gravado: tenta de novo depois
+    restantes = {}
+    for message_id, pendente in lote.items():
+        if message_id in encontrados:
+            continue
+        pendente["tentativas"] += 1
+        if pendente["tentativas"] < MAX_TENTATIVAS:
+            restantes[message_id] = pendente
+    _devolver(restantes)
+    return incrementos
+
+
+def _devolver(lote):
+    """Junta recibos de volta aos pendentes (que podem ter recebido novos)."""
+    with _lock:
+        for message_id, pendente in lote.items():
+            atual = _pendentes.setdefault(message_id, {"tipos": {}, "tentativas": 0})
+            atual["tentativas"] = max(atual["tentativas"], pendente["tentativas"])
+            for tipo, quando in pendente["tipos"].items():
+                atual["tipos"].setdefault(tipo, quando)
+
+
+def _aplicar(lote):
+    from .models import CampanhaWhatsApp, MensagemCampanha
+
+    ids = list(lote)
+    campanha_de = {}
+    for inicio in range(0, len(ids), TAMANHO_LOTE):
+        campanha_de.update(
+            MensagemCampanha.objects.filter(provider_message_id__in=ids[inicio:inicio + TAMANHO_LOTE])
+            .values_list("provider_message_id", "campanha_id")
+        )
+
+    # (campanha, tipo) -> {message_id: quando}; mensagem lida também foi
+    # entregue (o DELIVERY_ACK pode nem chegar)
+    por_campanha = defaultdict(dict)
+    for message_id, campanha_id in campanha_de.items():
+        tipos = lote[message_id]["tipos"]
+        for tipo, quando in tipos.items():
+            por_campanha[(campanha_id, tipo)][message_id] = quando
+        if LIDO in tipos:
+            por_campanha[(campanha_id, ENTREGUE)].setdefault(message_id, tipos[LIDO])
+
+    incrementos = defaultdict(dict)
+    with transaction.atomic():
+        # Entregue antes de lido, para a ordem dos contadores fazer sentido
+        for (campanha_id, tipo), mensagens in sorted(por_campanha.items(), key=lambda item: item[0][1] != ENTREGUE):
+            campo = CAMPOS[tipo]
+            itens = list(mensagens.items())
+            afetadas = 0
+            for inicio in range(0, len(itens), TAMANHO_LOTE):
+                bloco = itens[inicio:inicio + TAMANHO_LOTE]
+                afetadas += MensagemCampanha.objects.filter(
+                    campanha_id=campanha_id,
+                    provider_message_id__in=[mid for mid, _ in bloco],
+                    **{f"{campo}__isnull": True},
+                ).update(**{campo: Case(
+                    *[When(provider_message_id=mid, then=Value(quando)) for mid, quando in bloco],
+                    output_field=DateTimeField(),
+                )})
+            contador = CONTADORES.get(tipo)
+            if contador and afetadas:
+                CampanhaWhatsApp.objects.filter(pk=campanha_id).update(
+                    **{contador: F(contador) + afetadas, "updated_at": timezone.now()}
+                )
+                incrementos[campanha_id][contador] = afetadas
+    return set(campanha_de), dict(incrementos)
@@ -0,0 +1,172 @@
+"""
+Derivados de imagens de produtos, promoções e campanhas.
+
+As imagens enviadas pelos usuários (muitas vezes fotos de celular com
+vários MB) ganham versões reduzidas:
+
+- thumb: miniatura para listagens (WebP, até 320px)
+- web: página/catálogo (WebP, até 1280px)
+- whatsapp: envio pelo WhatsApp e links do catálogo do n8n (JPEG, até 1600px)
+
+Os derivados ficam em `derivados/<pasta do original>/` com um hash do
+original (nome, tamanho e data) no nome do arquivo, então podem ser
+servidos com cache imutável e nunca ficam desatualizados quando a imagem é
+substituída. São gerados em background após o upload (ver signals em
+organizations.apps) e, se ainda não existirem, na primeira vez em que
+forem pedidos.
+"""
+import hashlib
+import io
+import logging
+import os
+import posixpath
+import threading
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+DERIVADOS_DIR = "derivados"
+
+# nome: (lado máximo em px, formato Pillow, extensão, qualidade)
+VARIANTES = {
+    "thumb": (320, "WEBP", "webp", 80),
+    "web": (1280, "WEBP", "webp", 82),
+    "whatsapp": (1600, "JPEG", "jpg", 82),
+}
+
+MIMETYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+_geracao_lock = threading.Lock()
+
+
+def _assinatura(imagem_field):
+    """Hash curto do original (nome, tamanho e mtime), sem ler o arquivo."""
+    storage = imagem_field.storage
+    try:
+        tamanho = storage.size(imagem_field.name)
+        modificado = storage.get_modified_time(imagem_field.name).timestamp()
+    except (OSError, NotImplementedError):
+        tamanho, modificado = 0, 0
+    chave = f"{imagem_field.name}:{tamanho}:{modificado}"
+    return hashlib.sha1(chave.encode("utf-8")).hexdigest()[:10]
+
+
+def nome_derivado(imagem_field, variante):
+    """Nome (no storage) do derivado de `imagem_field` para a variante."""
+    _, _, extensao, _ = VARIANTES[variante]
+    pasta, arquivo = posixpath.split(imagem_field.name)
+    base = os.path.splitext(arquivo)[0]
+    return posixpath.join(
+        DERIVADOS_DIR, pasta, f"{base}.{variante}.{_assinatura(imagem_field)}.{extensao}"
+    )
+
+
+def gerar_derivado(imagem_field, variante):
+    """
+    Gera (se ainda não existir) o derivado e retorna seu nome no storage.
+    """
+    from PIL import Image, ImageOps
+
+    nome = nome_derivado(imagem_field, variante)
+    storage = imagem_field.storage
+    if storage.exists(nome):
+        return nome
+
+    lado, formato, _, qualidade = VARIANTES[variante]
+    with storage.open(imagem_field.name, "rb") as original:
+        imagem = Image.open(original)
+        imagem = ImageOps.exif_transpose(imagem)
+        imagem.thumbnail((lado, lado), Image.LANCZOS)
+
+        if formato == "JPEG" and imagem.mode != "RGB":
+            fundo = Image.new("RGB", imagem.size, (255, 255, 255))
+            if imagem.mode in ("RGBA", "LA", "P"):
+                imagem = imagem.convert("RGBA")
+                fundo.paste(imagem, mask=imagem.getchannel("A"))
+            else:
+                fundo.paste(imagem.convert("RGB"))
+            imagem = fundo
+        elif imagem.mode not in ("RGB", "RGBA"):
+            imagem = imagem.convert("RGBA" if "A" in imagem.getbands() else "RGB")
+
+        buffer = io.BytesIO()
+        imagem.save(buffer, formato, quality=qualidade, optimize=True)
+
+    with _geracao_lock:
+        if not storage.exists(nome):
+            storage.save(nome, ContentFile(buffer.getvalue()))
+    return nome
+
+
+def url_variante(imagem_field, variante):
+    """
+    URL do derivado, gerando-o na primeira vez. Em caso de erro (arquivo
+    ausente, formato não suportado), devolve a URL do original.
+    """
+    if not imagem_field:
+        return ""
+    try:
+        return imagem_field.storage.url(gerar_derivado(imagem_field, variante))
+    except Exception as e:
+        logger.warning(f"Falha ao gerar derivado '{variante}' de {imagem_field.name}: {e}")
+        try:
+            return imagem_field.url
+        except ValueError:
+            return ""
+
+
+def arquivo_variante(imagem_field, variante):
+    """
+    Caminho local e mimetype do derivado (para envio em base64).
+
+    Returns:
+        (caminho, mimetype) ou (None, None) se não for possível gerar
+    """
+    try:
+        nome = gerar_derivado(imagem_field, variante)
+        return imagem_field.storage.path(nome), MIMETYPES[VARIANTES[variante][1]]
+    except Exception as e:
+        logger.warning(f"Falha ao gerar derivado '{variante}' de {imagem_field.name}: {e}")
+        return None, None
+
+
+def gerar_derivados(imagem_field):
+    """Gera todas as variantes de uma imagem."""
+    for variante in VARIANTES:
+        try:
+            gerar_derivado(imagem_field, variante)
+        except Exception as e:
+            logger.warning(f"Falha ao gerar derivado '{variante}' de {imagem_field.name}: {e}")
+
+
+def gerar_derivados_background(imagem_field):
+    """Agenda a geração das variantes para depois do commit, em uma thread."""
+    if not imagem_field:
+        return
+
+    def iniciar():
+        threading.Thread(
+            target=gerar_derivados, args=(imagem_field,), name="image-derivatives", daemon=True
+        ).start()
+
+    transaction.on_commit(iniciar)
+
+
+def remover_derivados(imagem_field):
+    """Remove todos os derivados de uma imagem (ao excluir ou substituir o original)."""
+    if not imagem_field:
+        return
+    storage = imagem_field.storage
+    pasta, arquivo = posixpath.split(imagem_field.name)
+    base = os.path.splitext(arquivo)[0]
+    pasta_derivados = posixpath.join(DERIVADOS_DIR, pasta)
+    try:
+        _, arquivos = storage.listdir(pasta_derivados)
+    except (OSError, NotImplementedError):
+        return
+    prefixos = tuple(f"{base}.{variante}." for variante in VARIANTES)
+    for nome in arquivos:
+        if nome.startswith(prefixos):
+            storage.delete(posixpath.join(pasta_derivados, nome))
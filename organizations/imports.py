@@ -0,0 +1,518 @@
+"""
+Importações em lote: produtos (planilha Excel) e clientes (CSV).
+
+Produtos: as linhas são lidas em streaming (``load_workbook(read_only=True)``) e
+processadas em lotes de ``BATCH_SIZE``: cada lote é validado/normalizado
+de uma vez, comparado com um mapa ``{nome: Produto}`` carregado no início
+(uma única query) e gravado com ``bulk_create``/``bulk_update`` em uma
+transação. Linhas inválidas não interrompem a importação; vão para o
+relatório de erros com o número da linha.
+
+Planilhas acima de ``ASYNC_THRESHOLD_BYTES`` são importadas em uma thread
+em segundo plano; o progresso e o resultado ficam no cache compartilhado
+(visível para todos os workers) por ``JOB_TTL`` segundos.
+
+Clientes: o CSV é decodificado em streaming (a codificação é detectada
+pelos primeiros bytes), os telefones são normalizados para E.164 e
+deduplicados contra o próprio arquivo e contra os números já cadastrados
+(coluna indexada ``Cliente.whatsapp_e164``); os novos vão em
+``bulk_create`` em blocos, com ``ignore_conflicts`` para o caso de
+cadastros concorrentes.
+"""
+import codecs
+import csv
+import io
+import logging
+import os
+import re
+import tempfile
+import threading
+import uuid
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from core.phones import normalizar_whatsapp
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 1000
+
+# Acima deste tamanho de arquivo a importação vai para segundo plano
+ASYNC_THRESHOLD_BYTES = getattr(settings, 'PRODUTOS_IMPORT_ASYNC_THRESHOLD_BYTES', 512 * 1024)
+
+JOB_TTL = 24 * 60 * 60
+
+# O relatório guarda no máximo este número de erros
+MAX_ERROS = 500
+
+_JOB_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+
+COLUNAS = {
+    'nome': ['nome', 'name', 'produto', 'product'],
+    'descricao': ['descrição', 'descricao', 'description', 'desc'],
+    'preco': ['preço', 'preco', 'price', 'valor', 'value', 'r$'],
+    'categoria': ['categoria', 'category', 'tipo', 'type'],
+}
+
+
+class ImportacaoError(Exception):
+    """Arquivo que não pode ser importado (ex: sem coluna de nome)."""
+
+
+def chave_nome(nome):
+    """Chave de comparação de nomes de produto: sem espaços extras nem caixa."""
+    return " ".join(nome.split()).casefold()
+
+
+def mapa_produtos(padaria):
+    """{chave_nome: Produto} com os produtos atuais da padaria (uma query)."""
+    from .models import Produto
+
+    mapa = {}
+    for produto in Produto.objects.filter(padaria=padaria).order_by('id'):
+        mapa.setdefault(chave_nome(produto.nome), produto)
+    return mapa
+
+
+def mapear_colunas(cabecalho):
+    """
+    Índices das colunas a partir da linha de cabeçalho (matching flexível,
+    como 'Preço (R$)' ou 'Nome do produto').
+    """
+    indices = {}
+    for i, valor in enumerate(cabecalho):
+        titulo = str(valor).strip().lower() if valor is not None else ''
+        for campo, palavras in COLUNAS.items():
+            if campo not in indices and any(palavra in titulo for palavra in palavras):
+                indices[campo] = i
+                break
+    if 'nome' not in indices:
+        raise ImportacaoError("Coluna 'Nome' não encontrada na planilha. Verifique o cabeçalho.")
+    return indices
+
+
+def _valor(linha, indice):
+    if indice is None or indice >= len(linha):
+        return None
+    return linha[indice]
+
+
+def _preco(valor):
+    if valor is None or valor == '':
+        return None
+    if isinstance(valor, bool):
+        raise ValueError(f"preço inválido: {valor!r}")
+    if isinstance(valor, (int, float, Decimal)):
+        preco = Decimal(str(valor))
+    else:
+        texto = str(valor).replace('R$', '').replace(' ', '').strip()
+        if ',' in texto:
+            # 1.234,56 -> 1234.56
+            texto = texto.replace('.', '').replace(',', '.')
+        try:
+            preco = Decimal(texto)
+        except InvalidOperation:
+            raise ValueError(f"preço inválido: {valor!r}")
+    if preco < 0 or preco >= Decimal('100000000'):
+        raise ValueError(f"preço fora do intervalo: {valor!r}")
+    return preco.quantize(Decimal('0.01'))
+
+
+def normalizar_lote(linhas, indices):
+    """
+    Valida e normaliza um lote de linhas da planilha.
+
+    Args:
+        linhas: lista de (numero_da_linha, tupla de valores)
+        indices: resultado de `mapear_colunas`
+
+    Returns:
+        (validos, erros, vazias): dicts com os campos de Produto (mais
+        'linha'), lista de {'linha', 'erro'} e número de linhas sem nome
+    """
+    validos, erros, vazias = [], [], 0
+    coluna = {campo: indices.get(campo) for campo in COLUNAS}
+    for numero, linha in linhas:
+        nome = _valor(linha, coluna['nome'])
+        nome = " ".join(str(nome).split()) if nome is not None else ''
+        if not nome:
+            vazias += 1
+            continue
+        try:
+            if len(nome) > 200:
+                raise ValueError("nome com mais de 200 caracteres")
+            categoria = str(_valor(linha, coluna['categoria']) or '').strip()
+            if len(categoria) > 100:
+                raise ValueError("categoria com mais de 100 caracteres")
+            validos.append({
+                'linha': numero,
+                'nome': nome,
+                'descricao': str(_valor(linha, coluna['descricao']) or '').strip(),
+                'preco': _preco(_valor(linha, coluna['preco'])),
+                'categoria': categoria,
+            })
+        except ValueError as e:
+            erros.append({'linha': numero, 'erro': str(e)})
+    return validos, erros, vazias
+
+
+def gravar_lote(padaria, validos, existentes):
+    """
+    Cria/atualiza os produtos de um lote com bulk_create/bulk_update.
+
+    Mesmo comportamento do antigo update_or_create por linha: descrição e
+    preço são sobrescritos, a categoria só quando informada e o produto
+    volta a ficar ativo. Se o nome se repete no lote, vale a última linha.
+    `existentes` (o mapa de `mapa_produtos`) é atualizado com os criados.
+
+    Returns:
+        (criados, atualizados)
+    """
+    from admin_panel import metrics
+    from .models import Produto
+
+    agora = timezone.now()
+    novos, atualizados = {}, {}
+    for dados in validos:
+        chave = chave_nome(dados['nome'])
+        produto = existentes.get(chave) or novos.get(chave)
+        if produto is None:
+            novos[chave] = Produto(
+                padaria=padaria,
+                nome=dados['nome'],
+                descricao=dados['descricao'],
+                preco=dados['preco'],
+                categoria=dados['categoria'],
+                ativo=True,
+            )
+            continue
+        produto.descricao = dados['descricao']
+        produto.preco = dados['preco']
+        if dados['categoria']:
+            produto.categoria = dados['categoria']
+        produto.ativo = True
+        if produto.pk:
+            produto.updated_at = agora
+            atualizados[produto.pk] = produto
+
+    with transaction.atomic():
+        if atualizados:
+            Produto.objects.bulk_update(
+                list(atualizados.values()),
+                ['descricao', 'preco', 'categoria', 'ativo', 'updated_at'],
+                batch_size=BATCH_SIZE,
+            )
+        if novos:
+            Produto.objects.bulk_create(list(novos.values()), batch_size=BATCH_SIZE)
+            # bulk_create não dispara post_save
+            metrics.incrementar(metrics.PRODUTOS_TOTAL, len(novos))
+
+    existentes.update(novos)
+    return len(novos), len(atualizados)
+
+
+def importar_planilha(arquivo, padaria, progresso=None):
+    """
+    Importa os produtos de uma planilha Excel.
+
+    Args:
+        arquivo: caminho ou arquivo aberto (.xlsx)
+        padaria: Padaria de destino
+        progresso: callable(linhas_processadas, total_estimado), opcional
+
+    Returns:
+        dict com 'criados', 'atualizados', 'vazias', 'linhas', 'erros'
+        (lista de {'linha', 'erro'}, até MAX_ERROS) e 'total_erros'
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        ws = wb.active
+        linhas = ws.iter_rows(values_only=True)
+        cabecalho = next(linhas, None)
+        if cabecalho is None:
+            raise ImportacaoError("A planilha está vazia.")
+        indices = mapear_colunas(cabecalho)
+        total_estimado = max((ws.max_row or 1) - 1, 0)
+
+        existentes = mapa_produtos(padaria)
+        resultado = {'criados': 0, 'atualizados': 0, 'vazias': 0, 'linhas': 0, 'erros': [], 'total_erros': 0}
+
+        def processar(lote):
+            validos, erros, vazias = normalizar_lote(lote, indices)
+            criados, atualizados = gravar_lote(padaria, validos, existentes)
+            resultado['criados'] += criados
+            resultado['atualizados'] += atualizados
+            resultado['vazias'] += vazias
+            resultado['linhas'] += len(lote)
+            resultado['total_erros'] += len(erros)
+            resultado['erros'].extend(erros[:MAX_ERROS - len(resultado['erros'])])
+            if progresso:
+                progresso(resultado['linhas'], total_estimado)
+
+        lote = []
+        for numero, linha in enumerate(linhas, start=2):
+            lote.append((numero, linha))
+            if len(lote) >= BATCH_SIZE:
+                processar(lote)
+                lote = []
+        if lote:
+            processar(lote)
+    finally:
+        wb.close()
+
+    return resultado
+
+
+# =============================================================================
+# Importação em segundo plano
+# =============================================================================
+
+def _chave_job(job_id):
+    return f'importacao_produtos:{job_id}'
+
+
+def status_importacao(job_id):
+    """
+    Estado de uma importação em segundo plano, ou None se o job não existe:
+    {'status': 'processando'|'pronto'|'erro', 'progresso', 'resultado', 'erro', ...}
+    """
+    if not job_id or not _JOB_ID_RE.match(job_id):
+        return None
+    return cache.get(_chave_job(job_id))
+
+
+def _atualizar_job(job_id, **campos):
+    estado = cache.get(_chave_job(job_id)) or {}
+    estado.update(campos)
+    cache.set(_chave_job(job_id), estado, JOB_TTL)
+
+
+def _executar_importacao(job_id, caminho, padaria_id, user_id, nome_arquivo):
+    """Execução da importação na thread de segundo plano."""
+    from django.contrib.auth.models import User
+    from .models import Padaria
+
+    close_old_connections()
+    try:
+        padaria = Padaria.objects.get(pk=padaria_id)
+
+        def progresso(processadas, total):
+            _atualizar_job(job_id, progresso=min(int(processadas * 100 / total), 99) if total else 0)
+
+        resultado = importar_planilha(caminho, padaria, progresso)
+        usuario = User.objects.filter(pk=user_id).first()
+        concluir_importacao(padaria, usuario, nome_arquivo, resultado)
+        _atualizar_job(job_id, status='pronto', progresso=100, resultado=resultado)
+        logger.info(f"[Importação {job_id}] Concluída: {resultado['criados']} criados, "
+                    f"{resultado['atualizados']} atualizados, {resultado['total_erros']} erros")
+    except Exception as e:
+        logger.error(f"[Importação {job_id}] Erro ao importar planilha: {e}")
+        _atualizar_job(job_id, status='erro', erro=str(e))
+    finally:
+        os.unlink(caminho)
+        close_old_connections()
+
+
+def iniciar_importacao_background(arquivo, padaria, user):
+    """
+    Copia o upload para um arquivo temporário e importa em uma thread.
+
+    Returns:
+        str: id do job, usado para acompanhar o progresso
+    """
+    with tempfile.NamedTemporaryFile(suffix='.xlsx', delete=False) as destino:
+        for bloco in arquivo.chunks():
+            destino.write(bloco)
+
+    job_id = uuid.uuid4().hex
+    cache.set(_chave_job(job_id), {
+        'status': 'processando',
+        'progresso': 0,
+        'padaria_id': padaria.pk,
+        'user_id': user.pk,
+        'arquivo': arquivo.name,
+    }, JOB_TTL)
+
+    threading.Thread(
+        target=_executar_importacao,
+        args=(job_id, destino.name, padaria.pk, user.pk, arquivo.name),
+        name=f"ProdutosImport-{job_id[:8]}",
+        daemon=True,
+    ).start()
+    return job_id
+
+
+def concluir_importacao(padaria, user, nome_arquivo, resultado):
+    """Auditoria e webhook do catálogo para o n8n após uma importação."""
+    from audit.models import AuditLog
+    from .views import send_products_webhook
+
+    if not (resultado['criados'] or resultado['atualizados']):
+        return
+    AuditLog.log(
+        action="import_excel",
+        entity="Produto",
+        padaria=padaria,
+        actor=user,
+        entity_id=None,
+        diff={
+            "excel_filename": nome_arquivo,
+            "produtos_importados": resultado['criados'],
+            "produtos_atualizados": resultado['atualizados'],
+            "erros": resultado['total_erros'],
+        }
+    )
+    # Enviar webhook para atualizar RAG do N8N
+    send_products_webhook(padaria, user, action="products_imported_excel")
+
+
+# =============================================================================
+# Clientes (CSV)
+# =============================================================================
+
+CSV_AMOSTRA_BYTES = 64 * 1024
+
+COLUNAS_CLIENTE = {
+    'nome': ['nome', 'name', 'cliente'],
+    'telefone': ['telefone', 'celular', 'whatsapp', 'fone', 'phone'],
+    'email': ['email', 'e-mail', 'mail'],
+}
+
+
+def detectar_codificacao(amostra):
+    """
+    Codificação do CSV a partir dos primeiros bytes: BOM, UTF-8 válido ou
+    cp1252 (padrão do Excel em português).
+    """
+    if amostra.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if amostra.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+    try:
+        # final=False: a amostra pode terminar no meio de um caractere
+        codecs.getincrementaldecoder('utf-8')().decode(amostra, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return 'cp1252'
+
+
+def _abrir_csv(arquivo):
+    """DictReader sobre o upload, decodificado em streaming."""
+    binario = getattr(arquivo, 'file', arquivo)
+    binario.seek(0)
+    amostra = binario.read(CSV_AMOSTRA_BYTES)
+    binario.seek(0)
+
+    codificacao = detectar_codificacao(amostra)
+    texto = io.TextIOWrapper(binario, encoding=codificacao, errors='replace', newline='')
+    try:
+        dialeto = csv.Sniffer().sniff(amostra.decode(codificacao, errors='ignore')[:4096], delimiters=',;\t')
+    except csv.Error:
+        dialeto = csv.excel
+    return texto, csv.reader(texto, dialeto)
+
+
+def _mapear_colunas_cliente(cabecalho):
+    indices = {}
+    for i, valor in enumerate(cabecalho):
+        titulo = (valor or '').strip().lower()
+        for campo, palavras in COLUNAS_CLIENTE.items():
+            if campo not in indices and titulo in palavras:
+                indices[campo] = i
+                break
+    faltando = [campo for campo in ('nome', 'telefone') if campo not in indices]
+    if faltando:
+        raise ImportacaoError(f"Coluna(s) obrigatória(s) ausente(s) no CSV: {', '.join(faltando)}.")
+    return indices
+
+
+def telefones_cadastrados(padaria):
+    """Conjunto com os WhatsApp (E.164) já cadastrados na padaria."""
+    from .models import Cliente
+
+    return set(
+        Cliente.objects.filter(padaria=padaria).exclude(whatsapp_e164="")
+        .values_list('whatsapp_e164', flat=True).iterator()
+    )
+
+
+def importar_clientes_csv(arquivo, padaria, batch_size=BATCH_SIZE):
+    """
+    Importa clientes de um CSV (colunas nome, telefone e, opcional, email).
+
+    Returns:
+        dict com 'importados', 'duplicados', 'linhas', 'erros'
+        (lista de {'linha', 'erro'}, até MAX_ERROS) e 'total_erros'
+    """
+    from admin_panel import metrics
+    from .models import Cliente
+
+    texto, leitor = _abrir_csv(arquivo)
+    try:
+        cabecalho = next(leitor, None)
+        if not cabecalho:
+            raise ImportacaoError("O arquivo CSV está vazio.")
+        indices = _mapear_colunas_cliente(cabecalho)
+
+        vistos = telefones_cadastrados(padaria)
+        antes = Cliente.objects.filter(padaria=padaria).count()
+        resultado = {'importados': 0, 'duplicados': 0, 'linhas': 0, 'erros': [], 'total_erros': 0}
+
+        def erro(numero, mensagem):
+            resultado['total_erros'] += 1
+            if len(resultado['erros']) < MAX_ERROS:
+                resultado['erros'].append({'linha': numero, 'erro': mensagem})
+
+        lote = []
+        for numero, linha in enumerate(leitor, start=2):
+            if not any(valor.strip() for valor in linha):
+                continue
+            resultado['linhas'] += 1
+            nome = _valor(linha, indices['nome'])
+            nome = " ".join(nome.split()) if nome else ''
+            telefone = (_valor(linha, indices['telefone']) or '').strip()
+            if not nome or not telefone:
+                erro(numero, "nome e telefone são obrigatórios")
+                continue
+            e164 = normalizar_whatsapp(telefone)
+            if not e164:
+                erro(numero, f"telefone inválido: {telefone!r}")
+                continue
+            if e164 in vistos:
+                resultado['duplicados'] += 1
+                continue
+            vistos.add(e164)
+
+            email = (_valor(linha, indices.get('email')) or '').strip()
+            try:
+                if email:
+                    validate_email(email)
+            except ValidationError:
+                email = ''
+            # bulk_create não chama save(): o E.164 vai preenchido aqui
+            lote.append(Cliente(
+                padaria=padaria, nome=nome[:200], telefone=telefone[:20], whatsapp_e164=e164,
+                email=email, aceita_promocoes=True,
+            ))
+            if len(lote) >= batch_size:
+                Cliente.objects.bulk_create(lote, ignore_conflicts=True)
+                lote = []
+        if lote:
+            Cliente.objects.bulk_create(lote, ignore_conflicts=True)
+    finally:
+        # Não fecha o upload junto com o wrapper de texto
+        texto.detach()
+
+    # ignore_conflicts não informa quantos entraram: conta pela diferença
+    resultado['importados'] = Cliente.objects.filter(padaria=padaria).count() - antes
+    # bulk_create não dispara post_save
+    metrics.incrementar(metrics.CLIENTES_TOTAL, resultado['importados'])
+    return resultado
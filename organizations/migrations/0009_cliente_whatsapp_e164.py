@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:22
+
+from django.db import migrations, models
+
+from core.phones import normalizar_whatsapp
+
+BATCH_SIZE = 2000
+
+
+def preencher_whatsapp(apps, schema_editor):
+    """
+    Calcula o E.164 dos clientes existentes, em blocos por id. Quando dois
+    clientes da mesma padaria têm o mesmo número em formatos diferentes,
+    só o mais antigo recebe o E.164 (o índice único exige isso).
+    """
+    Cliente = apps.get_model('organizations', 'Cliente')
+
+    vistos = set()
+    ultimo_id = 0
+    while True:
+        lote = list(
+            Cliente.objects.filter(pk__gt=ultimo_id).order_by('pk').only('pk', 'padaria_id', 'telefone')[:BATCH_SIZE]
+        )
+        if not lote:
+            break
+        alterados = []
+        for cliente in lote:
+            e164 = normalizar_whatsapp(cliente.telefone)
+            if e164 and (cliente.padaria_id, e164) not in vistos:
+                vistos.add((cliente.padaria_id, e164))
+                cliente.whatsapp_e164 = e164
+                alterados.append(cliente)
+        Cliente.objects.bulk_update(alterados, ['whatsapp_e164'])
+        ultimo_id = lote[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0008_add_socio_responsavel_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='whatsapp_e164',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Calculado a partir do telefone ao salvar, ex: +5511999999999', max_length=16, verbose_name='WhatsApp (E.164)'),
+        ),
+        migrations.RunPython(preencher_whatsapp, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cliente',
+            constraint=models.UniqueConstraint(condition=models.Q(('whatsapp_e164', ''), _negated=True), fields=('padaria', 'whatsapp_e164'), name='cliente_whatsapp_unico_por_padaria'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('organizations', '0009_cliente_whatsapp_e164'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campanhawhatsapp',
+            name='entregues',
+            field=models.IntegerField(default=0, verbose_name='Entregues'),
+        ),
+        migrations.AddField(
+            model_name='campanhawhatsapp',
+            name='lidas',
+            field=models.IntegerField(default=0, verbose_name='Lidas'),
+        ),
+        migrations.AddField(
+            model_name='mensagemcampanha',
+            name='entregue_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Entregue em'),
+        ),
+        migrations.AddField(
+            model_name='mensagemcampanha',
+            name='falhou_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Falha na entrega em'),
+        ),
+        migrations.AddField(
+            model_name='mensagemcampanha',
+            name='lido_em',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Lido em'),
+        ),
+        migrations.AddField(
+            model_name='mensagemcampanha',
+            name='provider_message_id',
+            field=models.CharField(blank=True, db_index=True, help_text='key.id retornado no envio; liga os recibos de entrega à mensagem', max_length=100, verbose_name='ID da mensagem na Evolution'),
+        ),
+    ]
@@ -3,6 +3,9 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils.text import slugify
 
+from core.models import ChangeTrackingMixin, ExclusaoNotificadaMixin
+from core.phones import normalizar_whatsapp
+
 
 # =============================================================================
 # Funções de upload dinâmico (organiza por padaria para isolamento de tenant)
@@ -23,7 +26,7 @@ def get_campanha_upload_path(instance, filename):
     return f'padarias/{instance.padaria.slug}/campanhas/{filename}'
 
 
-class Padaria(models.Model):
+class Padaria(ChangeTrackingMixin, models.Model):
     """
     Padaria (tenant principal do sistema).
     Antiga 'Organization' renomeada para o novo contexto.
@@ -90,7 +93,7 @@ class Padaria(models.Model):
         return self.agents.exists()
 
 
-class PadariaUser(models.Model):
+class PadariaUser(ExclusaoNotificadaMixin, models.Model):
     """
     Relaciona usuários com padarias e seus papéis.
     """
@@ -194,7 +197,7 @@ class ApiKey(models.Model):
 Organization = Padaria
 
 
-class Promocao(models.Model):
+class Promocao(ChangeTrackingMixin, models.Model):
     """
     Promoção ou aviso para exibir no chatbot.
     Cada padaria pode ter múltiplas promoções.
@@ -251,6 +254,11 @@ class Promocao(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
 
+    # Campos que entram no catálogo enviado ao RAG (send_products_webhook)
+    CAMPOS_CATALOGO = (
+        "produto", "titulo", "preco", "preco_original", "data_inicio", "data_fim", "is_active",
+    )
+
     class Meta:
         verbose_name = "Promoção"
         verbose_name_plural = "Promoções"
@@ -291,7 +299,7 @@ class Promocao(models.Model):
         return None
 
 
-class Produto(models.Model):
+class Produto(ChangeTrackingMixin, ExclusaoNotificadaMixin, models.Model):
     """
     Produto cadastrado de uma padaria.
     Pode ser adicionado manualmente ou extraído do PDF do agente.
@@ -327,6 +335,9 @@ class Produto(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
 
+    # Campos que entram no catálogo enviado ao RAG (send_products_webhook)
+    CAMPOS_CATALOGO = ("nome", "descricao", "preco", "categoria", "ativo")
+
     class Meta:
         verbose_name = "Produto"
         verbose_name_plural = "Produtos"
@@ -336,11 +347,13 @@ class Produto(models.Model):
         return f"{self.nome} - {self.padaria.name}"
 
 
-class Cliente(models.Model):
+class Cliente(ChangeTrackingMixin, ExclusaoNotificadaMixin, models.Model):
     """
     Cliente cadastrado de uma padaria.
     Armazena informações de contato para envio de promoções via WhatsApp.
     """
+    tracked_fields = ("telefone",)
+
     padaria = models.ForeignKey(
         Padaria,
         on_delete=models.CASCADE,
@@ -353,6 +366,14 @@ class Cliente(models.Model):
         verbose_name="Telefone/WhatsApp",
         help_text="Número com DDD, ex: (11) 99999-9999"
     )
+    whatsapp_e164 = models.CharField(
+        max_length=16,
+        blank=True,
+        default="",
+        editable=False,
+        verbose_name="WhatsApp (E.164)",
+        help_text="Calculado a partir do telefone ao salvar, ex: +5511999999999"
+    )
     email = models.EmailField(blank=True, verbose_name="E-mail")
     observacoes = models.TextField(blank=True, verbose_name="Observações")
     aceita_promocoes = models.BooleanField(
@@ -369,9 +390,36 @@ class Cliente(models.Model):
         verbose_name_plural = "Clientes"
         ordering = ["nome"]
         unique_together = [("padaria", "telefone")]
+        constraints = [
+            # Mesmo número em formatos diferentes não cria outro cliente;
+            # também serve de índice para achar o cliente pelo número
+            models.UniqueConstraint(
+                fields=["padaria", "whatsapp_e164"],
+                condition=~models.Q(whatsapp_e164=""),
+                name="cliente_whatsapp_unico_por_padaria",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.nome} - {self.telefone}"
+
+    def save(self, *args, **kwargs):
+        # Só recalcula se o telefone mudou: duplicados antigos (migração
+        # 0009) ficam sem E.164 e não podem recebê-lo em um save qualquer
+        if self.has_changed("telefone"):
+            self.whatsapp_e164 = normalizar_whatsapp(self.telefone)
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "telefone" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "whatsapp_e164"}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def buscar_por_whatsapp(cls, padaria, numero):
+        """Cliente da padaria com este número (em qualquer formato), ou None."""
+        e164 = normalizar_whatsapp(numero)
+        if not e164:
+            return None
+        return cls.objects.filter(padaria=padaria, whatsapp_e164=e164).first()
     
     def get_telefone_formatado(self):
         """Retorna telefone apenas com números para envio."""
@@ -380,6 +428,8 @@ class Cliente(models.Model):
     
     def get_telefone_whatsapp(self):
         """Retorna telefone no formato WhatsApp (com 55 se necessário)."""
+        if self.whatsapp_e164:
+            return self.whatsapp_e164[1:]
         telefone = self.get_telefone_formatado()
         if not telefone.startswith('55'):
             telefone = '55' + telefone
@@ -466,6 +516,9 @@ class CampanhaWhatsApp(models.Model):
     total_destinatarios = models.IntegerField(default=0, verbose_name="Total de destinatários")
     enviados = models.IntegerField(default=0, verbose_name="Enviados")
     falhas = models.IntegerField(default=0, verbose_name="Falhas")
+    # Mantidos pelos recibos da Evolution (organizations.delivery_receipts)
+    entregues = models.IntegerField(default=0, verbose_name="Entregues")
+    lidas = models.IntegerField(default=0, verbose_name="Lidas")
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Criado em")
@@ -487,6 +540,12 @@ class CampanhaWhatsApp(models.Model):
             return round((self.enviados / self.total_destinatarios) * 100, 1)
         return 0
     
+    def get_taxa_leitura(self):
+        """Porcentagem das mensagens enviadas que foram lidas."""
+        if self.enviados > 0:
+            return round((self.lidas / self.enviados) * 100, 1)
+        return 0
+    
     def get_delay_aleatorio(self):
         """Retorna um delay aleatório entre mínimo e máximo."""
         import random
@@ -524,6 +583,16 @@ class MensagemCampanha(models.Model):
     )
     erro_mensagem = models.TextField(blank=True, verbose_name="Mensagem de erro")
     enviado_em = models.DateTimeField(null=True, blank=True, verbose_name="Enviado em")
+    provider_message_id = models.CharField(
+        max_length=100,
+        blank=True,
+        db_index=True,
+        verbose_name="ID da mensagem na Evolution",
+        help_text="key.id retornado no envio; liga os recibos de entrega à mensagem"
+    )
+    entregue_em = models.DateTimeField(null=True, blank=True, verbose_name="Entregue em")
+    lido_em = models.DateTimeField(null=True, blank=True, verbose_name="Lido em")
+    falhou_em = models.DateTimeField(null=True, blank=True, verbose_name="Falha na entrega em")
     
     class Meta:
         verbose_name = "Mensagem de Campanha"
@@ -0,0 +1,33 @@
+"""
+Signals que mantêm os derivados de imagem (organizations.images).
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from core.models import ChangeTrackingMixin
+
+from .models import Produto, Promocao, CampanhaWhatsApp
+from . import images
+
+
+@receiver(post_save, sender=Produto)
+@receiver(post_save, sender=Promocao)
+@receiver(post_save, sender=CampanhaWhatsApp)
+def imagem_post_save(sender, instance, raw=False, **kwargs):
+    if raw or not instance.imagem:
+        return
+    # Produto/Promocao sabem se a imagem mudou: sem troca, nada a verificar
+    if isinstance(instance, ChangeTrackingMixin) and not instance.has_changed("imagem"):
+        return
+    storage = instance.imagem.storage
+    # Campanhas e produtos são salvos com frequência: só agenda se faltar algo
+    if all(storage.exists(images.nome_derivado(instance.imagem, v)) for v in images.VARIANTES):
+        return
+    images.gerar_derivados_background(instance.imagem)
+
+
+@receiver(post_delete, sender=Produto)
+@receiver(post_delete, sender=Promocao)
+@receiver(post_delete, sender=CampanhaWhatsApp)
+def imagem_post_delete(sender, instance, **kwargs):
+    images.remover_derivados(instance.imagem)
@@ -0,0 +1,14 @@
+from django import template
+
+from organizations.images import url_variante
+
+register = template.Library()
+
+
+@register.filter
+def variante(imagem_field, nome):
+    """
+    URL de um derivado da imagem: {{ produto.imagem|variante:"thumb" }}
+    Variantes: thumb, web, whatsapp (ver organizations.images).
+    """
+    return url_variante(imagem_field, nome)
@@ -1,3 +1,388 @@
-from django.test import TestCase
+import io
+import tempfile
+from decimal import Decimal
+from unittest.mock import patch
 
-# Organizations tests
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from openpyxl import Workbook
+from PIL import Image
+
+from .models import Cliente, Padaria, PadariaUser, Produto
+from . import delivery_receipts, images, imports
+
+
+def _foto(tamanho=(2400, 1800), formato="PNG"):
+    buffer = io.BytesIO()
+    Image.new("RGBA", tamanho, (200, 120, 40, 255)).save(buffer, formato)
+    return SimpleUploadedFile(f"foto.{formato.lower()}", buffer.getvalue())
+
+
+class ImageDerivativesTest(TestCase):
+    """Testes para os derivados de imagem."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        override = override_settings(MEDIA_ROOT=tmp.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        owner = User.objects.create_user(username="dono", password="12345")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=owner)
+        self.produto = Produto.objects.create(padaria=self.padaria, nome="Pão", imagem=_foto())
+
+    def test_variantes_geradas_sob_demanda(self):
+        url = images.url_variante(self.produto.imagem, "thumb")
+        self.assertIn("/derivados/padarias/padaria-teste/produtos/", url)
+        self.assertTrue(url.endswith(".webp"))
+
+        nome = images.nome_derivado(self.produto.imagem, "thumb")
+        with self.produto.imagem.storage.open(nome) as arquivo:
+            self.assertEqual(max(Image.open(arquivo).size), 320)
+
+        caminho, mimetype = images.arquivo_variante(self.produto.imagem, "whatsapp")
+        self.assertEqual(mimetype, "image/jpeg")
+        with Image.open(caminho) as imagem:
+            self.assertEqual(imagem.mode, "RGB")
+            self.assertEqual(max(imagem.size), 1600)
+
+    def test_remover_derivados(self):
+        images.gerar_derivados(self.produto.imagem)
+        storage = self.produto.imagem.storage
+        nomes = [images.nome_derivado(self.produto.imagem, v) for v in images.VARIANTES]
+        self.assertTrue(all(storage.exists(nome) for nome in nomes))
+
+        self.produto.delete()
+        self.assertFalse(any(storage.exists(nome) for nome in nomes))
+
+    def test_editar_promocao_remove_imagem_antiga(self):
+        from .models import Promocao
+
+        promocao = Promocao.objects.create(padaria=self.padaria, titulo="Promo", imagem=_foto())
+        images.gerar_derivados(promocao.imagem)
+        storage = promocao.imagem.storage
+        antigos = [promocao.imagem.name] + [images.nome_derivado(promocao.imagem, v) for v in images.VARIANTES]
+        PadariaUser.objects.get_or_create(user=self.padaria.owner, padaria=self.padaria, defaults={"role": "dono"})
+        self.client.force_login(self.padaria.owner)
+        url = reverse("organizations:promocao_edit", args=[promocao.pk])
+
+        self.client.post(url, {"titulo": "Promo", "imagem": _foto((800, 600), "WEBP")})
+        promocao.refresh_from_db()
+        self.assertTrue(storage.exists(promocao.imagem.name))
+        self.assertFalse(any(storage.exists(nome) for nome in antigos))
+
+        nova = promocao.imagem.name
+        self.client.post(url, {"titulo": "Promo", "remover_imagem": "on"})
+        promocao.refresh_from_db()
+        self.assertFalse(promocao.imagem)
+        self.assertFalse(storage.exists(nova))
+
+    def test_imagem_invalida_usa_original(self):
+        produto = Produto.objects.create(
+            padaria=self.padaria, nome="Sonho", imagem=SimpleUploadedFile("x.jpg", b"nao e imagem")
+        )
+        self.assertEqual(images.url_variante(produto.imagem, "web"), produto.imagem.url)
+
+
+def _planilha(linhas, cabecalho=("Nome do Produto", "Descrição", "Preço (R$)", "Categoria")):
+    wb = Workbook()
+    ws = wb.active
+    ws.append(cabecalho)
+    for linha in linhas:
+        ws.append(linha)
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return SimpleUploadedFile(
+        "produtos.xlsx", buffer.getvalue(),
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
+class _ThreadImediata:
+    """Substitui threading.Thread executando o alvo no start()."""
+
+    def __init__(self, target, args=(), **kwargs):
+        self.target, self.args = target, args
+
+    def start(self):
+        self.target(*self.args)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class ProdutoImportExcelTest(TestCase):
+    """Testes para a importação de produtos por planilha."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username="dono", password="12345")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=self.user)
+        PadariaUser.objects.get_or_create(user=self.user, padaria=self.padaria, defaults={"role": "dono"})
+        Produto.objects.create(padaria=self.padaria, nome="Pão Francês", preco=Decimal("0.80"), categoria="Pães")
+
+    def test_importa_em_lote_com_relatorio_de_erros(self):
+        linhas = [(f"Produto {i}", "", i, "Doces") for i in range(2500)]
+        linhas += [
+            ("pão  francês", "Crocante", "R$ 1,20", None),
+            ("Bolo", "", "caro", "Bolos"),
+            (None, "sem nome", 3, ""),
+            ("Produto 7", "repetido", "7,50", ""),
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            resultado = imports.importar_planilha(_planilha(linhas), self.padaria)
+        # Mapa de nomes + escritas em lote por bloco de 1000 linhas
+        self.assertLess(len(queries), 40)
+
+        self.assertEqual(resultado["criados"], 2500)
+        self.assertEqual(resultado["atualizados"], 2)
+        self.assertEqual(resultado["vazias"], 1)
+        self.assertEqual(resultado["erros"], [{"linha": 2503, "erro": "preço inválido: 'caro'"}])
+        self.assertEqual(Produto.objects.filter(padaria=self.padaria).count(), 2501)
+
+        pao = Produto.objects.get(padaria=self.padaria, nome="Pão Francês")
+        self.assertEqual((pao.preco, pao.descricao, pao.categoria), (Decimal("1.20"), "Crocante", "Pães"))
+        produto = Produto.objects.get(padaria=self.padaria, nome="Produto 7")
+        self.assertEqual((produto.preco, produto.categoria), (Decimal("7.50"), "Doces"))
+
+    def test_planilha_sem_coluna_nome(self):
+        with self.assertRaises(imports.ImportacaoError):
+            imports.importar_planilha(_planilha([("x",)], cabecalho=("Código",)), self.padaria)
+
+    @patch("organizations.views.send_products_webhook")
+    @patch.object(imports.threading, "Thread", _ThreadImediata)
+    @patch.object(imports, "ASYNC_THRESHOLD_BYTES", 0)
+    def test_planilha_grande_em_segundo_plano(self, webhook):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("organizations:produto_import_excel"),
+            {"excel_file": _planilha([("Sonho", "", 4, "Doces")])},
+        )
+        job_id = response.url.rstrip("/").rsplit("/", 1)[-1]
+        self.assertRedirects(
+            response, reverse("organizations:produto_import_status", args=[job_id]), fetch_redirect_response=False
+        )
+
+        estado = self.client.get(response.url, {"format": "json"}).json()
+        self.assertEqual(estado["status"], "pronto")
+        self.assertEqual(estado["resultado"]["criados"], 1)
+        webhook.assert_called_once()
+        self.assertTrue(Produto.objects.filter(padaria=self.padaria, nome="Sonho").exists())
+
+
+class ClienteImportCsvTest(TestCase):
+    """Testes para a importação de clientes por CSV."""
+
+    def setUp(self):
+        owner = User.objects.create_user(username="dono", password="12345")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=owner)
+        Cliente.objects.create(padaria=self.padaria, nome="Já Existe", telefone="(11) 99999-0000")
+
+    def _csv(self, conteudo, codificacao="utf-8"):
+        return SimpleUploadedFile("clientes.csv", conteudo.encode(codificacao), content_type="text/csv")
+
+    def test_deduplica_telefones_normalizados(self):
+        linhas = ["Nome;Celular;E-mail"]
+        linhas += [f"Cliente {i};(21) 9{i:04d}-{i:04d};cliente{i}@email.com" for i in range(3000)]
+        linhas += [
+            "José;+55 11 99999-0000;",      # já cadastrado em outro formato
+            "Repetido;21 90001-0001;",      # repete o Cliente 1
+            "Sem Telefone;;",
+            "Inválido;123;x",
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            resultado = imports.importar_clientes_csv(self._csv("\n".join(linhas), "cp1252"), self.padaria)
+        # Uma query por bloco de INSERT, não uma (ou duas) por linha
+        self.assertLess(len(queries), 60)
+
+        self.assertEqual(resultado["importados"], 3000)
+        self.assertEqual(resultado["duplicados"], 2)
+        self.assertEqual([erro["linha"] for erro in resultado["erros"]], [3004, 3005])
+        self.assertEqual(Cliente.objects.filter(padaria=self.padaria).count(), 3001)
+        self.assertEqual(Cliente.objects.get(telefone="(21) 90001-0001").email, "cliente1@email.com")
+
+    def test_detecta_codificacao(self):
+        self.assertEqual(imports.detectar_codificacao("nome,telefone\nJoão".encode("utf-8")), "utf-8")
+        self.assertEqual(imports.detectar_codificacao("nome,telefone\nJoão".encode("cp1252")), "cp1252")
+        self.assertEqual(imports.detectar_codificacao(b"\xef\xbb\xbfnome"), "utf-8-sig")
+
+        resultado = imports.importar_clientes_csv(
+            self._csv("﻿nome,telefone\nJoão,11 98888-7777\n"), self.padaria
+        )
+        self.assertEqual(resultado["importados"], 1)
+        self.assertTrue(Cliente.objects.filter(nome="João").exists())
+
+    def test_normalizar_whatsapp(self):
+        from core.phones import normalizar_whatsapp
+
+        self.assertEqual(normalizar_whatsapp("(11) 99999-1111"), "+5511999991111")
+        self.assertEqual(normalizar_whatsapp("55 11 3333-4444"), "+551133334444")
+        self.assertEqual(normalizar_whatsapp("(55) 99999-1111"), "+5555999991111")
+        self.assertEqual(normalizar_whatsapp("+1 415 555 2671"), "+14155552671")
+        self.assertEqual(normalizar_whatsapp("123"), "")
+
+
+class ClienteWhatsappTest(TestCase):
+    """Testes para a coluna normalizada de WhatsApp dos clientes."""
+
+    def setUp(self):
+        owner = User.objects.create_user(username="dono", password="12345")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=owner)
+
+    def test_e164_calculado_ao_salvar(self):
+        cliente = Cliente.objects.create(padaria=self.padaria, nome="Ana", telefone="(11) 99999-1111")
+        self.assertEqual(cliente.whatsapp_e164, "+5511999991111")
+        self.assertEqual(cliente.get_telefone_whatsapp(), "5511999991111")
+
+        cliente.telefone = "21 98888-2222"
+        cliente.save(update_fields=["telefone"])
+        cliente.refresh_from_db()
+        self.assertEqual(cliente.whatsapp_e164, "+5521988882222")
+
+    def test_numero_unico_por_padaria(self):
+        from django.db import IntegrityError, transaction
+
+        Cliente.objects.create(padaria=self.padaria, nome="Ana", telefone="(11) 99999-1111")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Cliente.objects.create(padaria=self.padaria, nome="Ana 2", telefone="+55 11 99999-1111")
+
+        outra = Padaria.objects.create(name="Outra", owner=self.padaria.owner)
+        Cliente.objects.create(padaria=outra, nome="Ana", telefone="11999991111")
+
+    def test_buscar_por_whatsapp(self):
+        cliente = Cliente.objects.create(padaria=self.padaria, nome="Ana", telefone="(11) 99999-1111")
+        with self.assertNumQueries(1):
+            self.assertEqual(Cliente.buscar_por_whatsapp(self.padaria, "5511999991111"), cliente)
+        self.assertIsNone(Cliente.buscar_por_whatsapp(self.padaria, "11 98888-0000"))
+        self.assertIsNone(Cliente.buscar_por_whatsapp(self.padaria, "abc"))
+
+    def test_duplicado_antigo_sem_e164_pode_ser_editado(self):
+        """Duplicado deixado sem E.164 pela migração 0009 salva sem IntegrityError."""
+        Cliente.objects.create(padaria=self.padaria, nome="Ana", telefone="(11) 99999-1111")
+        duplicado = Cliente.objects.create(padaria=self.padaria, nome="Ana 2", telefone="11 98888-0000")
+        Cliente.objects.filter(pk=duplicado.pk).update(telefone="+55 11 99999-1111", whatsapp_e164="")
+
+        duplicado = Cliente.objects.get(pk=duplicado.pk)
+        duplicado.nome = "Ana (antigo)"
+        duplicado.save()
+        duplicado.refresh_from_db()
+        self.assertEqual(duplicado.nome, "Ana (antigo)")
+        self.assertEqual(duplicado.whatsapp_e164, "")
+
+        # Trocar para um número livre volta a calcular o E.164
+        duplicado.telefone = "11 97777-3333"
+        duplicado.save()
+        duplicado.refresh_from_db()
+        self.assertEqual(duplicado.whatsapp_e164, "+5511977773333")
+
+    def test_backfill_da_migracao(self):
+        import importlib
+        from django.apps import apps
+
+        migracao = importlib.import_module("organizations.migrations.0009_cliente_whatsapp_e164")
+        primeiro = Cliente.objects.create(padaria=self.padaria, nome="Ana", telefone="(11) 99999-1111")
+        Cliente.objects.filter(pk=primeiro.pk).update(whatsapp_e164="")
+        sem_numero = Cliente.objects.create(padaria=self.padaria, nome="Bia", telefone="n/d")
+
+        with patch.object(migracao, "BATCH_SIZE", 1):
+            migracao.preencher_whatsapp(apps, None)
+        primeiro.refresh_from_db()
+        sem_numero.refresh_from_db()
+        self.assertEqual(primeiro.whatsapp_e164, "+5511999991111")
+        self.assertEqual(sem_numero.whatsapp_e164, "")
+
+
+class ReciboEntregaTest(TestCase):
+    """Testes para os recibos de entrega das mensagens de campanha."""
+
+    def setUp(self):
+        from .models import CampanhaWhatsApp, MensagemCampanha
+
+        owner = User.objects.create_user(username="dono", password="12345")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=owner)
+        self.campanha = CampanhaWhatsApp.objects.create(padaria=self.padaria, nome="Promo", mensagem="Oi")
+        self.mensagens = [
+            MensagemCampanha.objects.create(
+                campanha=self.campanha,
+                cliente=Cliente.objects.create(padaria=self.padaria, nome=f"C{i}", telefone=f"11 9{i:04d}-0000"),
+                status="enviado",
+                provider_message_id=f"MSG{i}",
+            )
+            for i in range(300)
+        ]
+        self.iniciar_thread = delivery_receipts._iniciar_thread
+        patcher = patch.object(delivery_receipts, "_iniciar_thread")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(delivery_receipts._pendentes.clear)
+
+    def test_contadores_incrementais_em_lote(self):
+        from django.utils import timezone
+
+        agora = timezone.now()
+        recibos = [(f"MSG{i}", delivery_receipts.ENTREGUE, agora) for i in range(200)]
+        recibos += [(f"MSG{i}", delivery_receipts.LIDO, agora) for i in range(150, 250)]
+        recibos += [("MSG0", delivery_receipts.ENTREGUE, agora), ("OUTRA", delivery_receipts.LIDO, agora)]
+        delivery_receipts.registrar(recibos)
+
+        with CaptureQueriesContext(connection) as queries:
+            incrementos = delivery_receipts.gravar_pendentes()
+        # Sem consultas por mensagem
+        self.assertLess(len(queries), 15)
+        self.assertEqual(incrementos, {self.campanha.pk: {"entregues": 250, "lidas": 100}})
+
+        # Recibo repetido não conta de novo
+        delivery_receipts.registrar([("MSG0", delivery_receipts.LIDO, agora), ("MSG1", delivery_receipts.ENTREGUE, agora)])
+        delivery_receipts.gravar_pendentes()
+
+        self.campanha.refresh_from_db()
+        self.assertEqual((self.campanha.entregues, self.campanha.lidas), (250, 101))
+        mensagem = self.mensagens[160]
+        mensagem.refresh_from_db()
+        self.assertIsNotNone(mensagem.entregue_em)
+        self.assertIsNotNone(mensagem.lido_em)
+
+    def test_recibo_antes_do_id_ser_gravado(self):
+        from django.utils import timezone
+
+        delivery_receipts.registrar([("NOVA", delivery_receipts.ENTREGUE, timezone.now())])
+        delivery_receipts.gravar_pendentes()
+        self.assertIn("NOVA", delivery_receipts._pendentes)
+
+        self.mensagens[0].provider_message_id = "NOVA"
+        self.mensagens[0].save(update_fields=["provider_message_id"])
+        self.assertEqual(delivery_receipts.gravar_pendentes(), {self.campanha.pk: {"entregues": 1}})
+        self.assertNotIn("NOVA", delivery_receipts._pendentes)
+
+    def test_lote_devolvido_quando_a_gravacao_falha(self):
+        from django.db import OperationalError
+        from django.utils import timezone
+
+        delivery_receipts.registrar([("MSG0", delivery_receipts.ENTREGUE, timezone.now())])
+        delivery_receipts._pendentes["MSG0"]["tentativas"] = 3
+        with patch.object(delivery_receipts, "escrever", side_effect=OperationalError("database is locked")):
+            with self.assertRaises(OperationalError):
+                delivery_receipts.gravar_pendentes()
+        self.assertEqual(delivery_receipts._pendentes["MSG0"]["tentativas"], 3)
+
+        self.assertEqual(delivery_receipts.gravar_pendentes(), {self.campanha.pk: {"entregues": 1}})
+        self.assertEqual(delivery_receipts._pendentes, {})
+
+    def test_pendentes_gravados_no_encerramento(self):
+        from django.utils import timezone
+
+        delivery_receipts.registrar([("MSG0", delivery_receipts.ENTREGUE, timezone.now())])
+        delivery_receipts._gravar_ao_sair()
+        self.assertEqual(delivery_receipts._pendentes, {})
+        self.campanha.refresh_from_db()
+        self.assertEqual(self.campanha.entregues, 1)
+
+        # O handler é registrado uma vez, com a primeira thread
+        with patch.object(delivery_receipts, "_thread", None), \
+                patch.object(delivery_receipts.threading, "Thread"), \
+                patch.object(delivery_receipts.atexit, "register") as register:
+            self.iniciar_thread()
+            self.iniciar_thread()
+        register.assert_called_once_with(delivery_receipts._gravar_ao_sair)
@@ -22,6 +22,7 @@ urlpatterns = [
     path("produtos/create/", views.produto_create, name="produto_create"),
     path("produtos/import/", views.produto_import, name="produto_import"),
     path("produtos/import-excel/", views.produto_import_excel, name="produto_import_excel"),
+    path("produtos/import-excel/<str:job_id>/", views.produto_import_status, name="produto_import_status"),
     path("produtos/<int:pk>/edit/", views.produto_edit, name="produto_edit"),
     path("produtos/<int:pk>/delete/", views.produto_delete, name="produto_delete"),
     
@@ -5,6 +5,8 @@ from django.conf import settings
 from django.http import JsonResponse
 from django.db.models import Prefetch
 from .models import Padaria, PadariaUser, ApiKey, Promocao, Produto, Cliente, CampanhaWhatsApp, MensagemCampanha
+from .images import url_variante, remover_derivados
+from . import whatsapp_state
 from audit.models import AuditLog
 import requests
 
@@ -91,8 +93,8 @@ def send_products_webhook(padaria, user=None, action="product_update"):
             
             # URL da imagem (apenas se o produto tiver imagem)
             if produto.imagem:
-                # Usar o caminho real da imagem
-                linhas.append(f"Imagem do produto: https://pandia.com.br{produto.imagem.url}")
+                # Versão otimizada para WhatsApp (o agente envia o link ao cliente)
+                linhas.append(f"Imagem do produto: https://pandia.com.br{url_variante(produto.imagem, 'whatsapp')}")
             
             linhas.append("")  # Linha em branco entre produtos
         
@@ -562,6 +564,15 @@ def whatsapp_connect(request, slug):
             logger.info(f"[Evolution API] URL base: {api_url}")
             logger.info(f"[Evolution API] Tentando criar/conectar instância: {instance_name}")
             
+            # Já conectado segundo o último CONNECTION_UPDATE: nada a criar
+            estado = whatsapp_state.estado_em_cache(instance_name)
+            if estado and estado["state"] == "open":
+                return JsonResponse({
+                    "success": True,
+                    "is_connected": True,
+                    "message": "WhatsApp já está conectado!"
+                })
+            
             # Passo 1: Tentar criar a instância (se não existir)
             create_url = f"{api_url}/instance/create"
             create_payload = {
@@ -649,6 +660,7 @@ def whatsapp_connect(request, slug):
                 status = data.get("status") or instance_data.get("status")
                 
                 if state == "open" or status == "connected":
+                    whatsapp_state.registrar_estado(instance_name, "open", origem="consulta")
                     return JsonResponse({
                         "success": True,
                         "is_connected": True,
@@ -937,6 +949,7 @@ def whatsapp_pairing_code(request, slug):
             status = data.get("status") or instance_data.get("status")
             
             if state == "open" or status == "connected":
+                whatsapp_state.registrar_estado(instance_name, "open", origem="consulta")
                 return JsonResponse({
                     "success": True,
                     "is_connected": True,
@@ -1056,54 +1069,31 @@ def whatsapp_status(request, slug):
                 "error": "Sistema não configurado."
             })
         
-        headers = {
-            "apikey": api_key,
-            "Content-Type": "application/json"
-        }
-        
-        # Chamar endpoint de status da Evolution API
-        status_url = f"{api_url}/instance/connectionState/{instance_name}"
-        response = requests.get(status_url, headers=headers, timeout=10)
-        
-        if response.status_code == 200:
-            data = response.json()
-            
-            # Extrair state da resposta
-            state = data.get("state") or data.get("instance", {}).get("state") or "close"
-            
-            # Mapear state para status amigável
-            status_map = {
-                "open": "connected",
-                "close": "disconnected",
-                "connecting": "connecting"
-            }
-            status = status_map.get(state, "disconnected")
-            
-            # Se conectou, atualizar status da padaria
-            if status == "connected":
-                organization.whatsapp_status = "connected"
-                organization.save(update_fields=["whatsapp_status"])
-            
-            return JsonResponse({
-                "success": True,
-                "status": status,
-                "state": state,
-                "instance": instance_name
-            })
+        # Estado mantido pelos eventos CONNECTION_UPDATE; a Evolution API
+        # só é consultada se não houver estado recente no cache
+        state = whatsapp_state.consultar_estado(instance_name, api_url, api_key)
         
-        elif response.status_code == 404:
-            return JsonResponse({
-                "success": True,
-                "status": "disconnected",
-                "state": "close",
-                "instance": instance_name
-            })
-        else:
+        if state is None:
             return JsonResponse({
                 "success": False,
                 "status": "error",
                 "error": "Erro ao verificar status"
             })
+        
+        # Mapear state para status amigável
+        status_map = {
+            "open": "connected",
+            "close": "disconnected",
+            "connecting": "connecting"
+        }
+        status = status_map.get(state, "disconnected")
+        
+        return JsonResponse({
+            "success": True,
+            "status": status,
+            "state": state,
+            "instance": instance_name
+        })
             
     except requests.exceptions.Timeout:
         return JsonResponse({
@@ -1304,11 +1294,20 @@ def promocao_edit(request, pk):
             else:
                 promocao.produto = None
             
-            if remover_imagem:
+            if remover_imagem and promocao.imagem:
+                remover_derivados(promocao.imagem)
+                promocao.imagem.delete(save=False)
                 promocao.imagem = None
             elif imagem:
+                if promocao.imagem:
+                    remover_derivados(promocao.imagem)
+                    promocao.imagem.delete(save=False)
                 promocao.imagem = imagem
             
+            # Catálogo do RAG só muda se a promoção estava ou ficou vinculada
+            alterou_catalogo = promocao.has_changed(*Promocao.CAMPOS_CATALOGO) and (
+                promocao.produto_id or promocao.previous_value("produto")
+            )
             promocao.save()
             
             if diff:
@@ -1322,7 +1321,7 @@ def promocao_edit(request, pk):
                 )
             
             # Se promoção está vinculada a produto, atualizar RAG
-            if promocao.produto:
+            if alterou_catalogo:
                 send_products_webhook(promocao.padaria, request.user, action="promotion_updated")
             
             messages.success(request, "Promoção atualizada com sucesso!")
@@ -1546,13 +1545,16 @@ def produto_edit(request, pk):
             
             # Gerenciar imagem
             if remover_imagem and produto.imagem:
+                remover_derivados(produto.imagem)
                 produto.imagem.delete(save=False)
                 produto.imagem = None
             elif imagem:
                 if produto.imagem:
+                    remover_derivados(produto.imagem)
                     produto.imagem.delete(save=False)
                 produto.imagem = imagem
             
+            alterou_catalogo = produto.has_changed(*Produto.CAMPOS_CATALOGO)
             produto.save()
             
             if diff:
@@ -1565,8 +1567,9 @@ def produto_edit(request, pk):
                     diff=diff
                 )
             
-            # Enviar webhook para atualizar RAG do N8N
-            send_products_webhook(produto.padaria, request.user, action="product_updated")
+            # Enviar webhook para atualizar RAG do N8N (só se o catálogo mudou)
+            if alterou_catalogo:
+                send_products_webhook(produto.padaria, request.user, action="product_updated")
             
             messages.success(request, f"Produto '{nome}' atualizado com sucesso!")
             return redirect("organizations:produto_list")
@@ -1712,8 +1715,14 @@ def produto_import(request):
 
 @login_required
 def produto_import_excel(request):
-    """Importar produtos de planilha Excel."""
-    from openpyxl import load_workbook
+    """
+    Importar produtos de planilha Excel.
+    
+    Planilhas pequenas são importadas na hora; acima de
+    `imports.ASYNC_THRESHOLD_BYTES` a importação roda em segundo plano e o
+    usuário é levado à página de acompanhamento.
+    """
+    from . import imports
     
     padarias = get_user_padarias(request.user)
     
@@ -1736,144 +1745,46 @@ def produto_import_excel(request):
             messages.error(request, "O arquivo deve ser uma planilha Excel (.xlsx ou .xls).")
             return render(request, "organizations/produto_import_excel.html", {"padarias": padarias})
         
+        if excel_file.size > imports.ASYNC_THRESHOLD_BYTES:
+            job_id = imports.iniciar_importacao_background(excel_file, padaria, request.user)
+            messages.info(request, "A planilha está sendo importada em segundo plano.")
+            return redirect("organizations:produto_import_status", job_id=job_id)
+        
         try:
-            # Carregar a planilha
-            wb = load_workbook(excel_file, read_only=True)
-            ws = wb.active
-            
-            # Ler cabeçalhos da primeira linha
-            headers = []
-            for cell in ws[1]:
-                if cell.value:
-                    headers.append(str(cell.value).strip().lower())
-                else:
-                    headers.append("")
-            
-            # Mapear índices das colunas
-            nome_idx = None
-            descricao_idx = None
-            preco_idx = None
-            categoria_idx = None
-            
-            for i, h in enumerate(headers):
-                h_lower = h.lower()
-                # Usar 'in' para matching flexível de headers
-                if any(keyword in h_lower for keyword in ['nome', 'name', 'produto', 'product']):
-                    nome_idx = i
-                elif any(keyword in h_lower for keyword in ['descrição', 'descricao', 'description', 'desc']):
-                    descricao_idx = i
-                elif any(keyword in h_lower for keyword in ['preço', 'preco', 'price', 'valor', 'value', 'r$']):
-                    preco_idx = i
-                elif any(keyword in h_lower for keyword in ['categoria', 'category', 'tipo', 'type']):
-                    categoria_idx = i
-            
-            if nome_idx is None:
-                messages.error(request, "Coluna 'Nome' não encontrada na planilha. Verifique o cabeçalho.")
-                return render(request, "organizations/produto_import_excel.html", {"padarias": padarias})
-            
-            # Processar linhas (a partir da segunda)
-            produtos_importados = 0
-            produtos_atualizados = 0
-            erros = 0
-            
-            for row_num, row in enumerate(ws.iter_rows(min_row=2, values_only=True), start=2):
-                try:
-                    # Pegar valores das colunas
-                    nome = str(row[nome_idx]).strip() if row[nome_idx] else None
-                    
-                    if not nome or nome == "None":
-                        continue
-                    
-                    descricao = ""
-                    if descricao_idx is not None and len(row) > descricao_idx and row[descricao_idx]:
-                        descricao = str(row[descricao_idx]).strip()
-                    
-                    preco = None
-                    if preco_idx is not None and len(row) > preco_idx and row[preco_idx]:
-                        preco_val = row[preco_idx]
-                        if isinstance(preco_val, (int, float)):
-                            preco = float(preco_val)
-                        else:
-                            # Tentar converter string (suporta R$ 1,20 ou 1.20)
-                            preco_str = str(preco_val).replace("R$", "").replace(" ", "").replace(",", ".").strip()
-                            try:
-                                preco = float(preco_str)
-                            except ValueError:
-                                preco = None
-                    
-                    categoria = ""
-                    if categoria_idx is not None and len(row) > categoria_idx and row[categoria_idx]:
-                        categoria = str(row[categoria_idx]).strip()
-                    
-                    # Criar ou atualizar produto
-                    defaults = {
-                        'descricao': descricao,
-                        'preco': preco,
-                        'ativo': True
-                    }
-                    if categoria:
-                        defaults['categoria'] = categoria
-                    
-                    produto, created = Produto.objects.update_or_create(
-                        padaria=padaria,
-                        nome=nome,
-                        defaults=defaults
-                    )
-                    
-                    if created:
-                        produtos_importados += 1
-                    else:
-                        produtos_atualizados += 1
-                        
-                except Exception as e:
-                    print(f"[ERROR] Erro na linha {row_num}: {str(e)}")
-                    erros += 1
-            
-            wb.close()
-            
-            # Registrar auditoria
-            if produtos_importados > 0 or produtos_atualizados > 0:
-                AuditLog.log(
-                    action="import_excel",
-                    entity="Produto",
-                    padaria=padaria,
-                    actor=request.user,
-                    entity_id=None,
-                    diff={
-                        "excel_filename": excel_file.name,
-                        "produtos_importados": produtos_importados,
-                        "produtos_atualizados": produtos_atualizados,
-                        "erros": erros
-                    }
-                )
-            
-            # Mensagem de resultado
-            if produtos_importados > 0 or produtos_atualizados > 0:
-                # Enviar webhook para atualizar RAG do N8N
-                send_products_webhook(padaria, request.user, action="products_imported_excel")
-                
-                msg = f"✅ Importação concluída! "
-                if produtos_importados > 0:
-                    msg += f"{produtos_importados} produtos novos"
-                if produtos_atualizados > 0:
-                    if produtos_importados > 0:
-                        msg += f", {produtos_atualizados} atualizados"
-                    else:
-                        msg += f"{produtos_atualizados} produtos atualizados"
-                if erros > 0:
-                    msg += f" ({erros} erros)"
-                messages.success(request, msg)
-            else:
-                messages.warning(request, "Nenhum produto foi encontrado na planilha.")
-            
-            return redirect("organizations:produto_list")
-            
+            resultado = imports.importar_planilha(excel_file, padaria)
+        except imports.ImportacaoError as e:
+            messages.error(request, str(e))
+            return render(request, "organizations/produto_import_excel.html", {"padarias": padarias})
         except Exception as e:
             import traceback
             print(f"[ERROR] Erro ao processar Excel: {str(e)}")
             print(traceback.format_exc())
             messages.error(request, f"Erro ao processar planilha: {str(e)}")
             return render(request, "organizations/produto_import_excel.html", {"padarias": padarias})
+        
+        imports.concluir_importacao(padaria, request.user, excel_file.name, resultado)
+        
+        if resultado['total_erros']:
+            # Relatório por linha na página de resultado
+            return render(request, "organizations/produto_import_status.html", {
+                "status": "pronto",
+                "resultado": resultado,
+            })
+        
+        if resultado['criados'] or resultado['atualizados']:
+            msg = f"✅ Importação concluída! "
+            if resultado['criados']:
+                msg += f"{resultado['criados']} produtos novos"
+            if resultado['atualizados']:
+                if resultado['criados']:
+                    msg += f", {resultado['atualizados']} atualizados"
+                else:
+                    msg += f"{resultado['atualizados']} produtos atualizados"
+            messages.success(request, msg)
+        else:
+            messages.warning(request, "Nenhum produto foi encontrado na planilha.")
+        
+        return redirect("organizations:produto_list")
     
     context = {
         "padarias": padarias,
@@ -1881,6 +1792,33 @@ def produto_import_excel(request):
     return render(request, "organizations/produto_import_excel.html", context)
 
 
+@login_required
+def produto_import_status(request, job_id):
+    """Acompanhamento de uma importação de planilha em segundo plano."""
+    from . import imports
+    
+    estado = imports.status_importacao(job_id)
+    if estado is None or estado.get('user_id') != request.user.pk:
+        messages.error(request, "Importação não encontrada ou expirada.")
+        return redirect("organizations:produto_list")
+    
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'job_id': job_id,
+            'status': estado['status'],
+            'progresso': estado.get('progresso', 0),
+            'resultado': estado.get('resultado'),
+        })
+    
+    return render(request, "organizations/produto_import_status.html", {
+        "job_id": job_id,
+        "status": estado['status'],
+        "progresso": estado.get('progresso', 0),
+        "resultado": estado.get('resultado'),
+        "erro": estado.get('erro'),
+    })
+
+
 # =====================================================
 # CLIENTES
 # =====================================================
@@ -2018,7 +1956,10 @@ def cliente_edit(request, pk):
             return redirect("organizations:cliente_list")
             
         except Exception as e:
-            messages.error(request, f"Erro ao atualizar cliente: {str(e)}")
+            if "unique" in str(e).lower():
+                messages.error(request, "Já existe um cliente com este telefone cadastrado.")
+            else:
+                messages.error(request, f"Erro ao atualizar cliente: {str(e)}")
     
     return render(request, "organizations/cliente_form.html", {
         "cliente": cliente,
@@ -2062,6 +2003,8 @@ def cliente_delete(request, pk):
 @login_required
 def cliente_import(request):
     """Importar clientes via CSV."""
+    from . import imports
+    
     padarias = get_user_padarias(request.user)
     
     if not padarias.exists():
@@ -2082,43 +2025,23 @@ def cliente_import(request):
             return render(request, "organizations/cliente_import.html")
         
         try:
-            import csv
-            import io
-            
-            decoded_file = csv_file.read().decode('utf-8')
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string)
-            
-            importados = 0
-            erros = 0
-            
-            for row in reader:
-                nome = row.get('nome', '').strip()
-                telefone = row.get('telefone', '').strip()
-                email = row.get('email', '').strip()
-                
-                if nome and telefone:
-                    try:
-                        Cliente.objects.get_or_create(
-                            padaria=padaria,
-                            telefone=telefone,
-                            defaults={
-                                'nome': nome,
-                                'email': email,
-                                'aceita_promocoes': True
-                            }
-                        )
-                        importados += 1
-                    except Exception:
-                        erros += 1
-                else:
-                    erros += 1
-            
-            messages.success(request, f"Importação concluída! {importados} clientes importados, {erros} erros.")
-            return redirect("organizations:cliente_list")
-            
+            resultado = imports.importar_clientes_csv(csv_file, padaria)
+        except imports.ImportacaoError as e:
+            messages.error(request, str(e))
+            return render(request, "organizations/cliente_import.html")
         except Exception as e:
             messages.error(request, f"Erro ao importar: {str(e)}")
+            return render(request, "organizations/cliente_import.html")
+        
+        msg = (
+            f"Importação concluída! {resultado['importados']} clientes importados, "
+            f"{resultado['duplicados']} já cadastrados, {resultado['total_erros']} erros."
+        )
+        if resultado['erros']:
+            linhas = ", ".join(str(erro['linha']) for erro in resultado['erros'][:10])
+            msg += f" Linhas com erro: {linhas}{'...' if resultado['total_erros'] > 10 else ''}"
+        messages.success(request, msg)
+        return redirect("organizations:cliente_list")
     
     return render(request, "organizations/cliente_import.html")
 
@@ -2350,6 +2273,8 @@ def campanha_status_ajax(request, pk):
         'status_display': campanha.get_status_display(),
         'enviados': campanha.enviados,
         'falhas': campanha.falhas,
+        'entregues': campanha.entregues,
+        'lidas': campanha.lidas,
         'total': campanha.total_destinatarios,
         'progresso': campanha.get_progresso(),
     })
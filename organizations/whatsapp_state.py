@@ -0,0 +1,86 @@
+"""
+Estado da conexão WhatsApp (instâncias da Evolution API) no cache.
+
+O webhook global da Evolution (eventos CONNECTION_UPDATE, ver
+webhooks.views.evolution_event) grava o estado de cada instância no cache
+compartilhado. As verificações de status (página de conexão, início de
+campanha) leem esse valor e só consultam `/instance/connectionState/` na
+Evolution quando ele não existe ou expirou; o resultado da consulta
+também fica no cache por alguns segundos, para absorver o polling.
+"""
+import logging
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Estado recebido por webhook: a Evolution avisa toda mudança
+ESTADO_TTL = getattr(settings, "EVOLUTION_STATE_TTL", 300)
+# Estado consultado na Evolution: curto, o webhook pode não estar configurado
+CONSULTA_TTL = 10
+
+ESTADOS = ("open", "close", "connecting")
+
+
+def nome_instancia(padaria):
+    """Nome da instância da Evolution API da padaria."""
+    return f"padaria_{padaria.slug}"
+
+
+def _chave(instance_name):
+    return f"evolution:estado:{instance_name}"
+
+
+def registrar_estado(instance_name, state, origem="webhook"):
+    """Grava o estado da instância ('open', 'close' ou 'connecting')."""
+    if state not in ESTADOS:
+        state = "close"
+    ttl = ESTADO_TTL if origem == "webhook" else CONSULTA_TTL
+    cache.set(
+        _chave(instance_name),
+        {"state": state, "origem": origem, "atualizado_em": timezone.now().isoformat()},
+        ttl,
+    )
+
+
+def estado_em_cache(instance_name):
+    """Estado gravado da instância, ou None se não houver/expirou."""
+    return cache.get(_chave(instance_name))
+
+
+def consultar_estado(instance_name, api_url=None, api_key=None, timeout=10):
+    """
+    Estado da instância: do cache ou, se não houver, da Evolution API.
+
+    Returns:
+        'open', 'close' ou 'connecting'; None se a Evolution respondeu com
+        erro (não fica no cache).
+
+    Raises:
+        requests.exceptions.RequestException: falha ao consultar a Evolution
+    """
+    estado = estado_em_cache(instance_name)
+    if estado:
+        return estado["state"]
+
+    api_url = api_url or settings.EVOLUTION_API_URL
+    api_key = api_key or settings.EVOLUTION_API_KEY
+    response = requests.get(
+        f"{api_url}/instance/connectionState/{instance_name}",
+        headers={"apikey": api_key, "Content-Type": "application/json"},
+        timeout=timeout,
+    )
+    if response.status_code == 404:
+        state = "close"
+    elif response.status_code == 200:
+        data = response.json()
+        state = data.get("state") or data.get("instance", {}).get("state") or "close"
+    else:
+        logger.warning(f"Evolution retornou {response.status_code} ao consultar {instance_name}")
+        return None
+
+    registrar_estado(instance_name, state, origem="consulta")
+    return state
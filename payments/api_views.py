@@ -9,11 +9,34 @@ from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from django.utils import timezone
 from organizations.models import Padaria
+from payments import status_updates
 from payments.models import MercadoPagoConfig, MercadoPagoPayment
 from payments.services.mercadopago_service import MercadoPagoService, MercadoPagoAPIError
 
 logger = logging.getLogger(__name__)
 
+# Status em que o long-poll (?wait=N) espera uma mudança
+STATUS_PAGAMENTO_EM_ESPERA = ("pending", "in_process")
+
+
+def _aguardar_pagamento(request, mp_payment):
+    """
+    Com `?wait=N`, espera até N segundos (máx. 30) o status do pagamento
+    mudar. Espera enquanto o status for o informado em `?status=` ou, sem
+    ele, enquanto o pagamento não for concluído.
+    """
+    segundos = status_updates.segundos_espera(request.GET.get("wait"))
+    if not segundos:
+        return mp_payment
+    conhecido = request.GET.get("status")
+    return status_updates.aguardar_status(
+        status_updates.PAGAMENTO,
+        mp_payment.pk,
+        carregar=lambda: MercadoPagoPayment.objects.select_related('config', 'config__padaria').get(pk=mp_payment.pk),
+        em_espera=lambda p: p.status == conhecido if conhecido else p.status in STATUS_PAGAMENTO_EM_ESPERA,
+        segundos=segundos,
+    )
+
 
 @csrf_exempt
 @require_http_methods(["POST"])
@@ -255,6 +278,10 @@ def get_payment_status(request, payment_id):
     Consulta status de um pagamento.
     
     GET /api/payments/<payment_id>/status/
+    GET /api/payments/<payment_id>/status/?wait=30
+    
+    Com `wait`, a resposta só volta quando o status mudar (ou após o
+    tempo informado, máx. 30s).
     
     Response:
     {
@@ -269,6 +296,7 @@ def get_payment_status(request, payment_id):
         # Buscar no banco local primeiro
         try:
             mp_payment = MercadoPagoPayment.objects.get(mp_payment_id=payment_id)
+            mp_payment = _aguardar_pagamento(request, mp_payment)
             return JsonResponse({
                 "success": True,
                 "payment_id": payment_id,
@@ -613,6 +641,11 @@ def check_payment_status(request, payment_id):
     
     GET /payments/api/check/<payment_id>/
     POST /payments/api/check/<payment_id>/
+    GET /payments/api/check/<payment_id>/?wait=30
+    
+    Com `wait`, espera (máx. 30s) o status mudar por webhook antes de
+    consultar o Mercado Pago. As consultas ao Mercado Pago ficam alguns
+    segundos em cache, compartilhadas entre as requisições.
     
     Response (success):
     {
@@ -642,19 +675,25 @@ def check_payment_status(request, payment_id):
             }, status=404)
         
         old_status = mp_payment.status
+        mp_payment = _aguardar_pagamento(request, mp_payment)
         status_detail = ""
         synced = False
         mp_status_response = None
         
-        # Tentar sincronizar com o Mercado Pago
+        # Tentar sincronizar com o Mercado Pago (se o status mudou durante
+        # a espera, o webhook já atualizou o pagamento)
         mp_config = mp_payment.config
-        if mp_config and mp_config.access_token:
+        if mp_config and mp_config.access_token and mp_payment.status == old_status:
             mp_service = MercadoPagoService(mp_config.access_token)
             
             # Se temos o mp_payment_id, buscar status direto
             if mp_payment.mp_payment_id:
                 try:
-                    mp_status_response = mp_service.get_payment(mp_payment.mp_payment_id)
+                    mp_status_response = status_updates.consultar_gateway(
+                        status_updates.PAGAMENTO, mp_payment.pk,
+                        lambda: mp_service.get_payment(mp_payment.mp_payment_id),
+                        variante=mp_payment.mp_payment_id,
+                    )
                     if mp_status_response:
                         new_status = mp_status_response.get("status", mp_payment.status)
                         status_detail = mp_status_response.get("status_detail", "")
@@ -676,7 +715,11 @@ def check_payment_status(request, payment_id):
                     # O external_reference está armazenado no campo pix_qr_code (workaround)
                     external_ref = mp_payment.pix_qr_code  # pandia_padaria_xxxxx
                     if external_ref and external_ref.startswith("pandia_"):
-                        search_result = mp_service.search_payments(external_reference=external_ref, limit=1)
+                        search_result = status_updates.consultar_gateway(
+                            status_updates.PAGAMENTO, mp_payment.pk,
+                            lambda: mp_service.search_payments(external_reference=external_ref, limit=1),
+                            variante="search",
+                        )
                         if search_result and search_result.get("results"):
                             payment_data = search_result["results"][0]
                             new_status = payment_data.get("status", mp_payment.status)
@@ -1149,6 +1192,12 @@ def check_subscription_status(request, padaria_slug):
     Usado para polling após pagamento.
     
     GET /payments/api/subscription/{padaria_slug}/status/
+    GET /payments/api/subscription/{padaria_slug}/status/?wait=30
+    
+    Com `wait`, espera (máx. 30s) a assinatura mudar de status (ou o status
+    deixar de ser o informado em `?status=`) antes de responder; a consulta
+    à Cakto só é feita se ela continuar inativa, e fica alguns segundos em
+    cache.
     
     Response:
     {
@@ -1170,35 +1219,47 @@ def check_subscription_status(request, padaria_slug):
             "error": "Padaria não encontrada"
         }, status=404)
     
-    # Tentar Cakto primeiro
-    subscription = None
-    is_cakto = False
+    def carregar():
+        # Tentar Cakto primeiro, fallback para Asaas
+        return (
+            CaktoSubscription.objects.filter(padaria=padaria).first()
+            or AsaasSubscription.objects.filter(padaria=padaria).first()
+        )
     
-    try:
-        subscription = CaktoSubscription.objects.get(padaria=padaria)
-        is_cakto = True
-        
-        # Se tiver order_id e não estiver ativo, tentar sincronizar com API
-        if subscription.cakto_order_id and subscription.status not in ['active']:
-            try:
-                result = cakto_service.get_order_status(subscription.cakto_order_id)
-                if result.get("success"):
-                    api_status = result.get("status", "")
-                    if api_status in ["approved", "paid"]:
-                        subscription.activate()
-                        logger.info(f"Assinatura {padaria_slug} ativada via polling")
-            except Exception as e:
-                logger.warning(f"Erro ao consultar API Cakto para {padaria_slug}: {e}")
-                
-    except CaktoSubscription.DoesNotExist:
-        # Fallback para Asaas
+    subscription = carregar()
+    if subscription is None:
+        return JsonResponse({
+            "success": False,
+            "error": "Assinatura não encontrada"
+        }, status=404)
+    
+    segundos = status_updates.segundos_espera(request.GET.get("wait"))
+    if segundos:
+        conhecido = request.GET.get("status")
+        subscription = status_updates.aguardar_status(
+            status_updates.ASSINATURA,
+            padaria.id,
+            carregar=carregar,
+            em_espera=lambda s: s is not None and (s.status == conhecido if conhecido else s.status != 'active'),
+            segundos=segundos,
+        ) or subscription
+    is_cakto = isinstance(subscription, CaktoSubscription)
+    
+    # Se tiver order_id e não estiver ativo, tentar sincronizar com API
+    if is_cakto and subscription.cakto_order_id and subscription.status not in ['active']:
         try:
-            subscription = AsaasSubscription.objects.get(padaria=padaria)
-        except AsaasSubscription.DoesNotExist:
-            return JsonResponse({
-                "success": False,
-                "error": "Assinatura não encontrada"
-            }, status=404)
+            result = status_updates.consultar_gateway(
+                status_updates.ASSINATURA, padaria.id,
+                lambda: cakto_service.get_order_status(subscription.cakto_order_id),
+                variante=subscription.cakto_order_id,
+            )
+            if result.get("success"):
+                api_status = result.get("status", "")
+                if api_status in ["approved", "paid"]:
+                    subscription.activate()
+                    logger.info(f"Assinatura {padaria_slug} ativada via polling")
+        except Exception as e:
+            logger.warning(f"Erro ao consultar API Cakto para {padaria_slug}: {e}")
     
     # Retornar status
     response_data = {
@@ -1,114 +1,79 @@
 """
-Management command para processar assinaturas Cakto diariamente.
+Management command para processar assinaturas Cakto.
 
 Funções:
 - Verifica trials expirando (3 dias antes do fim)
 - Desativa padarias com trial expirado sem pagamento
-- Processa renovações de assinaturas ativas
+- Desativa padarias com pagamento vencido há mais de 15 dias
 
-Uso: python manage.py process_subscriptions
-Recomendado: Executar via cron/scheduler 1x ao dia
+O processamento é feito em lote (ver payments.subscription_lifecycle) e
+cada execução fica registrada em ProcessamentoAssinaturas.
+
+Uso: python manage.py process_subscriptions [--dry-run] [--batch-size 500]
+Executado automaticamente pelo agendador interno (run_scheduler), 1x por hora.
 """
 from django.core.management.base import BaseCommand
 from django.utils import timezone
-from datetime import timedelta
 
-from payments.models import CaktoSubscription
-from organizations.models import Padaria
+from payments import subscription_lifecycle
 
 
 class Command(BaseCommand):
     help = 'Processa assinaturas Cakto - verifica trials, ativa/desativa padarias'
-    
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--dry-run',
             action='store_true',
             help='Executa sem fazer alterações no banco de dados',
         )
-    
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=subscription_lifecycle.TAMANHO_LOTE,
+            help='Quantidade de assinaturas atualizadas por transação',
+        )
+
     def handle(self, *args, **options):
         dry_run = options.get('dry_run', False)
         today = timezone.now().date()
-        
+
         self.stdout.write(f"[{timezone.now()}] Iniciando processamento de assinaturas...")
-        
+
         if dry_run:
             self.stdout.write(self.style.WARNING("MODO DRY-RUN: Nenhuma alteração será feita"))
-        
-        # 1. Verificar trials expirando em 3 dias (para notificação)
-        warning_date = today + timedelta(days=3)
-        expiring_trials = CaktoSubscription.objects.filter(
-            status='trial',
-            trial_end_date=warning_date,
-            card_registered=False
-        )
-        
-        for sub in expiring_trials:
-            self.stdout.write(
-                f"  ⚠️  Trial expirando em 3 dias: {sub.padaria.name} (fim: {sub.trial_end_date})"
-            )
-            # TODO: Enviar email/notificação para o responsável
-        
-        # 2. Desativar padarias com trial expirado sem cartão cadastrado
-        expired_trials = CaktoSubscription.objects.filter(
-            status='trial',
-            trial_end_date__lt=today,
-        )
-        
-        expired_count = 0
-        for sub in expired_trials:
-            self.stdout.write(
-                f"  ❌ Trial expirado: {sub.padaria.name} (fim: {sub.trial_end_date})"
-            )
-            
-            if not dry_run:
-                # Mudar status para inativo
-                sub.status = 'inactive'
-                sub.save(update_fields=['status', 'updated_at'])
-                
-                # Desativar padaria
-                sub.padaria.is_active = False
-                sub.padaria.save(update_fields=['is_active'])
-                
-            expired_count += 1
-        
-        # 3. Verificar assinaturas ativas com pagamento vencido
-        overdue_subscriptions = CaktoSubscription.objects.filter(
-            status='active',
-            next_billing_date__lt=today
+
+        # Detalhes por padaria (só com -v 2: a listagem é uma consulta a mais por grupo)
+        if options['verbosity'] >= 2:
+            for nome, fim in subscription_lifecycle.trials_expirando(today).values_list(
+                'padaria__name', 'trial_end_date'
+            ):
+                self.stdout.write(f"  ⚠️  Trial expirando em 3 dias: {nome} (fim: {fim})")
+                # TODO: Enviar email/notificação para o responsável
+            for nome, fim in subscription_lifecycle.trials_expirados(today).values_list(
+                'padaria__name', 'trial_end_date'
+            ):
+                self.stdout.write(f"  ❌ Trial expirado: {nome} (fim: {fim})")
+            for nome, vencimento in subscription_lifecycle.assinaturas_atrasadas(today).values_list(
+                'padaria__name', 'next_billing_date'
+            ):
+                self.stdout.write(f"  ⚠️  Pagamento atrasado há {(today - vencimento).days} dias: {nome}")
+
+        execucao = subscription_lifecycle.processar_assinaturas(
+            hoje=today, dry_run=dry_run, tamanho_lote=options['batch_size']
         )
-        
-        overdue_count = 0
-        for sub in overdue_subscriptions:
-            days_overdue = (today - sub.next_billing_date).days
-            self.stdout.write(
-                f"  ⚠️  Pagamento atrasado há {days_overdue} dias: {sub.padaria.name}"
-            )
-            
-            # Após 15 dias de atraso, desativar
-            if days_overdue > 15:
-                self.stdout.write(
-                    f"  ❌ Desativando por inadimplência: {sub.padaria.name}"
-                )
-                
-                if not dry_run:
-                    sub.status = 'inactive'
-                    sub.save(update_fields=['status', 'updated_at'])
-                    
-                    sub.padaria.is_active = False
-                    sub.padaria.save(update_fields=['is_active'])
-                    
-                overdue_count += 1
-        
-        # 4. Resumo
+
+        # Resumo
         self.stdout.write("")
         self.stdout.write(self.style.SUCCESS("=" * 50))
-        self.stdout.write(f"Trials expirando em 3 dias: {expiring_trials.count()}")
-        self.stdout.write(f"Trials expirados processados: {expired_count}")
-        self.stdout.write(f"Assinaturas inadimplentes desativadas: {overdue_count}")
+        self.stdout.write(f"Trials expirando em 3 dias: {execucao.trials_expirando}")
+        self.stdout.write(f"Trials expirados processados: {execucao.trials_expirados}")
+        self.stdout.write(f"Assinaturas com pagamento atrasado: {execucao.assinaturas_atrasadas}")
+        self.stdout.write(f"Assinaturas inadimplentes desativadas: {execucao.inadimplentes_desativadas}")
+        self.stdout.write(f"Padarias desativadas: {execucao.padarias_desativadas}")
+        self.stdout.write(f"Duração: {execucao.duracao_ms} ms")
         self.stdout.write(self.style.SUCCESS("=" * 50))
-        
+
         if dry_run:
             self.stdout.write(self.style.WARNING("\nMODO DRY-RUN: Nenhuma alteração foi feita"))
         else:
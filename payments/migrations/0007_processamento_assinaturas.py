@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0006_caktosubscription_cakto_subscription_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcessamentoAssinaturas',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('iniciado_em', models.DateTimeField(db_index=True, verbose_name='Iniciado em')),
+                ('duracao_ms', models.PositiveIntegerField(default=0, verbose_name='Duração (ms)')),
+                ('dry_run', models.BooleanField(default=False, verbose_name='Dry-run')),
+                ('trials_expirando', models.PositiveIntegerField(default=0, verbose_name='Trials expirando')),
+                ('trials_expirados', models.PositiveIntegerField(default=0, verbose_name='Trials expirados')),
+                ('assinaturas_atrasadas', models.PositiveIntegerField(default=0, verbose_name='Assinaturas atrasadas')),
+                ('inadimplentes_desativadas', models.PositiveIntegerField(default=0, verbose_name='Inadimplentes desativadas')),
+                ('padarias_desativadas', models.PositiveIntegerField(default=0, verbose_name='Padarias desativadas')),
+                ('erro', models.TextField(blank=True, verbose_name='Erro')),
+            ],
+            options={
+                'verbose_name': 'Processamento de Assinaturas',
+                'verbose_name_plural': 'Processamentos de Assinaturas',
+                'ordering': ['-iniciado_em'],
+            },
+        ),
+    ]
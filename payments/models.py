@@ -778,3 +778,29 @@ class CaktoPayment(models.Model):
     def __str__(self):
         return f"Cakto #{self.id} - R${self.amount} - {self.get_status_display()}"
 
+
+
+class ProcessamentoAssinaturas(models.Model):
+    """
+    Histórico das execuções do processamento de assinaturas Cakto
+    (payments.subscription_lifecycle / comando process_subscriptions).
+    """
+    iniciado_em = models.DateTimeField(db_index=True, verbose_name="Iniciado em")
+    duracao_ms = models.PositiveIntegerField(default=0, verbose_name="Duração (ms)")
+    dry_run = models.BooleanField(default=False, verbose_name="Dry-run")
+    
+    trials_expirando = models.PositiveIntegerField(default=0, verbose_name="Trials expirando")
+    trials_expirados = models.PositiveIntegerField(default=0, verbose_name="Trials expirados")
+    assinaturas_atrasadas = models.PositiveIntegerField(default=0, verbose_name="Assinaturas atrasadas")
+    inadimplentes_desativadas = models.PositiveIntegerField(default=0, verbose_name="Inadimplentes desativadas")
+    padarias_desativadas = models.PositiveIntegerField(default=0, verbose_name="Padarias desativadas")
+    
+    erro = models.TextField(blank=True, verbose_name="Erro")
+    
+    class Meta:
+        verbose_name = "Processamento de Assinaturas"
+        verbose_name_plural = "Processamentos de Assinaturas"
+        ordering = ["-iniciado_em"]
+    
+    def __str__(self):
+        return f"Processamento {self.iniciado_em:%d/%m/%Y %H:%M} ({self.duracao_ms} ms)"
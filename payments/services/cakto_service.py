@@ -5,19 +5,18 @@ Integração com a API da Cakto para assinaturas recorrentes.
 Autenticação: OAuth2 com client_credentials
 1. POST /token/ com client_id + client_secret para obter access_token
 2. Usar access_token em todas as requisições subsequentes
+O token é gerenciado por core.oauth.TokenClientCredentials (compartilhado
+entre workers, renovado antes de expirar e após um 401).
 """
 import requests
 import logging
 from django.conf import settings
-from django.core.cache import cache
 from django.db import models
 from decimal import Decimal
-from datetime import datetime, timedelta
 
-logger = logging.getLogger(__name__)
+from core.oauth import TokenClientCredentials, TokenIndisponivel
 
-# Cache key para o access token
-CAKTO_TOKEN_CACHE_KEY = "cakto_access_token"
+logger = logging.getLogger(__name__)
 
 
 class CaktoService:
@@ -37,92 +36,40 @@ class CaktoService:
         self.test_mode = settings.CAKTO_TEST_MODE
         self.plan_value = settings.CAKTO_PLAN_VALUE
         self.plan_name = settings.CAKTO_PLAN_NAME
-        self._access_token = None
-        self._token_expires_at = None
+        # A Cakto recebe só client_id + client_secret (sem grant_type)
+        self.token = TokenClientCredentials(
+            "cakto", f"{self.base_url}/token/", self.client_id, self.client_secret, grant_type=None
+        )
     
     def _get_access_token(self):
         """
         Obtém access token via OAuth2.
-        Faz cache do token para evitar requisições desnecessárias.
+        O token é compartilhado entre os workers e renovado antes de expirar.
         """
-        # Verificar cache primeiro
-        cached_token = cache.get(CAKTO_TOKEN_CACHE_KEY)
-        if cached_token:
-            logger.debug("Usando token Cakto do cache")
-            return cached_token
-        
-        # Verificar token em memória
-        if self._access_token and self._token_expires_at:
-            if datetime.now() < self._token_expires_at:
-                return self._access_token
-        
-        # Obter novo token
-        token_url = f"{self.base_url}/token/"
-        
         try:
-            response = requests.post(
-                token_url,
-                headers={"Content-Type": "application/x-www-form-urlencoded"},
-                data={
-                    "client_id": self.client_id,
-                    "client_secret": self.client_secret,
-                },
-                timeout=30
-            )
-            
-            if response.status_code == 200:
-                token_data = response.json()
-                access_token = token_data.get("access_token")
-                expires_in = token_data.get("expires_in", 36000)  # Default 10 horas
-                
-                # Cachear token (com margem de segurança de 5 minutos)
-                cache_time = max(expires_in - 300, 60)
-                cache.set(CAKTO_TOKEN_CACHE_KEY, access_token, cache_time)
-                
-                # Salvar em memória também
-                self._access_token = access_token
-                self._token_expires_at = datetime.now() + timedelta(seconds=cache_time)
-                
-                logger.info(f"Novo token Cakto obtido, expira em {expires_in}s")
-                return access_token
-            else:
-                logger.error(f"Erro ao obter token Cakto: {response.status_code} - {response.text}")
-                return None
-                
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Erro de conexão ao obter token Cakto: {str(e)}")
+            return self.token.obter()
+        except TokenIndisponivel as e:
+            logger.error(str(e))
             return None
     
-    def _get_headers(self):
-        """Retorna headers para requisições à API com Bearer Token."""
-        access_token = self._get_access_token()
-        
-        if not access_token:
-            logger.error("Não foi possível obter access token Cakto")
-            return None
+    def _make_request(self, method, endpoint, data=None):
+        """
+        Faz requisição à API Cakto.
+        Se o token for rejeitado (401), renova e repete uma vez.
+        """
+        if method not in ("GET", "POST"):
+            raise ValueError(f"Método HTTP não suportado: {method}")
         
-        return {
-            "Authorization": f"Bearer {access_token}",
+        url = f"{self.base_url}/{endpoint}"
+        headers = {
             "Content-Type": "application/json",
             "Accept": "application/json",
         }
-    
-    def _make_request(self, method, endpoint, data=None):
-        """Faz requisição à API Cakto."""
-        headers = self._get_headers()
-        
-        if not headers:
-            return {"success": False, "error": "Falha na autenticação com Cakto"}
-        
-        url = f"{self.base_url}/{endpoint}"
         
         try:
-            if method == "GET":
-                response = requests.get(url, headers=headers, timeout=30)
-            elif method == "POST":
-                response = requests.post(url, headers=headers, json=data, timeout=30)
-            else:
-                raise ValueError(f"Método HTTP não suportado: {method}")
+            response = self.token.requisitar(
+                method, url, headers=headers, json=data if method == "POST" else None, timeout=30
+            )
             
             # Log da resposta
             logger.info(f"Cakto API {method} {endpoint}: {response.status_code}")
@@ -130,15 +77,15 @@ class CaktoService:
             if response.status_code in [200, 201]:
                 return {"success": True, "data": response.json()}
             elif response.status_code == 401:
-                # Token expirado, limpar cache e tentar novamente
-                cache.delete(CAKTO_TOKEN_CACHE_KEY)
-                self._access_token = None
-                logger.warning("Token Cakto expirado, limpando cache")
-                return {"success": False, "error": "Token expirado, tente novamente", "status_code": 401}
+                logger.warning("Token Cakto rejeitado mesmo após renovação")
+                return {"success": False, "error": "Falha na autenticação com Cakto", "status_code": 401}
             else:
                 logger.error(f"Cakto API error: {response.text}")
                 return {"success": False, "error": response.text, "status_code": response.status_code}
                 
+        except TokenIndisponivel as e:
+            logger.error(f"Não foi possível obter access token Cakto: {e}")
+            return {"success": False, "error": "Falha na autenticação com Cakto"}
         except requests.exceptions.Timeout:
             logger.error("Cakto API timeout")
             return {"success": False, "error": "Timeout na conexão com Cakto"}
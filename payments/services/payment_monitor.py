@@ -9,6 +9,8 @@ from typing import Optional, Dict, Set
 from django.utils import timezone
 from django.db import connection
 
+from core.db import escrever
+
 logger = logging.getLogger(__name__)
 
 # Armazena os IDs dos pagamentos sendo monitorados
@@ -139,7 +141,7 @@ class PaymentMonitor:
                             payment.mp_payment_id = mp_payment_id
                         if new_status == 'approved':
                             payment.paid_at = timezone.now()
-                        payment.save()
+                        escrever(payment.save)
                         
                         # Callback se definido
                         if self.on_status_change:
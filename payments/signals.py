@@ -1,12 +1,14 @@
 """
-Signals para criação automática de assinatura quando uma padaria é criada.
+Signals para criação automática de assinatura quando uma padaria é criada
+e para notificar os endpoints de long-poll quando um status muda.
 """
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from django.conf import settings
 
 from organizations.models import Padaria
-from .models import AsaasSubscription
+from . import status_updates
+from .models import AsaasSubscription, CaktoSubscription, MercadoPagoPayment
 
 
 @receiver(post_save, sender=Padaria)
@@ -30,3 +32,14 @@ def create_subscription_on_padaria_create(sender, instance, created, **kwargs):
                 status='active',  # Ativa com trial
                 next_due_date=trial_end_date,  # Primeiro vencimento após 15 dias
             )
+
+
+@receiver(post_save, sender=MercadoPagoPayment)
+def notificar_pagamento(sender, instance, **kwargs):
+    status_updates.notificar_apos_commit(status_updates.PAGAMENTO, instance.pk)
+
+
+@receiver(post_save, sender=CaktoSubscription)
+@receiver(post_save, sender=AsaasSubscription)
+def notificar_assinatura(sender, instance, **kwargs):
+    status_updates.notificar_apos_commit(status_updates.ASSINATURA, instance.padaria_id)
@@ -0,0 +1,182 @@
+"""
+Notificação de mudanças de status (pagamentos Mercado Pago e assinaturas)
+para os endpoints de polling com long-poll (`?wait=N`).
+
+Todo save de MercadoPagoPayment, CaktoSubscription ou AsaasSubscription
+(webhooks, monitor de pagamento, sincronização manual) chama `notificar`
+depois do commit, que:
+
+- incrementa a versão do objeto no cache compartilhado, vista pelas
+  requisições esperando em outros workers (leitura a cada
+  `INTERVALO_CACHE` segundos);
+- acorda na hora as requisições esperando neste processo.
+
+As consultas ao gateway (Mercado Pago, Cakto) feitas pelos endpoints
+passam por `consultar_gateway`: o resultado fica no cache por
+`GATEWAY_TTL` segundos e só uma requisição por objeto consulta o gateway
+de cada vez; as outras esperam o resultado dela, por no máximo
+`GATEWAY_LOCK_TTL` segundos (se quem consulta morreu ou travou, consultam
+o gateway diretamente). A versão faz parte da chave, então uma
+notificação invalida o resultado anterior.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+PAGAMENTO = "pagamento"
+ASSINATURA = "assinatura"
+
+WAIT_MAX = 30
+INTERVALO_CACHE = 1.0
+VERSAO_TTL = 60 * 60
+
+GATEWAY_TTL = 5
+GATEWAY_LOCK_TTL = 20
+INTERVALO_GATEWAY = 0.1
+
+_condicao = threading.Condition()
+# chave -> {"aguardando": n, "versao": n}; só chaves com requisições esperando
+_locais = {}
+
+
+def _chave(tipo, ident):
+    return f"payments:status:{tipo}:{ident}"
+
+
+def segundos_espera(valor):
+    """Valor de `?wait=` limitado a 0..WAIT_MAX (inválido vira 0)."""
+    try:
+        return max(0, min(int(valor), WAIT_MAX))
+    except (TypeError, ValueError):
+        return 0
+
+
+def notificar(tipo, ident):
+    """Avisa as requisições esperando pelo objeto que ele mudou."""
+    chave = _chave(tipo, ident)
+    if not cache.add(chave, 1, VERSAO_TTL):
+        try:
+            cache.incr(chave)
+        except ValueError:
+            # Expirou entre o add e o incr
+            cache.set(chave, 1, VERSAO_TTL)
+    with _condicao:
+        estado = _locais.get(chave)
+        if estado is not None:
+            estado["versao"] += 1
+            _condicao.notify_all()
+
+
+def notificar_apos_commit(tipo, ident):
+    transaction.on_commit(lambda: notificar(tipo, ident))
+
+
+class Observador:
+    """
+    Espera notificações de um objeto. Entre no contexto antes de ler o
+    status no banco, para não perder uma notificação feita entre a leitura
+    e a espera.
+    """
+
+    def __init__(self, tipo, ident):
+        self.chave = _chave(tipo, ident)
+
+    def __enter__(self):
+        with _condicao:
+            self._estado = _locais.setdefault(self.chave, {"aguardando": 0, "versao": 0})
+            self._estado["aguardando"] += 1
+            self._local = self._estado["versao"]
+        self._compartilhada = cache.get(self.chave, 0)
+        return self
+
+    def __exit__(self, *exc):
+        with _condicao:
+            self._estado["aguardando"] -= 1
+            if not self._estado["aguardando"]:
+                _locais.pop(self.chave, None)
+
+    def aguardar(self, timeout):
+        """
+        Bloqueia até a próxima notificação ou o timeout.
+
+        Returns:
+            True se houve notificação
+        """
+        limite = time.monotonic() + timeout
+        while True:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return False
+            with _condicao:
+                if self._estado["versao"] == self._local:
+                    _condicao.wait(min(restante, INTERVALO_CACHE))
+                notificado = self._estado["versao"] != self._local
+                self._local = self._estado["versao"]
+            compartilhada = cache.get(self.chave, 0)
+            if compartilhada != self._compartilhada:
+                self._compartilhada = compartilhada
+                notificado = True
+            if notificado:
+                return True
+
+
+def aguardar_status(tipo, ident, carregar, em_espera, segundos):
+    """
+    Relê o objeto a cada notificação enquanto `em_espera(objeto)` for
+    verdadeiro, por até `segundos`.
+
+    Args:
+        carregar: função que lê o objeto do banco
+        em_espera: função que diz se o status ainda é o que se espera mudar
+
+    Returns:
+        o objeto mais recente
+    """
+    with Observador(tipo, ident) as observador:
+        objeto = carregar()
+        limite = time.monotonic() + segundos
+        while em_espera(objeto):
+            restante = limite - time.monotonic()
+            if restante <= 0 or not observador.aguardar(restante):
+                break
+            objeto = carregar()
+    return objeto
+
+
+def consultar_gateway(tipo, ident, consulta, variante=""):
+    """
+    Resultado de `consulta()` para o objeto, com cache curto e uma só
+    consulta em andamento por objeto (entre workers).
+
+    Resultados None e exceções não ficam no cache.
+    """
+    versao = cache.get(_chave(tipo, ident), 0)
+    chave = f"payments:gateway:{tipo}:{ident}:{variante}:{versao}"
+    resultado = cache.get(chave)
+    if resultado is not None:
+        return resultado
+
+    lock = f"{chave}:lock"
+    limite = time.monotonic() + GATEWAY_LOCK_TTL
+    while not cache.add(lock, True, GATEWAY_LOCK_TTL):
+        if time.monotonic() >= limite:
+            # Quem tem o lock não respondeu a tempo: consulta sem ele
+            return _consultar(chave, consulta)
+        # Outra requisição está consultando: usa o resultado dela
+        time.sleep(INTERVALO_GATEWAY)
+        resultado = cache.get(chave)
+        if resultado is not None:
+            return resultado
+    try:
+        return _consultar(chave, consulta)
+    finally:
+        cache.delete(lock)
+
+
+def _consultar(chave, consulta):
+    resultado = consulta()
+    if resultado is not None:
+        cache.set(chave, resultado, GATEWAY_TTL)
+    return resultado
@@ -0,0 +1,153 @@
+"""
+Ciclo de vida das assinaturas Cakto (comando process_subscriptions, rodado
+pelo agendador interno - ver core.scheduler).
+
+- conta os trials sem cartão que expiram em `DIAS_AVISO_TRIAL` dias;
+- desativa assinatura e padaria dos trials expirados;
+- desativa assinatura e padaria com cobrança vencida há mais de
+  `DIAS_TOLERANCIA` dias.
+
+As desativações são UPDATEs em conjunto, em lotes de `TAMANHO_LOTE`
+assinaturas, cada lote em uma transação. Como `update()` não dispara os
+signals de métricas do painel (admin_panel.signals), cada lote aplica os
+mesmos incrementos nos contadores. Cada execução fica registrada em
+ProcessamentoAssinaturas.
+"""
+import logging
+import time
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import status_updates
+from .models import CaktoSubscription, ProcessamentoAssinaturas
+
+logger = logging.getLogger(__name__)
+
+DIAS_AVISO_TRIAL = 3
+DIAS_TOLERANCIA = 15
+TAMANHO_LOTE = 500
+HISTORICO_DIAS = 90
+
+
+def trials_expirando(hoje):
+    return CaktoSubscription.objects.filter(
+        status='trial',
+        trial_end_date=hoje + timedelta(days=DIAS_AVISO_TRIAL),
+        card_registered=False,
+    )
+
+
+def trials_expirados(hoje):
+    return CaktoSubscription.objects.filter(status='trial', trial_end_date__lt=hoje)
+
+
+def assinaturas_atrasadas(hoje):
+    """Ativas com cobrança vencida (ainda dentro ou já fora da tolerância)."""
+    return CaktoSubscription.objects.filter(status='active', next_billing_date__lt=hoje)
+
+
+def inadimplentes(hoje):
+    return assinaturas_atrasadas(hoje).filter(next_billing_date__lt=hoje - timedelta(days=DIAS_TOLERANCIA))
+
+
+def _notificar(padaria_ids):
+    # Requisições em long-poll do status da assinatura (api_views)
+    for padaria_id in padaria_ids:
+        status_updates.notificar(status_updates.ASSINATURA, padaria_id)
+
+
+def _desativar(queryset, status_anterior, tamanho_lote):
+    """
+    Passa as assinaturas do queryset para 'inactive' e desativa as padarias.
+
+    Returns:
+        (assinaturas desativadas, padarias desativadas)
+    """
+    from admin_panel import metrics
+    from agents.models import Agent
+    from organizations.models import Padaria
+
+    assinaturas = padarias = 0
+    ultimo_id = 0
+    while True:
+        with transaction.atomic():
+            lote = list(
+                queryset.select_for_update()
+                .filter(id__gt=ultimo_id)
+                .order_by('id')
+                .values_list('id', 'padaria_id', 'plan_value')[:tamanho_lote]
+            )
+            if not lote:
+                break
+            ultimo_id = lote[-1][0]
+            ids = [sub_id for sub_id, _, _ in lote]
+            padaria_ids = [padaria_id for _, padaria_id, _ in lote]
+
+            desativadas = CaktoSubscription.objects.filter(id__in=ids, status=status_anterior).update(
+                status='inactive', updated_at=timezone.now()
+            )
+            ativas = Padaria.objects.filter(id__in=padaria_ids, is_active=True)
+            sem_agente = ativas.filter(~Exists(Agent.objects.filter(padaria_id=OuterRef('pk')))).update(
+                is_active=False
+            )
+            com_agente = ativas.update(is_active=False)
+
+            deltas = {
+                metrics.chave_status_cakto(status_anterior): -desativadas,
+                metrics.chave_status_cakto('inactive'): desativadas,
+                metrics.PADARIAS_ATIVAS: -(sem_agente + com_agente),
+                metrics.PADARIAS_ATIVAS_SEM_AGENTE: -sem_agente,
+            }
+            if status_anterior == 'active':
+                deltas[metrics.MRR_CENTAVOS] = -sum(metrics.para_centavos(valor) for _, _, valor in lote)
+            metrics.incrementar_varios(deltas)
+
+            transaction.on_commit(lambda padaria_ids=padaria_ids: _notificar(padaria_ids))
+        assinaturas += desativadas
+        padarias += sem_agente + com_agente
+    return assinaturas, padarias
+
+
+def processar_assinaturas(hoje=None, dry_run=False, tamanho_lote=None):
+    """
+    Processa trials expirados e assinaturas inadimplentes.
+
+    Returns:
+        ProcessamentoAssinaturas da execução (já gravado)
+    """
+    hoje = hoje or timezone.now().date()
+    tamanho_lote = tamanho_lote or TAMANHO_LOTE
+    inicio = time.monotonic()
+    execucao = ProcessamentoAssinaturas(iniciado_em=timezone.now(), dry_run=dry_run)
+
+    try:
+        execucao.trials_expirando = trials_expirando(hoje).count()
+        execucao.assinaturas_atrasadas = assinaturas_atrasadas(hoje).count()
+        if dry_run:
+            execucao.trials_expirados = trials_expirados(hoje).count()
+            execucao.inadimplentes_desativadas = inadimplentes(hoje).count()
+        else:
+            execucao.trials_expirados, padarias_trial = _desativar(trials_expirados(hoje), 'trial', tamanho_lote)
+            execucao.inadimplentes_desativadas, padarias_inadimplentes = _desativar(
+                inadimplentes(hoje), 'active', tamanho_lote
+            )
+            execucao.padarias_desativadas = padarias_trial + padarias_inadimplentes
+    except Exception as e:
+        execucao.erro = str(e)
+        raise
+    finally:
+        execucao.duracao_ms = int((time.monotonic() - inicio) * 1000)
+        execucao.save()
+        ProcessamentoAssinaturas.objects.filter(
+            iniciado_em__lt=timezone.now() - timedelta(days=HISTORICO_DIAS)
+        ).delete()
+
+    logger.info(
+        f"Assinaturas processadas{' (dry-run)' if dry_run else ''} em {execucao.duracao_ms} ms: "
+        f"{execucao.trials_expirados} trials expirados, "
+        f"{execucao.inadimplentes_desativadas} inadimplentes desativadas"
+    )
+    return execucao
@@ -1,12 +1,18 @@
 """
 Testes para o app de pagamentos.
 """
+import threading
+import time
 from decimal import Decimal
 from unittest.mock import patch, MagicMock
-from django.test import TestCase, Client
+from django.test import TestCase, Client, override_settings
 from django.contrib.auth.models import User
+from django.urls import reverse
 from organizations.models import Padaria, ApiKey
-from payments.models import StripeAccount, PaymentSession
+from payments import status_updates
+from payments.models import (
+    StripeAccount, PaymentSession, MercadoPagoConfig, MercadoPagoPayment, CaktoSubscription,
+)
 
 
 class StripeAccountModelTest(TestCase):
@@ -213,3 +219,203 @@ class StripeWebhookTest(TestCase):
         session.refresh_from_db()
         self.assertEqual(session.status, "completed")
         self.assertIsNotNone(session.completed_at)
+
+
+@override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}})
+class StatusLongPollTest(TestCase):
+    """Testes para o long-poll dos endpoints de status."""
+    
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user = User.objects.create_user(username="testuser", password="12345")
+        self.padaria = Padaria.objects.create(name="Test Padaria", owner=self.user)
+        self.config = MercadoPagoConfig.objects.create(padaria=self.padaria, access_token="TEST-token")
+        self.payment = MercadoPagoPayment.objects.create(
+            config=self.config, mp_payment_id="999", amount=Decimal("30.00"), description="Pedido"
+        )
+    
+    def test_notificacao_acorda_quem_espera(self):
+        with status_updates.Observador(status_updates.PAGAMENTO, 1) as observador:
+            threading.Timer(0.05, status_updates.notificar, args=(status_updates.PAGAMENTO, 1)).start()
+            inicio = time.monotonic()
+            self.assertTrue(observador.aguardar(5))
+            self.assertLess(time.monotonic() - inicio, 1)
+            self.assertFalse(observador.aguardar(0.1))
+        self.assertEqual(status_updates._locais, {})
+    
+    def test_notificacao_de_outro_worker_pelo_cache(self):
+        from django.core.cache import cache
+        with patch.object(status_updates, "INTERVALO_CACHE", 0.02), \
+                status_updates.Observador(status_updates.PAGAMENTO, 1) as observador:
+            # Outro processo só altera a versão no cache compartilhado
+            cache.set(status_updates._chave(status_updates.PAGAMENTO, 1), 7)
+            self.assertTrue(observador.aguardar(1))
+    
+    def test_consulta_ao_gateway_em_voo_unico(self):
+        chamadas = []
+        
+        def consulta():
+            chamadas.append(1)
+            time.sleep(0.2)
+            return {"status": "pending"}
+        
+        resultados = []
+        threads = [
+            threading.Thread(target=lambda: resultados.append(
+                status_updates.consultar_gateway(status_updates.PAGAMENTO, 1, consulta)
+            ))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(chamadas), 1)
+        self.assertEqual(resultados, [{"status": "pending"}] * 4)
+        
+        # Uma notificação invalida o resultado em cache
+        status_updates.notificar(status_updates.PAGAMENTO, 1)
+        status_updates.consultar_gateway(status_updates.PAGAMENTO, 1, consulta)
+        self.assertEqual(len(chamadas), 2)
+    
+    def test_consulta_ao_gateway_com_lock_abandonado(self):
+        from django.core.cache import cache
+        # Lock de um worker que morreu no meio da consulta
+        chave = f"payments:gateway:{status_updates.PAGAMENTO}:1::0"
+        cache.set(f"{chave}:lock", True, 60)
+        with patch.object(status_updates, "GATEWAY_LOCK_TTL", 0.2), \
+                patch.object(status_updates, "INTERVALO_GATEWAY", 0.02):
+            inicio = time.monotonic()
+            resultado = status_updates.consultar_gateway(
+                status_updates.PAGAMENTO, 1, lambda: {"status": "approved"}
+            )
+        self.assertEqual(resultado, {"status": "approved"})
+        self.assertLess(time.monotonic() - inicio, 1)
+        self.assertEqual(cache.get(chave), {"status": "approved"})
+    
+    @patch("payments.api_views.MercadoPagoService.get_payment")
+    def test_check_payment_status_usa_cache_do_gateway(self, get_payment):
+        get_payment.return_value = {"status": "pending", "status_detail": "pending_waiting_transfer"}
+        url = reverse("payments:api_check_payment", args=[self.payment.id])
+        for _ in range(3):
+            response = self.client.get(url)
+            self.assertTrue(response.json()["synced"])
+        self.assertEqual(get_payment.call_count, 1)
+    
+    @patch("payments.api_views.MercadoPagoService.get_payment")
+    def test_wait_retorna_quando_webhook_aprova(self, get_payment):
+        def webhook(observador, timeout):
+            self.payment.status = "approved"
+            self.payment.save()
+            return True
+        
+        url = reverse("payments:api_check_payment", args=[self.payment.id])
+        with patch.object(status_updates.Observador, "aguardar", autospec=True, side_effect=webhook) as aguardar:
+            response = self.client.get(url, {"wait": "120"})
+        
+        self.assertEqual(response.json()["status"], "approved")
+        self.assertTrue(response.json()["status_changed"])
+        # Espera limitada a 30s; status veio do webhook, sem consultar o gateway
+        self.assertLessEqual(aguardar.call_args[0][1], status_updates.WAIT_MAX)
+        get_payment.assert_not_called()
+    
+    def test_wait_nao_espera_status_final(self):
+        self.payment.status = "approved"
+        self.payment.save()
+        url = reverse("payments:api_payment_status", args=[self.payment.mp_payment_id])
+        with patch.object(status_updates.Observador, "aguardar") as aguardar:
+            response = self.client.get(url, {"wait": "30"})
+        self.assertEqual(response.json()["status"], "approved")
+        aguardar.assert_not_called()
+    
+    @patch("payments.services.cakto_service.cakto_service.get_order_status")
+    def test_wait_assinatura(self, get_order_status):
+        get_order_status.return_value = {"success": True, "status": "waiting_payment"}
+        assinatura = CaktoSubscription.objects.create(padaria=self.padaria, cakto_order_id="ord_1")
+        assinatura.start_trial()
+        url = reverse("payments:api_subscription_status", args=[self.padaria.slug])
+        
+        def webhook(observador, timeout):
+            CaktoSubscription.objects.get(pk=assinatura.pk).activate()
+            return True
+        
+        with patch.object(status_updates.Observador, "aguardar", autospec=True, side_effect=webhook):
+            response = self.client.get(url, {"wait": "30"})
+        self.assertEqual(response.json()["status"], "active")
+        get_order_status.assert_not_called()
+        
+        # Sem wait, inativa: consulta a Cakto uma vez para várias requisições
+        CaktoSubscription.objects.filter(pk=assinatura.pk).update(status="inactive")
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).json()["status"], "inactive")
+        self.assertEqual(get_order_status.call_count, 1)
+
+
+class ProcessamentoAssinaturasTest(TestCase):
+    """Testes para o processamento em lote das assinaturas Cakto."""
+    
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from agents.models import Agent
+        
+        self.hoje = timezone.now().date()
+        self.user = User.objects.create_user(username="testuser", password="12345")
+        
+        def assinatura(nome, **campos):
+            padaria = Padaria.objects.create(name=nome, owner=self.user)
+            return CaktoSubscription.objects.create(padaria=padaria, plan_value=Decimal("99.90"), **campos)
+        
+        dia = timedelta(days=1)
+        self.trial_expirado = assinatura("Trial Expirado", status="trial", trial_end_date=self.hoje - dia)
+        self.trial_expirando = assinatura("Trial Expirando", status="trial", trial_end_date=self.hoje + 3 * dia)
+        self.inadimplente = assinatura("Inadimplente", status="active", next_billing_date=self.hoje - 16 * dia)
+        self.atrasada = assinatura("Atrasada", status="active", next_billing_date=self.hoje - 5 * dia)
+        self.em_dia = assinatura("Em Dia", status="active", next_billing_date=self.hoje + 10 * dia)
+        Agent.objects.create(padaria=self.inadimplente.padaria, name="Ana")
+    
+    def test_desativa_em_lote_e_mantem_metricas(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        from admin_panel import metrics
+        from payments import subscription_lifecycle
+        from payments.models import ProcessamentoAssinaturas
+        
+        with CaptureQueriesContext(connection) as consultas:
+            execucao = subscription_lifecycle.processar_assinaturas(hoje=self.hoje, tamanho_lote=1)
+        
+        self.assertEqual(execucao.trials_expirando, 1)
+        self.assertEqual(execucao.trials_expirados, 1)
+        self.assertEqual(execucao.assinaturas_atrasadas, 2)
+        self.assertEqual(execucao.inadimplentes_desativadas, 1)
+        self.assertEqual(execucao.padarias_desativadas, 2)
+        self.assertEqual(ProcessamentoAssinaturas.objects.get().pk, execucao.pk)
+        
+        status = dict(CaktoSubscription.objects.values_list("padaria__name", "status"))
+        self.assertEqual(status["Trial Expirado"], "inactive")
+        self.assertEqual(status["Inadimplente"], "inactive")
+        self.assertEqual(status["Atrasada"], "active")
+        self.assertEqual(status["Trial Expirando"], "trial")
+        self.assertEqual(
+            set(Padaria.objects.filter(is_active=False).values_list("name", flat=True)),
+            {"Trial Expirado", "Inadimplente"},
+        )
+        # Contadores do painel continuam iguais ao recálculo
+        self.assertEqual(metrics.reconciliar(dry_run=True), [])
+        # Sem consultas por assinatura (nem save() nem sub.padaria)
+        self.assertLess(len(consultas), 40)
+        
+        # Segunda execução não encontra nada a fazer
+        execucao = subscription_lifecycle.processar_assinaturas(hoje=self.hoje)
+        self.assertEqual((execucao.trials_expirados, execucao.inadimplentes_desativadas), (0, 0))
+    
+    def test_dry_run_pelo_comando(self):
+        from io import StringIO
+        from django.core.management import call_command
+        
+        saida = StringIO()
+        call_command("process_subscriptions", "--dry-run", verbosity=2, stdout=saida)
+        self.assertIn("Trial expirado: Trial Expirado", saida.getvalue())
+        self.assertIn("Trials expirados processados: 1", saida.getvalue())
+        self.assertEqual(CaktoSubscription.objects.filter(status="inactive").count(), 0)
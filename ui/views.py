@@ -3,9 +3,7 @@ from django.contrib.auth.decorators import login_required
 from organizations.models import Padaria, PadariaUser, ApiKey
 from agents.models import Agent
 from audit.models import AuditLog
-from django.db.models import Count, Q
-from django.utils import timezone
-from datetime import timedelta
+from audit.activity import resumo_atividade
 
 
 @login_required
@@ -69,55 +67,8 @@ def dashboard(request):
         # Logs recentes das padarias do usuário
         logs = AuditLog.objects.filter(padaria__in=padarias).order_by("-created_at")[:10]
     
-    # Estatísticas para clientes
-    hoje = timezone.now()
-    dias_30 = hoje - timedelta(days=30)
-    dias_7 = hoje - timedelta(days=7)
-    
-    # Atividade nos últimos 30 dias
-    atividade_30_dias = AuditLog.objects.filter(
-        padaria__in=padarias,
-        created_at__gte=dias_30
-    ).count()
-    
-    # Atividade nos últimos 7 dias
-    atividade_7_dias = AuditLog.objects.filter(
-        padaria__in=padarias,
-        created_at__gte=dias_7
-    ).count()
-    
-    # Chamadas de API nos últimos 30 dias
-    api_calls_30_dias = AuditLog.objects.filter(
-        padaria__in=padarias,
-        created_at__gte=dias_30,
-        action='api_call'
-    ).count()
-    
-    # Gráfico de atividade por dia (últimos 7 dias)
-    atividade_diaria = []
-    for i in range(6, -1, -1):
-        dia = hoje - timedelta(days=i)
-        dia_inicio = dia.replace(hour=0, minute=0, second=0, microsecond=0)
-        dia_fim = dia_inicio + timedelta(days=1)
-        
-        count = AuditLog.objects.filter(
-            padaria__in=padarias,
-            created_at__gte=dia_inicio,
-            created_at__lt=dia_fim
-        ).count()
-        
-        atividade_diaria.append({
-            'dia': dia.strftime('%d/%m'),
-            'count': count
-        })
-    
-    # Ações mais frequentes
-    acoes_frequentes = AuditLog.objects.filter(
-        padaria__in=padarias,
-        created_at__gte=dias_30
-    ).values('action').annotate(
-        total=Count('id')
-    ).order_by('-total')[:5]
+    # Estatísticas para clientes (contadores diários, ver audit.activity)
+    atividade = resumo_atividade(padarias)
     
     # Status do agente (se existe)
     agente = agents.first() if agents.exists() else None
@@ -130,11 +81,7 @@ def dashboard(request):
         "logs": logs,
         "api_keys": api_keys,
         "api_keys_count": api_keys.count(),
-        "atividade_30_dias": atividade_30_dias,
-        "atividade_7_dias": atividade_7_dias,
-        "api_calls_30_dias": api_calls_30_dias,
-        "atividade_diaria": atividade_diaria,
-        "acoes_frequentes": acoes_frequentes,
+        **atividade,
     }
     
     return render(request, "ui/dashboard.html", context)
@@ -1,5 +1,7 @@
 import json
-from django.test import TestCase
+from unittest.mock import patch
+from django.test import TestCase, override_settings
+from django.urls import reverse
 from django.contrib.auth.models import User
 from organizations.models import Organization, ApiKey
 from audit.models import AuditLog
@@ -81,3 +83,110 @@ class WebhookTest(TestCase):
         )
         
         self.assertEqual(response.status_code, 400)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    EVOLUTION_WEBHOOK_TOKEN="segredo",
+    EVOLUTION_API_URL="http://evolution.local",
+    EVOLUTION_API_KEY="chave",
+)
+class EvolutionWebhookTest(TestCase):
+    """Testes para o webhook global da Evolution API."""
+
+    def setUp(self):
+        from django.core.cache import cache
+        from organizations.models import Padaria, PadariaUser
+
+        cache.clear()
+        self.user = User.objects.create_user(username="dono", password="12345")
+        self.padaria = Padaria.objects.create(name="Padaria Teste", owner=self.user)
+        PadariaUser.objects.get_or_create(user=self.user, padaria=self.padaria, defaults={"role": "dono"})
+        self.client.force_login(self.user)
+
+    def _evento(self, dados, token="segredo"):
+        return self.client.post(
+            f"/webhooks/evolution/?token={token}", data=json.dumps(dados), content_type="application/json"
+        )
+
+    @patch("organizations.whatsapp_state.requests.get")
+    def test_connection_update_alimenta_o_status(self, get):
+        response = self._evento({
+            "event": "connection.update",
+            "instance": "padaria_padaria-teste",
+            "data": {"instance": "padaria_padaria-teste", "state": "open", "statusReason": 200},
+        })
+        self.assertEqual(response.json(), {"status": "ok", "updated": True, "state": "open"})
+
+        status = self.client.get(reverse("organizations:whatsapp_status", args=[self.padaria.slug])).json()
+        self.assertEqual(status["status"], "connected")
+        get.assert_not_called()
+
+        self._evento({"event": "CONNECTION_UPDATE", "instance": "padaria_padaria-teste", "data": {"state": "close"}})
+        status = self.client.get(reverse("organizations:whatsapp_status", args=[self.padaria.slug])).json()
+        self.assertEqual(status["status"], "disconnected")
+        get.assert_not_called()
+
+    @patch("organizations.whatsapp_state.requests.get")
+    def test_sem_estado_consulta_a_evolution_uma_vez(self, get):
+        get.return_value.status_code = 200
+        get.return_value.json.return_value = {"instance": {"state": "connecting"}}
+        url = reverse("organizations:whatsapp_status", args=[self.padaria.slug])
+        for _ in range(3):
+            self.assertEqual(self.client.get(url).json()["status"], "connecting")
+        # As demais leituras vêm do cache
+        get.assert_called_once()
+
+    @patch("organizations.whatsapp_state.requests.get")
+    def test_estado_consultado_expira_no_backend_configurado(self, get):
+        import os
+        import tempfile
+        import time
+        from django.conf import settings
+        from organizations import whatsapp_state
+
+        # O backend padrão (SQLiteCache), não o LocMem da classe
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        caches = {"default": {**settings.CACHES["default"], "BACKEND": "core.cache.SQLiteCache",
+                              "LOCATION": os.path.join(tmp.name, "cache.sqlite3")}}
+        get.return_value.status_code = 200
+        get.return_value.json.return_value = {"instance": {"state": "connecting"}}
+        url = reverse("organizations:whatsapp_status", args=[self.padaria.slug])
+
+        with self.settings(CACHES=caches):
+            self.client.force_login(self.user)
+            self.assertEqual(self.client.get(url).json()["status"], "connecting")
+            self.assertEqual(self.client.get(url).json()["status"], "connecting")
+            get.assert_called_once()
+
+            get.return_value.json.return_value = {"instance": {"state": "open"}}
+            depois = time.time() + whatsapp_state.CONSULTA_TTL + 1
+            with patch("core.cache.time.time", return_value=depois):
+                self.assertEqual(self.client.get(url).json()["status"], "connected")
+            self.assertEqual(get.call_count, 2)
+
+    def test_token_invalido(self):
+        self.assertEqual(self._evento({"event": "connection.update"}, token="errado").status_code, 401)
+        self.assertEqual(self._evento({"event": "qrcode.updated"}).json()["status"], "ignored")
+
+    @patch("organizations.delivery_receipts._iniciar_thread")
+    def test_messages_update_registra_recibos(self, _iniciar_thread):
+        from organizations import delivery_receipts
+
+        self.addCleanup(delivery_receipts._pendentes.clear)
+        response = self._evento({
+            "event": "messages.update",
+            "instance": "padaria_padaria-teste",
+            "date_time": "2026-01-10T12:00:00.000Z",
+            "data": {"keyId": "BAE5F1", "remoteJid": "5511999990000@s.whatsapp.net", "status": "READ"},
+        })
+        self.assertEqual(response.json(), {"status": "ok", "receipts": 1})
+        self._evento({
+            "event": "MESSAGES_UPDATE",
+            "data": [{"key": {"id": "BAE5F2"}, "update": {"status": 3}}, {"key": {"id": "X"}, "update": {"status": 2}}],
+        })
+        self.assertEqual(
+            {mid: set(p["tipos"]) for mid, p in delivery_receipts._pendentes.items()},
+            {"BAE5F1": {"lido"}, "BAE5F2": {"entregue"}},
+        )
@@ -7,6 +7,7 @@ app_name = "webhooks"
 
 urlpatterns = [
     path("n8n/events", views.receive_event, name="n8n_events"),
+    path("evolution/", views.evolution_event, name="evolution"),
     path("asaas/", asaas_webhook.asaas_webhook, name="asaas"),
     path("mercadopago/", mercadopago_webhook.mercadopago_webhook, name="mercadopago"),
 ]
@@ -1,9 +1,18 @@
+import hmac
 import json
-from django.http import JsonResponse
+import logging
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_http_methods
 from audit.models import AuditLog
+from organizations.models import Cliente
 from core.utils import require_api_key, get_client_ip
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from organizations import delivery_receipts, whatsapp_state
+
+logger = logging.getLogger(__name__)
 
 
 @csrf_exempt
@@ -32,21 +41,122 @@ def receive_event(request):
             "error": "Missing required fields: type, agent_slug, session_id"
         }, status=400)
     
-    # Log do evento
     padaria = request.api_key.padaria
+    
+    # Identificar o cliente pelo número do WhatsApp (busca indexada por E.164)
+    cliente = None
+    numero = _numero_do_evento(data, payload)
+    if numero:
+        cliente = Cliente.buscar_por_whatsapp(padaria, numero)
+    
+    # Log do evento
     AuditLog.log(
         action="webhook_received",
         entity="n8n_event",
-        organization=padaria,
+        padaria=padaria,
         entity_id=session_id,
         diff={
             "type": event_type,
             "agent_slug": agent_slug,
             "session_id": session_id,
+            "cliente_id": cliente.id if cliente else None,
             "payload": payload
         },
         ip=get_client_ip(request),
         user_agent=request.META.get("HTTP_USER_AGENT", "")
     )
     
-    return JsonResponse({"status": "ok"})
+    return JsonResponse({
+        "status": "ok",
+        "cliente": {"id": cliente.id, "nome": cliente.nome} if cliente else None,
+    })
+
+
+def _numero_do_evento(data, payload):
+    """
+    Número do WhatsApp do contato no evento: campo phone/telefone ou o JID
+    do Evolution (5511999999999@s.whatsapp.net).
+    """
+    for origem in (payload, data):
+        if not isinstance(origem, dict):
+            continue
+        for campo in ("phone", "telefone", "remote_jid", "remoteJid"):
+            valor = origem.get(campo)
+            if valor:
+                return str(valor).split("@", 1)[0]
+    return ""
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def evolution_event(request):
+    """
+    Recebe eventos do webhook global da Evolution API.
+    URL: /webhooks/evolution/?token=<EVOLUTION_WEBHOOK_TOKEN>
+
+    O webhook de cada instância continua apontando para o n8n (mensagens);
+    este endpoint deve ser configurado como webhook global da Evolution
+    (WEBHOOK_GLOBAL_URL) com os eventos CONNECTION_UPDATE e MESSAGES_UPDATE.
+
+    Eventos processados:
+    - CONNECTION_UPDATE: estado da conexão da instância (cache)
+    - MESSAGES_UPDATE: recibos de entrega/leitura das mensagens de campanha
+    """
+    token = request.headers.get("x-webhook-token") or request.GET.get("token", "")
+    esperado = getattr(settings, "EVOLUTION_WEBHOOK_TOKEN", "")
+    if not esperado or not hmac.compare_digest(token, esperado):
+        logger.warning("Evolution webhook: token inválido recebido")
+        return HttpResponse(status=401)
+
+    try:
+        data = json.loads(request.body.decode("utf-8"))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+    if not isinstance(data, dict):
+        return JsonResponse({"error": "Invalid JSON"}, status=400)
+
+    # v1 envia "CONNECTION_UPDATE", v2 "connection.update"
+    evento = str(data.get("event", "")).lower().replace("_", ".")
+    tratador = _EVENTOS_EVOLUTION.get(evento)
+    if tratador is None:
+        return JsonResponse({"status": "ignored", "event": evento})
+    return JsonResponse({"status": "ok", **tratador(data)})
+
+
+def _evolution_connection_update(data):
+    payload = data.get("data") or {}
+    instancia = data.get("instance") or payload.get("instance")
+    if isinstance(instancia, dict):
+        instancia = instancia.get("instanceName")
+    state = payload.get("state")
+    if not instancia or not state:
+        return {"updated": False}
+    whatsapp_state.registrar_estado(instancia, state)
+    return {"updated": True, "state": state}
+
+
+def _evolution_messages_update(data):
+    # v2: um dict com keyId/status; v1: lista com key.id/update.status
+    itens = data.get("data")
+    if isinstance(itens, dict):
+        itens = [itens]
+    quando = parse_datetime(str(data.get("date_time") or "")) or timezone.now()
+    if timezone.is_naive(quando):
+        quando = timezone.make_aware(quando)
+
+    recibos = []
+    for item in itens or []:
+        if not isinstance(item, dict):
+            continue
+        message_id = item.get("keyId") or (item.get("key") or {}).get("id")
+        status = item.get("status", (item.get("update") or {}).get("status"))
+        tipo = delivery_receipts.tipo_do_status(status)
+        if message_id and tipo:
+            recibos.append((message_id, tipo, quando))
+    return {"receipts": delivery_receipts.registrar(recibos)}
+
+
+_EVENTOS_EVOLUTION = {
+    "connection.update": _evolution_connection_update,
+    "messages.update": _evolution_messages_update,
+}